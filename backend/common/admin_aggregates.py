@@ -0,0 +1,240 @@
+"""Single-pass aggregates over the main table for admin stats and reports.
+
+The admin stats, usage and report endpoints used to list users, then query
+profiles per user and heroes per profile: thousands of sequential round
+trips at a few thousand users. MainTableAggregate is instead built from one
+parallel scan of the main table. Items are classified by key prefix as they
+stream in (user METADATA, USER#/PROFILE#, PROFILE#/HERO#), and only small
+per-user and per-profile rollups are kept, so endpoints can still apply the
+same rules as before: soft-deleted users and profiles are skipped, heroes
+only count under a live profile of a live user, and test accounts can be
+left out.
+
+A built aggregate is reused for AGGREGATE_MAX_AGE seconds, so the admin
+dashboard's stats, usage and report calls share one scan.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from .db import get_table, parallel_scan
+
+logger = logging.getLogger(__name__)
+
+AGGREGATE_MAX_AGE = 60  # seconds
+
+# Attributes any of the aggregates read (#n/#r: reserved words)
+_PROJECTION = (
+    "PK, SK, user_id, username, email, #r, is_active, is_test_account, "
+    "ai_requests_today, created_at, last_login, deleted_at, "
+    "#n, state_number, server_age_days, furnace_level, spending_profile, "
+    "alliance_role, hero_name, hero_class"
+)
+
+_cached: Optional["MainTableAggregate"] = None
+_cached_at = 0.0
+_lock = threading.Lock()
+
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """Parse an ISO timestamp as stored on items (None if missing/invalid)."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+@dataclass
+class ProfileRollup:
+    """A live profile and the heroes tracked under it."""
+
+    item: dict
+    hero_count: int = 0
+    hero_names: Counter = field(default_factory=Counter)
+    hero_classes: Counter = field(default_factory=Counter)
+
+
+@dataclass
+class UserRollup:
+    """A live user, their live profiles and parsed activity timestamps."""
+
+    item: dict
+    profiles: List[ProfileRollup] = field(default_factory=list)
+    created: Optional[datetime] = None
+    last_login: Optional[datetime] = None
+
+    @property
+    def hero_count(self) -> int:
+        return sum(p.hero_count for p in self.profiles)
+
+    @property
+    def is_test(self) -> bool:
+        return bool(self.item.get("is_test_account"))
+
+    def days_since_login(self, now: datetime) -> Optional[int]:
+        return (now - self.last_login).days if self.last_login else None
+
+
+class MainTableAggregate:
+    """Users, profiles and hero tallies gathered in one streaming pass."""
+
+    def __init__(self):
+        self.users: Dict[str, UserRollup] = {}
+        self._profiles: Dict[str, tuple] = {}  # profile_id -> (user_id, ProfileRollup)
+        self._heroes: Dict[str, ProfileRollup] = {}  # profile_id -> hero tallies
+        self.items_scanned = 0
+
+    def add(self, item: dict) -> None:
+        """Classify one main-table item by its key prefixes."""
+        self.items_scanned += 1
+        pk, sk = item.get("PK", ""), item.get("SK", "")
+        if pk.startswith("USER#"):
+            if item.get("deleted_at"):
+                return
+            user_id = pk[len("USER#"):]
+            if sk == "METADATA":
+                self.users[user_id] = UserRollup(
+                    item=item,
+                    created=parse_timestamp(item.get("created_at")),
+                    last_login=parse_timestamp(item.get("last_login")),
+                )
+            elif sk.startswith("PROFILE#"):
+                self._profiles[sk[len("PROFILE#"):]] = (user_id, ProfileRollup(item=item))
+        elif pk.startswith("PROFILE#") and sk.startswith("HERO#"):
+            tally = self._heroes.setdefault(pk[len("PROFILE#"):], ProfileRollup(item={}))
+            tally.hero_count += 1
+            name = sk[len("HERO#"):] or item.get("hero_name")
+            if name:
+                tally.hero_names[name] += 1
+            if item.get("hero_class"):
+                tally.hero_classes[item["hero_class"]] += 1
+
+    def finish(self) -> "MainTableAggregate":
+        """Attach hero tallies to profiles and profiles to users."""
+        for profile_id, (user_id, profile) in sorted(self._profiles.items()):
+            user = self.users.get(user_id)
+            if user is None:
+                continue  # profile of a deleted or missing user
+            tally = self._heroes.get(profile_id)
+            if tally:
+                profile.hero_count = tally.hero_count
+                profile.hero_names = tally.hero_names
+                profile.hero_classes = tally.hero_classes
+            user.profiles.append(profile)
+        self._profiles.clear()
+        self._heroes.clear()
+        return self
+
+    def select(self, include_test: bool = True) -> List[UserRollup]:
+        """Users newest first (the order list_users returned them in)."""
+        users = [u for u in self.users.values() if include_test or not u.is_test]
+        users.sort(key=lambda u: u.item.get("created_at", ""), reverse=True)
+        return users
+
+    def summary(self, include_test: bool = False, now: Optional[datetime] = None) -> dict:
+        """Every counter the stats and usage endpoints report, in one pass over the rollups."""
+        now = now or datetime.now(timezone.utc)
+        users = self.select(include_test)
+        totals = Counter()
+        hero_names, hero_classes = Counter(), Counter()
+        spending, alliance_roles, states = Counter(), Counter(), Counter()
+        activity = Counter({"very_active": 0, "active_weekly": 0, "active_monthly": 0, "inactive": 0})
+        created_dates, login_dates = Counter(), Counter()
+
+        for u in users:
+            totals["active_users"] += 1 if u.item.get("is_active") else 0
+            totals["ai_requests_today"] += u.item.get("ai_requests_today", 0)
+            totals["profiles"] += len(u.profiles)
+            has_state = False
+            for p in u.profiles:
+                totals["heroes"] += p.hero_count
+                hero_names.update(p.hero_names)
+                hero_classes.update(p.hero_classes)
+                if p.item.get("state_number"):
+                    states[p.item["state_number"]] += 1
+                    has_state = True
+                if p.item.get("spending_profile"):
+                    spending[p.item["spending_profile"]] += 1
+                if p.item.get("alliance_role"):
+                    alliance_roles[p.item["alliance_role"]] += 1
+            totals["users_with_state" if has_state else "users_without_state"] += 1
+
+            days_since = u.days_since_login(now)
+            if days_since is None or days_since > 30:
+                activity["inactive"] += 1
+            elif days_since <= 1:
+                activity["very_active"] += 1
+            elif days_since <= 7:
+                activity["active_weekly"] += 1
+            else:
+                activity["active_monthly"] += 1
+
+            if u.created:
+                created_dates[u.created.strftime("%Y-%m-%d")] += 1
+            if u.last_login:
+                login_dates[u.last_login.strftime("%Y-%m-%d")] += 1
+
+        return {
+            "total_users": len(users),
+            "test_accounts": sum(1 for u in self.users.values() if u.is_test),
+            "active_users": totals["active_users"],
+            "ai_requests_today": totals["ai_requests_today"],
+            "total_profiles": totals["profiles"],
+            "total_heroes": totals["heroes"],
+            "users_with_state": totals["users_with_state"],
+            "users_without_state": totals["users_without_state"],
+            "hero_popularity": hero_names,
+            "hero_classes": hero_classes,
+            "spending_distribution": spending,
+            "alliance_roles": alliance_roles,
+            "states": states,
+            "activity_breakdown": dict(activity),
+            "created_dates": created_dates,
+            "login_dates": login_dates,
+        }
+
+
+def build_main_table_aggregate() -> MainTableAggregate:
+    """Scan the main table once (in parallel segments) and aggregate it."""
+    started = time.perf_counter()
+    aggregate = MainTableAggregate()
+    items = parallel_scan(
+        get_table("main"),
+        projection=_PROJECTION,
+        ExpressionAttributeNames={"#n": "name", "#r": "role"},
+        FilterExpression=(
+            "(begins_with(PK, :user) AND (SK = :meta OR begins_with(SK, :profile))) "
+            "OR (begins_with(PK, :profile) AND begins_with(SK, :hero))"
+        ),
+        ExpressionAttributeValues={
+            ":user": "USER#",
+            ":meta": "METADATA",
+            ":profile": "PROFILE#",
+            ":hero": "HERO#",
+        },
+    )
+    for item in items:
+        aggregate.add(item)
+    aggregate.finish()
+    logger.info(
+        "Main table aggregate built: %d items, %d users in %.2fs",
+        aggregate.items_scanned, len(aggregate.users), time.perf_counter() - started,
+    )
+    return aggregate
+
+
+def get_main_table_aggregate(max_age: float = AGGREGATE_MAX_AGE) -> MainTableAggregate:
+    """Return a recent aggregate, rebuilding it if older than max_age seconds."""
+    global _cached, _cached_at
+    with _lock:
+        if _cached is None or time.monotonic() - _cached_at > max_age:
+            _cached = build_main_table_aggregate()
+            _cached_at = time.monotonic()
+        return _cached
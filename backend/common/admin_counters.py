@@ -0,0 +1,287 @@
+"""Incrementally maintained counters for admin stats (AdminTable).
+
+Totals that only change on writes (users by status and role, profiles,
+heroes tracked, per-hero ownership, conversations by source/rating) are
+kept in counter items and updated with atomic ADD expressions by the repos
+that write the underlying items, so the admin stats endpoints read them
+with a single query instead of recounting the main table.
+
+users, users_active and ai_requests_today count every account;
+users_real, users_active_real, ai_requests_today_real and users_role_<role>
+leave test accounts out, and users_test says how many there are. Profiles
+and heroes are counted without knowing their owner, so the TEST_USERS item
+lists the test accounts and test_account_usage() works out their share for
+the admin stats to subtract. Soft-deleted users are not counted.
+
+Layout:
+- PK=COUNTERS, SK=TOTALS: users, users_active, users_test, users_real,
+  users_active_real, users_role_<role>, ai_requests_today,
+  ai_requests_today_real, profiles, heroes, conversations,
+  conversations_rated, conversations_helpful, conversations_unhelpful,
+  good_examples, bad_examples, answer_cache_hits, answer_cache_misses,
+  tokens_saved, source_<routed_to>
+- PK=COUNTERS, SK=HERO#<name>: owned
+- PK=COUNTERS, SK=TEST_USERS: user_ids (string set)
+
+Updates are best effort: a failed increment is logged and never fails the
+user's write. reconcile_counters() recomputes everything from a scan (run
+daily by the cleanup job and on demand by admins) and corrects any drift,
+including from paths that bypass the repos (user deletion, manual edits).
+"""
+
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from .db import count_query, get_table, iter_query, parallel_scan
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_PK = "COUNTERS"
+TOTALS_SK = "TOTALS"
+HERO_SK_PREFIX = "HERO#"
+TEST_USERS_SK = "TEST_USERS"
+
+TOTAL_FIELDS = (
+    "users", "users_active", "users_test", "ai_requests_today",
+    "users_real", "users_active_real", "ai_requests_today_real",
+    "profiles", "heroes", "conversations", "conversations_rated",
+    "conversations_helpful", "conversations_unhelpful", "good_examples", "bad_examples",
+    "answer_cache_hits", "answer_cache_misses", "tokens_saved",
+)
+
+
+def increment(deltas: dict, sk: str = TOTALS_SK) -> None:
+    """Atomically ADD each non-zero delta to a counter item."""
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    names = {f"#k{i}": key for i, key in enumerate(deltas)}
+    values = {f":v{i}": value for i, value in enumerate(deltas.values())}
+    try:
+        get_table("admin").update_item(
+            Key={"PK": COUNTERS_PK, "SK": sk},
+            UpdateExpression="ADD " + ", ".join(f"#k{i} :v{i}" for i in range(len(deltas))),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+        )
+    except Exception:
+        logger.warning("Counter update failed for %s %s", sk, deltas, exc_info=True)
+
+
+def record_heroes(added: Iterable[str] = (), removed: Iterable[str] = ()) -> None:
+    """Count heroes added to / removed from profiles (totals and per hero)."""
+    change = Counter(added)
+    change.subtract(removed)
+    change = {name: n for name, n in change.items() if n}
+    if not change:
+        return
+    increment({"heroes": sum(change.values())})
+    for name, n in change.items():
+        increment({"owned": n}, sk=f"{HERO_SK_PREFIX}{name}")
+
+
+def user_counts(item: Optional[dict]) -> Counter:
+    """The counters a single user METADATA item contributes to."""
+    counts = Counter()
+    if not item or item.get("deleted_at"):
+        return counts
+    ai_requests = int(item.get("ai_requests_today", 0))
+    counts["users"] = 1
+    counts["ai_requests_today"] = ai_requests
+    if item.get("is_active"):
+        counts["users_active"] = 1
+    if item.get("is_test_account"):
+        counts["users_test"] = 1
+        return counts
+    counts["users_real"] = 1
+    counts["ai_requests_today_real"] = ai_requests
+    if item.get("is_active"):
+        counts["users_active_real"] = 1
+    counts[f"users_role_{item.get('role') or 'user'}"] = 1
+    return counts
+
+
+def _test_user_id(item: Optional[dict]) -> Optional[str]:
+    """The user id of a live test account's METADATA item, else None."""
+    if not item or item.get("deleted_at") or not item.get("is_test_account"):
+        return None
+    return item.get("user_id") or item["PK"][len("USER#"):]
+
+
+def record_user_change(old: Optional[dict], new: Optional[dict]) -> None:
+    """Apply the counter difference between two states of a user."""
+    deltas = user_counts(new)
+    deltas.subtract(user_counts(old))
+    increment(deltas)
+
+    was_test, is_test = _test_user_id(old), _test_user_id(new)
+    if was_test == is_test:
+        return
+    try:
+        table = get_table("admin")
+        key = {"PK": COUNTERS_PK, "SK": TEST_USERS_SK}
+        if was_test:
+            table.update_item(
+                Key=key, UpdateExpression="DELETE user_ids :ids",
+                ExpressionAttributeValues={":ids": {was_test}},
+            )
+        if is_test:
+            table.update_item(
+                Key=key, UpdateExpression="ADD user_ids :ids",
+                ExpressionAttributeValues={":ids": {is_test}},
+            )
+    except Exception:
+        logger.warning("Test account list update failed for %s -> %s", was_test, is_test, exc_info=True)
+
+
+def test_account_usage(user_ids: Iterable[str]) -> Counter:
+    """Profiles and heroes that belong to the given (test) accounts.
+
+    Counted the way reconcile_counters counts them: live profiles, and
+    every hero under any of the account's profiles. A few key queries per
+    account; test accounts are few.
+    """
+    usage = Counter({"profiles": 0, "heroes": 0})
+    table = get_table("main")
+    for user_id in user_ids:
+        for profile in iter_query(table, f"USER#{user_id}", sk_begins_with="PROFILE#", projection="SK, deleted_at"):
+            if not profile.get("deleted_at"):
+                usage["profiles"] += 1
+            usage["heroes"] += count_query(
+                table,
+                KeyConditionExpression="PK = :pk AND begins_with(SK, :hero)",
+                ExpressionAttributeValues={":pk": profile["SK"], ":hero": "HERO#"},
+            )
+    return usage
+
+
+def conversation_counts(item: Optional[dict]) -> Counter:
+    """The counters a single conversation item contributes to."""
+    counts = Counter()
+    if not item:
+        return counts
+    counts["conversations"] = 1
+    source = item.get("routed_to") or item.get("source")
+    if source:
+        counts[f"source_{source}"] = 1
+    if item.get("rating") is not None:
+        counts["conversations_rated"] = 1
+    if item.get("is_helpful") is True:
+        counts["conversations_helpful"] = 1
+    elif item.get("is_helpful") is False:
+        counts["conversations_unhelpful"] = 1
+    if item.get("is_good_example"):
+        counts["good_examples"] = 1
+    if item.get("is_bad_example"):
+        counts["bad_examples"] = 1
+    if item.get("answer_cache") == "hit":
+        counts["answer_cache_hits"] = 1
+        counts["tokens_saved"] = int(item.get("tokens_saved", 0))
+    elif item.get("answer_cache") == "miss":
+        counts["answer_cache_misses"] = 1
+    return counts
+
+
+def record_conversation_change(old: Optional[dict], new: Optional[dict]) -> None:
+    """Apply the counter difference between two states of a conversation."""
+    deltas = conversation_counts(new)
+    deltas.subtract(conversation_counts(old))
+    increment(dict(deltas))
+
+
+def get_counters() -> dict:
+    """All counters in one query.
+
+    Returns:
+        {"totals": {...}, "heroes": {name: owned}, "test_users": {user_id, ...}}
+    """
+    totals = {field: 0 for field in TOTAL_FIELDS}
+    heroes = {}
+    test_users = set()
+    for item in iter_query(get_table("admin"), COUNTERS_PK, convert=True):
+        if item["SK"] == TOTALS_SK:
+            totals.update({k: v for k, v in item.items() if k not in ("PK", "SK", "reconciled_at")})
+            totals["reconciled_at"] = item.get("reconciled_at")
+        elif item["SK"] == TEST_USERS_SK:
+            test_users = set(item.get("user_ids") or ())
+        elif item["SK"].startswith(HERO_SK_PREFIX) and item.get("owned"):
+            heroes[item["SK"][len(HERO_SK_PREFIX):]] = item["owned"]
+    return {"totals": totals, "heroes": heroes, "test_users": test_users}
+
+
+def reconcile_counters() -> dict:
+    """Recompute every counter from a scan of the main table and overwrite them.
+
+    Increments that land while the scan runs may be lost until the next
+    reconcile; the counters are for reporting, not accounting.
+
+    Returns:
+        The recomputed totals.
+    """
+    totals = Counter({field: 0 for field in TOTAL_FIELDS})
+    owned = Counter()
+    test_users = set()
+    items = parallel_scan(
+        get_table("main"),
+        projection=(
+            "PK, SK, user_id, deleted_at, is_active, is_test_account, #role, ai_requests_today, "
+            "routed_to, #src, rating, is_helpful, is_good_example, is_bad_example, "
+            "answer_cache, tokens_saved"
+        ),
+        ExpressionAttributeNames={"#src": "source", "#role": "role"},
+        FilterExpression=(
+            "(begins_with(PK, :user) AND (SK = :meta OR begins_with(SK, :profile) "
+            "OR begins_with(SK, :conv))) "
+            "OR (begins_with(PK, :profile) AND begins_with(SK, :hero))"
+        ),
+        ExpressionAttributeValues={
+            ":user": "USER#",
+            ":meta": "METADATA",
+            ":profile": "PROFILE#",
+            ":conv": "AICONV#",
+            ":hero": "HERO#",
+        },
+    )
+    for item in items:
+        sk = item["SK"]
+        if item["PK"].startswith("PROFILE#"):
+            totals["heroes"] += 1
+            owned[sk[len("HERO#"):]] += 1
+        elif sk == "METADATA":
+            totals.update(user_counts(item))
+            if _test_user_id(item):
+                test_users.add(_test_user_id(item))
+        elif sk.startswith("PROFILE#"):
+            if not item.get("deleted_at"):
+                totals["profiles"] += 1
+        else:
+            totals.update(conversation_counts(item))
+
+    table = get_table("admin")
+    stale = {
+        item["SK"] for item in iter_query(table, COUNTERS_PK, projection="SK")
+        if item["SK"].startswith(HERO_SK_PREFIX)
+    }
+    with table.batch_writer() as batch:
+        batch.put_item(Item={
+            "PK": COUNTERS_PK,
+            "SK": TOTALS_SK,
+            **totals,
+            "reconciled_at": datetime.now(timezone.utc).isoformat(),
+        })
+        for name, n in owned.items():
+            sk = f"{HERO_SK_PREFIX}{name}"
+            stale.discard(sk)
+            batch.put_item(Item={"PK": COUNTERS_PK, "SK": sk, "owned": n})
+        for sk in stale:
+            batch.delete_item(Key={"PK": COUNTERS_PK, "SK": sk})
+        # DynamoDB has no empty sets
+        if test_users:
+            batch.put_item(Item={"PK": COUNTERS_PK, "SK": TEST_USERS_SK, "user_ids": test_users})
+        else:
+            batch.delete_item(Key={"PK": COUNTERS_PK, "SK": TEST_USERS_SK})
+
+    logger.info("Counters reconciled: %s", dict(totals))
+    return dict(totals)
@@ -5,7 +5,9 @@ import uuid
 from datetime import datetime, timezone
 from typing import Optional
 
-from .db import get_table, strip_none
+from boto3.dynamodb.conditions import Attr
+
+from .db import get_table, iter_query, strip_none
 
 
 def _generate_ulid() -> str:
@@ -31,11 +33,7 @@ DEFAULT_FLAGS = [
 def get_feature_flags() -> list:
     """Get all feature flags, seeding defaults if empty."""
     table = get_table("admin")
-    resp = table.query(
-        KeyConditionExpression="PK = :pk",
-        ExpressionAttributeValues={":pk": "FLAG"},
-    )
-    flags = resp.get("Items", [])
+    flags = list(iter_query(table, "FLAG"))
 
     if not flags:
         # Seed defaults
@@ -146,17 +144,8 @@ def bulk_flag_action(action: str) -> None:
 def get_announcements(active_only: bool = False) -> list:
     """Get all announcements."""
     table = get_table("admin")
-    resp = table.query(
-        KeyConditionExpression="PK = :pk",
-        ExpressionAttributeValues={":pk": "ANNOUNCE"},
-        ScanIndexForward=False,
-    )
-    items = resp.get("Items", [])
-
-    if active_only:
-        items = [a for a in items if a.get("is_active", True)]
-
-    return items
+    items = iter_query(table, "ANNOUNCE", scan_forward=False)
+    return [a for a in items if not active_only or a.get("is_active", True)]
 
 
 def create_announcement(
@@ -269,25 +258,18 @@ def get_feedback(status_filter: Optional[str] = None, category_filter: Optional[
     table = get_table("admin")
 
     if status_filter:
-        resp = table.query(
-            IndexName="GSI1-Status",
+        items = iter_query(
+            table,
+            index_name="GSI1-Status",
+            scan_forward=False,
             KeyConditionExpression="#s = :status",
             ExpressionAttributeNames={"#s": "status"},
             ExpressionAttributeValues={":status": status_filter},
-            ScanIndexForward=False,
         )
     else:
-        resp = table.query(
-            KeyConditionExpression="PK = :pk",
-            ExpressionAttributeValues={":pk": "FEEDBACK"},
-            ScanIndexForward=False,
-        )
+        items = iter_query(table, "FEEDBACK", scan_forward=False)
 
-    items = resp.get("Items", [])
-    if category_filter:
-        items = [f for f in items if f.get("category") == category_filter]
-
-    return items
+    return [f for f in items if not category_filter or f.get("category") == category_filter]
 
 
 def update_feedback(feedback_sk: str, updates: dict) -> dict:
@@ -356,13 +338,7 @@ def get_audit_logs(month: Optional[str] = None, limit: int = 100) -> list:
     if month is None:
         month = datetime.now(timezone.utc).strftime("%Y-%m")
 
-    resp = table.query(
-        KeyConditionExpression="PK = :pk",
-        ExpressionAttributeValues={":pk": f"AUDIT#{month}"},
-        ScanIndexForward=False,
-        Limit=limit,
-    )
-    return resp.get("Items", [])
+    return list(iter_query(table, f"AUDIT#{month}", scan_forward=False, limit=limit))
 
 
 # --- Error Logs ---
@@ -411,13 +387,7 @@ def log_error(
 def get_errors(limit: int = 100) -> list:
     """Get error logs, newest first."""
     table = get_table("admin")
-    resp = table.query(
-        KeyConditionExpression="PK = :pk",
-        ExpressionAttributeValues={":pk": "ERRORS"},
-        ScanIndexForward=False,
-        Limit=limit,
-    )
-    items = resp.get("Items", [])
+    items = list(iter_query(table, "ERRORS", scan_forward=False, limit=limit))
     # Add 'id' field for frontend (use error_id which is URL-safe)
     for item in items:
         item["id"] = item.get("error_id", item.get("SK", ""))
@@ -427,13 +397,8 @@ def get_errors(limit: int = 100) -> list:
 def _find_error_by_id(error_id: str) -> dict | None:
     """Find an error item by its error_id (ULID). Returns the item or None."""
     table = get_table("admin")
-    resp = table.query(
-        KeyConditionExpression="PK = :pk",
-        FilterExpression="error_id = :eid",
-        ExpressionAttributeValues={":pk": "ERRORS", ":eid": error_id},
-    )
-    items = resp.get("Items", [])
-    return items[0] if items else None
+    items = iter_query(table, "ERRORS", filter_expression=Attr("error_id").eq(error_id), limit=1)
+    return next(items, None)
 
 
 # Module-level rate limiter for error emails
@@ -512,12 +477,11 @@ def get_metrics_history(days: int = 90) -> list:
     table = get_table("admin")
     start_date = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
 
-    resp = table.query(
+    return list(iter_query(
+        table,
         KeyConditionExpression="PK = :pk AND SK >= :start",
         ExpressionAttributeValues={
             ":pk": "METRICS",
             ":start": start_date,
         },
-        ScanIndexForward=True,
-    )
-    return resp.get("Items", [])
+    ))
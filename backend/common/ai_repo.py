@@ -2,10 +2,14 @@
 
 import time
 import uuid
+from collections import Counter
 from datetime import datetime, timezone
 from typing import Optional
 
-from .db import get_table, strip_none
+from boto3.dynamodb.conditions import Attr
+
+from . import admin_counters
+from .db import get_table, iter_query, strip_none
 from .exceptions import RateLimitError
 
 
@@ -151,8 +155,14 @@ def log_conversation(
     tokens_output: int = 0,
     response_time_ms: int = 0,
     thread_id: Optional[str] = None,
+    answer_cache: Optional[str] = None,
+    tokens_saved: int = 0,
 ) -> dict:
-    """Log an AI conversation to MainTable."""
+    """Log an AI conversation to MainTable.
+
+    answer_cache is "hit" or "miss" when the advisor answer cache was
+    consulted; tokens_saved is what a cached answer originally cost.
+    """
     table = get_table("main")
     ulid = _generate_ulid()
     now = datetime.now(timezone.utc).isoformat()
@@ -177,43 +187,33 @@ def log_conversation(
         "is_good_example": False,
         "is_bad_example": False,
         "thread_id": thread_id,
+        "answer_cache": answer_cache,
+        "tokens_saved": tokens_saved or None,
         "created_at": now,
     })
 
     table.put_item(Item=item)
+    admin_counters.record_conversation_change(None, item)
     return item
 
 
 def get_conversation_history(user_id: str, limit: int = 10) -> list:
     """Get recent conversations for a user."""
     table = get_table("main")
-    resp = table.query(
-        KeyConditionExpression="PK = :pk AND begins_with(SK, :prefix)",
-        ExpressionAttributeValues={
-            ":pk": f"USER#{user_id}",
-            ":prefix": "AICONV#",
-        },
-        ScanIndexForward=False,
-        Limit=limit,
-    )
-    return resp.get("Items", [])
+    return list(iter_query(
+        table, f"USER#{user_id}", sk_begins_with="AICONV#",
+        scan_forward=False, limit=limit,
+    ))
 
 
 def get_favorites(user_id: str, limit: int = 20) -> list:
     """Get favorited conversations."""
     table = get_table("main")
-    resp = table.query(
-        KeyConditionExpression="PK = :pk AND begins_with(SK, :prefix)",
-        FilterExpression="is_favorite = :t",
-        ExpressionAttributeValues={
-            ":pk": f"USER#{user_id}",
-            ":prefix": "AICONV#",
-            ":t": True,
-        },
-        ScanIndexForward=False,
-        Limit=limit,
-    )
-    return resp.get("Items", [])
+    return list(iter_query(
+        table, f"USER#{user_id}", sk_begins_with="AICONV#",
+        filter_expression=Attr("is_favorite").eq(True),
+        scan_forward=False, limit=limit,
+    ))
 
 
 def rate_conversation(user_id: str, conversation_sk: str, updates: dict) -> dict:
@@ -236,21 +236,26 @@ def rate_conversation(user_id: str, conversation_sk: str, updates: dict) -> dict
     if not expr_parts:
         return {}
 
+    # ALL_OLD so the counters can see which flags changed
     resp = table.update_item(
         Key={"PK": f"USER#{user_id}", "SK": conversation_sk},
         UpdateExpression="SET " + ", ".join(expr_parts),
         ExpressionAttributeNames=attr_names,
         ExpressionAttributeValues=attr_values,
-        ReturnValues="ALL_NEW",
+        ReturnValues="ALL_OLD",
     )
-    return resp.get("Attributes", {})
+    old = resp.get("Attributes", {})
+    new = {**old, **{k: v for k, v in updates.items() if v is not None}}
+    admin_counters.record_conversation_change(old, new)
+    return new
 
 
 def delete_conversation(user_id: str, conversation_sk: str) -> bool:
     """Delete a single AI conversation. Returns True if deleted."""
     table = get_table("main")
     sk = conversation_sk if conversation_sk.startswith("AICONV#") else f"AICONV#{conversation_sk}"
-    table.delete_item(Key={"PK": f"USER#{user_id}", "SK": sk})
+    resp = table.delete_item(Key={"PK": f"USER#{user_id}", "SK": sk}, ReturnValues="ALL_OLD")
+    admin_counters.record_conversation_change(resp.get("Attributes"), None)
     return True
 
 
@@ -258,34 +263,35 @@ def delete_thread(user_id: str, thread_id: str) -> int:
     """Delete all conversations in a thread. Returns count deleted."""
     table = get_table("main")
     conversations = get_conversation_history(user_id, limit=200)
-    count = 0
+    removed = Counter()
     with table.batch_writer() as batch:
         for conv in conversations:
             if conv.get("thread_id") == thread_id:
                 batch.delete_item(Key={"PK": conv["PK"], "SK": conv["SK"]})
-                count += 1
-    return count
+                removed.update(admin_counters.conversation_counts(conv))
+    admin_counters.increment({k: -v for k, v in removed.items()})
+    return removed["conversations"]
 
 
 def delete_conversation_history(user_id: str) -> int:
     """Delete all AI conversations for a user. Returns count deleted."""
     table = get_table("main")
     # Query all AICONV items
-    resp = table.query(
-        KeyConditionExpression="PK = :pk AND begins_with(SK, :prefix)",
-        ExpressionAttributeValues={
-            ":pk": f"USER#{user_id}",
-            ":prefix": "AICONV#",
-        },
-        ProjectionExpression="PK, SK",
+    items = iter_query(
+        table, f"USER#{user_id}", sk_begins_with="AICONV#",
+        projection=(
+            "PK, SK, routed_to, #src, rating, is_helpful, is_good_example, is_bad_example, "
+            "answer_cache, tokens_saved"
+        ),
+        ExpressionAttributeNames={"#src": "source"},
     )
-    items = resp.get("Items", [])
-    count = 0
+    removed = Counter()
     with table.batch_writer() as batch:
         for item in items:
             batch.delete_item(Key={"PK": item["PK"], "SK": item["SK"]})
-            count += 1
-    return count
+            removed.update(admin_counters.conversation_counts(item))
+    admin_counters.increment({k: -v for k, v in removed.items()})
+    return removed["conversations"]
 
 
 def toggle_favorite(user_id: str, conversation_sk: str) -> bool:
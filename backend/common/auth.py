@@ -10,7 +10,6 @@ Claims path: event['requestContext']['authorizer']['jwt']['claims']
 from typing import Optional
 
 from common.exceptions import AuthenticationError, AuthorizationError
-from common.user_repo import get_user
 
 
 def get_user_claims(event: dict) -> dict:
@@ -67,16 +66,14 @@ def is_admin(event: dict) -> bool:
     """Check if current user has admin role.
 
     Looks up the user's role from DynamoDB since Cognito access
-    tokens don't include custom attributes.
+    tokens don't include custom attributes. The lookup is memoized on the
+    request's UserContext, so repeated checks cost one read.
 
     Returns:
         True if the user's role is 'admin', False otherwise.
     """
-    user_id = get_user_id(event)
-    user = get_user(user_id)
-    if not user:
-        return False
-    return user.get("role") == "admin"
+    from common.user_context import get_user_context
+    return get_user_context(event).is_admin
 
 
 def is_test_account(event: dict) -> bool:
@@ -88,8 +85,9 @@ def is_test_account(event: dict) -> bool:
     Returns:
         True if the user is a test account.
     """
-    user_id = get_user_id(event)
-    user = get_user(user_id)
+    from common.user_context import get_user_context
+    ctx = get_user_context(event)
+    user = ctx.get_user(ctx.caller_id)
     if not user:
         return False
     return user.get("is_test_account", False) is True
@@ -146,7 +144,5 @@ def get_effective_user_id(event: dict) -> str:
         AuthenticationError: If user identity cannot be determined.
         AuthorizationError: If a non-admin attempts impersonation.
     """
-    target = get_impersonation_target(event)
-    if target:
-        return target
-    return get_user_id(event)
+    from common.user_context import get_user_context
+    return get_user_context(event).user_id
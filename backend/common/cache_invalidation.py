@@ -0,0 +1,131 @@
+"""Cross-container invalidation for in-memory reference-data caches.
+
+Warm Lambda containers keep reference data (the engine, the hero store,
+parsed JSON) in memory indefinitely. A monotonically increasing generation
+counter in the ReferenceTable (PK=META, SK=REFERENCE_GENERATION) lets an
+admin edit on one container reach every other one: handlers call
+check_reference_generation() on entry, which reads the counter at most once
+every Config.REFERENCE_CHECK_INTERVAL seconds and, when it has moved, runs
+every registered invalidation hook. Caches then rebuild lazily on next use.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+GENERATION_PK = "META"
+GENERATION_SK = "REFERENCE_GENERATION"
+
+_hooks: list = []
+_hooks_lock = threading.Lock()
+
+_known_generation: Optional[int] = None
+_last_check: float = 0.0
+
+
+def register_invalidation_hook(hook: Callable[[], None]) -> None:
+    """Register a zero-arg callable that drops one in-memory cache."""
+    with _hooks_lock:
+        if hook not in _hooks:
+            _hooks.append(hook)
+
+
+def invalidate_local_caches() -> None:
+    """Run every registered hook in this container."""
+    for hook in list(_hooks):
+        try:
+            hook()
+        except Exception:
+            logger.exception("Cache invalidation hook %r failed", hook)
+
+
+def get_known_generation() -> int:
+    """Generation this container last saw (0 before the first check)."""
+    return _known_generation or 0
+
+
+def get_reference_generation() -> int:
+    """Read the current reference-data generation (0 if never bumped)."""
+    from .db import get_table
+
+    table = get_table("reference")
+    resp = table.get_item(Key={"PK": GENERATION_PK, "SK": GENERATION_SK})
+    item = resp.get("Item") or {}
+    return int(item.get("generation", 0))
+
+
+def bump_reference_generation(reason: str = "") -> int:
+    """Increment the generation after a reference-data edit.
+
+    Invalidates this container immediately; others pick the change up on
+    their next check.
+
+    Returns:
+        The new generation number.
+    """
+    global _known_generation
+    from .db import get_table
+
+    table = get_table("reference")
+    resp = table.update_item(
+        Key={"PK": GENERATION_PK, "SK": GENERATION_SK},
+        UpdateExpression="ADD generation :one SET updated_at = :now, reason = :reason",
+        ExpressionAttributeValues={
+            ":one": 1,
+            ":now": datetime.now(timezone.utc).isoformat(),
+            ":reason": reason or "unspecified",
+        },
+        ReturnValues="UPDATED_NEW",
+    )
+    generation = int(resp.get("Attributes", {}).get("generation", 0))
+
+    invalidate_local_caches()
+    _known_generation = generation
+    logger.info("Bumped reference generation to %d (%s)", generation, reason)
+    return generation
+
+
+def check_reference_generation(force: bool = False) -> bool:
+    """Invalidate local caches if another container bumped the generation.
+
+    Cheap on the hot path: only a clock comparison unless the check
+    interval has elapsed. Fails open (keeps serving cached data) if the
+    counter cannot be read.
+
+    Returns:
+        True if caches were invalidated.
+    """
+    global _known_generation, _last_check
+
+    now = time.monotonic()
+    if not force and now - _last_check < Config.REFERENCE_CHECK_INTERVAL:
+        return False
+    _last_check = now
+
+    try:
+        generation = get_reference_generation()
+    except Exception:
+        logger.warning("Could not read reference generation; keeping caches")
+        return False
+
+    if _known_generation is None:
+        # First check in this container: caches were built from current data
+        _known_generation = generation
+        return False
+
+    if generation == _known_generation:
+        return False
+
+    logger.info(
+        "Reference generation changed %s -> %s; invalidating caches",
+        _known_generation, generation,
+    )
+    _known_generation = generation
+    invalidate_local_caches()
+    return True
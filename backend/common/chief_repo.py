@@ -31,8 +31,11 @@ def get_chief_gear(profile_id: str) -> dict:
     resp = table.get_item(
         Key={"PK": f"PROFILE#{profile_id}", "SK": "CHIEFGEAR"}
     )
-    item = resp.get("Item")
+    return chief_gear_from_item(profile_id, resp.get("Item"))
 
+
+def chief_gear_from_item(profile_id: str, item: Optional[dict]) -> dict:
+    """Fill defaults into a fetched CHIEFGEAR item, creating it if missing."""
     if item:
         # Ensure all fields have defaults
         for key, default in _DEFAULT_GEAR.items():
@@ -102,8 +105,11 @@ def get_chief_charms(profile_id: str) -> dict:
     resp = table.get_item(
         Key={"PK": f"PROFILE#{profile_id}", "SK": "CHIEFCHARM"}
     )
-    item = resp.get("Item")
+    return chief_charms_from_item(profile_id, resp.get("Item"))
+
 
+def chief_charms_from_item(profile_id: str, item: Optional[dict]) -> dict:
+    """Fill defaults into a fetched CHIEFCHARM item, creating it if missing."""
     if item:
         for key, default in _DEFAULT_CHARMS.items():
             if key not in item or item[key] is None:
@@ -2,6 +2,7 @@
 
 import json
 import os
+import tempfile
 
 
 def _load_secrets():
@@ -48,6 +49,30 @@ class Config:
     ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY", "") or _secrets.get("ANTHROPIC_API_KEY", "")
     OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "") or _secrets.get("OPENAI_API_KEY", "")
 
+    # AI provider selection: "auto" (Anthropic, then OpenAI), a specific
+    # provider, or "fake" (offline canned answers streamed with the given
+    # delays in ms, for testing and benchmarking the streaming path)
+    AI_PROVIDER = os.environ.get("AI_PROVIDER", "auto")
+    AI_FAKE_FIRST_TOKEN_MS = int(os.environ.get("AI_FAKE_FIRST_TOKEN_MS", "400"))
+    AI_FAKE_TOKEN_DELAY_MS = int(os.environ.get("AI_FAKE_TOKEN_DELAY_MS", "25"))
+
+    # Pooled AI provider clients: request timeout and connect timeout in
+    # seconds, SDK retries, and idle keep-alive connections kept per provider
+    AI_TIMEOUT_SECONDS = float(os.environ.get("AI_TIMEOUT_SECONDS", "60"))
+    AI_CONNECT_TIMEOUT_SECONDS = float(os.environ.get("AI_CONNECT_TIMEOUT_SECONDS", "5"))
+    AI_MAX_RETRIES = int(os.environ.get("AI_MAX_RETRIES", "1"))
+    AI_KEEPALIVE_CONNECTIONS = int(os.environ.get("AI_KEEPALIVE_CONNECTIONS", "4"))
+
+    # Hedged AI requests: when the primary provider has not answered within
+    # its observed p95 latency (clamped to these bounds in ms, and
+    # AI_HEDGE_AFTER_MS until AI_HEDGE_MIN_SAMPLES calls have been seen),
+    # the fallback provider is called too and the first answer wins
+    AI_HEDGE_ENABLED = os.environ.get("AI_HEDGE_ENABLED", "true").lower() == "true"
+    AI_HEDGE_AFTER_MS = int(os.environ.get("AI_HEDGE_AFTER_MS", "12000"))
+    AI_HEDGE_MIN_MS = int(os.environ.get("AI_HEDGE_MIN_MS", "4000"))
+    AI_HEDGE_MAX_MS = int(os.environ.get("AI_HEDGE_MAX_MS", "30000"))
+    AI_HEDGE_MIN_SAMPLES = int(os.environ.get("AI_HEDGE_MIN_SAMPLES", "20"))
+
     # SES
     SES_FROM_EMAIL = os.environ.get("SES_FROM_EMAIL", "noreply@randomchaoslabs.com")
 
@@ -58,6 +83,39 @@ class Config:
     # Data directory (bundled with Lambda)
     DATA_DIR = os.environ.get("DATA_DIR", os.path.join(os.path.dirname(__file__), "..", "data"))
 
+    # Precompiled reference-data snapshot (built by scripts/build_reference_bundle.py,
+    # shipped inside the common layer)
+    REFERENCE_BUNDLE = os.environ.get(
+        "REFERENCE_BUNDLE", os.path.join(os.path.dirname(__file__), "reference_bundle.bin")
+    )
+
+    # Admin edits to reference data go to the ReferenceTable (read by every
+    # container) instead of the local data directory
+    REFERENCE_SHARED_EDITS = os.environ.get("REFERENCE_SHARED_EDITS", "false").lower() == "true"
+
+    # Seconds between reference-data generation checks per container
+    REFERENCE_CHECK_INTERVAL = int(os.environ.get("REFERENCE_CHECK_INTERVAL", "30"))
+
+    # Computed-result cache: in-process LRU budget (bytes of JSON), and an
+    # optional main-table layer with its TTL in seconds
+    RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+    RESULT_CACHE_PERSIST = os.environ.get("RESULT_CACHE_PERSIST", "false").lower() == "true"
+    RESULT_CACHE_TTL = int(os.environ.get("RESULT_CACHE_TTL", "86400"))
+
+    # Advisor answer cache (stored in the result cache): on/off, whether
+    # answers are shared across containers via the main table, and their TTL
+    ANSWER_CACHE_ENABLED = os.environ.get("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_PERSIST = os.environ.get("ANSWER_CACHE_PERSIST", "true").lower() == "true"
+    ANSWER_CACHE_TTL = int(os.environ.get("ANSWER_CACHE_TTL", str(6 * 3600)))
+
+    # Admin exports: S3 bucket (local directory when unset), multipart part
+    # size in bytes, presigned URL lifetime in seconds, and job retention
+    EXPORT_BUCKET = os.environ.get("EXPORT_BUCKET", "")
+    EXPORT_DIR = os.environ.get("EXPORT_DIR", os.path.join(tempfile.gettempdir(), "wos-exports"))
+    EXPORT_PART_SIZE = int(os.environ.get("EXPORT_PART_SIZE", str(8 * 1024 * 1024)))
+    EXPORT_URL_TTL = int(os.environ.get("EXPORT_URL_TTL", "900"))
+    EXPORT_RETENTION_DAYS = int(os.environ.get("EXPORT_RETENTION_DAYS", "7"))
+
     @classmethod
     def is_production(cls) -> bool:
         return cls.STAGE == "live"
@@ -3,22 +3,46 @@
 Provides a thin abstraction over boto3 DynamoDB resource with:
 - Lazy-cached table references from environment config
 - Helper methods for common operations (put, get, query, delete, batch, transact)
+- Streaming, paginated query/scan iterators and parallel segmented scans
 - Automatic serialization handling (Decimal, None filtering)
 - Local DynamoDB support via AWS_SAM_LOCAL
 """
 
 import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
-from typing import Any, Optional
+from typing import Any, Callable, Iterator, Optional
 
 import boto3
 from boto3.dynamodb.conditions import Key
 from botocore.exceptions import ClientError
 
 from common.config import Config
+from common.exceptions import AppError
 
 logger = logging.getLogger(__name__)
 
+# BatchGetItem accepts at most 100 keys per request
+BATCH_GET_MAX_KEYS = 100
+BATCH_GET_MAX_RETRIES = 8
+BATCH_GET_BASE_BACKOFF = 0.05  # seconds
+BATCH_GET_MAX_BACKOFF = 2.0
+
+# Worker threads / segments for parallel full-table scans
+DEFAULT_SCAN_SEGMENTS = 4
+
+_batch_stats_lock = threading.Lock()
+_batch_get_stats: dict[str, Any] = {
+    "requests": 0,
+    "items_read": 0,
+    "retries": 0,
+    "consumed_capacity": 0.0,
+}
+
 # ---------------------------------------------------------------------------
 # Module-level cached resources
 # ---------------------------------------------------------------------------
@@ -187,9 +211,39 @@ def get_item(table, pk: str, sk: str) -> Optional[dict]:
     return from_decimal(item) if item else None
 
 
-def query(
+def _paginate(
+    operation: Callable[..., dict],
+    params: dict[str, Any],
+    limit: Optional[int],
+    page_size: Optional[int],
+    convert: bool,
+) -> Iterator[dict]:
+    """Yield items from a Query/Scan call, following LastEvaluatedKey.
+
+    Pages are requested only as the caller consumes items, and iteration
+    stops as soon as `limit` items have been yielded.
+    """
+    # Without a filter every evaluated item is returned, so `limit` is also
+    # the right page size; with one, Limit would cap items *evaluated*.
+    if page_size or (limit and "FilterExpression" not in params):
+        params["Limit"] = page_size or limit
+    yielded = 0
+    while True:
+        response = operation(**params)
+        for item in response.get("Items", []):
+            yield from_decimal(item) if convert else item
+            yielded += 1
+            if limit and yielded >= limit:
+                return
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        params["ExclusiveStartKey"] = last_key
+
+
+def iter_query(
     table,
-    pk: str,
+    pk: Optional[str] = None,
     sk_begins_with: Optional[str] = None,
     sk_between: Optional[tuple[str, str]] = None,
     sk_value: Optional[str] = None,
@@ -198,9 +252,14 @@ def query(
     limit: Optional[int] = None,
     filter_expression=None,
     projection: Optional[str] = None,
+    page_size: Optional[int] = None,
+    convert: bool = False,
     **kwargs,
-) -> list[dict]:
-    """Query items by partition key with optional sort key conditions.
+) -> Iterator[dict]:
+    """Stream query results across every page.
+
+    Either pass `pk` (plus an optional sort key condition) or a raw
+    KeyConditionExpression with its attribute values in **kwargs.
 
     Args:
         table: DynamoDB Table resource.
@@ -210,49 +269,332 @@ def query(
         sk_value: Exact sort key match.
         index_name: GSI name if querying a secondary index.
         scan_forward: True for ascending, False for descending.
-        limit: Maximum items to return.
-        filter_expression: Optional boto3 filter expression.
+        limit: Stop after this many items (counted after filtering).
+        filter_expression: Optional filter expression.
         projection: Comma-separated projection expression.
+        page_size: Items evaluated per request (defaults to `limit` when
+            there is no filter, otherwise DynamoDB's 1 MB pages).
+        convert: Convert Decimals to int/float as each item is yielded.
         **kwargs: Additional arguments passed to table.query().
 
-    Returns:
-        List of item dicts with Decimals converted.
+    Yields:
+        Item dicts, one at a time.
     """
-    key_condition = Key("PK").eq(pk)
-
-    if sk_value is not None:
-        key_condition = key_condition & Key("SK").eq(sk_value)
-    elif sk_begins_with is not None:
-        key_condition = key_condition & Key("SK").begins_with(sk_begins_with)
-    elif sk_between is not None:
-        key_condition = key_condition & Key("SK").between(*sk_between)
-
-    params: dict[str, Any] = {
-        "KeyConditionExpression": key_condition,
-        "ScanIndexForward": scan_forward,
-    }
+    params: dict[str, Any] = {"ScanIndexForward": scan_forward}
+
+    if pk is not None:
+        key_condition = Key("PK").eq(pk)
+        if sk_value is not None:
+            key_condition = key_condition & Key("SK").eq(sk_value)
+        elif sk_begins_with is not None:
+            key_condition = key_condition & Key("SK").begins_with(sk_begins_with)
+        elif sk_between is not None:
+            key_condition = key_condition & Key("SK").between(*sk_between)
+        params["KeyConditionExpression"] = key_condition
 
     if index_name:
         params["IndexName"] = index_name
-    if limit:
-        params["Limit"] = limit
     if filter_expression:
         params["FilterExpression"] = filter_expression
     if projection:
         params["ProjectionExpression"] = projection
     params.update(kwargs)
 
-    # Paginate to collect all results
-    items = []
+    return _paginate(table.query, params, limit, page_size, convert)
+
+
+def iter_scan(
+    table,
+    limit: Optional[int] = None,
+    filter_expression=None,
+    projection: Optional[str] = None,
+    page_size: Optional[int] = None,
+    convert: bool = False,
+    **kwargs,
+) -> Iterator[dict]:
+    """Stream scan results across every page.
+
+    Args:
+        table: DynamoDB Table resource.
+        limit: Stop after this many items (counted after filtering).
+        filter_expression: Optional filter expression.
+        projection: Comma-separated projection expression.
+        page_size: Items evaluated per request (defaults to `limit` when
+            there is no filter, otherwise DynamoDB's 1 MB pages).
+        convert: Convert Decimals to int/float as each item is yielded.
+        **kwargs: Additional arguments passed to table.scan().
+
+    Yields:
+        Item dicts, one at a time.
+    """
+    params = _scan_params(filter_expression, projection, kwargs)
+    return _paginate(table.scan, params, limit, page_size, convert)
+
+
+def _scan_params(filter_expression, projection: Optional[str], kwargs: dict) -> dict[str, Any]:
+    params: dict[str, Any] = {}
+    if filter_expression:
+        params["FilterExpression"] = filter_expression
+    if projection:
+        params["ProjectionExpression"] = projection
+    params.update(kwargs)
+    return params
+
+
+def parallel_scan(
+    table,
+    segments: int = DEFAULT_SCAN_SEGMENTS,
+    filter_expression=None,
+    projection: Optional[str] = None,
+    convert: bool = False,
+    **kwargs,
+) -> Iterator[dict]:
+    """Stream a full-table scan split into parallel segments.
+
+    Each segment (Segment/TotalSegments) is paginated to completion on its
+    own worker thread; pages are handed to the caller through a bounded
+    queue as they arrive, so memory stays flat and items are yielded while
+    the rest of the table is still being read. Order across segments is
+    arbitrary. Closing the generator early stops the workers.
+
+    Args:
+        table: DynamoDB Table resource.
+        segments: Number of segments / worker threads.
+        filter_expression: Optional filter expression.
+        projection: Comma-separated projection expression.
+        convert: Convert Decimals to int/float as each item is yielded.
+        **kwargs: Additional arguments passed to Scan.
+
+    Yields:
+        Item dicts, one at a time.
+    """
+    params = _scan_params(filter_expression, projection, kwargs)
+    params["TableName"] = table.name
+    client = _get_resource().meta.client
+    pages: queue.Queue = queue.Queue(maxsize=segments * 2)
+    stop = threading.Event()
+
+    def hand_off(value) -> None:
+        while not stop.is_set():
+            try:
+                pages.put(value, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def scan_segment(segment: int) -> None:
+        segment_params = {**params, "Segment": segment, "TotalSegments": segments}
+        try:
+            while not stop.is_set():
+                response = client.scan(**segment_params)
+                hand_off(response.get("Items", []))
+                last_key = response.get("LastEvaluatedKey")
+                if not last_key:
+                    break
+                segment_params["ExclusiveStartKey"] = last_key
+        except Exception as e:
+            hand_off(e)
+            return
+        hand_off(None)
+
+    pool = ThreadPoolExecutor(max_workers=segments)
+    try:
+        for segment in range(segments):
+            pool.submit(scan_segment, segment)
+        remaining = segments
+        while remaining:
+            page = pages.get()
+            if page is None:
+                remaining -= 1
+                continue
+            if isinstance(page, Exception):
+                raise page
+            for item in page:
+                yield from_decimal(item) if convert else item
+    finally:
+        stop.set()
+        pool.shutdown(wait=False)
+
+
+def parallel_count(
+    table,
+    segments: int = DEFAULT_SCAN_SEGMENTS,
+    filter_expression=None,
+    **kwargs,
+) -> int:
+    """Count matching items with a parallel Select=COUNT scan.
+
+    Args:
+        table: DynamoDB Table resource.
+        segments: Number of segments / worker threads.
+        filter_expression: Optional filter expression.
+        **kwargs: Additional arguments passed to Scan.
+    """
+    params = _scan_params(filter_expression, None, kwargs)
+    params.update(TableName=table.name, Select="COUNT", TotalSegments=segments)
+    client = _get_resource().meta.client
+
+    def count_segment(segment: int) -> int:
+        segment_params = {**params, "Segment": segment}
+        total = 0
+        while True:
+            response = client.scan(**segment_params)
+            total += response.get("Count", 0)
+            last_key = response.get("LastEvaluatedKey")
+            if not last_key:
+                return total
+            segment_params["ExclusiveStartKey"] = last_key
+
+    with ThreadPoolExecutor(max_workers=segments) as pool:
+        return sum(pool.map(count_segment, range(segments)))
+
+
+def count_query(table, **kwargs) -> int:
+    """Count matching items across every page (Select=COUNT).
+
+    Args:
+        table: DynamoDB Table resource.
+        **kwargs: Arguments passed to table.query() (KeyConditionExpression etc.).
+    """
+    params: dict[str, Any] = {**kwargs, "Select": "COUNT"}
+    total = 0
     while True:
         response = table.query(**params)
-        items.extend(response.get("Items", []))
+        total += response.get("Count", 0)
         last_key = response.get("LastEvaluatedKey")
-        if not last_key or (limit and len(items) >= limit):
-            break
+        if not last_key:
+            return total
         params["ExclusiveStartKey"] = last_key
 
-    return from_decimal(items[:limit] if limit else items)
+
+def query(
+    table,
+    pk: str,
+    sk_begins_with: Optional[str] = None,
+    sk_between: Optional[tuple[str, str]] = None,
+    sk_value: Optional[str] = None,
+    index_name: Optional[str] = None,
+    scan_forward: bool = True,
+    limit: Optional[int] = None,
+    filter_expression=None,
+    projection: Optional[str] = None,
+    **kwargs,
+) -> list[dict]:
+    """Query items by partition key with optional sort key conditions.
+
+    Args:
+        table: DynamoDB Table resource.
+        pk: Partition key value.
+        sk_begins_with: Sort key prefix filter.
+        sk_between: Tuple of (low, high) for range query on SK.
+        sk_value: Exact sort key match.
+        index_name: GSI name if querying a secondary index.
+        scan_forward: True for ascending, False for descending.
+        limit: Maximum items to return.
+        filter_expression: Optional boto3 filter expression.
+        projection: Comma-separated projection expression.
+        **kwargs: Additional arguments passed to table.query().
+
+    Returns:
+        List of item dicts with Decimals converted.
+    """
+    return list(iter_query(
+        table,
+        pk,
+        sk_begins_with=sk_begins_with,
+        sk_between=sk_between,
+        sk_value=sk_value,
+        index_name=index_name,
+        scan_forward=scan_forward,
+        limit=limit,
+        filter_expression=filter_expression,
+        projection=projection,
+        convert=True,
+        **kwargs,
+    ))
+
+
+def _batch_get_chunk(table, keys: list[dict], options: dict[str, Any]) -> list[dict]:
+    """BatchGetItem one chunk of <= 100 keys, retrying UnprocessedKeys.
+
+    Retries back off exponentially with full jitter so throttled callers
+    running in parallel do not retry in lockstep.
+    """
+    client = _get_resource().meta.client
+    request = {table.name: {"Keys": keys, **options}}
+    items: list[dict] = []
+    attempt = 0
+    while request:
+        response = client.batch_get_item(RequestItems=request, ReturnConsumedCapacity="TOTAL")
+        found = response.get("Responses", {}).get(table.name, [])
+        items.extend(found)
+        capacity = sum(c.get("CapacityUnits", 0) for c in response.get("ConsumedCapacity", []))
+        request = response.get("UnprocessedKeys") or None
+
+        with _batch_stats_lock:
+            _batch_get_stats["requests"] += 1
+            _batch_get_stats["items_read"] += len(found)
+            _batch_get_stats["consumed_capacity"] += capacity
+            if request:
+                _batch_get_stats["retries"] += 1
+
+        if request:
+            attempt += 1
+            if attempt > BATCH_GET_MAX_RETRIES:
+                raise AppError("Database is busy, please try again", status_code=503)
+            time.sleep(random.uniform(0, min(BATCH_GET_MAX_BACKOFF, BATCH_GET_BASE_BACKOFF * 2 ** attempt)))
+    return items
+
+
+def batch_get_items(
+    table,
+    keys: list[dict],
+    projection: Optional[str] = None,
+    consistent_read: bool = False,
+    max_workers: int = 1,
+    convert: bool = False,
+) -> list[dict]:
+    """Fetch many items by primary key with BatchGetItem.
+
+    Keys are sent in chunks of 100 (the BatchGetItem limit); duplicates
+    are dropped first since DynamoDB rejects them. UnprocessedKeys are
+    retried with jittered exponential backoff. Reads, retries and consumed
+    capacity are tallied in get_batch_get_stats().
+
+    Args:
+        table: DynamoDB Table resource.
+        keys: List of key dicts, each with 'PK' and 'SK'.
+        projection: Comma-separated projection expression (must include
+            PK and SK if the caller matches results back to keys).
+        consistent_read: Use strongly consistent reads.
+        max_workers: Fetch up to this many chunks concurrently.
+        convert: Convert Decimals to int/float.
+
+    Returns:
+        The items found (missing keys are simply absent), in no
+        particular order.
+    """
+    unique = list({(k["PK"], k["SK"]): {"PK": k["PK"], "SK": k["SK"]} for k in keys}.values())
+    chunks = [unique[i:i + BATCH_GET_MAX_KEYS] for i in range(0, len(unique), BATCH_GET_MAX_KEYS)]
+
+    options: dict[str, Any] = {"ConsistentRead": consistent_read}
+    if projection:
+        options["ProjectionExpression"] = projection
+
+    if max_workers > 1 and len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+            results = list(pool.map(lambda chunk: _batch_get_chunk(table, chunk, options), chunks))
+    else:
+        results = [_batch_get_chunk(table, chunk, options) for chunk in chunks]
+
+    items = [item for chunk_items in results for item in chunk_items]
+    return from_decimal(items) if convert else items
+
+
+def get_batch_get_stats() -> dict[str, Any]:
+    """BatchGetItem counters for this container (requests, items, retries, capacity)."""
+    with _batch_stats_lock:
+        return dict(_batch_get_stats)
 
 
 def delete_item(table, pk: str, sk: str, condition: Optional[str] = None, **kwargs) -> dict:
@@ -0,0 +1,372 @@
+"""Streaming, gzip-compressed admin data exports.
+
+The export endpoints used to build the whole CSV/JSONL body in memory from
+a full scan and return it inline, which is capped by Lambda's 6 MB response
+payload. run_export() instead streams items straight from the scan through
+a gzip compressor into a multipart upload on an object store, holding at
+most one part (Config.EXPORT_PART_SIZE) of compressed output in memory, and
+returns a job ID plus a download pointer.
+
+Stores:
+- S3 (Config.EXPORT_BUCKET set): multipart upload; downloads are
+  presigned GET URLs served with Content-Encoding: gzip, so browsers save
+  the decompressed file under its plain name.
+- Local filesystem (Config.EXPORT_DIR): parts staged as files and joined on
+  completion; the pointer is the admin API's download route, which serves
+  the file to an authenticated admin. Used locally and in tests.
+
+Each job is recorded in the admin table (PK=EXPORT, SK=<job_id>, expiring
+via TTL) so its download pointer can be fetched again later.
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+import zlib
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .config import Config
+from .db import from_decimal, get_table
+from .exceptions import NotFoundError, ValidationError
+
+logger = logging.getLogger(__name__)
+
+EXPORT_PK = "EXPORT"
+EXPORT_FORMATS = ("jsonl", "json", "csv")
+
+# S3 rejects non-final multipart parts smaller than 5 MiB
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+# Served by the admin API for exports in the local store
+DOWNLOAD_ROUTE = "/api/admin/export/jobs/{job_id}/download"
+
+CONTENT_TYPES = {
+    "jsonl": "application/x-ndjson",
+    "json": "application/json",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+# --- Object stores ---
+
+class LocalExportStore:
+    """Filesystem stand-in for the S3 store, with the same multipart flow."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def start_upload(self, key: str, content_type: str, filename: str) -> "LocalUpload":
+        return LocalUpload(self.path(key))
+
+    def download_url(self, key: str, filename: str, job_id: str) -> str:
+        # Browsers will not follow file:// links from a web page
+        return DOWNLOAD_ROUTE.format(job_id=job_id)
+
+    def read(self, key: str) -> bytes:
+        try:
+            with open(self.path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise NotFoundError("Export file not found")
+
+
+class LocalUpload:
+    def __init__(self, path: str):
+        self.path = path
+        self.staging = f"{path}.parts"
+        self.parts: List[str] = []
+        os.makedirs(self.staging, exist_ok=True)
+
+    def upload_part(self, data: bytes) -> None:
+        part = os.path.join(self.staging, f"{len(self.parts) + 1:05d}")
+        with open(part, "wb") as f:
+            f.write(data)
+        self.parts.append(part)
+
+    def complete(self) -> None:
+        with open(self.path, "wb") as out:
+            for part in self.parts:
+                with open(part, "rb") as f:
+                    shutil.copyfileobj(f, out)
+        shutil.rmtree(self.staging, ignore_errors=True)
+
+    def abort(self) -> None:
+        shutil.rmtree(self.staging, ignore_errors=True)
+
+
+class S3ExportStore:
+    """Export objects in an S3 bucket, written with multipart uploads."""
+
+    def __init__(self, bucket: str):
+        import boto3
+        self.bucket = bucket
+        self.client = boto3.client("s3", region_name=Config.REGION)
+
+    def start_upload(self, key: str, content_type: str, filename: str) -> "S3Upload":
+        resp = self.client.create_multipart_upload(
+            Bucket=self.bucket,
+            Key=key,
+            ContentType=content_type,
+            ContentEncoding="gzip",
+            ContentDisposition=f'attachment; filename="{filename}"',
+        )
+        return S3Upload(self.client, self.bucket, key, resp["UploadId"])
+
+    def download_url(self, key: str, filename: str, job_id: str) -> str:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": key,
+                "ResponseContentDisposition": f'attachment; filename="{filename}"',
+            },
+            ExpiresIn=Config.EXPORT_URL_TTL,
+        )
+
+
+class S3Upload:
+    def __init__(self, client, bucket: str, key: str, upload_id: str):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.upload_id = upload_id
+        self.parts: List[dict] = []
+
+    def upload_part(self, data: bytes) -> None:
+        number = len(self.parts) + 1
+        resp = self.client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            PartNumber=number, Body=data,
+        )
+        self.parts.append({"PartNumber": number, "ETag": resp["ETag"]})
+
+    def complete(self) -> None:
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={"Parts": self.parts},
+        )
+
+    def abort(self) -> None:
+        self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+
+
+_store = None
+
+
+def get_export_store():
+    """S3 store when EXPORT_BUCKET is configured, else the local directory."""
+    global _store
+    if _store is None:
+        if Config.EXPORT_BUCKET:
+            _store = S3ExportStore(Config.EXPORT_BUCKET)
+        else:
+            _store = LocalExportStore(Config.EXPORT_DIR)
+    return _store
+
+
+# --- Compression ---
+
+class GzipPartWriter:
+    """Gzip text into an upload, sending a part whenever part_size bytes are buffered."""
+
+    def __init__(self, upload, part_size: int):
+        self.upload = upload
+        self.part_size = part_size
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.parts = 0
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        self._buffer = bytearray()
+
+    def write(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self.raw_bytes += len(data)
+        self._buffer += self._compressor.compress(data)
+        if len(self._buffer) >= self.part_size:
+            self._send_part()
+
+    def _send_part(self) -> None:
+        self.upload.upload_part(bytes(self._buffer))
+        self.compressed_bytes += len(self._buffer)
+        self.parts += 1
+        self._buffer.clear()
+
+    def close(self) -> None:
+        """Flush the gzip trailer as the final (possibly short) part and complete."""
+        self._buffer += self._compressor.flush()
+        self._send_part()
+        self.upload.complete()
+
+
+# --- Formats ---
+
+def csv_cell(value) -> str:
+    """Flatten a value into one CSV cell (same sanitizing the inline exports used)."""
+    if value is None:
+        return ""
+    return str(value).replace(",", ";").replace("\n", " ").replace("\r", "")
+
+
+def _spool_headers(items: Iterable[dict]):
+    """Collect the union of keys while spooling items to a temp file.
+
+    Returns the sorted headers and an iterator replaying the items, so a CSV
+    with every column can be written from one scan without holding it in memory.
+    """
+    spool = tempfile.TemporaryFile("w+", encoding="utf-8")
+    keys = set()
+    for item in items:
+        keys.update(item.keys())
+        spool.write(json.dumps(item, default=str))
+        spool.write("\n")
+    spool.seek(0)
+
+    def replay():
+        with spool:
+            for line in spool:
+                yield json.loads(line)
+
+    return sorted(keys), replay()
+
+
+def _encode(fmt: str, items: Iterable[dict], headers: Optional[List[str]], counter: list) -> Iterator[str]:
+    """Yield the export text in small chunks, counting items as they pass."""
+    if fmt == "csv":
+        if headers is None:
+            headers, items = _spool_headers(items)
+        yield ",".join(headers)
+        for item in items:
+            counter[0] += 1
+            yield "\n" + ",".join(csv_cell(item.get(h)) for h in headers)
+    elif fmt == "json":
+        yield "["
+        for item in items:
+            counter[0] += 1
+            yield ("," if counter[0] > 1 else "") + json.dumps(item, default=str)
+        yield "]"
+    else:
+        for item in items:
+            counter[0] += 1
+            yield json.dumps(item, default=str) + "\n"
+
+
+# --- Jobs ---
+
+def _public(job: dict) -> dict:
+    store = get_export_store()
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "kind": job["kind"],
+        "format": job["format"],
+        "count": job.get("count", 0),
+        "bytes": job.get("raw_bytes", 0),
+        "compressed_bytes": job.get("compressed_bytes", 0),
+        "filename": job["filename"],
+        "download_url": (
+            store.download_url(job["key"], job["filename"], job["job_id"])
+            if job["status"] == "complete" else None
+        ),
+        "created_at": job["created_at"],
+    }
+
+
+def run_export(
+    kind: str,
+    fmt: str,
+    items: Iterable[dict],
+    filename: str,
+    headers: Optional[List[str]] = None,
+    created_by: Optional[str] = None,
+) -> dict:
+    """Stream items into a compressed export object and record the job.
+
+    Args:
+        kind: What is exported, e.g. "table:main" or "report:activity"
+        fmt: "jsonl", "json" or "csv"
+        items: Rows to write; consumed lazily (e.g. straight from a scan)
+        filename: Download file name, without the compression suffix
+        headers: CSV columns; None collects every key across the items
+        created_by: Admin user ID, recorded on the job
+
+    Returns:
+        The job: job_id, status, count, sizes and download_url.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValidationError(f"Export format must be one of: {', '.join(EXPORT_FORMATS)}")
+
+    job_id = uuid.uuid4().hex
+    now = datetime.now(timezone.utc)
+    key = f"exports/{now.strftime('%Y/%m/%d')}/{job_id}/{filename}.gz"
+    part_size = Config.EXPORT_PART_SIZE
+    if isinstance(get_export_store(), S3ExportStore):
+        part_size = max(part_size, S3_MIN_PART_SIZE)
+
+    upload = get_export_store().start_upload(key, CONTENT_TYPES[fmt], filename)
+    writer = GzipPartWriter(upload, part_size)
+    counter = [0]
+    try:
+        for chunk in _encode(fmt, items, headers, counter):
+            writer.write(chunk)
+        writer.close()
+    except Exception:
+        logger.exception("Export %s (%s) failed after %d items", job_id, kind, counter[0])
+        upload.abort()
+        raise
+
+    job = {
+        "PK": EXPORT_PK,
+        "SK": job_id,
+        "job_id": job_id,
+        "status": "complete",
+        "kind": kind,
+        "format": fmt,
+        "key": key,
+        "filename": filename,
+        "count": counter[0],
+        "raw_bytes": writer.raw_bytes,
+        "compressed_bytes": writer.compressed_bytes,
+        "parts": writer.parts,
+        "created_by": created_by,
+        "created_at": now.isoformat(),
+        "ttl": int(now.timestamp()) + Config.EXPORT_RETENTION_DAYS * 86400,
+    }
+    get_table("admin").put_item(Item=job)
+    logger.info(
+        "Export %s (%s): %d items, %d bytes -> %d gzipped in %d parts",
+        job_id, kind, counter[0], writer.raw_bytes, writer.compressed_bytes, writer.parts,
+    )
+    return _public(job)
+
+
+def _get_job(job_id: str) -> dict:
+    item = get_table("admin").get_item(Key={"PK": EXPORT_PK, "SK": job_id}).get("Item")
+    if not item:
+        raise NotFoundError("Export job not found")
+    return from_decimal(item)
+
+
+def get_export_job(job_id: str) -> dict:
+    """A recorded export job with a fresh download pointer."""
+    return _public(_get_job(job_id))
+
+
+def open_export(job_id: str) -> Tuple[dict, Optional[bytes]]:
+    """A completed export and its gzipped body.
+
+    The body is None for S3 exports; those are downloaded from the job's
+    presigned download_url instead.
+    """
+    job = _get_job(job_id)
+    if job["status"] != "complete":
+        raise NotFoundError("Export is not ready")
+    store = get_export_store()
+    body = store.read(job["key"]) if isinstance(store, LocalExportStore) else None
+    return _public(job), body
@@ -1,26 +1,18 @@
 """Hero data access functions for DynamoDB."""
 
-import json
-import os
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Mapping, Optional
 
-from .config import Config
-from .db import get_table, strip_none
+from . import admin_counters
+from .db import get_table, iter_query, strip_none
 from .exceptions import NotFoundError
+from .reference_store import get_reference_store
 
 
 def get_heroes(profile_id: str) -> list:
     """Get all heroes for a profile."""
     table = get_table("main")
-    resp = table.query(
-        KeyConditionExpression="PK = :pk AND begins_with(SK, :prefix)",
-        ExpressionAttributeValues={
-            ":pk": f"PROFILE#{profile_id}",
-            ":prefix": "HERO#",
-        },
-    )
-    return resp.get("Items", [])
+    return list(iter_query(table, f"PROFILE#{profile_id}", sk_begins_with="HERO#"))
 
 
 def get_hero(profile_id: str, hero_name: str) -> Optional[dict]:
@@ -85,6 +77,8 @@ def put_hero(profile_id: str, hero_name: str, data: dict) -> dict:
         item["created_at"] = now
 
     table.put_item(Item=item)
+    if not existing:
+        admin_counters.record_heroes(added=[hero_name])
     return item
 
 
@@ -134,9 +128,12 @@ def update_hero(profile_id: str, hero_name: str, updates: dict) -> dict:
 def delete_hero(profile_id: str, hero_name: str) -> None:
     """Delete a hero from a profile."""
     table = get_table("main")
-    table.delete_item(
-        Key={"PK": f"PROFILE#{profile_id}", "SK": f"HERO#{hero_name}"}
+    resp = table.delete_item(
+        Key={"PK": f"PROFILE#{profile_id}", "SK": f"HERO#{hero_name}"},
+        ReturnValues="ALL_OLD",
     )
+    if resp.get("Attributes"):
+        admin_counters.record_heroes(removed=[hero_name])
 
 
 def batch_update_heroes(profile_id: str, heroes: list[dict]) -> list[dict]:
@@ -194,49 +191,28 @@ def batch_update_heroes(profile_id: str, heroes: list[dict]) -> list[dict]:
         for item in items:
             batch.put_item(Item=item)
 
+    admin_counters.record_heroes(added={item["hero_name"] for item in items} - existing.keys())
     return items
 
 
 # --- Reference data ---
 
-_heroes_cache: Optional[dict] = None
-
-
-def load_heroes_json() -> dict:
-    """Load heroes.json from data directory. Cached in memory."""
-    global _heroes_cache
-    if _heroes_cache is not None:
-        return _heroes_cache
-
-    data_dir = Config.DATA_DIR
-    heroes_path = os.path.join(data_dir, "heroes.json")
-
-    if os.path.exists(heroes_path):
-        with open(heroes_path, encoding="utf-8") as f:
-            data = json.load(f)
-        _heroes_cache = {h["name"]: h for h in data.get("heroes", [])}
-    else:
-        _heroes_cache = {}
-
-    return _heroes_cache
+def load_heroes_json() -> Mapping[str, dict]:
+    """Hero reference data keyed by name, from the shared reference store."""
+    return get_reference_store().by_name
 
 
 def get_all_heroes_reference() -> list:
-    """Get all hero reference data from heroes.json, falling back to DynamoDB."""
-    heroes_map = load_heroes_json()
-    if heroes_map:
-        return list(heroes_map.values())
-    # Fallback: Lambda doesn't have heroes.json, read from DynamoDB
-    return get_all_reference_heroes_from_db()
+    """Get all hero reference data (heroes.json, falling back to DynamoDB).
+
+    Returns copies so callers can decorate them without touching the store.
+    """
+    return [dict(h) for h in get_reference_store().heroes]
 
 
 def get_hero_reference(hero_name: str) -> Optional[dict]:
-    """Get reference data for a specific hero from heroes.json, falling back to DynamoDB."""
-    heroes_map = load_heroes_json()
-    if heroes_map:
-        return heroes_map.get(hero_name)
-    # Fallback: Lambda doesn't have heroes.json, read from DynamoDB
-    return get_reference_hero_from_db(hero_name)
+    """Get reference data for a specific hero (heroes.json, falling back to DynamoDB)."""
+    return get_reference_store().get(hero_name)
 
 
 def get_reference_hero_from_db(hero_name: str) -> Optional[dict]:
@@ -249,8 +225,4 @@ def get_reference_hero_from_db(hero_name: str) -> Optional[dict]:
 def get_all_reference_heroes_from_db() -> list:
     """Get all heroes from ReferenceTable."""
     table = get_table("reference")
-    resp = table.query(
-        KeyConditionExpression="PK = :pk",
-        ExpressionAttributeValues={":pk": "HERO"},
-    )
-    return resp.get("Items", [])
+    return list(iter_query(table, "HERO"))
@@ -0,0 +1,163 @@
+"""Key-set index of the main table for the admin data-integrity checks.
+
+The checks used to scan one entity type and then issue a GetItem or
+Query (and, for orphaned heroes, a whole Scan) per scanned item. Instead,
+build_integrity_index() makes one parallel scan and keeps only the keys
+of each entity type: user METADATA, USER#/PROFILE#, PROFILE#/HERO#,
+UNIQUE# guards and USER#/AICONV#. Orphans and gaps then fall out as
+in-memory set differences, and the fix actions delete exactly the keys
+the check reported.
+"""
+
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Set, Tuple
+
+from .db import get_table, parallel_scan
+
+logger = logging.getLogger(__name__)
+
+# Valid maximums for hero fields; fix_hero_ranges clamps to these
+HERO_LIMITS = {
+    "level": 80,
+    "stars": 5,
+    "exploration_skill_1_level": 5,
+    "exploration_skill_2_level": 5,
+    "exploration_skill_3_level": 5,
+    "expedition_skill_1_level": 5,
+    "expedition_skill_2_level": 5,
+    "expedition_skill_3_level": 5,
+    "gear_slot1_quality": 7,
+    "gear_slot2_quality": 7,
+    "gear_slot3_quality": 7,
+    "gear_slot4_quality": 7,
+}
+
+# #n: "name" is a reserved word
+_PROJECTION = "PK, SK, email, user_id, cognito_sub, deleted_at, hero_name, #n, " + ", ".join(HERO_LIMITS)
+
+Key = Tuple[str, str]
+
+
+def hero_range_issues(item: dict) -> Dict[str, int]:
+    """Fields of a hero item above their valid maximum, with their values."""
+    return {f: item[f] for f, limit in HERO_LIMITS.items() if item.get(f, 0) > limit}
+
+
+@dataclass
+class HeroEntry:
+    """Key and the checked attributes of one PROFILE#/HERO# item."""
+
+    key: Key
+    name: str
+    issues: Dict[str, int]
+
+
+@dataclass
+class IntegrityIndex:
+    """Keys per entity type, gathered in one streaming pass."""
+
+    users: Dict[str, str] = field(default_factory=dict)  # user_id -> email
+    profiles: Dict[str, Key] = field(default_factory=dict)  # profile_id -> key
+    live_profiles: Set[str] = field(default_factory=set)
+    heroes: List[HeroEntry] = field(default_factory=list)
+    guards: Dict[Key, str] = field(default_factory=dict)  # guard key -> owner user_id
+    conversations: Counter = field(default_factory=Counter)  # user_id -> count
+    items_scanned: int = 0
+    scan_seconds: float = 0.0
+
+    def add(self, item: dict) -> None:
+        self.items_scanned += 1
+        pk, sk = item["PK"], item["SK"]
+        if pk.startswith("USER#"):
+            user_id = pk[len("USER#"):]
+            if sk == "METADATA":
+                self.users[user_id] = item.get("email", pk)
+            elif sk.startswith("PROFILE#"):
+                profile_id = sk[len("PROFILE#"):]
+                self.profiles[profile_id] = (pk, sk)
+                if not item.get("deleted_at"):
+                    self.live_profiles.add(profile_id)
+            elif sk.startswith("AICONV#"):
+                self.conversations[user_id] += 1
+        elif pk.startswith("PROFILE#") and sk.startswith("HERO#"):
+            self.heroes.append(HeroEntry(
+                key=(pk, sk),
+                name=item.get("hero_name", item.get("name", "")),
+                issues=hero_range_issues(item),
+            ))
+        elif pk.startswith("UNIQUE#"):
+            owner = item.get("user_id") or item.get("cognito_sub")
+            if owner:
+                self.guards[(pk, sk)] = owner
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        return {
+            "users": len(self.users),
+            "profiles": len(self.profiles),
+            "heroes": len(self.heroes),
+            "guards": len(self.guards),
+            "conversations": sum(self.conversations.values()),
+        }
+
+    # --- Set differences ---
+
+    def orphaned_profiles(self) -> List[Key]:
+        """Profile items whose user has no METADATA."""
+        return sorted(k for k in self.profiles.values() if k[0][len("USER#"):] not in self.users)
+
+    def users_without_profiles(self) -> List[str]:
+        """Users (by email) with no profile item at all."""
+        owners = {pk[len("USER#"):] for pk, _ in self.profiles.values()}
+        return sorted(email for user_id, email in self.users.items() if user_id not in owners)
+
+    def orphaned_heroes(self) -> List[HeroEntry]:
+        """Hero items under a profile ID no user has."""
+        return [h for h in self.heroes if h.key[0][len("PROFILE#"):] not in self.profiles]
+
+    def heroes_under(self, profile_ids: Set[str]) -> List[HeroEntry]:
+        """Hero items under any of the given profile IDs."""
+        return [h for h in self.heroes if h.key[0][len("PROFILE#"):] in profile_ids]
+
+    def orphaned_guards(self) -> List[Key]:
+        """Email/username guards owned by a user that no longer exists."""
+        return sorted(k for k, owner in self.guards.items() if owner not in self.users)
+
+    def orphaned_conversations(self) -> Dict[str, int]:
+        """Conversation counts of users that no longer exist."""
+        return {u: n for u, n in self.conversations.items() if u not in self.users}
+
+
+def build_integrity_index() -> IntegrityIndex:
+    """Scan the main table once (in parallel segments) and index its keys."""
+    started = time.perf_counter()
+    index = IntegrityIndex()
+    items = parallel_scan(
+        get_table("main"),
+        projection=_PROJECTION,
+        ExpressionAttributeNames={"#n": "name"},
+        FilterExpression=(
+            "(begins_with(PK, :user) AND (SK = :meta OR begins_with(SK, :profile) OR begins_with(SK, :conv))) "
+            "OR (begins_with(PK, :profile) AND begins_with(SK, :hero)) "
+            "OR begins_with(PK, :unique)"
+        ),
+        ExpressionAttributeValues={
+            ":user": "USER#",
+            ":meta": "METADATA",
+            ":profile": "PROFILE#",
+            ":conv": "AICONV#",
+            ":hero": "HERO#",
+            ":unique": "UNIQUE#",
+        },
+    )
+    for item in items:
+        index.add(item)
+    index.scan_seconds = time.perf_counter() - started
+    logger.info(
+        "Integrity index built: %d items in %.2fs %s",
+        index.items_scanned, index.scan_seconds, index.counts,
+    )
+    return index
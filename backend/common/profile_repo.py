@@ -1,14 +1,23 @@
 """Profile data access functions for DynamoDB."""
 
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Iterable, Optional
+import logging
 import time
 import uuid
 
+from botocore.exceptions import ClientError
+
+from . import admin_counters
 from .config import Config
-from .db import get_table, strip_none
+from .db import count_query, get_table, iter_query, strip_none
 from .exceptions import NotFoundError, ValidationError
 
+logger = logging.getLogger(__name__)
+
+# Attribute on the user's METADATA item pointing at the active profile
+ACTIVE_PROFILE_ATTR = "active_profile_id"
+
 
 def _generate_ulid() -> str:
     """Generate a ULID-like sortable unique ID."""
@@ -41,45 +50,110 @@ def get_profile(user_id: str, profile_id: str) -> Optional[dict]:
 def get_profiles(user_id: str, include_deleted: bool = False) -> list:
     """Get all profiles for a user."""
     table = get_table("main")
-    resp = table.query(
-        KeyConditionExpression="PK = :pk AND begins_with(SK, :prefix)",
-        ExpressionAttributeValues={
-            ":pk": f"USER#{user_id}",
-            ":prefix": "PROFILE#",
-        },
-    )
-    items = resp.get("Items", [])
-    if not include_deleted:
-        items = [p for p in items if not p.get("deleted_at")]
-    return [_migrate_priority_fields(p) for p in items]
+    items = iter_query(table, f"USER#{user_id}", sk_begins_with="PROFILE#")
+    return [
+        _migrate_priority_fields(p) for p in items
+        if include_deleted or not p.get("deleted_at")
+    ]
 
 
 def get_deleted_profiles(user_id: str) -> list:
     """Get soft-deleted profiles for a user."""
     table = get_table("main")
-    resp = table.query(
-        KeyConditionExpression="PK = :pk AND begins_with(SK, :prefix)",
-        ExpressionAttributeValues={
-            ":pk": f"USER#{user_id}",
-            ":prefix": "PROFILE#",
-        },
-    )
-    return [_migrate_priority_fields(p) for p in resp.get("Items", []) if p.get("deleted_at")]
+    items = iter_query(table, f"USER#{user_id}", sk_begins_with="PROFILE#")
+    return [_migrate_priority_fields(p) for p in items if p.get("deleted_at")]
 
 
-def get_default_profile(user_id: str) -> Optional[dict]:
-    """Get the user's default (active) profile."""
-    profiles = get_profiles(user_id)
-    # Return the default profile, or first profile, or None
-    for p in profiles:
-        if p.get("is_default"):
-            return p
-    return profiles[0] if profiles else None
+def _set_active_pointer(user_id: str, profile_id: str) -> None:
+    """Point the user's METADATA item at a profile (never creates METADATA)."""
+    table = get_table("main")
+    try:
+        table.update_item(
+            Key={"PK": f"USER#{user_id}", "SK": "METADATA"},
+            UpdateExpression=f"SET {ACTIVE_PROFILE_ATTR} = :pid",
+            ConditionExpression="attribute_exists(PK)",
+            ExpressionAttributeValues={":pid": profile_id},
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+
+
+def _clear_active_pointer(user_id: str, profile_id: str) -> None:
+    """Remove the active-profile pointer if it still points at profile_id."""
+    table = get_table("main")
+    try:
+        table.update_item(
+            Key={"PK": f"USER#{user_id}", "SK": "METADATA"},
+            UpdateExpression=f"REMOVE {ACTIVE_PROFILE_ATTR}",
+            ConditionExpression=f"{ACTIVE_PROFILE_ATTR} = :pid",
+            ExpressionAttributeValues={":pid": profile_id},
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+
+
+def get_default_profile(user_id: str, user: Optional[dict] = None) -> Optional[dict]:
+    """Get the user's default (active) profile.
+
+    Follows the active_profile_id pointer on the user's METADATA item (one
+    GetItem). Users without a valid pointer fall back to listing their
+    profiles, and the pointer is repaired for next time when the caller
+    is allowed to write (read-only functions just skip the repair).
+
+    Args:
+        user_id: Owner of the profiles
+        user: The user's METADATA item if the caller already loaded it
+    """
+    if user is None:
+        resp = get_table("main").get_item(
+            Key={"PK": f"USER#{user_id}", "SK": "METADATA"},
+            ProjectionExpression=ACTIVE_PROFILE_ATTR,
+        )
+        user = resp.get("Item") or {}
 
+    active_id = user.get(ACTIVE_PROFILE_ATTR)
+    if active_id:
+        profile = get_profile(user_id, active_id)
+        if profile and not profile.get("deleted_at"):
+            return profile
 
-def get_or_create_profile(user_id: str) -> dict:
+    profiles = get_profiles(user_id)
+    # Return the default profile, or first profile, or None
+    chosen = next((p for p in profiles if p.get("is_default")), profiles[0] if profiles else None)
+    if chosen:
+        try:
+            _set_active_pointer(user_id, chosen["profile_id"])
+        except Exception:
+            logger.warning("Could not repair active profile pointer for user %s", user_id, exc_info=True)
+    return chosen
+
+
+def backfill_active_pointers(users: Iterable[dict]) -> int:
+    """Set the active-profile pointer on users that do not have one yet.
+
+    Args:
+        users: User METADATA items (e.g. from user_repo.list_users)
+
+    Returns:
+        Number of users whose pointer was set
+    """
+    filled = 0
+    for user in users:
+        if user.get(ACTIVE_PROFILE_ATTR) or not user.get("user_id"):
+            continue
+        profiles = get_profiles(user["user_id"])
+        chosen = next((p for p in profiles if p.get("is_default")), profiles[0] if profiles else None)
+        if chosen:
+            _set_active_pointer(user["user_id"], chosen["profile_id"])
+            filled += 1
+    return filled
+
+
+def get_or_create_profile(user_id: str, user: Optional[dict] = None) -> dict:
     """Get default profile or create one if none exist."""
-    profile = get_default_profile(user_id)
+    profile = get_default_profile(user_id, user=user)
     if profile:
         return profile
     return create_profile(user_id, name="Chief")
@@ -119,6 +193,10 @@ def create_profile(
     })
 
     table.put_item(Item=item)
+    admin_counters.increment({"profiles": 1})
+    # Make sure the pointer exists: a user's first profile becomes active,
+    # later ones leave the current active profile in place
+    get_default_profile(user_id)
     return item
 
 
@@ -155,25 +233,39 @@ def delete_profile(user_id: str, profile_id: str, hard: bool = False) -> dict:
     if hard:
         # Delete profile and all child items (heroes, gear, charms, inventory)
         _delete_profile_children(profile_id)
-        table.delete_item(Key={"PK": f"USER#{user_id}", "SK": f"PROFILE#{profile_id}"})
+        resp = table.delete_item(
+            Key={"PK": f"USER#{user_id}", "SK": f"PROFILE#{profile_id}"},
+            ReturnValues="ALL_OLD",
+        )
+        old = resp.get("Attributes")
+        if old and not old.get("deleted_at"):
+            admin_counters.increment({"profiles": -1})
+        _clear_active_pointer(user_id, profile_id)
         return {"status": "deleted", "permanent": True}
     else:
         now = datetime.now(timezone.utc).isoformat()
-        table.update_item(
+        resp = table.update_item(
             Key={"PK": f"USER#{user_id}", "SK": f"PROFILE#{profile_id}"},
             UpdateExpression="SET deleted_at = :now",
             ExpressionAttributeValues={":now": now},
+            ReturnValues="UPDATED_OLD",
         )
+        if not resp.get("Attributes", {}).get("deleted_at"):
+            admin_counters.increment({"profiles": -1})
+        _clear_active_pointer(user_id, profile_id)
         return {"status": "deleted", "permanent": False}
 
 
 def restore_profile(user_id: str, profile_id: str) -> dict:
     """Restore a soft-deleted profile."""
     table = get_table("main")
-    table.update_item(
+    resp = table.update_item(
         Key={"PK": f"USER#{user_id}", "SK": f"PROFILE#{profile_id}"},
         UpdateExpression="REMOVE deleted_at",
+        ReturnValues="UPDATED_OLD",
     )
+    if resp.get("Attributes", {}).get("deleted_at"):
+        admin_counters.increment({"profiles": 1})
     return {"status": "restored", "profile_id": profile_id}
 
 
@@ -197,6 +289,7 @@ def activate_profile(user_id: str, profile_id: str) -> None:
         UpdateExpression="SET is_default = :t",
         ExpressionAttributeValues={":t": True},
     )
+    _set_active_pointer(user_id, profile_id)
 
 
 def duplicate_profile(user_id: str, source_profile_id: str, new_name: str) -> dict:
@@ -241,6 +334,7 @@ def duplicate_profile(user_id: str, source_profile_id: str, new_name: str) -> di
                 item["created_at"] = now
                 item["updated_at"] = now
                 batch.put_item(Item=strip_none(item))
+        admin_counters.record_heroes(added=[hero["SK"].replace("HERO#", "") for hero in heroes])
 
     return get_profile(user_id, new_profile_id)
 
@@ -248,25 +342,24 @@ def duplicate_profile(user_id: str, source_profile_id: str, new_name: str) -> di
 def get_hero_count(profile_id: str) -> int:
     """Get count of heroes in a profile."""
     table = get_table("main")
-    resp = table.query(
+    return count_query(
+        table,
         KeyConditionExpression="PK = :pk AND begins_with(SK, :prefix)",
         ExpressionAttributeValues={
             ":pk": f"PROFILE#{profile_id}",
             ":prefix": "HERO#",
         },
-        Select="COUNT",
     )
-    return resp.get("Count", 0)
 
 
 def _delete_profile_children(profile_id: str) -> None:
     """Delete all items under a profile (heroes, gear, charms, inventory)."""
     table = get_table("main")
-    resp = table.query(
-        KeyConditionExpression="PK = :pk",
-        ExpressionAttributeValues={":pk": f"PROFILE#{profile_id}"},
-        ProjectionExpression="PK, SK",
-    )
+    keys = iter_query(table, f"PROFILE#{profile_id}", projection="PK, SK")
+    removed_heroes = []
     with table.batch_writer() as batch:
-        for item in resp.get("Items", []):
+        for item in keys:
             batch.delete_item(Key={"PK": item["PK"], "SK": item["SK"]})
+            if item["SK"].startswith("HERO#"):
+                removed_heroes.append(item["SK"].replace("HERO#", ""))
+    admin_counters.record_heroes(removed=removed_heroes)
@@ -0,0 +1,382 @@
+"""Shared loader for static reference data under data/.
+
+On a cold start every consumer (hero_repo, lineup_builder, the engine,
+PowerOptimizer, general handlers) used to json.load its own files. This
+module serves them all from a single precompiled snapshot built by
+scripts/build_reference_bundle.py.
+
+The snapshot is a small index followed by one marshal section per JSON
+file. Opening it reads only the index; a file's section is decoded the
+first time it is asked for, so a container pays only for the files it
+uses, and marshal decodes several times faster than json. Section
+checksums are recorded in the index and checked by verify_bundle() at
+build and deploy time, not on every cold start.
+
+Lookups fall back to reading the JSON file directly when the snapshot is
+missing, unreadable, or stale (the file on disk no longer matches the size
+and mtime recorded at build time).
+
+Deployed containers have no writable data directory, so admin edits
+(save_json) are stored in the ReferenceTable as PK=DATA_FILE, SK=<path>
+items when Config.REFERENCE_SHARED_EDITS is on. Those take precedence over
+the snapshot in every container; after a generation bump the list of
+edited files is re-read along with everything else.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import marshal
+import os
+import struct
+import time
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from .cache_invalidation import register_invalidation_hook
+from .config import Config
+from .exceptions import ValidationError
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_MAGIC = b"WOSREF2\n"
+BUNDLE_FORMAT = 2
+
+# Index length, right after the magic
+_INDEX_LEN = struct.Struct("<I")
+
+# Zip packaging only keeps mtimes to 2-second resolution
+_MTIME_TOLERANCE = 2.0
+
+# Build inputs and audit output that nothing reads at runtime
+BUNDLE_EXCLUDED_DIRS = {"raw", "validation"}
+
+_bundle: Optional[dict] = None
+_bundle_loaded = False
+
+# Sections decoded from the snapshot: rel_path -> data
+_sections: dict = {}
+
+# Parsed JSON for files served from disk: full_path -> (size, mtime_ns, data)
+_json_cache: dict = {}
+
+EDIT_PK = "DATA_FILE"
+
+# DynamoDB items are capped at 400 KB; leave room for the other attributes
+MAX_EDIT_BYTES = 380 * 1024
+
+# Paths with a shared edit (None until listed), and the edits read so far
+_edited_paths: Optional[set] = None
+_edits: dict = {}
+_list_retry_at = 0.0
+
+
+# ---------------------------------------------------------------------------
+# Snapshot build
+# ---------------------------------------------------------------------------
+
+def _iter_json_files(data_dir: str):
+    for root, dirs, filenames in os.walk(data_dir):
+        if root == data_dir:
+            dirs[:] = [d for d in dirs if d not in BUNDLE_EXCLUDED_DIRS]
+        for fname in sorted(filenames):
+            if fname.endswith(".json"):
+                full = os.path.join(root, fname)
+                yield os.path.relpath(full, data_dir).replace(os.sep, "/"), full
+
+
+def build_bundle(data_dir: str, out_path: str) -> dict:
+    """Compile every JSON file under data_dir into a snapshot at out_path.
+
+    Returns:
+        Summary dict with version, file count, and byte sizes.
+    """
+    files = {}
+    sections = []
+    offset = 0
+    source_bytes = 0
+    version_hash = hashlib.sha256()
+    for rel_path, full in _iter_json_files(data_dir):
+        st = os.stat(full)
+        with open(full, encoding="utf-8") as f:
+            section = marshal.dumps(json.load(f))
+        files[rel_path] = {
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "offset": offset,
+            "length": len(section),
+            "sha256": hashlib.sha256(section).hexdigest(),
+        }
+        # Version depends only on content, not on build time
+        version_hash.update(rel_path.encode("utf-8") + b"\0" + files[rel_path]["sha256"].encode("ascii"))
+        sections.append(section)
+        offset += len(section)
+        source_bytes += st.st_size
+
+    index = marshal.dumps({
+        "format": BUNDLE_FORMAT,
+        "version": version_hash.hexdigest()[:16],
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "files": files,
+    })
+
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(BUNDLE_MAGIC)
+        f.write(_INDEX_LEN.pack(len(index)))
+        f.write(index)
+        for section in sections:
+            f.write(section)
+    os.replace(tmp_path, out_path)
+
+    return {
+        "version": version_hash.hexdigest()[:16],
+        "files": len(files),
+        "source_bytes": source_bytes,
+        "bundle_bytes": os.path.getsize(out_path),
+        "path": out_path,
+    }
+
+
+def verify_bundle(path: str) -> list:
+    """Check every section of a snapshot against its recorded checksum.
+
+    Run after building and before deploying; the runtime loader trusts
+    the file.
+
+    Returns:
+        Problems found (an empty list means the snapshot is intact).
+    """
+    bundle = _read_bundle(path)
+    if bundle is None:
+        return [f"{path} is missing or has an unreadable index"]
+    problems = []
+    with open(path, "rb") as f:
+        for rel_path, meta in bundle["files"].items():
+            f.seek(bundle["data_start"] + meta["offset"])
+            section = f.read(meta["length"])
+            if hashlib.sha256(section).hexdigest() != meta["sha256"]:
+                problems.append(f"{rel_path}: checksum mismatch")
+                continue
+            try:
+                marshal.loads(section)
+            except (EOFError, ValueError, TypeError):
+                problems.append(f"{rel_path}: section does not decode")
+    return problems
+
+
+# ---------------------------------------------------------------------------
+# Snapshot load
+# ---------------------------------------------------------------------------
+
+def _read_bundle(path: str) -> Optional[dict]:
+    """Read a snapshot's index (not its sections). Returns None if unusable."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(len(BUNDLE_MAGIC) + _INDEX_LEN.size)
+            if not head.startswith(BUNDLE_MAGIC) or len(head) < len(BUNDLE_MAGIC) + _INDEX_LEN.size:
+                logger.warning("Reference bundle %s has an unknown header; ignoring", path)
+                return None
+            (index_len,) = _INDEX_LEN.unpack_from(head, len(BUNDLE_MAGIC))
+            bundle = marshal.loads(f.read(index_len))
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, ValueError, TypeError):
+        logger.warning("Reference bundle %s has an unreadable index; ignoring", path)
+        return None
+
+    if not isinstance(bundle, dict) or bundle.get("format") != BUNDLE_FORMAT:
+        return None
+    bundle["path"] = path
+    bundle["data_start"] = len(head) + index_len
+    return bundle
+
+
+def _read_section(bundle: dict, rel_path: str, meta: dict) -> Any:
+    """Decode one file's section, or raise ValueError if it is unusable."""
+    try:
+        with open(bundle["path"], "rb") as f:
+            f.seek(bundle["data_start"] + meta["offset"])
+            section = f.read(meta["length"])
+        if len(section) != meta["length"]:
+            raise ValueError("truncated")
+        return marshal.loads(section)
+    except (OSError, EOFError, ValueError, TypeError) as exc:
+        raise ValueError(f"Reference bundle section {rel_path} is unreadable: {exc}")
+
+
+def get_bundle() -> Optional[dict]:
+    """Return the loaded snapshot index (read once per container), or None."""
+    global _bundle, _bundle_loaded
+    if not _bundle_loaded:
+        _bundle = _read_bundle(Config.REFERENCE_BUNDLE)
+        _bundle_loaded = True
+        if _bundle:
+            logger.info(
+                "Loaded reference bundle version=%s files=%d",
+                _bundle["version"], len(_bundle["files"]),
+            )
+    return _bundle
+
+
+def get_bundle_version() -> Optional[str]:
+    """Version of the loaded snapshot, or None when serving plain JSON."""
+    bundle = get_bundle()
+    return bundle["version"] if bundle else None
+
+
+def reset_bundle() -> None:
+    """Forget the loaded snapshot and parsed files so the next lookup re-reads them."""
+    global _bundle, _bundle_loaded, _edited_paths, _list_retry_at
+    _bundle = None
+    _bundle_loaded = False
+    _sections.clear()
+    _json_cache.clear()
+    _edits.clear()
+    _edited_paths = None
+    _list_retry_at = 0.0
+
+
+register_invalidation_hook(reset_bundle)
+
+
+# ---------------------------------------------------------------------------
+# Shared edits
+# ---------------------------------------------------------------------------
+
+def _get_edited_paths() -> set:
+    """Paths with a shared edit, listed once per container and generation."""
+    global _edited_paths, _list_retry_at
+    if _edited_paths is None:
+        if not Config.REFERENCE_SHARED_EDITS:
+            _edited_paths = set()
+            return _edited_paths
+        if time.monotonic() < _list_retry_at:
+            return set()
+        from .db import get_table, iter_query
+        try:
+            _edited_paths = {
+                item["SK"] for item in iter_query(get_table("reference"), EDIT_PK, projection="SK")
+            }
+        except Exception:
+            # Fail open to the snapshot until the next retry
+            logger.warning("Could not list reference data edits; serving the snapshot")
+            _list_retry_at = time.monotonic() + Config.REFERENCE_CHECK_INTERVAL
+            return set()
+    return _edited_paths
+
+
+def _read_edit(rel_path: str) -> Any:
+    """Parsed content of a shared edit, or None if it has gone."""
+    if rel_path not in _edits:
+        from .db import get_table
+        resp = get_table("reference").get_item(Key={"PK": EDIT_PK, "SK": rel_path})
+        item = resp.get("Item")
+        if not item:
+            return None
+        _edits[rel_path] = json.loads(gzip.decompress(bytes(item["content"])))
+    return _edits[rel_path]
+
+
+def save_json(rel_path: str, content: Any, data_dir: str = None) -> None:
+    """Store an edited reference file where every container will read it.
+
+    With Config.REFERENCE_SHARED_EDITS the edit goes to the ReferenceTable;
+    otherwise (local development) the file under the data directory is
+    rewritten. Callers bump the reference generation afterwards so other
+    containers drop their cached copies.
+    """
+    rel_path = rel_path.replace("\\", "/")
+    if not Config.REFERENCE_SHARED_EDITS:
+        full_path = os.path.join(str(data_dir or Config.DATA_DIR), rel_path)
+        with open(full_path, "w", encoding="utf-8") as f:
+            json.dump(content, f, indent=2, ensure_ascii=False)
+        return
+
+    packed = gzip.compress(json.dumps(content, ensure_ascii=False).encode("utf-8"))
+    if len(packed) > MAX_EDIT_BYTES:
+        raise ValidationError(f"{rel_path} is too large to store ({len(packed) // 1024} KB compressed)")
+
+    from .db import get_table
+    get_table("reference").put_item(Item={
+        "PK": EDIT_PK,
+        "SK": rel_path,
+        "content": packed,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    })
+    _edits[rel_path] = content
+    if _edited_paths is not None:
+        _edited_paths.add(rel_path)
+
+
+def _is_fresh(meta: dict, full_path: str) -> bool:
+    try:
+        st = os.stat(full_path)
+    except OSError:
+        # Source JSON isn't deployed alongside the code (the Lambda case);
+        # the snapshot is the only local copy, and shared edits have
+        # already been checked.
+        return True
+    return (
+        st.st_size == meta["size"]
+        and abs(st.st_mtime - meta["mtime"]) <= _MTIME_TOLERANCE
+    )
+
+
+def load_json(rel_path: str, default: Any = None, data_dir: str = None) -> Any:
+    """Load a reference JSON file by its path relative to the data directory.
+
+    Served from a shared admin edit if there is one, then from the
+    snapshot when it is fresh (each section is decoded once),
+    otherwise parsed from disk (and kept until the file's size or mtime
+    changes). The returned object may be shared between callers and must not
+    be mutated.
+
+    Args:
+        rel_path: Path under data/, e.g. "heroes.json" or "guides/x.json".
+        default: Returned when the file exists in neither place.
+        data_dir: Override the data directory (defaults to Config.DATA_DIR).
+
+    Returns:
+        Parsed JSON content, or default.
+    """
+    rel_path = rel_path.replace("\\", "/")
+    full_path = os.path.join(str(data_dir or Config.DATA_DIR), rel_path)
+
+    if not data_dir and rel_path in _get_edited_paths():
+        try:
+            data = _read_edit(rel_path)
+        except Exception:
+            logger.warning("Could not read the shared edit of %s; serving the snapshot", rel_path)
+            data = None
+        if data is not None:
+            return data
+
+    bundle = get_bundle()
+    if bundle:
+        meta = bundle["files"].get(rel_path)
+        if meta and _is_fresh(meta, full_path):
+            if rel_path in _sections:
+                return _sections[rel_path]
+            try:
+                data = _read_section(bundle, rel_path, meta)
+            except ValueError as exc:
+                logger.warning("%s; reading JSON instead", exc)
+            else:
+                _sections[rel_path] = data
+                return data
+
+    try:
+        st = os.stat(full_path)
+    except OSError:
+        return default
+
+    cached = _json_cache.get(full_path)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2]
+
+    with open(full_path, encoding="utf-8") as f:
+        data = json.load(f)
+    _json_cache[full_path] = (st.st_size, st.st_mtime_ns, data)
+    return data
@@ -0,0 +1,193 @@
+"""Indexed, read-only hero reference data shared across the process.
+
+One ReferenceDataStore is built per data directory and reused by hero_repo,
+the analyzers, and the AI recommender instead of each keeping its own copy
+and re-indexing heroes.json. Secondary indexes and derived fields (lineup
+metadata, pre-tagged skill effects) are computed once at build time.
+
+Hero dicts handed out by the store are shared; callers must copy before
+mutating.
+"""
+
+import os
+import threading
+from bisect import bisect_right
+from types import MappingProxyType
+from typing import Any, Iterable, Mapping, Optional
+
+from .cache_invalidation import register_invalidation_hook
+from .config import Config
+from .reference_data import load_json
+
+UNKNOWN_HERO_METADATA = MappingProxyType({
+    "class": "Unknown",
+    "gen": 99,
+    "tier": "C",
+    "tier_expedition": "C",
+    "tier_exploration": "C",
+    "role": "Unknown",
+    "rarity": "Rare",
+    "image_filename": None,
+    "expedition_effects": [],
+    "exploration_effects": [],
+})
+
+_stores: dict = {}
+_stores_lock = threading.Lock()
+
+
+def _as_int(value, default: int = 99) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _build_metadata(hero: dict) -> dict:
+    """Derive the compact per-hero record the lineup builder works from."""
+    expedition_effects = {}
+    exploration_effects = {}
+    for i in range(1, 4):
+        exp_effs = hero.get(f"expedition_skill_{i}_effects", [])
+        if exp_effs:
+            expedition_effects[i] = exp_effs
+        expl_effs = hero.get(f"exploration_skill_{i}_effects", [])
+        if expl_effs:
+            exploration_effects[i] = expl_effs
+
+    return {
+        "class": hero.get("hero_class", "Unknown"),
+        "gen": hero.get("generation", 1),
+        "tier": hero.get("tier_overall", "C"),
+        "tier_expedition": hero.get("tier_expedition", "C"),
+        "tier_exploration": hero.get("tier_exploration", "C"),
+        "role": hero.get("best_use", "Unknown")[:30] if hero.get("best_use") else "Unknown",
+        "rarity": hero.get("rarity", "Rare"),
+        "image_filename": hero.get("image_filename"),
+        "expedition_effects": expedition_effects,
+        "exploration_effects": exploration_effects,
+    }
+
+
+class ReferenceDataStore:
+    """Immutable hero reference data with prebuilt secondary indexes.
+
+    Indexes:
+        by_name:             hero name -> hero dict
+        by class:            lowercase hero_class -> heroes
+        by generation:       generation -> heroes
+        by tier:             tier_overall -> heroes
+        by class+generation: (lowercase hero_class, generation) -> heroes
+
+    All index lists keep heroes.json order.
+    """
+
+    def __init__(self, heroes: Iterable[dict]):
+        heroes = tuple(h for h in heroes if h.get("name"))
+        self._heroes = heroes
+        self.heroes_data = MappingProxyType({"heroes": list(heroes)})
+        self.by_name: Mapping[str, dict] = MappingProxyType({h["name"]: h for h in heroes})
+
+        by_class: dict = {}
+        by_generation: dict = {}
+        by_tier: dict = {}
+        by_class_generation: dict = {}
+        for h in heroes:
+            cls = (h.get("hero_class") or "").lower()
+            gen = _as_int(h.get("generation"))
+            by_class.setdefault(cls, []).append(h)
+            by_generation.setdefault(gen, []).append(h)
+            by_tier.setdefault(h.get("tier_overall"), []).append(h)
+            by_class_generation.setdefault((cls, gen), []).append(h)
+
+        self._by_class = {k: tuple(v) for k, v in by_class.items()}
+        self._by_generation = {k: tuple(v) for k, v in by_generation.items()}
+        self._by_tier = {k: tuple(v) for k, v in by_tier.items()}
+        self._by_class_generation = {k: tuple(v) for k, v in by_class_generation.items()}
+
+        # Cumulative "generation <= g" views, one per distinct generation
+        self._generations = sorted(self._by_generation)
+        self._up_to_generation = [
+            tuple(h for h in heroes if _as_int(h.get("generation")) <= g)
+            for g in self._generations
+        ]
+
+        self._metadata = MappingProxyType(
+            {h["name"]: MappingProxyType(_build_metadata(h)) for h in heroes}
+        )
+
+    @classmethod
+    def of(cls, source) -> "ReferenceDataStore":
+        """Return source if it is already a store, else index a heroes.json dict."""
+        if isinstance(source, ReferenceDataStore):
+            return source
+        return cls((source or {}).get("heroes", []))
+
+    def __len__(self) -> int:
+        return len(self._heroes)
+
+    @property
+    def heroes(self) -> tuple:
+        return self._heroes
+
+    def get(self, name: str) -> Optional[dict]:
+        return self.by_name.get(name)
+
+    def by_class(self, hero_class: str) -> tuple:
+        return self._by_class.get((hero_class or "").lower(), ())
+
+    def by_generation(self, generation: int) -> tuple:
+        return self._by_generation.get(_as_int(generation), ())
+
+    def by_tier(self, tier: str) -> tuple:
+        return self._by_tier.get(tier, ())
+
+    def by_class_generation(self, hero_class: str, generation: int) -> tuple:
+        return self._by_class_generation.get(((hero_class or "").lower(), _as_int(generation)), ())
+
+    def up_to_generation(self, generation: int) -> tuple:
+        """Heroes released in or before the given generation."""
+        idx = bisect_right(self._generations, _as_int(generation))
+        return self._up_to_generation[idx - 1] if idx else ()
+
+    def metadata(self, name: str) -> Mapping[str, Any]:
+        """Lineup metadata for a hero, or an 'Unknown' placeholder."""
+        return self._metadata.get(name, UNKNOWN_HERO_METADATA)
+
+    def all_metadata(self) -> Mapping[str, Mapping[str, Any]]:
+        return self._metadata
+
+
+def _load_heroes(data_dir: Optional[str]) -> list:
+    data = load_json("heroes.json", data_dir=data_dir)
+    if data:
+        return data.get("heroes", [])
+    # Lambda fallback: no heroes.json on disk or in the bundle
+    try:
+        from .hero_repo import get_all_reference_heroes_from_db
+        return get_all_reference_heroes_from_db()
+    except Exception:
+        return []
+
+
+def get_reference_store(data_dir: str = None) -> ReferenceDataStore:
+    """Return the shared store for a data directory, building it on first use."""
+    key = os.path.normpath(os.path.abspath(str(data_dir or Config.DATA_DIR)))
+    store = _stores.get(key)
+    if store is not None:
+        return store
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = ReferenceDataStore(_load_heroes(data_dir))
+            _stores[key] = store
+        return store
+
+
+def reset_reference_store() -> None:
+    """Drop all stores; the next lookup rebuilds from current data."""
+    with _stores_lock:
+        _stores.clear()
+
+
+register_invalidation_hook(reset_reference_store)
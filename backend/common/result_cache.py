@@ -0,0 +1,221 @@
+"""Content-addressed cache for computed recommendation and lineup results.
+
+Between hero edits the same user hits build-all, recommendations and
+investments repeatedly with identical inputs. Results are cached under a
+fingerprint of everything the computation reads (roster, profile,
+gear/charms, ...), the engine's data version and the reference generation,
+so any input or reference-data change simply produces a new key.
+
+Two layers:
+- In-process LRU, bounded by the serialized size of its entries
+  (Config.RESULT_CACHE_MAX_BYTES) and cleared on reference invalidation.
+- Optional persisted layer in the main table (PK=RESULT#<fingerprint>,
+  SK=RESULT) with a TTL, shared by every container. Enabled with
+  RESULT_CACHE_PERSIST=true.
+
+Values must be JSON-serializable; they are stored as JSON text and every
+hit returns a fresh copy.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from .cache_invalidation import get_known_generation, register_invalidation_hook
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+RESULT_PK_PREFIX = "RESULT#"
+RESULT_SK = "RESULT"
+
+# DynamoDB items are capped at 400 KB; leave room for keys and attributes
+MAX_PERSISTED_BYTES = 350 * 1024
+
+_entries: "OrderedDict[str, str]" = OrderedDict()
+_size = 0
+_lock = threading.Lock()
+_stats = {"hits": 0, "persisted_hits": 0, "misses": 0, "evictions": 0}
+
+
+def _normalize(value: Any) -> Any:
+    """Drop bookkeeping fields (timestamps) that do not affect results."""
+    if isinstance(value, dict):
+        return {
+            k: _normalize(v) for k, v in value.items()
+            if not (isinstance(k, str) and k.endswith("_at"))
+        }
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def fingerprint(kind: str, inputs: Dict[str, Any], version: str = "") -> str:
+    """Stable hash of a result kind, its inputs and the reference-data version."""
+    payload = json.dumps(
+        {
+            "kind": kind,
+            "inputs": _normalize(inputs),
+            "version": version,
+            "generation": get_known_generation(),
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _log(event: str, kind: str) -> None:
+    logger.info(
+        "Result cache %s kind=%s hits=%d persisted_hits=%d misses=%d entries=%d bytes=%d",
+        event, kind, _stats["hits"], _stats["persisted_hits"], _stats["misses"],
+        len(_entries), _size,
+    )
+
+
+def _local_get(key: str) -> Optional[str]:
+    with _lock:
+        text = _entries.get(key)
+        if text is not None:
+            _entries.move_to_end(key)
+        return text
+
+
+def _local_put(key: str, text: str) -> None:
+    global _size
+    if len(text) > Config.RESULT_CACHE_MAX_BYTES:
+        return
+    with _lock:
+        old = _entries.pop(key, None)
+        if old is not None:
+            _size -= len(old)
+        _entries[key] = text
+        _size += len(text)
+        while _size > Config.RESULT_CACHE_MAX_BYTES and _entries:
+            _, evicted = _entries.popitem(last=False)
+            _size -= len(evicted)
+            _stats["evictions"] += 1
+
+
+def _persisted_get(key: str) -> Optional[str]:
+    from .db import get_table
+
+    try:
+        resp = get_table("main").get_item(Key={"PK": f"{RESULT_PK_PREFIX}{key}", "SK": RESULT_SK})
+    except Exception:
+        logger.warning("Result cache read failed; computing instead", exc_info=True)
+        return None
+    item = resp.get("Item")
+    if not item or int(item.get("ttl", 0)) < time.time():
+        return None
+    return item.get("data")
+
+
+def _persisted_put(key: str, kind: str, text: str, ttl: Optional[int] = None) -> None:
+    from .db import get_table
+
+    if len(text) > MAX_PERSISTED_BYTES:
+        return
+    try:
+        get_table("main").put_item(Item={
+            "PK": f"{RESULT_PK_PREFIX}{key}",
+            "SK": RESULT_SK,
+            "kind": kind,
+            "data": text,
+            "ttl": int(time.time()) + (ttl or Config.RESULT_CACHE_TTL),
+        })
+    except Exception:
+        logger.warning("Result cache write failed", exc_info=True)
+
+
+def get_cached(kind: str, key: str, persist: Optional[bool] = None) -> Optional[Any]:
+    """Return a fresh copy of the result cached under key, or None on a miss.
+
+    Args:
+        kind: Result type, for logging
+        key: fingerprint() of the result
+        persist: Also check the main-table layer (default Config.RESULT_CACHE_PERSIST)
+    """
+    persist = Config.RESULT_CACHE_PERSIST if persist is None else persist
+
+    text = _local_get(key)
+    if text is not None:
+        _stats["hits"] += 1
+        _log("hit", kind)
+        return json.loads(text)
+
+    if persist:
+        text = _persisted_get(key)
+        if text is not None:
+            _stats["persisted_hits"] += 1
+            _local_put(key, text)
+            _log("persisted_hit", kind)
+            return json.loads(text)
+
+    _stats["misses"] += 1
+    _log("miss", kind)
+    return None
+
+
+def put_cached(
+    kind: str,
+    key: str,
+    value: Any,
+    persist: Optional[bool] = None,
+    ttl: Optional[int] = None,
+) -> str:
+    """Cache a JSON-serializable result under key; returns its JSON text.
+
+    Args:
+        ttl: Lifetime of the persisted entry in seconds (default Config.RESULT_CACHE_TTL)
+    """
+    persist = Config.RESULT_CACHE_PERSIST if persist is None else persist
+    text = json.dumps(value, default=str)
+    _local_put(key, text)
+    if persist:
+        _persisted_put(key, kind, text, ttl)
+    return text
+
+
+def get_or_compute(
+    kind: str,
+    inputs: Dict[str, Any],
+    compute: Callable[[], Any],
+    version: str = "",
+    persist: Optional[bool] = None,
+) -> Any:
+    """Return the cached result for these inputs, computing it on a miss.
+
+    Args:
+        kind: Result type, e.g. "lineups.build_all" (part of the key)
+        inputs: Everything the computation reads
+        compute: Zero-arg callable producing a JSON-serializable result
+        version: Engine/reference data version the result was built from
+        persist: Use the main-table layer (default Config.RESULT_CACHE_PERSIST)
+    """
+    key = fingerprint(kind, inputs, version)
+    cached = get_cached(kind, key, persist)
+    if cached is not None:
+        return cached
+    return json.loads(put_cached(kind, key, compute(), persist))
+
+
+def get_result_cache_stats() -> Dict[str, int]:
+    """Hit/miss/eviction counters and current LRU size for this container."""
+    with _lock:
+        return {**_stats, "entries": len(_entries), "bytes": _size}
+
+
+def reset_result_cache() -> None:
+    """Drop every in-process entry (persisted entries expire via TTL)."""
+    global _size
+    with _lock:
+        _entries.clear()
+        _size = 0
+
+
+register_invalidation_hook(reset_result_cache)
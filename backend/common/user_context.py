@@ -0,0 +1,190 @@
+"""Request-scoped loader for the calling user's data.
+
+A single request used to read the same items several times: the caller's
+METADATA item once per is_admin() check (impersonation, admin guards) and
+again for AI limits and the active-profile pointer, then heroes, chief
+gear and charms one call at a time. UserContext loads each of these
+lazily, at most once per request, and load() fetches the independent
+items together: one BatchGetItem for CHIEFGEAR / CHIEFCHARM while the
+hero query runs on a second thread.
+
+Usage in a handler:
+    ctx = get_user_context(app.current_event.raw_event)
+    ctx.load(heroes=True, chief=True)
+    ctx.profile, ctx.heroes, ctx.chief_gear
+
+Values are snapshots taken when first read; after writing through a repo,
+call invalidate() for anything the same request reads again.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from . import chief_repo, hero_repo, profile_repo, user_repo
+from .auth import get_user_id
+from .db import batch_get_items, get_table
+from .exceptions import AuthorizationError
+
+_UNSET = object()
+
+# Lambda serves one request per container at a time, so the context of the
+# event being handled is the only one worth keeping.
+_current: Optional["UserContext"] = None
+
+
+class UserContext:
+    """Lazily loaded, memoized view of one request's user, profile and game data."""
+
+    def __init__(self, event: dict):
+        self.event = event
+        self._users: dict = {}
+        self._user_id: Optional[str] = None
+        self._profile = _UNSET
+        self._heroes = _UNSET
+        self._chief_gear = _UNSET
+        self._chief_charms = _UNSET
+
+    # --- Identity ---
+
+    @property
+    def caller_id(self) -> str:
+        """Cognito sub of the authenticated caller (ignores impersonation)."""
+        return get_user_id(self.event)
+
+    def get_user(self, user_id: str) -> Optional[dict]:
+        """METADATA item for a user, fetched at most once per request."""
+        if user_id not in self._users:
+            self._users[user_id] = user_repo.get_user(user_id)
+        return self._users[user_id]
+
+    @property
+    def is_admin(self) -> bool:
+        user = self.get_user(self.caller_id)
+        return bool(user) and user.get("role") == "admin"
+
+    def require_admin(self) -> None:
+        """Raise AuthorizationError if the caller is not an admin."""
+        if not self.is_admin:
+            raise AuthorizationError("Admin access required")
+
+    @property
+    def user_id(self) -> str:
+        """Effective user ID, honoring the admin-only X-Impersonate-User header."""
+        if self._user_id is None:
+            headers = self.event.get("headers") or {}
+            # HTTP API lowercases all header names
+            target = headers.get("x-impersonate-user")
+            if target:
+                if not self.is_admin:
+                    raise AuthorizationError("Only admins can impersonate users")
+                self._user_id = target
+            else:
+                self._user_id = self.caller_id
+        return self._user_id
+
+    @property
+    def user(self) -> Optional[dict]:
+        """METADATA item of the effective user."""
+        return self.get_user(self.user_id)
+
+    # --- Profile data ---
+
+    @property
+    def profile(self) -> dict:
+        """Active profile of the effective user (created if none exist).
+
+        Resolved through the active_profile_id pointer on the already
+        loaded METADATA item, so this costs a single GetItem.
+        """
+        if self._profile is _UNSET:
+            self._profile = profile_repo.get_or_create_profile(self.user_id, user=self.user or {})
+        return self._profile
+
+    @property
+    def profile_id(self) -> str:
+        return self.profile["profile_id"]
+
+    @property
+    def heroes(self) -> list:
+        if self._heroes is _UNSET:
+            self._heroes = hero_repo.get_heroes(self.profile_id)
+        return self._heroes
+
+    @property
+    def chief_gear(self) -> dict:
+        if self._chief_gear is _UNSET:
+            self.load(chief=True)
+        return self._chief_gear
+
+    @property
+    def chief_charms(self) -> dict:
+        if self._chief_charms is _UNSET:
+            self.load(chief=True)
+        return self._chief_charms
+
+    def load(self, heroes: bool = False, chief: bool = False) -> "UserContext":
+        """Prefetch several items in as few round trips as possible.
+
+        Always resolves the user and active profile first (the METADATA item
+        holds the profile pointer), then fetches the requested items that are
+        not loaded yet: CHIEFGEAR / CHIEFCHARM in one BatchGetItem,
+        concurrently with the hero query.
+
+        Returns:
+            self, for chaining.
+        """
+        profile_id = self.profile_id
+        gear_key = {"PK": f"PROFILE#{profile_id}", "SK": "CHIEFGEAR"}
+        charm_key = {"PK": f"PROFILE#{profile_id}", "SK": "CHIEFCHARM"}
+
+        keys = []
+        if chief and self._chief_gear is _UNSET:
+            keys.append(gear_key)
+        if chief and self._chief_charms is _UNSET:
+            keys.append(charm_key)
+        load_heroes = heroes and self._heroes is _UNSET
+
+        if load_heroes and keys:
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                hero_future = pool.submit(hero_repo.get_heroes, profile_id)
+                items = batch_get_items(get_table("main"), keys)
+                self._heroes = hero_future.result()
+        else:
+            items = batch_get_items(get_table("main"), keys) if keys else []
+            if load_heroes:
+                self._heroes = hero_repo.get_heroes(profile_id)
+
+        found = {(item["PK"], item["SK"]): item for item in items}
+        if gear_key in keys:
+            self._chief_gear = chief_repo.chief_gear_from_item(
+                profile_id, found.get((gear_key["PK"], gear_key["SK"]))
+            )
+        if charm_key in keys:
+            self._chief_charms = chief_repo.chief_charms_from_item(
+                profile_id, found.get((charm_key["PK"], charm_key["SK"]))
+            )
+        return self
+
+    def invalidate(self, *names: str) -> None:
+        """Forget memoized values ("user", "profile", "heroes", "chief") or all of them."""
+        names = set(names) or {"user", "profile", "heroes", "chief"}
+        if "user" in names:
+            self._users.clear()
+        if "profile" in names:
+            self._profile = _UNSET
+            self._heroes = _UNSET
+            self._chief_gear = _UNSET
+            self._chief_charms = _UNSET
+        if "heroes" in names:
+            self._heroes = _UNSET
+        if "chief" in names:
+            self._chief_gear = _UNSET
+            self._chief_charms = _UNSET
+
+
+def get_user_context(event: dict) -> UserContext:
+    """Return the UserContext for this event, creating it on first use."""
+    global _current
+    if _current is None or _current.event is not event:
+        _current = UserContext(event)
+    return _current
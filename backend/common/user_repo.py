@@ -1,10 +1,12 @@
 """User data access functions for DynamoDB."""
 
+from collections import Counter
 from datetime import datetime, timezone
 from typing import Optional
 
+from . import admin_counters
 from .config import Config
-from .db import get_table, strip_none, transact_write_items
+from .db import count_query, get_table, iter_query, strip_none, transact_write_items
 from .exceptions import ConflictError, NotFoundError
 
 
@@ -18,15 +20,15 @@ def get_user(user_id: str) -> Optional[dict]:
 def get_user_by_email(email: str) -> Optional[dict]:
     """Get user by email via GSI1-Email."""
     table = get_table("main")
-    resp = table.query(
-        IndexName="GSI1-Email",
+    items = iter_query(
+        table,
+        index_name="GSI1-Email",
+        limit=1,
         KeyConditionExpression="#email = :email AND SK = :sk",
         ExpressionAttributeNames={"#email": "email"},
         ExpressionAttributeValues={":email": email, ":sk": "METADATA"},
-        Limit=1,
     )
-    items = resp.get("Items", [])
-    return items[0] if items else None
+    return next(items, None)
 
 
 def create_user(
@@ -102,6 +104,7 @@ def create_user(
             raise ConflictError("Email or username already registered")
         raise
 
+    admin_counters.record_user_change(None, user_item)
     return user_item
 
 
@@ -126,9 +129,12 @@ def update_user(user_id: str, updates: dict) -> dict:
         UpdateExpression="SET " + ", ".join(expr_parts),
         ExpressionAttributeNames=attr_names,
         ExpressionAttributeValues=attr_values,
-        ReturnValues="ALL_NEW",
+        ReturnValues="ALL_OLD",
     )
-    return resp.get("Attributes", {})
+    old = resp.get("Attributes", {})
+    new = {**old, **updates}
+    admin_counters.record_user_change(old, new)
+    return new
 
 
 def delete_user(user_id: str) -> None:
@@ -152,33 +158,45 @@ def delete_user(user_id: str) -> None:
     if user.get("username"):
         items_to_delete.append({"PK": "UNIQUE#USERNAME", "SK": user["username"].lower()})
 
-    # All items with PK=USER#<id> (profiles, conversations, threads, notifications, logins)
-    resp = table.query(
-        KeyConditionExpression="PK = :pk",
-        ExpressionAttributeValues={":pk": f"USER#{user_id}"},
-        ProjectionExpression="PK, SK",
-    )
-    for item in resp.get("Items", []):
+    # All items with PK=USER#<id> (profiles, conversations, threads, notifications, logins),
+    # with the attributes the admin counters need
+    user_items = list(iter_query(
+        table, f"USER#{user_id}",
+        projection=(
+            "PK, SK, deleted_at, routed_to, #src, rating, is_helpful, "
+            "is_good_example, is_bad_example, answer_cache, tokens_saved"
+        ),
+        ExpressionAttributeNames={"#src": "source"},
+    ))
+    for item in user_items:
         items_to_delete.append({"PK": item["PK"], "SK": item["SK"]})
 
     # Get profile IDs to delete their child items
-    profiles = [i for i in resp.get("Items", []) if i["SK"].startswith("PROFILE#")]
+    profiles = [i for i in user_items if i["SK"].startswith("PROFILE#")]
+    removed_heroes = []
     for profile_item in profiles:
         profile_id = profile_item["SK"].replace("PROFILE#", "")
         # Query all items under this profile
-        profile_resp = table.query(
-            KeyConditionExpression="PK = :pk",
-            ExpressionAttributeValues={":pk": f"PROFILE#{profile_id}"},
-            ProjectionExpression="PK, SK",
-        )
-        for child in profile_resp.get("Items", []):
+        for child in iter_query(table, f"PROFILE#{profile_id}", projection="PK, SK"):
             items_to_delete.append({"PK": child["PK"], "SK": child["SK"]})
+            if child["SK"].startswith("HERO#"):
+                removed_heroes.append(child["SK"][len("HERO#"):])
 
     # Batch delete (25 items per batch)
     with table.batch_writer() as batch:
         for item_key in items_to_delete:
             batch.delete_item(Key=item_key)
 
+    # Counted the way reconcile_counters counts them
+    removed = Counter()
+    for item in user_items:
+        if item["SK"].startswith("AICONV#"):
+            removed.update(admin_counters.conversation_counts(item))
+    removed["profiles"] = sum(1 for p in profiles if not p.get("deleted_at"))
+    admin_counters.increment({k: -v for k, v in removed.items()})
+    admin_counters.record_heroes(removed=removed_heroes)
+    admin_counters.record_user_change(user, None)
+
 
 def soft_delete_user(user_id: str) -> dict:
     """Soft-delete a user by setting deleted_at and deactivating."""
@@ -189,9 +207,12 @@ def soft_delete_user(user_id: str) -> dict:
         Key={"PK": f"USER#{user_id}", "SK": "METADATA"},
         UpdateExpression="SET deleted_at = :now, is_active = :false, updated_at = :now2",
         ExpressionAttributeValues={":now": now, ":false": False, ":now2": now},
-        ReturnValues="ALL_NEW",
+        ReturnValues="ALL_OLD",
     )
-    return resp.get("Attributes", {})
+    old = resp.get("Attributes", {})
+    new = {**old, "deleted_at": now, "is_active": False, "updated_at": now}
+    admin_counters.record_user_change(old, new)
+    return new
 
 
 def restore_user(user_id: str) -> dict:
@@ -203,32 +224,28 @@ def restore_user(user_id: str) -> dict:
         Key={"PK": f"USER#{user_id}", "SK": "METADATA"},
         UpdateExpression="REMOVE deleted_at SET is_active = :true, updated_at = :now",
         ExpressionAttributeValues={":true": True, ":now": now},
-        ReturnValues="ALL_NEW",
+        ReturnValues="ALL_OLD",
     )
-    return resp.get("Attributes", {})
+    old = resp.get("Attributes", {})
+    new = {k: v for k, v in old.items() if k != "deleted_at"}
+    new.update(is_active=True, updated_at=now)
+    admin_counters.record_user_change(old, new)
+    return new
 
 
 def get_deleted_users(limit: int = 500) -> list:
     """List soft-deleted users (those with deleted_at set)."""
     table = get_table("main")
 
-    params = {
-        "IndexName": "GSI4-AdminUserList",
-        "KeyConditionExpression": "entity_type = :et",
-        "FilterExpression": "attribute_exists(deleted_at)",
-        "ExpressionAttributeValues": {":et": "USER"},
-        "ScanIndexForward": False,
-    }
-
-    items = []
-    while True:
-        resp = table.query(**params)
-        items.extend(resp.get("Items", []))
-        if len(items) >= limit or "LastEvaluatedKey" not in resp:
-            break
-        params["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
-
-    return items[:limit]
+    return list(iter_query(
+        table,
+        index_name="GSI4-AdminUserList",
+        scan_forward=False,
+        limit=limit,
+        KeyConditionExpression="entity_type = :et",
+        FilterExpression="attribute_exists(deleted_at)",
+        ExpressionAttributeValues={":et": "USER"},
+    ))
 
 
 def get_expired_deleted_users(grace_days: int = 30) -> list:
@@ -263,16 +280,15 @@ def get_login_count_last_n_days(user_id: str, days: int = 7) -> int:
     table = get_table("main")
     start_date = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
 
-    resp = table.query(
+    return count_query(
+        table,
         KeyConditionExpression="PK = :pk AND SK BETWEEN :start AND :end",
         ExpressionAttributeValues={
             ":pk": f"USER#{user_id}",
             ":start": f"LOGIN#{start_date}",
             ":end": f"LOGIN#9999-12-31",
         },
-        Select="COUNT",
     )
-    return resp.get("Count", 0)
 
 
 def list_users(test_only: bool = False, include_deleted: bool = False, limit: int = 500) -> list:
@@ -295,24 +311,16 @@ def list_users(test_only: bool = False, include_deleted: bool = False, limit: in
         expr_values[":t"] = True
 
     params = {
-        "IndexName": "GSI4-AdminUserList",
         "KeyConditionExpression": "entity_type = :et",
         "ExpressionAttributeValues": expr_values,
-        "ScanIndexForward": False,
     }
 
     if filter_parts:
         params["FilterExpression"] = " AND ".join(filter_parts)
 
-    items = []
-    while True:
-        resp = table.query(**params)
-        items.extend(resp.get("Items", []))
-        if len(items) >= limit or "LastEvaluatedKey" not in resp:
-            break
-        params["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
-
-    return items[:limit]
+    return list(iter_query(
+        table, index_name="GSI4-AdminUserList", scan_forward=False, limit=limit, **params,
+    ))
 
 
 def increment_ai_requests(user_id: str) -> dict:
@@ -326,15 +334,22 @@ def increment_ai_requests(user_id: str) -> dict:
         ExpressionAttributeValues={":one": 1, ":zero": 0, ":now": now},
         ReturnValues="ALL_NEW",
     )
-    return resp.get("Attributes", {})
+    user = resp.get("Attributes", {})
+    if not user.get("deleted_at"):
+        real = 0 if user.get("is_test_account") else 1
+        admin_counters.increment({"ai_requests_today": 1, "ai_requests_today_real": real})
+    return user
 
 
 def reset_ai_request_counter(user_id: str) -> None:
     """Reset daily AI request counter."""
     table = get_table("main")
 
-    table.update_item(
+    resp = table.update_item(
         Key={"PK": f"USER#{user_id}", "SK": "METADATA"},
         UpdateExpression="SET ai_requests_today = :zero",
         ExpressionAttributeValues={":zero": 0},
+        ReturnValues="ALL_OLD",
     )
+    old = resp.get("Attributes", {})
+    admin_counters.record_user_change(old, {**old, "ai_requests_today": 0})
@@ -1,7 +1,12 @@
 # Engine module
 from .recommender import RecommendationEngine as HeroRecommender
 from .ai_recommender import AIRecommender, format_data_preview
-from .recommendation_engine import RecommendationEngine, get_engine
+from .recommendation_engine import (
+    RecommendationEngine,
+    get_engine,
+    get_engine_stats,
+    reset_engine,
+)
 
 # Analyzers
 from .analyzers import (
@@ -15,6 +20,8 @@ from .analyzers import (
 __all__ = [
     'RecommendationEngine',
     'get_engine',
+    'get_engine_stats',
+    'reset_engine',
     'HeroRecommender',  # Legacy name for old recommender.py
     'AIRecommender',
     'format_data_preview',
@@ -0,0 +1,259 @@
+"""
+AI Clients - pooled provider clients, latency histograms and hedged calls.
+
+Provider SDK clients are created once per container and key, each on its
+own httpx connection pool with keep-alive connections and explicit
+timeouts, so warm invocations reuse an open TLS connection instead of
+building a new client per engine. Keys come from Config (environment or
+Secrets Manager) only.
+
+Every provider call is timed into a per-provider LatencyHistogram. A call
+made through call_hedged() goes to the primary provider first; if it has
+not answered within the primary's observed p95 (clamped to
+Config.AI_HEDGE_MIN_MS..AI_HEDGE_MAX_MS, and Config.AI_HEDGE_AFTER_MS
+until enough samples exist), or it fails, the fallback provider is called
+as well and the first successful answer wins. Each hedged call gets its
+own two-thread pool, so a losing call still running (or frozen with the
+Lambda container) never holds a thread a later request needs, and the
+hedge delay is measured from when the primary call actually starts. The
+loser is left to finish in the background, bounded by the client timeout;
+its tokens are still spent, which is the price of cutting the tail.
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from common.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Idle pooled connections are closed after this long; providers keep them
+# open for about a minute
+KEEPALIVE_EXPIRY_SECONDS = 60
+
+# Histogram bucket upper bounds in ms; slower calls land in an overflow bucket
+BUCKETS_MS = (
+    100, 250, 500, 750, 1000, 1500, 2000, 3000, 4000, 5000,
+    7500, 10000, 15000, 20000, 30000, 45000, 60000, 90000,
+)
+
+_clients: Dict[Tuple[str, str], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def _api_key(provider: str) -> str:
+    if provider == "anthropic":
+        return os.environ.get("ANTHROPIC_API_KEY") or Config.ANTHROPIC_API_KEY
+    return os.environ.get("OPENAI_API_KEY") or Config.OPENAI_API_KEY
+
+
+def _http_client():
+    import httpx
+    return httpx.Client(
+        timeout=httpx.Timeout(Config.AI_TIMEOUT_SECONDS, connect=Config.AI_CONNECT_TIMEOUT_SECONDS),
+        limits=httpx.Limits(
+            max_keepalive_connections=Config.AI_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+        ),
+    )
+
+
+def _build_client(provider: str, api_key: str):
+    try:
+        if provider == "anthropic":
+            import anthropic
+            return anthropic.Anthropic(
+                api_key=api_key,
+                timeout=Config.AI_TIMEOUT_SECONDS,
+                max_retries=Config.AI_MAX_RETRIES,
+                http_client=_http_client(),
+            )
+        from openai import OpenAI
+        return OpenAI(
+            api_key=api_key,
+            timeout=Config.AI_TIMEOUT_SECONDS,
+            max_retries=Config.AI_MAX_RETRIES,
+            http_client=_http_client(),
+        )
+    except ImportError:
+        return None
+
+
+def get_client(provider: str, api_key: Optional[str] = None):
+    """The container's shared client for "anthropic" or "openai".
+
+    Returns None when there is no key or the SDK is not installed.
+    """
+    api_key = api_key or _api_key(provider)
+    if not api_key:
+        return None
+    key = (provider, api_key)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _build_client(provider, api_key)
+            if client is not None:
+                _clients[key] = client
+        return client
+
+
+class LatencyHistogram:
+    """Successful call latencies in fixed buckets, plus an error count."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, ms: float, ok: bool = True) -> None:
+        with self._lock:
+            if not ok:
+                self.errors += 1
+                return
+            self.buckets[bisect_left(BUCKETS_MS, ms)] += 1
+            self.count += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Upper bound (ms) of the bucket holding the p-th percentile call."""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = p / 100 * self.count
+            seen = 0
+            for bound, n in zip(BUCKETS_MS, self.buckets):
+                seen += n
+                if seen >= rank:
+                    return float(min(bound, self.max_ms))
+            return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50, p95, p99 = self.percentile(50), self.percentile(95), self.percentile(99)
+        with self._lock:
+            labels = [f"le_{b}" for b in BUCKETS_MS] + ["overflow"]
+            return {
+                "count": self.count,
+                "errors": self.errors,
+                "mean_ms": round(self.total_ms / self.count, 1) if self.count else None,
+                "p50_ms": p50,
+                "p95_ms": p95,
+                "p99_ms": p99,
+                "max_ms": round(self.max_ms, 1),
+                "buckets": dict(zip(labels, self.buckets)),
+            }
+
+
+_histograms: Dict[str, LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+
+
+def _histogram(name: str) -> LatencyHistogram:
+    histogram = _histograms.get(name)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.setdefault(name, LatencyHistogram())
+    return histogram
+
+
+def record_latency(name: str, seconds: float, ok: bool = True) -> None:
+    """Add one call to a provider's histogram (e.g. "anthropic", "openai:first_token")."""
+    _histogram(name).record(seconds * 1000, ok)
+
+
+def get_latency_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-provider latency histograms for this container."""
+    return {name: h.snapshot() for name, h in sorted(_histograms.items())}
+
+
+def hedge_delay_seconds(provider: str) -> float:
+    """How long to wait for a provider before hedging: its p95, clamped."""
+    histogram = _histogram(provider)
+    p95 = histogram.percentile(95) if histogram.count >= Config.AI_HEDGE_MIN_SAMPLES else None
+    delay_ms = Config.AI_HEDGE_AFTER_MS if p95 is None else p95
+    return min(max(delay_ms, Config.AI_HEDGE_MIN_MS), Config.AI_HEDGE_MAX_MS) / 1000
+
+
+def timed(name: str, call: Callable[[], Any]) -> Any:
+    """Run a provider call, recording its latency (and failures)."""
+    start = time.perf_counter()
+    try:
+        result = call()
+    except Exception:
+        record_latency(name, time.perf_counter() - start, ok=False)
+        raise
+    record_latency(name, time.perf_counter() - start)
+    return result
+
+
+def _run_started(name: str, call: Callable[[], Any], started: threading.Event) -> Any:
+    started.set()
+    return timed(name, call)
+
+
+Call = Tuple[str, Callable[[], Any]]
+
+
+def call_hedged(primary: Call, fallback: Optional[Call] = None) -> Tuple[str, Any]:
+    """Run primary, hedging with fallback when it is slow or fails.
+
+    Args:
+        primary: (provider name, zero-arg call)
+        fallback: Same for the other provider; None disables hedging
+
+    Returns:
+        (name of the provider that answered, its result)
+
+    Raises:
+        The last failure when every provider that was called failed.
+    """
+    name, call = primary
+    if fallback is None or not Config.AI_HEDGE_ENABLED:
+        return name, timed(name, call)
+
+    # A pool per call: nothing queues behind a loser from an earlier request
+    executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ai-hedge")
+    try:
+        primary_started = threading.Event()
+        futures = {executor.submit(_run_started, name, call, primary_started): name}
+        primary_started.wait()
+        started = time.perf_counter()
+        pending = set(futures)
+        hedged = False
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(
+                pending,
+                timeout=None if hedged else max(0.0, hedge_delay_seconds(name) - (time.perf_counter() - started)),
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                if future.exception() is None:
+                    return futures[future], future.result()
+                error = future.exception()
+            if not hedged:
+                hedged = True
+                fallback_name, fallback_call = fallback
+                logger.info(
+                    "Hedging %s with %s after %.0f ms (%s)",
+                    name, fallback_name, (time.perf_counter() - started) * 1000,
+                    "failed" if error else "slow",
+                )
+                future = executor.submit(timed, fallback_name, fallback_call)
+                futures[future] = fallback_name
+                pending.add(future)
+        raise error
+    finally:
+        # Returns at once; a losing call keeps its thread until it ends
+        executor.shutdown(wait=False, cancel_futures=True)
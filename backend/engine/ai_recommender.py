@@ -4,12 +4,17 @@ Submits compact, structured data for intelligent analysis.
 Includes verified game mechanics to prevent hallucination.
 """
 
-import os
 import json
+import threading
+import time
+from functools import partial
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Literal
+from typing import Callable, Iterator, List, Dict, Any, Optional, Literal, Tuple
 from dataclasses import dataclass
 
+from .ai_clients import call_hedged, get_client, record_latency
+from .fake_provider import FakeProvider
+
 
 @dataclass
 class AIRecommendation:
@@ -22,7 +27,7 @@ class AIRecommendation:
 
 
 # Supported AI providers
-AIProvider = Literal["openai", "anthropic", "auto"]
+AIProvider = Literal["openai", "anthropic", "auto", "fake"]
 
 
 # WoS Conversational Syntax - Game terminology and adaptive behavior
@@ -304,12 +309,26 @@ ALWAYS RECOMMEND THESE:
 """
 
 
-def build_hero_context(heroes_data: dict, owned_hero_names: List[str], user_gen: int) -> str:
+def server_generation(server_age_days) -> int:
+    """Hero generation a server has reached (from CLAUDE.md hero generation reference).
+
+    Gen 1 runs to day 40, then a new generation every 80 days, up to Gen 14.
+    """
+    try:
+        server_age = int(server_age_days or 0)
+    except (TypeError, ValueError):
+        server_age = 0
+    if server_age < 40:
+        return 1
+    return min(14, 2 + (server_age - 40) // 80)
+
+
+def build_hero_context(heroes_data, owned_hero_names: List[str], user_gen: int) -> str:
     """
     Build dynamic hero context showing owned vs recommended heroes.
 
     Args:
-        heroes_data: Full heroes.json data
+        heroes_data: ReferenceDataStore, or full heroes.json data
         owned_hero_names: List of hero names the user owns
         user_gen: User's current generation (based on server age)
 
@@ -319,9 +338,9 @@ def build_hero_context(heroes_data: dict, owned_hero_names: List[str], user_gen:
     owned_set = set(owned_hero_names)
     lines = []
 
-    # Filter heroes by generation
-    available_heroes = [h for h in heroes_data.get('heroes', [])
-                       if h.get('generation', 99) <= user_gen]
+    # Filter heroes by generation (precomputed in the reference store)
+    from common.reference_store import ReferenceDataStore
+    available_heroes = ReferenceDataStore.of(heroes_data).up_to_generation(user_gen)
 
     # Group owned heroes by tier
     owned_by_tier = {}
@@ -432,13 +451,21 @@ RULES:
         Initialize with AI provider and API key.
 
         Args:
-            provider: "openai", "anthropic", or "auto" (tries both)
+            provider: "openai", "anthropic", "auto" (tries both), or "fake"
+                (offline canned answers, see fake_provider)
             api_key: Optional API key (otherwise uses environment variables)
         """
         self.provider = provider
         self.openai_client = None
         self.anthropic_client = None
+        self.fake_client = None
         self.active_provider = None
+        self._usage = threading.local()
+
+        if provider == "fake":
+            from common.config import Config
+            self.fake_client = FakeProvider(Config.AI_FAKE_FIRST_TOKEN_MS, Config.AI_FAKE_TOKEN_DELAY_MS)
+            self.active_provider = "fake"
 
         # Try to initialize based on provider preference
         if provider in ["auto", "anthropic"]:
@@ -448,66 +475,30 @@ RULES:
             self._init_openai(api_key if provider == "openai" else None)
 
     def _init_anthropic(self, api_key: Optional[str] = None):
-        """Initialize Anthropic/Claude client."""
-        anthropic_key = api_key or os.environ.get('ANTHROPIC_API_KEY')
-
-        # On Windows, also check user environment variables
-        if not anthropic_key:
-            try:
-                import subprocess
-                result = subprocess.run(
-                    ['powershell', '-Command', "[Environment]::GetEnvironmentVariable('ANTHROPIC_API_KEY', 'User')"],
-                    capture_output=True, text=True, timeout=5
-                )
-                if result.stdout.strip():
-                    anthropic_key = result.stdout.strip()
-            except Exception:
-                pass
-
-        if anthropic_key:
-            try:
-                import anthropic
-                self.anthropic_client = anthropic.Anthropic(api_key=anthropic_key)
-                if not self.active_provider:
-                    self.active_provider = "anthropic"
-            except ImportError:
-                pass
+        """Attach the container's pooled Anthropic/Claude client."""
+        self.anthropic_client = get_client("anthropic", api_key)
+        if self.anthropic_client and not self.active_provider:
+            self.active_provider = "anthropic"
 
     def _init_openai(self, api_key: Optional[str] = None):
-        """Initialize OpenAI client."""
-        openai_key = api_key or os.environ.get('OPENAI_API_KEY')
-
-        # On Windows, also check user environment variables
-        if not openai_key:
-            try:
-                import subprocess
-                result = subprocess.run(
-                    ['powershell', '-Command', "[Environment]::GetEnvironmentVariable('OPENAI_API_KEY', 'User')"],
-                    capture_output=True, text=True, timeout=5
-                )
-                if result.stdout.strip():
-                    openai_key = result.stdout.strip()
-            except Exception:
-                pass
-
-        if openai_key:
-            try:
-                from openai import OpenAI
-                self.openai_client = OpenAI(api_key=openai_key)
-                if not self.active_provider:
-                    self.active_provider = "openai"
-            except ImportError:
-                pass
+        """Attach the container's pooled OpenAI client."""
+        self.openai_client = get_client("openai", api_key)
+        if self.openai_client and not self.active_provider:
+            self.active_provider = "openai"
 
     def is_available(self) -> bool:
         """Check if any AI provider is available."""
-        return self.anthropic_client is not None or self.openai_client is not None
+        return (
+            self.anthropic_client is not None
+            or self.openai_client is not None
+            or self.fake_client is not None
+        )
 
     def get_provider_name(self) -> str:
         """Get the name of the active AI provider."""
         return self.active_provider or "none"
 
-    def format_user_data(self, profile, user_heroes: list, heroes_data: dict, inventory: dict = None) -> str:
+    def format_user_data(self, profile, user_heroes: list, heroes_data, inventory: dict = None) -> str:
         """
         Format user data into compact, clear prompt format.
 
@@ -528,21 +519,7 @@ RULES:
             spending_profile = getattr(profile, 'spending_profile', 'f2p')
             is_farm = getattr(profile, 'is_farm_account', False)
 
-        # Calculate generation (from CLAUDE.md hero generation reference)
-        if server_age < 40: gen = 1
-        elif server_age < 120: gen = 2
-        elif server_age < 200: gen = 3
-        elif server_age < 280: gen = 4
-        elif server_age < 360: gen = 5
-        elif server_age < 440: gen = 6
-        elif server_age < 520: gen = 7
-        elif server_age < 600: gen = 8
-        elif server_age < 680: gen = 9
-        elif server_age < 760: gen = 10
-        elif server_age < 840: gen = 11
-        elif server_age < 920: gen = 12
-        elif server_age < 1000: gen = 13
-        else: gen = 14
+        gen = server_generation(server_age)
 
         # Basic profile info
         profile_line = f"PROFILE: Gen{gen} (Day {server_age}), Furnace {furnace}"
@@ -568,7 +545,9 @@ RULES:
         lines.append("")
 
         # Heroes section
-        hero_lookup = {h['name']: h for h in heroes_data.get('heroes', [])}
+        from common.reference_store import ReferenceDataStore
+        reference = ReferenceDataStore.of(heroes_data)
+        hero_lookup = reference.by_name
         owned_hero_names = []
 
         lines.append("MY HEROES:")
@@ -612,7 +591,7 @@ RULES:
 
         # Add dynamic hero context (heroes to get)
         if owned_hero_names:
-            hero_context = build_hero_context(heroes_data, owned_hero_names, gen)
+            hero_context = build_hero_context(reference, owned_hero_names, gen)
             # Extract just the "HEROES TO CONSIDER GETTING" part
             if "HEROES TO CONSIDER GETTING:" in hero_context:
                 getting_section = hero_context.split("HEROES TO CONSIDER GETTING:")[1].strip()
@@ -637,7 +616,7 @@ RULES:
 
         return "\n".join(lines)
 
-    def get_recommendations(self, profile, user_heroes: list, heroes_data: dict,
+    def get_recommendations(self, profile, user_heroes: list, heroes_data,
                           inventory: dict = None, custom_question: str = None) -> List[Dict]:
         """
         Get AI-powered recommendations.
@@ -645,7 +624,7 @@ RULES:
         Args:
             profile: User profile with priorities
             user_heroes: List of user's heroes
-            heroes_data: Static hero data
+            heroes_data: Static hero data (ReferenceDataStore or heroes.json dict)
             inventory: Optional inventory data
             custom_question: Optional specific question to ask
 
@@ -692,7 +671,7 @@ RULES:
                 return [{"error": "AI request limit reached. Please try again later."}]
             return [{"error": "AI service is temporarily unavailable."}]
 
-    def ask_question(self, profile, user_heroes: list, heroes_data: dict,
+    def ask_question(self, profile, user_heroes: list, heroes_data,
                     question: str, inventory: dict = None) -> str:
         """
         Ask a specific question about your account.
@@ -702,6 +681,7 @@ RULES:
         if not self.is_available():
             return "No AI provider available. Set OPENAI_API_KEY or ANTHROPIC_API_KEY environment variable."
 
+        self._record_usage(0, 0)
         user_data = self.format_user_data(profile, user_heroes, heroes_data, inventory)
         user_message = f"{user_data}\n\nQUESTION: {question}"
 
@@ -717,9 +697,68 @@ RULES:
                 return "AI request limit reached. Please try again later."
             return "AI service is temporarily unavailable. Please try again."
 
+    def stream_question(self, profile, user_heroes: list, heroes_data,
+                        question: str, inventory: dict = None) -> Iterator[str]:
+        """
+        Ask a specific question, yielding the answer as the provider streams it.
+
+        Token usage is available from last_usage() once the iterator is
+        exhausted.
+
+        Raises:
+            The provider error when every provider fails before its first
+            token, or when the stream breaks partway through.
+        """
+        self._record_usage(0, 0)
+        if not self.is_available():
+            yield "No AI provider available. Set OPENAI_API_KEY or ANTHROPIC_API_KEY environment variable."
+            return
+
+        user_data = self.format_user_data(profile, user_heroes, heroes_data, inventory)
+        user_message = f"{user_data}\n\nQUESTION: {question}"
+
+        try:
+            yield from self._stream_ai(self.QUESTION_PROMPT, user_message, max_tokens=800)
+        except Exception:
+            self._record_usage(0, 0)
+            raise
+
+    def _record_usage(self, tokens_input: int, tokens_output: int, provider: Optional[str] = None) -> None:
+        self._usage.tokens_input = int(tokens_input or 0)
+        self._usage.tokens_output = int(tokens_output or 0)
+        self._usage.provider = provider
+
+    def last_usage(self) -> Dict[str, int]:
+        """Token usage of this thread's last AI call (zeros if it failed)."""
+        return {
+            "tokens_input": getattr(self._usage, "tokens_input", 0),
+            "tokens_output": getattr(self._usage, "tokens_output", 0),
+        }
+
+    def last_provider(self) -> Optional[str]:
+        """Provider that answered this thread's last AI call (the hedge may have won)."""
+        return getattr(self._usage, "provider", None)
+
+    def _providers(self) -> List[Tuple[str, Callable[..., Tuple[str, int, int]]]]:
+        """Available providers, preferred first.
+
+        Anthropic is preferred when it is the active provider (usually more
+        accurate for structured tasks); the other one is the fallback.
+        """
+        if self.fake_client:
+            return [("fake", self._call_fake)]
+        providers = []
+        if self.anthropic_client and self.active_provider == "anthropic":
+            providers.append(("anthropic", self._call_anthropic))
+        if self.openai_client:
+            providers.append(("openai", self._call_openai))
+        if self.anthropic_client and self.active_provider != "anthropic":
+            providers.append(("anthropic", self._call_anthropic))
+        return providers
+
     def _call_ai(self, system_prompt: str, user_message: str, max_tokens: int = 1000) -> str:
         """
-        Call the appropriate AI provider.
+        Call the preferred AI provider, hedged with the fallback provider.
 
         Args:
             system_prompt: System prompt for the AI
@@ -729,18 +768,31 @@ RULES:
         Returns:
             AI response text
         """
-        # Prefer Anthropic if available (usually more accurate for structured tasks)
-        if self.anthropic_client and self.active_provider == "anthropic":
-            return self._call_anthropic(system_prompt, user_message, max_tokens)
-        elif self.openai_client:
-            return self._call_openai(system_prompt, user_message, max_tokens)
-        elif self.anthropic_client:
-            return self._call_anthropic(system_prompt, user_message, max_tokens)
-        else:
+        calls = [
+            (name, partial(call, system_prompt, user_message, max_tokens))
+            for name, call in self._providers()
+        ]
+        if not calls:
             raise Exception("No AI provider available")
-
-    def _call_anthropic(self, system_prompt: str, user_message: str, max_tokens: int) -> str:
-        """Call Anthropic Claude API."""
+        provider, (text, tokens_input, tokens_output) = call_hedged(
+            calls[0], calls[1] if len(calls) > 1 else None
+        )
+        self._record_usage(tokens_input, tokens_output, provider)
+        return text
+
+    def _new_fake(self) -> FakeProvider:
+        # One per call, so concurrent calls do not share usage counters
+        fake = self.fake_client
+        return FakeProvider(fake.first_token_ms, fake.token_delay_ms, fake.answer)
+
+    def _call_fake(self, system_prompt: str, user_message: str, max_tokens: int) -> Tuple[str, int, int]:
+        """Call the offline fake provider."""
+        fake = self._new_fake()
+        text = fake.complete(system_prompt, user_message, max_tokens)
+        return text, fake.tokens_input, fake.tokens_output
+
+    def _call_anthropic(self, system_prompt: str, user_message: str, max_tokens: int) -> Tuple[str, int, int]:
+        """Call Anthropic Claude API; returns (text, input tokens, output tokens)."""
         response = self.anthropic_client.messages.create(
             model="claude-sonnet-4-20250514",  # Latest Claude model
             max_tokens=max_tokens,
@@ -749,10 +801,11 @@ RULES:
                 {"role": "user", "content": user_message}
             ]
         )
-        return response.content[0].text.strip()
+        usage = response.usage
+        return response.content[0].text.strip(), usage.input_tokens, usage.output_tokens
 
-    def _call_openai(self, system_prompt: str, user_message: str, max_tokens: int) -> str:
-        """Call OpenAI API."""
+    def _call_openai(self, system_prompt: str, user_message: str, max_tokens: int) -> Tuple[str, int, int]:
+        """Call OpenAI API; returns (text, input tokens, output tokens)."""
         response = self.openai_client.chat.completions.create(
             model="gpt-4o-mini",  # Fast and cheap, good for this use case
             messages=[
@@ -762,10 +815,82 @@ RULES:
             temperature=0.7,
             max_tokens=max_tokens
         )
-        return response.choices[0].message.content.strip()
+        usage = response.usage
+        return response.choices[0].message.content.strip(), usage.prompt_tokens, usage.completion_tokens
+
+    def _stream_ai(self, system_prompt: str, user_message: str, max_tokens: int = 1000) -> Iterator[str]:
+        """Streaming counterpart of _call_ai: yield text deltas as they arrive.
+
+        Streams are not hedged (the first token is already on its way to
+        the user), but a provider that fails before its first token is
+        replaced by the next one. Time to first token is recorded as
+        "<provider>:first_token".
+        """
+        providers = self._providers()
+        if not providers:
+            raise Exception("No AI provider available")
+        streams = {
+            "fake": self._stream_fake,
+            "anthropic": self._stream_anthropic,
+            "openai": self._stream_openai,
+        }
+        for i, (name, _) in enumerate(providers):
+            start = time.perf_counter()
+            first = True
+            try:
+                for text in streams[name](system_prompt, user_message, max_tokens):
+                    if first:
+                        record_latency(f"{name}:first_token", time.perf_counter() - start)
+                        first = False
+                    yield text
+            except Exception:
+                record_latency(f"{name}:first_token" if first else name, time.perf_counter() - start, ok=False)
+                if not first or i == len(providers) - 1:
+                    raise
+                continue
+            record_latency(name, time.perf_counter() - start)
+            return
+
+    def _stream_fake(self, system_prompt: str, user_message: str, max_tokens: int) -> Iterator[str]:
+        fake = self._new_fake()
+        yield from fake.stream(system_prompt, user_message, max_tokens)
+        self._record_usage(fake.tokens_input, fake.tokens_output, "fake")
+
+    def _stream_anthropic(self, system_prompt: str, user_message: str, max_tokens: int) -> Iterator[str]:
+        """Stream from the Anthropic Claude API."""
+        with self.anthropic_client.messages.stream(
+            model="claude-sonnet-4-20250514",
+            max_tokens=max_tokens,
+            system=system_prompt,
+            messages=[
+                {"role": "user", "content": user_message}
+            ]
+        ) as stream:
+            yield from stream.text_stream
+            usage = stream.get_final_message().usage
+        self._record_usage(usage.input_tokens, usage.output_tokens, "anthropic")
+
+    def _stream_openai(self, system_prompt: str, user_message: str, max_tokens: int) -> Iterator[str]:
+        """Stream from the OpenAI API (usage arrives on the final chunk)."""
+        stream = self.openai_client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_message}
+            ],
+            temperature=0.7,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            if getattr(chunk, "usage", None):
+                self._record_usage(chunk.usage.prompt_tokens, chunk.usage.completion_tokens, "openai")
 
 
-def format_data_preview(profile, user_heroes: list, heroes_data: dict) -> str:
+def format_data_preview(profile, user_heroes: list, heroes_data) -> str:
     """
     Generate a preview of what data will be sent to AI.
     Useful for showing users exactly what the AI sees.
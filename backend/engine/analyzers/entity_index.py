@@ -0,0 +1,233 @@
+"""
+Entity Index - every game entity in a question, found in one pass.
+
+Entity extraction used to test each hero name (and each game mode and gear
+piece) as a substring of the question, and the hero info lookup stopped at
+the first hero in heroes.json order. That made "Gregory" read as "Greg",
+"Gina" match inside "imagination", "generally" count as a rally, and
+"Jessie vs Sergey" answer for whichever hero came first in the file.
+
+EntityIndex is built once per reference data set from hero names plus
+common nicknames and misspellings, hero gear and chief gear slots, troop
+types, event names and game modes. All surface forms are compiled into a
+single trie-shaped regex (see question_router.literal_trie), anchored
+at word starts and required to end on a word boundary (an optional plural
+"s"/"es" is allowed), so one linear scan of the question returns every
+mention with its offsets. Longer forms win over their prefixes at the
+same position, and mentions never overlap.
+
+Event abbreviations of up to three letters ("AM", "AC", "Lab") collide
+with ordinary words, so they only count when written as an abbreviation:
+with a capital letter after the first ("AM", "HoC", "LAB"), never as
+"am" or "Lab".
+"""
+
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from common.cache_invalidation import register_invalidation_hook
+
+from .question_router import literal_trie
+
+# Nicknames and common misspellings -> canonical hero name. Only heroes
+# present in the reference data are indexed.
+HERO_ALIASES = {
+    "Jeronimo": ["jero", "geronimo"],
+    "Natalia": ["nat", "natalie"],
+    "Seo-yoon": ["seo yoon", "seoyoon", "seo-yun"],
+    "Ling Xue": ["lingxue", "ling-xue"],
+    "Lumak Bokan": ["lumak", "bokan"],
+    "Wu Ming": ["wuming", "wu-ming"],
+    "Sergey": ["sergei", "sergy"],
+    "Jessie": ["jesse", "jessy"],
+    "Zinman": ["zinnman"],
+    "Bahiti": ["bahati"],
+    "Renee": ["renée"],
+    "Hendrik": ["hendrick"],
+    "Blanchette": ["blanchet"],
+    "Eleonora": ["eleanora", "elenora"],
+    "Vulcanus": ["vulcan"],
+    "Gisela": ["gisella"],
+    "Ligeia": ["ligea"],
+}
+
+HERO_GEAR_PIECES = ["ring", "amulet", "gloves", "boots", "helmet", "armor"]
+
+TROOP_TYPES = {
+    "infantry": "Infantry",
+    "lancer": "Lancer",
+    "marksman": "Marksman",
+    "marksmen": "Marksman",
+}
+
+# Question wording -> game mode (the lineup modes the advisor knows)
+GAME_MODE_NAMES = [
+    ("bear trap", "bear_trap"),
+    ("crazy joe", "crazy_joe"),
+    ("garrison", "garrison"),
+    ("rally", "rally"),
+    ("svs", "svs"),
+    ("exploration", "exploration"),
+    ("pve", "exploration"),
+]
+
+# Event short names this long or shorter must be written as abbreviations
+ABBREVIATION_MAX_LEN = 3
+
+# Mentions start at a word and end at one, after an optional plural suffix
+_WORD_START = r"(?<![a-z0-9])"
+_WORD_END = r"(?:e?s)?(?![a-z0-9])"
+
+
+@dataclass
+class EntityMatch:
+    """One entity mentioned in a question."""
+    kind: str  # "hero", "gear_piece", "chief_gear", "troop_type", "event", "game_mode"
+    value: str  # canonical name, e.g. "Jeronimo", "Coat", "bear_trap"
+    start: int
+    end: int
+    text: str  # the question text that matched
+
+
+class EntityIndex:
+    """Surface forms of every entity compiled into one word-bounded scanner."""
+
+    def __init__(self, entries: Iterable[Tuple]):
+        """
+        Args:
+            entries: (surface form, kind, canonical value) triples; a form
+                may name several entities (e.g. "bear trap" is both an
+                event and a game mode). A fourth element, True, marks an
+                abbreviation that only matches when written as one.
+        """
+        self._entities: Dict[str, Dict[Tuple[str, str], bool]] = {}
+        for form, kind, value, *flags in entries:
+            form = form.lower().strip()
+            if not form:
+                continue
+            abbreviation = bool(flags and flags[0])
+            entities = self._entities.setdefault(form, {})
+            # A plain entry for the same entity lifts the restriction
+            entities[(kind, value)] = entities.get((kind, value), True) and abbreviation
+        self._scanner = re.compile(
+            _WORD_START + "(?=(" + literal_trie(self._entities) + ")" + _WORD_END + ")"
+        ) if self._entities else None
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    def find(self, text: str) -> List[EntityMatch]:
+        """Every entity mentioned in text, in order of appearance."""
+        if self._scanner is None:
+            return []
+        lowered = text.lower()
+        matches = []
+        end = 0
+        for m in self._scanner.finditer(lowered):
+            start = m.start(1)
+            if start < end:
+                continue  # inside a longer mention ("wu ming" then "ming")
+            form = m.group(1)
+            written = text[start:m.end(1)]
+            found = [
+                (kind, value) for (kind, value), abbreviation in self._entities[form].items()
+                if not abbreviation or _is_abbreviation(written)
+            ]
+            if not found:
+                continue
+            end = m.end(1)
+            for kind, value in found:
+                matches.append(EntityMatch(kind, value, start, end, written))
+        return matches
+
+    def values(self, text: str, kind: str) -> List[str]:
+        """Distinct entities of one kind in order of first mention."""
+        seen = []
+        for m in self.find(text):
+            if m.kind == kind and m.value not in seen:
+                seen.append(m.value)
+        return seen
+
+
+def _is_abbreviation(written: str) -> bool:
+    """True for "AM", "HoC" or "LAB"; False for "am" or "Lab"."""
+    return any(c.isupper() for c in written[1:])
+
+
+def _reference_entries(store, data_dir: Optional[str]) -> Iterable[Tuple[str, str, str]]:
+    from common.reference_data import load_json
+
+    for hero in store.heroes:
+        name = hero.get("name")
+        if not name:
+            continue
+        yield name, "hero", name
+        if "-" in name:
+            yield name.replace("-", " "), "hero", name
+        for alias in HERO_ALIASES.get(name, ()):
+            yield alias, "hero", name
+
+    for piece in HERO_GEAR_PIECES:
+        yield piece, "gear_piece", piece.title()
+
+    chief_gear = load_json("chief_gear.json", default={}, data_dir=data_dir)
+    for piece in chief_gear.get("slots", {}).get("pieces", []):
+        slot = piece.get("slot")
+        if slot:
+            yield slot, "chief_gear", slot.title()
+
+    for form, troop_type in TROOP_TYPES.items():
+        yield form, "troop_type", troop_type
+
+    events = load_json("events.json", default={}, data_dir=data_dir).get("events", {})
+    for event_id, event in events.items():
+        yield event_id.replace("_", " "), "event", event_id
+        for key in ("name", "short_name"):
+            label = event.get(key)
+            if label:
+                short = key == "short_name" and len(label.strip()) <= ABBREVIATION_MAX_LEN
+                yield label, "event", event_id, short
+                # "State vs State (SvS)" -> "State vs State"
+                if "(" in label:
+                    yield label.split("(")[0], "event", event_id
+
+    for text, mode in GAME_MODE_NAMES:
+        yield text, "game_mode", mode
+
+
+_indexes: Dict[int, Tuple[object, EntityIndex]] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_entity_index(store=None, data_dir: str = None) -> EntityIndex:
+    """The shared index for a reference data store, built on first use.
+
+    Args:
+        store: ReferenceDataStore (the shared store for data_dir if omitted)
+        data_dir: Data directory for events.json and chief_gear.json
+
+    A reloaded store (new reference data) gets a fresh index.
+    """
+    if store is None:
+        from common.reference_store import get_reference_store
+        store = get_reference_store(data_dir)
+    cached = _indexes.get(id(store))
+    if cached is not None and cached[0] is store:
+        return cached[1]
+    with _indexes_lock:
+        cached = _indexes.get(id(store))
+        if cached is None or cached[0] is not store:
+            cached = (store, EntityIndex(_reference_entries(store, data_dir)))
+            _indexes[id(store)] = cached
+        return cached[1]
+
+
+def reset_entity_indexes() -> None:
+    """Drop all indexes; the next lookup rebuilds from current data."""
+    with _indexes_lock:
+        _indexes.clear()
+
+
+register_invalidation_hook(reset_entity_indexes)
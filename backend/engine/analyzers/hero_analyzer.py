@@ -56,15 +56,17 @@ JOINER_HEROES = {
 class HeroAnalyzer:
     """Analyze heroes and generate upgrade recommendations."""
 
-    def __init__(self, heroes_data: dict):
+    def __init__(self, heroes_data):
         """
         Initialize with static hero data.
 
         Args:
-            heroes_data: Hero data from heroes.json
+            heroes_data: ReferenceDataStore, or hero data from heroes.json
         """
-        self.heroes_data = heroes_data
-        self.hero_lookup = {h['name']: h for h in heroes_data.get('heroes', [])}
+        from common.reference_store import ReferenceDataStore
+        self.reference = ReferenceDataStore.of(heroes_data)
+        self.heroes_data = self.reference.heroes_data
+        self.hero_lookup = self.reference.by_name
 
     def get_current_generation(self, server_age_days: int) -> int:
         """Determine current generation based on server age."""
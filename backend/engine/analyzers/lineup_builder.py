@@ -3,94 +3,28 @@ Lineup Builder - Recommends optimal lineups based on owned heroes.
 Considers game mode, hero levels, skills, gear, and user priorities.
 """
 
-import json
-from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass, field
 
-
-# Cache for hero metadata loaded from heroes.json
-_HERO_METADATA_CACHE = None
+from .lineup_solver import solve_assignment, solve_matching, solve_top_k
+from .request_classifier import QUESTION_ROUTER
 
 
 def load_hero_metadata() -> Dict[str, Dict[str, Any]]:
     """
-    Load hero metadata from heroes.json, falling back to DynamoDB.
+    Load hero metadata from the shared reference store.
 
     This is the single source of truth for hero data.
     Returns dict mapping hero_name -> {class, gen, tier, role}
     """
-    global _HERO_METADATA_CACHE
-
-    if _HERO_METADATA_CACHE is not None:
-        return _HERO_METADATA_CACHE
-
-    # Find heroes.json relative to this file
-    current_file = Path(__file__)
-    project_root = current_file.parent.parent.parent
-    heroes_file = project_root / "data" / "heroes.json"
-
-    metadata = {}
-    heroes_list = []
-
-    try:
-        with open(heroes_file, encoding='utf-8') as f:
-            data = json.load(f)
-        heroes_list = data.get('heroes', [])
-    except FileNotFoundError:
-        # Lambda doesn't have heroes.json - fall back to DynamoDB
-        try:
-            from common.hero_repo import get_all_reference_heroes_from_db
-            heroes_list = get_all_reference_heroes_from_db()
-        except Exception:
-            pass
-
-    for hero in heroes_list:
-        name = hero.get('name', '')
-        if name:
-            # Read pre-tagged effects keyed by skill number
-            expedition_effects = {}
-            exploration_effects = {}
-            for i in range(1, 4):
-                exp_effs = hero.get(f'expedition_skill_{i}_effects', [])
-                if exp_effs:
-                    expedition_effects[i] = exp_effs
-                expl_effs = hero.get(f'exploration_skill_{i}_effects', [])
-                if expl_effs:
-                    exploration_effects[i] = expl_effs
-
-            metadata[name] = {
-                'class': hero.get('hero_class', 'Unknown'),
-                'gen': hero.get('generation', 1),
-                'tier': hero.get('tier_overall', 'C'),
-                'tier_expedition': hero.get('tier_expedition', 'C'),
-                'tier_exploration': hero.get('tier_exploration', 'C'),
-                'role': hero.get('best_use', 'Unknown')[:30] if hero.get('best_use') else 'Unknown',
-                'rarity': hero.get('rarity', 'Rare'),
-                'image_filename': hero.get('image_filename'),
-                'expedition_effects': expedition_effects,
-                'exploration_effects': exploration_effects,
-            }
-
-    _HERO_METADATA_CACHE = metadata
-    return metadata
+    from common.reference_store import get_reference_store
+    return get_reference_store().all_metadata()
 
 
 def get_hero_metadata(hero_name: str) -> Dict[str, Any]:
     """Get metadata for a specific hero."""
-    metadata = load_hero_metadata()
-    return metadata.get(hero_name, {
-        'class': 'Unknown',
-        'gen': 99,
-        'tier': 'C',
-        'tier_expedition': 'C',
-        'tier_exploration': 'C',
-        'role': 'Unknown',
-        'rarity': 'Rare',
-        'image_filename': None,
-        'expedition_effects': [],
-        'exploration_effects': [],
-    })
+    from common.reference_store import get_reference_store
+    return get_reference_store().metadata(hero_name)
 
 
 @dataclass
@@ -102,6 +36,7 @@ class LineupRecommendation:
     notes: str
     confidence: str  # "high", "medium", "low" based on hero availability
     recommended_to_get: List[Dict[str, Any]] = field(default_factory=list)  # Heroes user should get
+    total_power: int = 0  # Sum of slot scores the lineup was chosen on
 
 
 # Hero tier values for ranking (S+ = 6, S = 5, ... D = 1)
@@ -292,21 +227,130 @@ def _get_skill_value(hero_data: dict, hero_stats: dict, mode: str) -> int:
     return int(total / SKILL_SCORE_SCALE)
 
 
-def calculate_hero_power(
-    hero_stats: dict,
-    hero_data: dict = None,
-    mode: str = None,
-    is_joiner_slot: bool = False,
-) -> int:
+def _skill_weights_signature() -> int:
+    """Fingerprint of every table _get_skill_value reads besides the hero."""
+    return hash((
+        repr(sorted((m, sorted(w.items())) for m, w in MODE_SKILL_WEIGHTS.items())),
+        repr(sorted((m, sorted(r.items())) for m, r in MODE_TROOP_RATIOS.items())),
+        tuple(sorted(UTILITY_EFFECTS)),
+        tuple(sorted(PVE_MODES)),
+        SKILL_SCORE_SCALE,
+    ))
+
+
+class SkillCoefficientTable:
     """
-    Calculate a hero's effective power for a specific game mode.
+    Skill effects compiled into one coefficient per (hero, mode, skill slot).
 
-    Mode-aware scoring:
-    - PvE modes use exploration skills and tier_exploration
-    - PvP modes use expedition skills and tier_expedition
-    - Joiner specialists (Jessie/Sergey) use tier_overall in non-joiner slots
-    - Exclusive gear skill provides a significant bonus for mythic heroes
+    _get_skill_value() walks every effect tag and looks up the mode weight,
+    troop ratio and utility filter on each call. All of that depends only on
+    the hero and mode, so it is folded in once here:
+
+        coefficient[skill] = sum(weight * max_value * effective_pct/100 * target_mult)
+        skill score        = int(sum(coefficient[n] * level[n] / 5) / SKILL_SCORE_SCALE)
+
+    The per-effect terms are kept for breakdown() so a score can be traced
+    back to the tags that produced it. Rebuild when heroes.json effects or
+    the weight tables change (see LineupBuilder.skill_table).
     """
+
+    SKILL_SLOTS = (1, 2, 3)
+
+    def __init__(self, reference):
+        self.reference = reference
+        self.signature = _skill_weights_signature()
+        self.coefficients: Dict[str, Dict[str, Tuple[float, float, float]]] = {}
+        self.terms: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+
+        for hero in reference.heroes:
+            name = hero['name']
+            self.coefficients[name] = {}
+            self.terms[name] = {}
+            for mode in MODE_SKILL_WEIGHTS:
+                coefs, terms = self._compile(hero, mode)
+                self.coefficients[name][mode] = coefs
+                self.terms[name][mode] = terms
+
+    @staticmethod
+    def _compile(hero_data: dict, mode: str) -> Tuple[Tuple[float, float, float], List[Dict[str, Any]]]:
+        weights = MODE_SKILL_WEIGHTS.get(mode, {})
+        troop_ratios = MODE_TROOP_RATIOS.get(mode, {})
+        skill_prefix = 'exploration_skill' if mode in PVE_MODES else 'expedition_skill'
+
+        coefs = [0.0, 0.0, 0.0]
+        terms = []
+        for skill_num in SkillCoefficientTable.SKILL_SLOTS:
+            for effect in hero_data.get(f'{skill_prefix}_{skill_num}_effects') or []:
+                eff_type = effect.get('type', '')
+                if eff_type in UTILITY_EFFECTS:
+                    continue
+
+                max_val = effect.get('max_value', 0)
+                eff_pct = effect.get('effective_pct', 100)
+                target = effect.get('target', 'all')
+                if target in ('all', 'enemy'):
+                    target_mult = 1.0
+                elif target in troop_ratios:
+                    target_mult = troop_ratios[target]
+                else:
+                    target_mult = 0.33
+
+                weight = weights.get(eff_type, 0)
+                coefficient = weight * max_val * (eff_pct / 100) * target_mult
+                coefs[skill_num - 1] += coefficient
+                terms.append({
+                    'skill': skill_num,
+                    'type': eff_type,
+                    'target': target,
+                    'max_value': max_val,
+                    'effective_pct': eff_pct,
+                    'weight': weight,
+                    'target_mult': target_mult,
+                    'coefficient': round(coefficient, 4),
+                })
+        return tuple(coefs), terms
+
+    def __contains__(self, hero_name: str) -> bool:
+        return hero_name in self.coefficients
+
+    def is_current(self, reference) -> bool:
+        """True if built from this store with the current weight tables."""
+        return reference is self.reference and self.signature == _skill_weights_signature()
+
+    @staticmethod
+    def skill_levels(hero_stats: Optional[dict], mode: str) -> Tuple[int, int, int]:
+        """User's skill levels for a mode (all 5 if no stats — general guide mode)."""
+        if not hero_stats:
+            return (5, 5, 5)
+        skill_prefix = 'exploration_skill' if mode in PVE_MODES else 'expedition_skill'
+        return tuple(hero_stats.get(f'{skill_prefix}_{n}', 1) for n in SkillCoefficientTable.SKILL_SLOTS)
+
+    def skill_value(self, hero_name: str, hero_stats: Optional[dict], mode: str) -> int:
+        """Compiled equivalent of _get_skill_value() for a known hero."""
+        coefs = self.coefficients.get(hero_name, {}).get(mode)
+        if not coefs:
+            return 0
+        levels = self.skill_levels(hero_stats, mode)
+        total = coefs[0] * (levels[0] / 5) + coefs[1] * (levels[1] / 5) + coefs[2] * (levels[2] / 5)
+        return int(total / SKILL_SCORE_SCALE)
+
+    def breakdown(self, hero_name: str, mode: str, hero_stats: Optional[dict] = None) -> Dict[str, Any]:
+        """How a hero's skill score for a mode is put together."""
+        coefs = self.coefficients.get(hero_name, {}).get(mode, (0.0, 0.0, 0.0))
+        levels = self.skill_levels(hero_stats, mode)
+        return {
+            'hero': hero_name,
+            'mode': mode,
+            'skill_levels': list(levels),
+            'coefficients': [round(c, 4) for c in coefs],
+            'terms': self.terms.get(hero_name, {}).get(mode, []),
+            'scale': SKILL_SCORE_SCALE,
+            'skill_score': self.skill_value(hero_name, hero_stats, mode),
+        }
+
+
+def _stat_score(hero_stats: dict) -> int:
+    """Mode-independent part of a hero's power: level, stars, gear, exclusive gear."""
     score = 0
 
     # Level contributes most (0-80 range)
@@ -342,6 +386,19 @@ def calculate_hero_power(
         mythic_level = hero_stats.get('mythic_gear_level', 0)
         score += mythic_level // 5  # 0-20 points
 
+    return score
+
+
+def _mode_score(
+    hero_stats: dict,
+    hero_data: dict,
+    mode: str,
+    is_joiner_slot: bool,
+    skills: Optional[SkillCoefficientTable] = None,
+) -> int:
+    """Mode-dependent part of a hero's power: tier, joiner penalty, skill effects."""
+    score = 0
+
     # Tier bonus - mode-aware
     if hero_data:
         hero_name = hero_data.get('name', '')
@@ -368,11 +425,92 @@ def calculate_hero_power(
     # Evaluates what each hero's skills actually DO and weights them by
     # what matters for winning in this specific mode.
     # Auto-detected from skill descriptions, works for future heroes too.
-    score += _get_skill_value(hero_data, hero_stats, mode)
+    hero_name = hero_data.get('name') if hero_data else None
+    if skills is not None and hero_name in skills:
+        score += skills.skill_value(hero_name, hero_stats, mode)
+    else:
+        score += _get_skill_value(hero_data, hero_stats, mode)
 
     return score
 
 
+def calculate_hero_power(
+    hero_stats: dict,
+    hero_data: dict = None,
+    mode: str = None,
+    is_joiner_slot: bool = False,
+) -> int:
+    """
+    Calculate a hero's effective power for a specific game mode.
+
+    Mode-aware scoring:
+    - PvE modes use exploration skills and tier_exploration
+    - PvP modes use expedition skills and tier_expedition
+    - Joiner specialists (Jessie/Sergey) use tier_overall in non-joiner slots
+    - Exclusive gear skill provides a significant bonus for mythic heroes
+    """
+    return _stat_score(hero_stats) + _mode_score(hero_stats, hero_data, mode, is_joiner_slot)
+
+
+class HeroScoreMatrix:
+    """
+    Owned heroes x game modes power matrix, computed once per roster.
+
+    Rows are owned heroes (in roster order), columns are modes. The
+    mode-independent stat score is computed once per hero and the
+    mode-dependent part once per (hero, mode), so slot filling and
+    build-all only index into precomputed columns instead of rescoring
+    each hero for every slot of every template.
+    """
+
+    def __init__(
+        self,
+        user_heroes: dict,
+        reference,
+        modes: List[str],
+        skills: Optional[SkillCoefficientTable] = None,
+    ):
+        self.heroes = list(user_heroes)
+        self.index = {name: i for i, name in enumerate(self.heroes)}
+        self.modes = list(dict.fromkeys(modes))
+
+        metadata = [reference.metadata(name) for name in self.heroes]
+        self.classes = [m.get('class') for m in metadata]
+        self.gens = [m.get('gen', 99) for m in metadata]
+
+        # Row indices per class, preserving roster order for tie-breaking
+        self.rows_by_class: Dict[str, List[int]] = {}
+        for i, hero_class in enumerate(self.classes):
+            self.rows_by_class.setdefault(hero_class, []).append(i)
+
+        stats = [user_heroes[name] for name in self.heroes]
+        data = [reference.get(name) for name in self.heroes]
+        base = [_stat_score(s) for s in stats]
+
+        self.columns: Dict[str, List[int]] = {}
+        for mode in self.modes:
+            is_joiner = mode in JOINER_MODES
+            self.columns[mode] = [
+                b + _mode_score(s, d, mode, is_joiner, skills)
+                for b, s, d in zip(base, stats, data)
+            ]
+
+    def rows(self, hero_names: Optional[List[str]]) -> set:
+        """Row indices for the given owned heroes (unknown names are ignored)."""
+        return {self.index[name] for name in hero_names or () if name in self.index}
+
+    def score(self, hero_name: str, mode: str) -> int:
+        """Base power of an owned hero in a mode (before slot bonuses)."""
+        return self.columns[mode][self.index[hero_name]]
+
+    def candidates(self, hero_class: str, max_generation: int = 99) -> List[int]:
+        """Row indices of owned heroes of a class up to a generation."""
+        return [
+            i for i in self.rows_by_class.get(hero_class, [])
+            if self.gens[i] <= max_generation
+        ]
+
+
 # HERO_METADATA is now loaded dynamically from heroes.json via load_hero_metadata()
 # This ensures we always use the source of truth for hero data
 
@@ -831,21 +969,95 @@ IDEAL_LINEUPS = {
 class LineupBuilder:
     """Build optimal lineups from user's available heroes."""
 
-    def __init__(self, heroes_data: dict = None):
+    def __init__(self, heroes_data=None):
         """
         Initialize with static hero data.
 
         Args:
-            heroes_data: Hero data from heroes.json (optional, loaded automatically if not provided)
+            heroes_data: ReferenceDataStore, or hero data from heroes.json
+                (optional, the shared store is used if not provided)
+        """
+        from common.reference_store import ReferenceDataStore, get_reference_store
+        self.reference = (
+            ReferenceDataStore.of(heroes_data) if heroes_data is not None else get_reference_store()
+        )
+        self.heroes_data = self.reference.heroes_data
+        self.hero_lookup = self.reference.by_name
+        self._skill_table = SkillCoefficientTable(self.reference)
+
+    @property
+    def skill_table(self) -> SkillCoefficientTable:
+        """Compiled skill coefficients, recompiled if the weight tables changed."""
+        if not self._skill_table.is_current(self.reference):
+            self._skill_table = SkillCoefficientTable(self.reference)
+        return self._skill_table
+
+    def build_score_matrix(self, user_heroes: dict, modes: List[str] = None) -> HeroScoreMatrix:
         """
-        self.heroes_data = heroes_data or {}
-        self.hero_lookup = {h['name']: h for h in self.heroes_data.get('heroes', [])}
+        Score every owned hero for every requested mode in one pass.
+
+        Args:
+            user_heroes: Dict of {hero_name: {level, stars, gear...}}
+            modes: Mode keys to score (defaults to all LINEUP_TEMPLATES)
+
+        Returns:
+            HeroScoreMatrix shared across slot filling for those modes
+        """
+        return HeroScoreMatrix(
+            user_heroes, self.reference, modes or list(LINEUP_TEMPLATES), self.skill_table
+        )
+
+    def _slot_candidates(
+        self,
+        slot: dict,
+        scores: HeroScoreMatrix,
+        mode_scores: List[int],
+        max_generation: int,
+    ) -> List[Tuple[int, int]]:
+        """
+        Eligible owned heroes for a template slot with their slot score.
+
+        Slot score is the hero's mode power plus the preferred-order bonus.
+        Returns (matrix row, score) pairs in roster order; filler slots and
+        heroes scoring below zero are never assigned.
+        """
+        preferred = slot.get("preferred", [])
+        if preferred == ["any"]:
+            return []
+
+        is_lead = slot.get("is_lead", False)
+        candidates = []
+        for row in scores.candidates(slot["class"], max_generation):
+            hero_name = scores.heroes[row]
+            power = mode_scores[row]
+
+            # Preferred-order bonus: curated lists encode mode-specific suitability.
+            # Joiner slots are special: the hero's specific joiner skill is the
+            # ONLY thing that matters (e.g., Jessie's Stand of Arms, Sergey's
+            # Defenders' Edge). Stats, level, gear are irrelevant — so the
+            # preferred bonus must massively outweigh any stat differences.
+            if hero_name in preferred:
+                idx = preferred.index(hero_name)
+                if slot.get("is_joiner"):
+                    # Joiner slot: preferred hero is THE answer, not just a tiebreaker.
+                    # +1000 ensures joiner heroes always beat non-joiner alternatives.
+                    power += max(1000 - idx * 100, 200)
+                elif is_lead:
+                    power += max(100 - idx * 10, 10)
+                else:
+                    power += max(75 - idx * 5, 5)
+
+            if power >= 0:
+                candidates.append((row, power))
+        return candidates
 
     def build_personalized_lineup(
         self,
         event_type: str,
         user_heroes: dict,
-        max_generation: int = 99
+        max_generation: int = 99,
+        scores: Optional[HeroScoreMatrix] = None,
+        exclude: Optional[List[str]] = None,
     ) -> LineupRecommendation:
         """
         Build lineup using ONLY the user's owned heroes, ranked by power.
@@ -854,27 +1066,171 @@ class LineupBuilder:
             event_type: Key from LINEUP_TEMPLATES
             user_heroes: Dict of {hero_name: {level, stars, gear...}}
             max_generation: Only consider heroes up to this generation
+            scores: Precomputed score matrix covering event_type (built
+                on demand if omitted; pass one in when building many modes)
+            exclude: Owned heroes to leave out (e.g. committed to another march)
 
         Returns:
             LineupRecommendation with user's best available heroes
         """
         template = LINEUP_TEMPLATES.get(event_type)
         if not template:
-            return LineupRecommendation(
-                game_mode=event_type,
-                heroes=[],
-                troop_ratio={"infantry": 33, "lancer": 33, "marksman": 34},
-                notes=f"Unknown event type: {event_type}",
-                confidence="low",
-                recommended_to_get=[]
+            return self._unknown_lineup(event_type)
+
+        if scores is None or event_type not in scores.columns:
+            scores = self.build_score_matrix(user_heroes, [event_type])
+        slot_candidates = self._all_slot_candidates(template, scores, event_type, max_generation)
+
+        # Pick the assignment that is best for the lineup as a whole
+        assignment, total = solve_assignment(slot_candidates, scores.rows(exclude))
+        return self._render_lineup(
+            event_type, template, user_heroes, max_generation,
+            scores, slot_candidates, assignment, total,
+        )
+
+    def build_lineup_alternatives(
+        self,
+        event_type: str,
+        user_heroes: dict,
+        top_k: int,
+        max_generation: int = 99,
+        scores: Optional[HeroScoreMatrix] = None,
+        exclude: Optional[List[str]] = None,
+    ) -> List[LineupRecommendation]:
+        """
+        Build the top_k best lineups that use different sets of heroes.
+
+        Args:
+            event_type: Key from LINEUP_TEMPLATES
+            user_heroes: Dict of {hero_name: {level, stars, gear...}}
+            top_k: Number of lineups to return (best first)
+            max_generation: Only consider heroes up to this generation
+            scores: Precomputed score matrix covering event_type
+            exclude: Owned heroes to leave out (e.g. committed to another march)
+
+        Returns:
+            Up to top_k LineupRecommendations; the first one is the same
+            lineup build_personalized_lineup returns
+        """
+        template = LINEUP_TEMPLATES.get(event_type)
+        if not template:
+            return [self._unknown_lineup(event_type)]
+
+        if scores is None or event_type not in scores.columns:
+            scores = self.build_score_matrix(user_heroes, [event_type])
+        slot_candidates = self._all_slot_candidates(template, scores, event_type, max_generation)
+
+        return [
+            self._render_lineup(
+                event_type, template, user_heroes, max_generation,
+                scores, slot_candidates, assignment, total,
+            )
+            for assignment, total in solve_top_k(slot_candidates, top_k, scores.rows(exclude))
+        ]
+
+    def allocate_marches(
+        self,
+        marches: List[Tuple[str, float]],
+        user_heroes: dict,
+        max_generation: int = 99,
+        exclude: Optional[List[str]] = None,
+    ) -> List[LineupRecommendation]:
+        """
+        Build lineups for several simultaneous marches without sharing heroes.
+
+        All slots of all marches are solved as one assignment, so a hero
+        goes to the march where it adds the most weighted score instead of
+        whichever march happened to be built first.
+
+        Args:
+            marches: (mode, weight) per march; a mode may repeat
+                (e.g. three rally_joiner_attack marches)
+            user_heroes: Dict of {hero_name: {level, stars, gear...}}
+            max_generation: Only consider heroes up to this generation
+            exclude: Owned heroes to leave out entirely
+
+        Returns:
+            One LineupRecommendation per march, in input order
+        """
+        modes = [mode for mode, _ in marches if mode in LINEUP_TEMPLATES]
+        scores = self.build_score_matrix(user_heroes, modes) if modes else None
+
+        per_march = []
+        weighted = []
+        for mode, weight in marches:
+            template = LINEUP_TEMPLATES.get(mode)
+            slot_candidates = (
+                self._all_slot_candidates(template, scores, mode, max_generation)
+                if template else []
+            )
+            per_march.append((mode, template, slot_candidates))
+            weighted.extend(
+                [(row, value * weight) for row, value in cands] for cands in slot_candidates
+            )
+
+        assignment, _ = solve_matching(weighted, scores.rows(exclude) if scores else None)
+
+        lineups = []
+        pos = 0
+        for mode, template, slot_candidates in per_march:
+            if not template:
+                lineups.append(self._unknown_lineup(mode))
+                continue
+            march_assignment = assignment[pos:pos + len(slot_candidates)]
+            pos += len(slot_candidates)
+            total = sum(
+                dict(cands)[row]
+                for cands, row in zip(slot_candidates, march_assignment)
+                if row is not None
             )
+            lineups.append(self._render_lineup(
+                mode, template, user_heroes, max_generation,
+                scores, slot_candidates, march_assignment, total,
+            ))
+        return lineups
+
+    @staticmethod
+    def _unknown_lineup(event_type: str) -> LineupRecommendation:
+        return LineupRecommendation(
+            game_mode=event_type,
+            heroes=[],
+            troop_ratio={"infantry": 33, "lancer": 33, "marksman": 34},
+            notes=f"Unknown event type: {event_type}",
+            confidence="low",
+            recommended_to_get=[]
+        )
 
+    def _all_slot_candidates(
+        self,
+        template: dict,
+        scores: HeroScoreMatrix,
+        event_type: str,
+        max_generation: int,
+    ) -> List[List[Tuple[int, int]]]:
+        """Score every eligible owned hero for every slot of a template."""
+        mode_scores = scores.columns[event_type]
+        return [
+            self._slot_candidates(slot, scores, mode_scores, max_generation)
+            for slot in template["slots"]
+        ]
+
+    def _render_lineup(
+        self,
+        event_type: str,
+        template: dict,
+        user_heroes: dict,
+        max_generation: int,
+        scores: HeroScoreMatrix,
+        slot_candidates: List[List[Tuple[int, int]]],
+        assignment: List[Optional[int]],
+        total_power: int,
+    ) -> LineupRecommendation:
+        """Turn a solved slot assignment into a LineupRecommendation."""
         lineup_heroes = []
-        used_heroes = set()
         missing_key_heroes = []
         slots_filled = 0
 
-        for slot in template["slots"]:
+        for slot, cands, row in zip(template["slots"], slot_candidates, assignment):
             slot_class = slot["class"]
             role = slot["role"]
             is_lead = slot.get("is_lead", False)
@@ -894,53 +1250,13 @@ class LineupBuilder:
                 })
                 continue
 
-            # Find best available hero for this slot from ALL user's heroes of the required class.
-            # Preferred lists provide a small bonus for lead slots to guide mode-specific
-            # choices (e.g., sustain heroes for garrison) without being a hard gate.
-            best_hero = None
-            best_score = -1
-
-            for hero_name, hero_stats in user_heroes.items():
-                if hero_name in used_heroes:
-                    continue
-                hero_meta = get_hero_metadata(hero_name)
-                if hero_meta.get("class") != slot_class:
-                    continue
-                if hero_meta.get("gen", 99) > max_generation:
-                    continue
-
-                hero_data = self.hero_lookup.get(hero_name)
-                power = calculate_hero_power(
-                    hero_stats, hero_data,
-                    mode=event_type,
-                    is_joiner_slot=(event_type in JOINER_MODES),
-                )
-
-                # Preferred-order bonus: curated lists encode mode-specific suitability.
-                # Joiner slots are special: the hero's specific joiner skill is the
-                # ONLY thing that matters (e.g., Jessie's Stand of Arms, Sergey's
-                # Defenders' Edge). Stats, level, gear are irrelevant — so the
-                # preferred bonus must massively outweigh any stat differences.
-                if hero_name in preferred:
-                    idx = preferred.index(hero_name)
-                    if slot.get("is_joiner"):
-                        # Joiner slot: preferred hero is THE answer, not just a tiebreaker.
-                        # +1000 ensures joiner heroes always beat non-joiner alternatives.
-                        power += max(1000 - idx * 100, 200)
-                    elif is_lead:
-                        power += max(100 - idx * 10, 10)
-                    else:
-                        power += max(75 - idx * 5, 5)
-
-                if power > best_score:
-                    best_score = power
-                    best_hero = hero_name
+            best_hero = scores.heroes[row] if row is not None else None
+            best_score = dict(cands).get(row, 0)
 
             if best_hero:
-                used_heroes.add(best_hero)
                 hero_stats = user_heroes[best_hero]
                 level = hero_stats.get('level', 1)
-                hero_meta = get_hero_metadata(best_hero)
+                hero_meta = self.reference.metadata(best_hero)
                 lineup_heroes.append({
                     "hero": best_hero,
                     "hero_class": hero_meta.get("class", slot_class),
@@ -967,7 +1283,7 @@ class LineupBuilder:
                 # Track missing key heroes
                 for hero in preferred[:2]:  # First 2 preferred are most important
                     if hero not in user_heroes:
-                        hero_meta = get_hero_metadata(hero)
+                        hero_meta = self.reference.metadata(hero)
                         if hero_meta.get("gen", 99) <= max_generation:
                             missing_key_heroes.append({
                                 "hero": hero,
@@ -980,7 +1296,7 @@ class LineupBuilder:
         recommended_to_get = []
         for key_hero in template.get("key_heroes", []):
             if key_hero not in user_heroes:
-                hero_meta = get_hero_metadata(key_hero)
+                hero_meta = self.reference.metadata(key_hero)
                 if hero_meta.get("gen", 99) <= max_generation:
                     recommended_to_get.append({
                         "hero": key_hero,
@@ -1030,9 +1346,7 @@ class LineupBuilder:
                 # Check if any sustain hero is within 20% power of the lead
                 for sustain_name, sustain_desc in sustain_heroes.items():
                     if sustain_name in user_heroes and sustain_name not in hero_names_in_lineup:
-                        sustain_stats = user_heroes[sustain_name]
-                        sustain_data = self.hero_lookup.get(sustain_name)
-                        sustain_power = calculate_hero_power(sustain_stats, sustain_data, mode=event_type)
+                        sustain_power = scores.score(sustain_name, event_type)
                         if sustain_power > 0 and lead_power > 0:
                             power_ratio = sustain_power / lead_power
                             if power_ratio >= 0.8:  # Within 20% power
@@ -1045,7 +1359,8 @@ class LineupBuilder:
             troop_ratio=template["troop_ratio"],
             notes=notes,
             confidence=confidence,
-            recommended_to_get=recommended_to_get[:4]  # Limit to 4 suggestions
+            recommended_to_get=recommended_to_get[:4],  # Limit to 4 suggestions
+            total_power=total_power,
         )
 
     def build_general_lineup(self, event_type: str, max_generation: int = 8) -> LineupRecommendation:
@@ -1096,14 +1411,14 @@ class LineupBuilder:
             for hero_name in preferred:
                 if hero_name in used_heroes:
                     continue
-                hero_meta = get_hero_metadata(hero_name)
+                hero_meta = self.reference.metadata(hero_name)
                 if hero_meta.get("gen", 99) <= max_generation:
                     selected_hero = hero_name
                     break
 
             if selected_hero:
                 used_heroes.add(selected_hero)
-                hero_meta = get_hero_metadata(selected_hero)
+                hero_meta = self.reference.metadata(selected_hero)
                 lineup_heroes.append({
                     "hero": selected_hero,
                     "hero_class": hero_meta.get("class", slot_class),
@@ -1317,30 +1632,8 @@ class LineupBuilder:
         Returns:
             LineupRecommendation if question matches a mode, None otherwise
         """
-        question_lower = question.lower()
-
-        # Map question patterns to modes
-        mode_patterns = {
-            "bear trap": "bear_trap",
-            "crazy joe": "crazy_joe",
-            "garrison": "garrison",
-            "defense": "garrison",
-            "reinforce": "rally_joiner_defense",
-            "join.*attack": "rally_joiner_attack",
-            "join.*rally": "rally_joiner_attack",
-            "rally leader": "rally_leader_infantry",
-            "lead.*rally": "rally_leader_infantry",
-            "marksman": "rally_leader_marksman",
-            "exploration": "exploration",
-            "pve": "exploration",
-            "frozen": "exploration",
-            "svs": "svs_march",
-            "field": "svs_march"
-        }
-
-        import re
-        for pattern, mode in mode_patterns.items():
-            if re.search(pattern, question_lower):
-                return self.build_lineup(mode, user_heroes)
+        match = QUESTION_ROUTER.first(question, "mode")
+        if match:
+            return self.build_lineup(match.route.category, user_heroes)
 
         return None
@@ -0,0 +1,314 @@
+"""
+Lineup Solver - exact slot assignment for lineup templates.
+
+Filling slots one at a time with the best unused hero can lock a strong
+hero into an early slot where a later slot needed it more (e.g. the two
+Infantry slots in arena with different preferred lists). The solver picks
+the assignment that fills the most slots and, among those, maximizes the
+total slot score.
+
+Slots only compete when their candidate sets overlap, so the problem is
+split into independent groups first; templates with one slot per class
+reduce to picking each slot's maximum. Each group is solved by depth-first
+branch-and-bound, bounded by the sum of per-slot maxima over unused heroes.
+Candidates are tried best-first in roster order, so the first complete
+assignment found is the greedy one and ties keep the greedy result.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# (row index into the score matrix, slot score)
+Candidate = Tuple[int, int]
+
+
+def _sorted_candidates(slot_candidates: Sequence[Sequence[Candidate]]) -> List[List[Candidate]]:
+    """Best-first candidate lists; sort is stable so roster order breaks ties."""
+    return [sorted(cands, key=lambda c: -c[1]) for cands in slot_candidates]
+
+
+def _slot_groups(candidates: List[List[Candidate]]) -> List[List[int]]:
+    """Partition slots into groups that share at least one candidate hero."""
+    parent = list(range(len(candidates)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    owner: Dict[int, int] = {}
+    for slot, cands in enumerate(candidates):
+        for row, _ in cands:
+            if row in owner:
+                parent[find(slot)] = find(owner[row])
+            else:
+                owner[row] = slot
+
+    groups: Dict[int, List[int]] = {}
+    for slot in range(len(candidates)):
+        groups.setdefault(find(slot), []).append(slot)
+    return list(groups.values())
+
+
+def _best_unused(cands: List[Candidate], used: set) -> Optional[Candidate]:
+    for cand in cands:
+        if cand[0] not in used:
+            return cand
+    return None
+
+
+def _solve_group(
+    slots: List[int],
+    candidates: List[List[Candidate]],
+) -> Tuple[Tuple[int, int], Dict[int, Optional[int]]]:
+    """Branch-and-bound over one group. Objective is (slots filled, total score)."""
+    n = len(slots)
+    used: set = set()
+    chosen: List[Optional[int]] = [None] * n
+    best_value = (-1, 0)
+    best_choice: List[Optional[int]] = [None] * n
+
+    def upper_bound(depth: int, filled: int, score: int) -> Tuple[int, int]:
+        for slot in slots[depth:]:
+            cand = _best_unused(candidates[slot], used)
+            if cand is not None:
+                filled += 1
+                score += cand[1]
+        return filled, score
+
+    def search(depth: int, filled: int, score: int) -> None:
+        nonlocal best_value, best_choice
+        if depth == n:
+            if (filled, score) > best_value:
+                best_value = (filled, score)
+                best_choice = list(chosen)
+            return
+        if upper_bound(depth, filled, score) <= best_value:
+            return
+
+        for row, value in candidates[slots[depth]]:
+            if row in used:
+                continue
+            used.add(row)
+            chosen[depth] = row
+            search(depth + 1, filled + 1, score + value)
+            used.discard(row)
+        # Leaving the slot empty can free a hero for a slot that values it more
+        chosen[depth] = None
+        search(depth + 1, filled, score)
+
+    search(0, 0, 0)
+    return best_value, dict(zip(slots, best_choice))
+
+
+def solve_assignment(
+    slot_candidates: Sequence[Sequence[Candidate]],
+    exclude: Optional[set] = None,
+) -> Tuple[List[Optional[int]], int]:
+    """
+    Assign at most one hero to each slot, each hero to at most one slot.
+
+    Args:
+        slot_candidates: Per slot, eligible (row, score) pairs in roster order
+        exclude: Rows that may not be used
+
+    Returns:
+        (row chosen per slot or None, total score of the assignment)
+    """
+    candidates = _sorted_candidates(slot_candidates)
+    if exclude:
+        candidates = [[c for c in cands if c[0] not in exclude] for cands in candidates]
+
+    assignment: List[Optional[int]] = [None] * len(candidates)
+    total = 0
+    for group in _slot_groups(candidates):
+        if len(group) == 1:
+            slot = group[0]
+            if candidates[slot]:
+                row, value = candidates[slot][0]
+                assignment[slot] = row
+                total += value
+            continue
+        (_, score), choice = _solve_group(group, candidates)
+        for slot, row in choice.items():
+            assignment[slot] = row
+        total += score
+    return assignment, total
+
+
+def solve_top_k(
+    slot_candidates: Sequence[Sequence[Candidate]],
+    k: int,
+    exclude: Optional[set] = None,
+) -> List[Tuple[List[Optional[int]], int]]:
+    """
+    Enumerate the K best assignments that use distinct sets of heroes.
+
+    Depth-first branch-and-bound over all slots: a branch is pruned once
+    its per-slot-maxima bound cannot beat the current K-th best. Two
+    assignments that only swap heroes between slots count as the same
+    lineup; the better arrangement is kept.
+
+    Args:
+        slot_candidates: Per slot, eligible (row, score) pairs in roster order
+        k: Number of lineups to return
+        exclude: Rows that may not be used
+
+    Returns:
+        Up to k (row chosen per slot or None, total score) pairs, best first
+    """
+    candidates = _sorted_candidates(slot_candidates)
+    if exclude:
+        candidates = [[c for c in cands if c[0] not in exclude] for cands in candidates]
+
+    n = len(candidates)
+    used: set = set()
+    chosen: List[Optional[int]] = [None] * n
+    # hero set -> (objective, discovery order, assignment)
+    found: Dict[frozenset, Tuple[Tuple[int, int], int, List[Optional[int]]]] = {}
+    order = 0
+    # Objective of the current K-th best lineup; recomputed only on insert
+    threshold = (-1, -1)
+
+    def upper_bound(depth: int, filled: int, score: int) -> Tuple[int, int]:
+        for cands in candidates[depth:]:
+            cand = _best_unused(cands, used)
+            if cand is not None:
+                filled += 1
+                score += cand[1]
+        return filled, score
+
+    def search(depth: int, filled: int, score: int) -> None:
+        nonlocal order, threshold
+        if depth == n:
+            key = frozenset(r for r in chosen if r is not None)
+            value = (filled, score)
+            if key not in found or value > found[key][0]:
+                found[key] = (value, order, list(chosen))
+                order += 1
+                if len(found) >= k:
+                    threshold = sorted((v[0] for v in found.values()), reverse=True)[k - 1]
+            return
+        if upper_bound(depth, filled, score) <= threshold:
+            return
+
+        for row, value in candidates[depth]:
+            if row in used:
+                continue
+            used.add(row)
+            chosen[depth] = row
+            search(depth + 1, filled + 1, score + value)
+            used.discard(row)
+        chosen[depth] = None
+        search(depth + 1, filled, score)
+
+    if k > 0:
+        search(0, 0, 0)
+    ranked = sorted(found.values(), key=lambda v: (-v[0][0], -v[0][1], v[1]))
+    return [(assignment, value[1]) for value, _, assignment in ranked[:k]]
+
+
+def _hungarian(cost: List[List[float]]) -> List[int]:
+    """Min-cost assignment of every row to a distinct column (rows <= columns).
+
+    Classic O(rows^2 * columns) shortest augmenting path formulation.
+
+    Returns:
+        Column index assigned to each row
+    """
+    n, m = len(cost), len(cost[0])
+    inf = float("inf")
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    match = [0] * (m + 1)  # column -> row (1-based, 0 = free)
+    way = [0] * (m + 1)
+
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            row = cost[i0 - 1]
+            delta = inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+
+    result = [0] * n
+    for j in range(1, m + 1):
+        if match[j]:
+            result[match[j] - 1] = j - 1
+    return result
+
+
+def solve_matching(
+    slot_candidates: Sequence[Sequence[Tuple[int, float]]],
+    exclude: Optional[set] = None,
+) -> Tuple[List[Optional[int]], float]:
+    """
+    Exact assignment for many slots at once (e.g. several marches).
+
+    Same objective as solve_assignment (most slots filled, then highest
+    total score) but solved per group as a weighted bipartite matching with
+    the Hungarian algorithm, which stays polynomial when a group has many
+    slots. Scores may be floats (weighted marches).
+
+    Args:
+        slot_candidates: Per slot, eligible (row, score) pairs
+        exclude: Rows that may not be used
+
+    Returns:
+        (row chosen per slot or None, total score of the assignment)
+    """
+    candidates = [
+        [c for c in cands if not exclude or c[0] not in exclude]
+        for cands in slot_candidates
+    ]
+
+    assignment: List[Optional[int]] = [None] * len(candidates)
+    total = 0.0
+    for group in _slot_groups(candidates):
+        rows = sorted({row for slot in group for row, _ in candidates[slot]})
+        if not rows:
+            continue
+        column = {row: j for j, row in enumerate(rows)}
+        # Filling a slot must outweigh any score difference, so every
+        # eligible pairing earns `fill` on top of its score. One dummy
+        # column per slot (cost 0) means "leave empty"; ineligible pairings
+        # cost more than that and are never chosen.
+        fill = sum(value for slot in group for _, value in candidates[slot]) + 1
+        cost = []
+        for slot in group:
+            row_cost = [fill] * len(rows) + [0.0] * len(group)
+            for row, value in candidates[slot]:
+                row_cost[column[row]] = -(fill + value)
+            cost.append(row_cost)
+
+        for slot, j in zip(group, _hungarian(cost)):
+            if j < len(rows) and rows[j] in dict(candidates[slot]):
+                assignment[slot] = rows[j]
+                total += dict(candidates[slot])[rows[j]]
+    return assignment, total
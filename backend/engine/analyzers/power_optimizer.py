@@ -3,7 +3,6 @@ Power Optimizer - Analyzes upgrade paths and calculates power efficiency.
 Uses collected game data to provide power-backed upgrade recommendations.
 """
 
-import json
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass, field
 from pathlib import Path
@@ -74,11 +73,8 @@ class PowerOptimizer:
 
     def _load_json(self, filename: str) -> dict:
         """Load a JSON data file."""
-        filepath = self.data_path / filename
-        if filepath.exists():
-            with open(filepath, "r", encoding="utf-8") as f:
-                return json.load(f)
-        return {}
+        from common.reference_data import load_json
+        return load_json(filename, default={}, data_dir=str(self.data_path))
 
     def analyze(self, profile, user_data: dict) -> List[PowerUpgrade]:
         """
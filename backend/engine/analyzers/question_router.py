@@ -0,0 +1,244 @@
+"""
+Question Router - one compiled pass over a question for every routing table.
+
+The request classifier, the lineup mode router and entity extraction each
+looped over their own pattern lists with re.search on uncompiled strings,
+so one advisor question was scanned ~130 times. QuestionRouter compiles
+all routes once and answers with every matching route (category,
+confidence, span) in a single pass that all consumers share.
+
+A single alternation of the route patterns was measured slower than
+separate searches under CPython's backtracking engine (alternatives led
+by groups or containing ".*" defeat its literal fast paths), so the pass
+is literal-gated instead. From each pattern the router derives a set of
+literals at least one of which occurs in any match. All gate literals are
+compiled into one trie-shaped regex, so a single scan of the question
+finds every literal present, and only routes with a literal present (a
+handful per question) run their own precompiled pattern. Results are
+identical to calling re.search per pattern.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import product
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+try:
+    from re import _parser as _sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse as _sre_parse
+
+# Caps on the literal alternatives tracked while deriving gates
+_MAX_ALTERNATIVES = 32
+
+
+@dataclass(frozen=True)
+class Route:
+    """One routing pattern and what a match means."""
+    table: str  # which routing table it belongs to: "ai", "rule", "mode", ...
+    pattern: str  # regex, matched against the lowercased question
+    category: str  # e.g. "lineup", "comparison", "bear_trap"
+    confidence: float = 1.0
+    handler: Optional[str] = None
+
+
+@dataclass
+class RouteMatch:
+    """A route that matched, with the span of its leftmost match."""
+    route: Route
+    order: int  # position of the route in its table
+    start: int
+    end: int
+
+
+def _exact_strings(node) -> Optional[FrozenSet[str]]:
+    """All strings a fully literal node can match, or None if it is not fully literal."""
+    op, av = node
+    if op == _sre_parse.LITERAL:
+        return frozenset([chr(av)])
+    if op == _sre_parse.SUBPATTERN:
+        return _exact_sequence(av[-1])
+    if op == _sre_parse.BRANCH:
+        out = set()
+        for branch in av[1]:
+            strings = _exact_sequence(branch)
+            if strings is None:
+                return None
+            out |= strings
+        return frozenset(out) if len(out) <= _MAX_ALTERNATIVES else None
+    return None
+
+
+def _exact_sequence(seq) -> Optional[FrozenSet[str]]:
+    out = frozenset([""])
+    for node in seq:
+        strings = _exact_strings(node)
+        if strings is None or len(out) * len(strings) > _MAX_ALTERNATIVES:
+            return None
+        out = frozenset(a + b for a, b in product(out, strings))
+    return out
+
+
+def _better(a: Optional[FrozenSet[str]], b: Optional[FrozenSet[str]]) -> Optional[FrozenSet[str]]:
+    """The more selective gate: longest shortest-literal, then fewest literals."""
+    if not b or "" in b:
+        return a
+    if not a:
+        return b
+    key_a = (min(map(len, a)), -len(a))
+    key_b = (min(map(len, b)), -len(b))
+    return b if key_b > key_a else a
+
+
+def _required_literals(seq) -> Optional[FrozenSet[str]]:
+    """Literals one of which occurs in every match of the sequence (None: no gate)."""
+    best = None
+    run = frozenset([""])
+    for node in list(seq) + [None]:
+        strings = _exact_strings(node) if node is not None else None
+        if strings is not None and len(run) * len(strings) <= _MAX_ALTERNATIVES:
+            run = frozenset(a + b for a, b in product(run, strings))
+            continue
+        # The literal run ends here; it is required as a whole
+        best = _better(best, run)
+        run = frozenset([""])
+        if node is None:
+            break
+        if strings is not None:
+            run = strings
+            continue
+        op, av = node
+        if op == _sre_parse.SUBPATTERN:
+            best = _better(best, _required_literals(av[-1]))
+        elif op == _sre_parse.BRANCH:
+            alternatives = set()
+            for branch in av[1]:
+                required = _required_literals(branch)
+                if not required:
+                    alternatives = None
+                    break
+                alternatives |= required
+            if alternatives and len(alternatives) <= _MAX_ALTERNATIVES:
+                best = _better(best, frozenset(alternatives))
+        elif op in (_sre_parse.MAX_REPEAT, _sre_parse.MIN_REPEAT) and av[0] >= 1:
+            best = _better(best, _required_literals(av[2]))
+    return best
+
+
+def required_literals(pattern: str) -> Optional[FrozenSet[str]]:
+    """Literals at least one of which must appear in any match of pattern.
+
+    Returns None when no such set can be derived (the route is then
+    always tried). Only used as a prefilter, never to decide a match.
+    """
+    try:
+        required = _required_literals(_sre_parse.parse(pattern))
+    except Exception:
+        return None
+    return required if required and "" not in required else None
+
+
+def literal_trie(literals: Iterable[str]) -> str:
+    """Regex source matching any of the literals, laid out as a trie.
+
+    "be(?:ar trap|st )|..." costs one branch per distinct next character
+    instead of one per literal. At a given position the longest literal is
+    tried first; shorter ones are reached by backtracking.
+    """
+    trie: dict = {}
+    for literal in literals:
+        node = trie
+        for ch in literal:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        alternatives = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if "" in node:
+            alternatives.append("")  # last, so longer literals win
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return "(?:" + "|".join(alternatives) + ")"
+
+    return emit(trie)
+
+
+def literal_scanner(literals: Iterable[str]) -> "re.Pattern":
+    """One regex finding, at every position, the longest literal starting there.
+
+    The scan is a zero-width lookahead over literal_trie(), so overlapping
+    literals are all reported.
+    """
+    return re.compile("(?=(" + literal_trie(literals) + "))")
+
+
+class QuestionRouter:
+    """Every routing table compiled once, matched in one gated pass."""
+
+    def __init__(self, routes: Iterable[Route]):
+        self.routes: List[Route] = list(routes)
+        self._compiled: List[Tuple[Route, int, "re.Pattern"]] = []
+        self._ungated: List[int] = []
+        gated: Dict[str, List[int]] = {}
+        orders: Dict[str, int] = {}
+        for index, route in enumerate(self.routes):
+            order = orders.get(route.table, 0)
+            orders[route.table] = order + 1
+            self._compiled.append((route, order, re.compile(route.pattern)))
+            gate = required_literals(route.pattern)
+            if gate is None:
+                self._ungated.append(index)
+            for literal in gate or ():
+                gated.setdefault(literal, []).append(index)
+
+        # The scanner reports the longest literal at each position; every
+        # literal that is a prefix of it is present there too
+        self._routes_by_literal: Dict[str, FrozenSet[int]] = {
+            literal: frozenset(
+                index for prefix, indexes in gated.items() if literal.startswith(prefix) for index in indexes
+            )
+            for literal in gated
+        }
+        self._scanner = literal_scanner(gated) if gated else None
+        self._cached_match = lru_cache(maxsize=256)(self._match)
+
+    def match(self, text: str) -> Tuple[RouteMatch, ...]:
+        """Every matching route; offsets are into text.lower().strip()."""
+        # Normalize before the cache so "Foo?" and " foo?" share one entry
+        return self._cached_match(text.lower().strip())
+
+    def clear_cache(self) -> None:
+        self._cached_match.cache_clear()
+
+    def _match(self, text: str) -> Tuple[RouteMatch, ...]:
+        candidates = set(self._ungated)
+        if self._scanner is not None:
+            for literal in set(self._scanner.findall(text)):
+                candidates |= self._routes_by_literal[literal]
+        matches = []
+        for index in sorted(candidates):
+            route, order, compiled = self._compiled[index]
+            m = compiled.search(text)
+            if m:
+                matches.append(RouteMatch(route, order, m.start(), m.end()))
+        return tuple(matches)
+
+    def match_table(self, text: str, table: str) -> List[RouteMatch]:
+        """Matches of one routing table, in table order."""
+        return [m for m in self.match(text) if m.route.table == table]
+
+    def first(self, text: str, table: str) -> Optional[RouteMatch]:
+        """The first route of a table that matches (table order wins)."""
+        for m in self.match(text):
+            if m.route.table == table:
+                return m
+        return None
+
+    def best(self, text: str, table: str) -> Optional[RouteMatch]:
+        """The highest-confidence match of a table (earliest route on ties)."""
+        best = None
+        for m in self.match(text):
+            if m.route.table == table and (best is None or m.route.confidence > best.route.confidence):
+                best = m
+        return best
@@ -5,9 +5,12 @@ Routes questions to the appropriate handler.
 
 import re
 from typing import Tuple, Optional
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from enum import Enum
 
+from .entity_index import get_entity_index
+from .question_router import QuestionRouter, Route
+
 
 class RequestType(Enum):
     RULES = "rules"
@@ -90,12 +93,50 @@ AI_PATTERNS = [
 ]
 
 
+# Phrases that explicitly ask for AI (substring match, like the other tables)
+EXPLICIT_AI_PHRASES = ["ai", "claude", "gpt", "help me think"]
+
+# Question patterns -> lineup mode (first match in order wins)
+LINEUP_MODE_PATTERNS = [
+    ("bear trap", "bear_trap"),
+    ("crazy joe", "crazy_joe"),
+    ("garrison", "garrison"),
+    ("defense", "garrison"),
+    ("reinforce", "rally_joiner_defense"),
+    ("join.*attack", "rally_joiner_attack"),
+    ("join.*rally", "rally_joiner_attack"),
+    ("rally leader", "rally_leader_infantry"),
+    ("lead.*rally", "rally_leader_infantry"),
+    ("marksman", "rally_leader_marksman"),
+    ("exploration", "exploration"),
+    ("pve", "exploration"),
+    ("frozen", "exploration"),
+    ("svs", "svs_march"),
+    ("field", "svs_march"),
+]
+
+def _build_router() -> QuestionRouter:
+    """Compile every routing table into the shared router."""
+    routes = [Route("explicit_ai", re.escape(phrase), "explicit_ai") for phrase in EXPLICIT_AI_PHRASES]
+    routes += [Route("ai", pattern, category, confidence) for pattern, category, confidence in AI_PATTERNS]
+    routes += [
+        Route("rule", pattern, category, confidence, handler)
+        for pattern, category, handler, confidence in RULE_PATTERNS
+    ]
+    routes += [Route("mode", pattern, mode) for pattern, mode in LINEUP_MODE_PATTERNS]
+    return QuestionRouter(routes)
+
+
+QUESTION_ROUTER = _build_router()
+
+
 class RequestClassifier:
     """Classify user requests to route them appropriately."""
 
     def __init__(self):
         self.rule_patterns = RULE_PATTERNS
         self.ai_patterns = AI_PATTERNS
+        self.router = QUESTION_ROUTER
 
     def classify(self, question: str) -> ClassifiedRequest:
         """
@@ -107,10 +148,11 @@ class RequestClassifier:
         Returns:
             ClassifiedRequest with routing information
         """
-        question_lower = question.lower().strip()
+        # The router lowercases and strips the question itself, so the
+        # classifier and other callers share its match cache
 
         # Check for explicit AI request
-        if any(phrase in question_lower for phrase in ["ai", "claude", "gpt", "help me think"]):
+        if self.router.first(question, "explicit_ai"):
             return ClassifiedRequest(
                 request_type=RequestType.AI,
                 category="explicit_ai",
@@ -120,33 +162,26 @@ class RequestClassifier:
             )
 
         # Check AI patterns first (they take precedence)
-        for pattern, category, confidence in self.ai_patterns:
-            if re.search(pattern, question_lower):
-                return ClassifiedRequest(
-                    request_type=RequestType.AI,
-                    category=category,
-                    confidence=confidence,
-                    rule_handler=None,
-                    reason=f"Question type '{category}' requires contextual AI analysis"
-                )
-
-        # Check rule patterns
-        best_match = None
-        best_confidence = 0.0
-
-        for pattern, category, handler, confidence in self.rule_patterns:
-            if re.search(pattern, question_lower):
-                if confidence > best_confidence:
-                    best_match = (pattern, category, handler, confidence)
-                    best_confidence = confidence
+        ai_match = self.router.first(question, "ai")
+        if ai_match:
+            category = ai_match.route.category
+            return ClassifiedRequest(
+                request_type=RequestType.AI,
+                category=category,
+                confidence=ai_match.route.confidence,
+                rule_handler=None,
+                reason=f"Question type '{category}' requires contextual AI analysis"
+            )
 
+        # Check rule patterns (highest confidence wins)
+        best_match = self.router.best(question, "rule")
         if best_match:
-            _, category, handler, confidence = best_match
+            category = best_match.route.category
             return ClassifiedRequest(
                 request_type=RequestType.RULES,
                 category=category,
-                confidence=confidence,
-                rule_handler=handler,
+                confidence=best_match.route.confidence,
+                rule_handler=best_match.route.handler,
                 reason=f"Question about '{category}' can be answered with game rules"
             )
 
@@ -209,72 +244,32 @@ class RequestClassifier:
             question: User's question
 
         Returns:
-            Dict with extracted entities
+            Dict with extracted entities (each list in order of first
+            mention) and "mentions", every match with its offsets
         """
         entities = {
             "heroes": [],
             "game_modes": [],
             "gear_pieces": [],
-            "resources": []
+            "chief_gear": [],
+            "troop_types": [],
+            "events": [],
+            "resources": [],
+            "mentions": [],
         }
 
-        question_lower = question.lower()
-
-        # Extract hero names (all 56 heroes from heroes.json, Gen 1-14)
-        hero_names = [
-            # Gen 1
-            "bahiti", "charlie", "cloris", "eugene", "gina", "jasser",
-            "jeronimo", "jessie", "ling xue", "lumak bokan", "molly",
-            "natalia", "patrick", "seo-yoon", "sergey", "smith", "zinman",
-            # Gen 2
-            "alonso", "flint", "philly",
-            # Gen 3
-            "greg", "logan", "mia",
-            # Gen 4
-            "ahmose", "lynn", "reina",
-            # Gen 5
-            "gwen", "hector", "norah",
-            # Gen 6
-            "renee", "wayne", "wu ming",
-            # Gen 7
-            "bradley", "edith", "gordon",
-            # Gen 8
-            "gatot", "hendrik", "sonya",
-            # Gen 9
-            "fred", "magnus", "xura",
-            # Gen 10
-            "blanchette", "freya", "gregory",
-            # Gen 11
-            "eleonora", "lloyd", "rufus",
-            # Gen 12
-            "hervor", "karol", "ligeia",
-            # Gen 13
-            "flora", "gisela", "vulcanus",
-            # Gen 14
-            "cara", "dominic", "elif",
-        ]
-        for hero in hero_names:
-            if hero in question_lower:
-                entities["heroes"].append(hero.title())
-
-        # Extract game modes
-        modes = {
-            "bear trap": "bear_trap",
-            "crazy joe": "crazy_joe",
-            "garrison": "garrison",
-            "rally": "rally",
-            "svs": "svs",
-            "exploration": "exploration",
-            "pve": "exploration"
+        kind_keys = {
+            "hero": "heroes",
+            "game_mode": "game_modes",
+            "gear_piece": "gear_pieces",
+            "chief_gear": "chief_gear",
+            "troop_type": "troop_types",
+            "event": "events",
         }
-        for mode_text, mode_id in modes.items():
-            if mode_text in question_lower:
-                entities["game_modes"].append(mode_id)
-
-        # Extract gear pieces
-        gear_pieces = ["ring", "amulet", "gloves", "boots", "helmet", "armor"]
-        for piece in gear_pieces:
-            if piece in question_lower:
-                entities["gear_pieces"].append(piece.title())
+        for m in get_entity_index().find(question):
+            values = entities[kind_keys[m.kind]]
+            if m.value not in values:
+                values.append(m.value)
+            entities["mentions"].append(asdict(m))
 
         return entities
@@ -0,0 +1,187 @@
+"""
+Answer Cache - reuse advisor answers for near-duplicate questions.
+
+Many advisor questions are rewordings of each other ("best bear trap
+lineup", "bear trap heroes?") asked by players at the same stage. Each
+used to rerun the rules engine or spend an AI call. Answers are now cached
+under the question's normalized form plus a coarse fingerprint of the
+asker's profile and roster:
+
+- Normalized question: entity mentions become their canonical names (via
+  the entity index, so "jero" and "Jeronimo" agree), then lowercase words
+  minus stopwords, with a few synonyms folded together. The classifier's
+  category is part of the key, so rewordings that route differently (an
+  AI "what if" vs. a rules lookup) never share an answer.
+- Roster fingerprint: furnace bracket, FC level, spending profile, farm
+  flag, priorities, server generation (as the AI prompt states it), and
+  each owned hero with its level (in steps of 10), stars and skill levels
+  (low 1-2, mid 3-4, max 5).
+
+Storage is the result cache (common/result_cache): the in-process LRU plus
+the main-table layer with Config.ANSWER_CACHE_TTL. Only real answers are
+stored: rules answers, and AI answers that actually consumed tokens (an
+AI error message comes back as text with no usage).
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from common import result_cache
+from common.config import Config
+
+from .ai_recommender import server_generation
+from .analyzers.entity_index import get_entity_index
+from .analyzers.request_classifier import QUESTION_ROUTER, RequestClassifier
+
+ANSWER_KIND = "advisor.answer"
+
+# Words that do not change what is being asked. Negations, comparisons and
+# ordering words ("not", "vs", "or", "first", "before") are kept, and so are
+# interrogatives and modals other than "what": "who should lead" and "how do
+# I get" ask different things. Direction words ("to", "from", "into") are
+# kept too: "move Molly from infantry to lancers" is not the reverse move.
+STOPWORDS = frozenset("""
+    a an the this that these those is are am was were be been it its
+    what whats
+    i im me my mine we our you your u
+    do does did
+    for of in on at about
+    best good top great
+    please pls plz thanks thank hey hi hello chief
+    use using run running pick choose
+    right now currently really just
+""".split())
+
+SYNONYMS = {
+    "hero": "lineup",
+    "heroes": "lineup",
+    "lineups": "lineup",
+    "team": "lineup",
+    "teams": "lineup",
+    "comp": "lineup",
+    "composition": "lineup",
+    "formation": "lineup",
+    "squad": "lineup",
+    "upgrading": "upgrade",
+    "upgrades": "upgrade",
+    "leveling": "level",
+    "levelling": "level",
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+_classifier = RequestClassifier()
+
+
+def normalize_question(question: str) -> str:
+    """Canonical form of a question: entities by name, content words in order."""
+    text = question.lower()
+    tokens: List[str] = []
+    position = 0
+    mentions = sorted(
+        {(m.start, m.end, m.value.lower()) for m in get_entity_index().find(question)},
+        key=lambda m: (m[0], m[2]),
+    )
+    for start, end, value in mentions:
+        if start < position:
+            continue  # same span, another kind ("bear trap" event and mode)
+        tokens += _words(text[position:start])
+        tokens.append(value)
+        position = end
+    tokens += _words(text[position:])
+    return " ".join(tokens)
+
+
+def _words(text: str) -> List[str]:
+    words = []
+    for word in _WORD.findall(text):
+        word = SYNONYMS.get(word, word)
+        if word not in STOPWORDS:
+            words.append(word)
+    return words
+
+
+def _field(obj, name: str, default=None):
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def _int(value, default: int = 0) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+SKILL_FIELDS = tuple(
+    f"{kind}_skill_{n}_level" for kind in ("expedition", "exploration") for n in (1, 2, 3)
+)
+
+
+def roster_fingerprint(profile, heroes: list) -> Dict[str, Any]:
+    """Coarse account state: players in the same bracket get the same answers."""
+    roster = []
+    for hero in heroes or []:
+        name = _field(hero, "hero_name") or _field(hero, "name")
+        if name:
+            skills = [(_int(_field(hero, field), 1) + 1) // 2 for field in SKILL_FIELDS]
+            roster.append([name, _int(_field(hero, "level"), 1) // 10, _int(_field(hero, "stars")), skills])
+    profile = profile or {}
+    return {
+        "furnace": _int(_field(profile, "furnace_level"), 1) // 5,
+        "fc": _field(profile, "furnace_fc_level") or None,
+        "spending": _field(profile, "spending_profile") or "f2p",
+        "farm": bool(_field(profile, "is_farm_account")),
+        "priorities": [
+            _int(_field(profile, key))
+            for key in ("priority_pvp_attack", "priority_defense", "priority_pve", "priority_economy")
+        ],
+        "generation": server_generation(_field(profile, "server_age_days")),
+        "heroes": sorted(roster),
+    }
+
+
+def answer_key(question: str, profile, heroes: list, version: str = "") -> str:
+    """Cache key for a question asked from this account state."""
+    classified = _classifier.classify(question)
+    mode = QUESTION_ROUTER.first(question, "mode")
+    inputs = {
+        "question": normalize_question(question),
+        "category": classified.category,
+        "mode": mode.route.category if mode else None,
+        "roster": roster_fingerprint(profile, heroes),
+    }
+    return result_cache.fingerprint(ANSWER_KIND, inputs, version)
+
+
+def get_cached_answer(question: str, profile, heroes: list, version: str = "") -> Tuple[str, Optional[dict]]:
+    """Look up an answer; returns (key, cached result or None).
+
+    The key is returned so a miss can be stored without normalizing again.
+    """
+    key = answer_key(question, profile, heroes, version)
+    if not Config.ANSWER_CACHE_ENABLED:
+        return key, None
+    return key, result_cache.get_cached(ANSWER_KIND, key, persist=Config.ANSWER_CACHE_PERSIST)
+
+
+def is_cacheable(result: dict) -> bool:
+    """Rules answers and AI answers that used tokens; never errors."""
+    if not result.get("answer"):
+        return False
+    source = result.get("source")
+    if source == "rules":
+        return True
+    return source == "ai" and result.get("tokens_output", 0) > 0
+
+
+def store_answer(key: str, result: dict) -> bool:
+    """Cache an engine result under key if it is a real answer."""
+    if not Config.ANSWER_CACHE_ENABLED or not is_cacheable(result):
+        return False
+    result_cache.put_cached(
+        ANSWER_KIND, key, result,
+        persist=Config.ANSWER_CACHE_PERSIST, ttl=Config.ANSWER_CACHE_TTL,
+    )
+    return True
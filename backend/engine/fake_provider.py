@@ -0,0 +1,52 @@
+"""
+Fake AI provider - an offline stand-in that streams a canned answer.
+
+Selected with AI_PROVIDER=fake. It mimics a provider's streaming API: a
+first-token latency, then one token (word) at a time with a fixed delay,
+and token usage reported once the stream ends. The advisor's streaming
+path can then be exercised and benchmarked without API keys or network.
+"""
+
+import time
+from typing import Iterator, Optional
+
+DEFAULT_ANSWER = (
+    "Chief, here's how I'd approach it. Put your strongest Infantry hero up front to "
+    "soak damage, keep your best Marksman behind them for the bulk of the damage, and "
+    "fill the Lancer slot with whoever has the highest expedition skill levels. "
+    "Upgrade the front-line hero's gear first, since it keeps the whole march alive "
+    "longer, then level expedition skills before stars. Check back after your next "
+    "furnace upgrade and we can revisit the lineup."
+)
+
+
+class FakeProvider:
+    """Streams DEFAULT_ANSWER (or a given answer) word by word."""
+
+    def __init__(
+        self,
+        first_token_ms: int = 400,
+        token_delay_ms: int = 25,
+        answer: Optional[str] = None,
+    ):
+        self.first_token_ms = first_token_ms
+        self.token_delay_ms = token_delay_ms
+        self.answer = answer or DEFAULT_ANSWER
+        self.tokens_input = 0
+        self.tokens_output = 0
+
+    def stream(self, system_prompt: str, user_message: str, max_tokens: int) -> Iterator[str]:
+        """Yield the answer's tokens; usage is set once the stream ends."""
+        self.tokens_input = self.tokens_output = 0
+        words = self.answer.split(" ")[:max_tokens]
+        time.sleep(self.first_token_ms / 1000)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.token_delay_ms / 1000)
+            yield word if i == 0 else " " + word
+        # Roughly 4 characters per token, as the real providers count
+        self.tokens_input = (len(system_prompt) + len(user_message)) // 4
+        self.tokens_output = len(words)
+
+    def complete(self, system_prompt: str, user_message: str, max_tokens: int) -> str:
+        return "".join(self.stream(system_prompt, user_message, max_tokens))
@@ -3,11 +3,17 @@ Main Recommendation Engine - Orchestrates all analyzers for WoS optimization.
 Uses rule-based analysis first, with AI fallback for complex questions.
 """
 
+import hashlib
 import json
+import logging
+import threading
+import time
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Iterator, List, Dict, Any, Optional
 from dataclasses import dataclass, asdict
 
+from common.cache_invalidation import register_invalidation_hook
+
 from .analyzers import (
     HeroAnalyzer,
     GearAdvisor,
@@ -17,8 +23,22 @@ from .analyzers import (
     PowerOptimizer,
     PowerUpgrade
 )
+from .analyzers.entity_index import get_entity_index
 from .analyzers.request_classifier import RequestType
 
+logger = logging.getLogger(__name__)
+
+# Reference files whose contents shape a built engine. A change to any of
+# them (mtime or size) produces a new data version and forces a rebuild.
+REFERENCE_DATA_FILES = (
+    "heroes.json",
+    "chief_gear.json",
+    "chief_equipment_data.json",
+    "hero_power_data.json",
+    "troop_data.json",
+    "upgrades/war_academy.steps.json",
+)
+
 
 @dataclass
 class Recommendation:
@@ -57,15 +77,19 @@ class RecommendationEngine:
             data_dir = Path(data_dir)
 
         self.data_dir = data_dir
+        # Set by get_engine(); identifies the data cached results were built from
+        self.data_version = ""
 
-        # Load static game data
-        self.heroes_data = self._load_json("heroes.json")
+        # Load static game data (heroes come from the shared indexed store)
+        from common.reference_store import get_reference_store
+        self.reference = get_reference_store(str(data_dir))
+        self.heroes_data = self.reference.heroes_data
         self.gear_data = self._load_json("chief_gear.json")
 
         # Initialize analyzers
-        self.hero_analyzer = HeroAnalyzer(self.heroes_data)
+        self.hero_analyzer = HeroAnalyzer(self.reference)
         self.gear_advisor = GearAdvisor(self.gear_data)
-        self.lineup_builder = LineupBuilder(self.heroes_data)
+        self.lineup_builder = LineupBuilder(self.reference)
         self.progression_tracker = ProgressionTracker()
         self.request_classifier = RequestClassifier()
         self.power_optimizer = PowerOptimizer(str(data_dir))
@@ -74,40 +98,29 @@ class RecommendationEngine:
         self._ai_recommender = None
 
     def _load_json(self, filename: str) -> dict:
-        """Load a JSON file from the data directory, with DynamoDB fallback for heroes."""
-        path = self.data_dir / filename
-        if path.exists():
-            with open(path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        # Lambda fallback: load heroes from DynamoDB reference table
-        if filename == "heroes.json":
-            try:
-                from common.hero_repo import get_all_reference_heroes_from_db
-                heroes = get_all_reference_heroes_from_db()
-                if heroes:
-                    return {"heroes": heroes}
-            except Exception:
-                pass
-        return {}
+        """Load a JSON file from the data directory."""
+        from common.reference_data import load_json
+        return load_json(filename, default={}, data_dir=str(self.data_dir))
 
     def _get_hero_info_from_question(self, question: str) -> Optional[Dict[str, Any]]:
-        """Extract hero name from question and return hero info in conversational WoS style."""
-        question_lower = question.lower()
-
-        # Search for hero names in the question
-        heroes = self.heroes_data.get('heroes', [])
-        matched_hero = None
+        """Extract hero names from question and return hero info in conversational WoS style.
 
-        for hero in heroes:
-            hero_name = hero.get('name', '').lower()
-            if hero_name and hero_name in question_lower:
-                matched_hero = hero
-                break
-
-        if not matched_hero:
+        Every hero mentioned (by name, nickname or common misspelling) is
+        covered, in the order the question mentions them; "hero" is the first.
+        """
+        names = get_entity_index(self.reference, str(self.data_dir)).values(question, "hero")
+        matched_heroes = [hero for hero in map(self.reference.get, names) if hero]
+        if not matched_heroes:
             return None
 
-        # Build a conversational summary using WoS terminology
+        return {
+            "hero": matched_heroes[0],
+            "heroes": matched_heroes,
+            "summary": "\n\n".join(self._hero_summary(hero) for hero in matched_heroes)
+        }
+
+    def _hero_summary(self, matched_hero: Dict[str, Any]) -> str:
+        """Conversational summary of one hero using WoS terminology."""
         name = matched_hero.get('name', 'Unknown')
         hero_class = matched_hero.get('hero_class', 'Unknown')
         generation = matched_hero.get('generation', '?')
@@ -157,18 +170,16 @@ class RecommendationEngine:
         else:
             summary_parts.append(f"Bottom line: Unless {name} is one of your only options, you're better off holding those manuals for a higher-value hero.")
 
-        return {
-            "hero": matched_hero,
-            "summary": "\n".join(summary_parts)
-        }
+        return "\n".join(summary_parts)
 
     @property
     def ai_recommender(self):
         """Lazy load AI recommender only when needed."""
         if self._ai_recommender is None:
             try:
+                from common.config import Config
                 from .ai_recommender import AIRecommender
-                self._ai_recommender = AIRecommender()
+                self._ai_recommender = AIRecommender(provider=Config.AI_PROVIDER)
             except Exception:
                 self._ai_recommender = None
         return self._ai_recommender
@@ -324,7 +335,9 @@ class RecommendationEngine:
         self,
         game_mode: str,
         user_heroes: list,
-        profile=None
+        profile=None,
+        top_k: int = 1,
+        exclude: Optional[List[str]] = None,
     ) -> dict:
         """
         Get the best lineup for a specific game mode.
@@ -333,17 +346,76 @@ class RecommendationEngine:
             game_mode: Game mode (e.g., "bear_trap", "rally_joiner_attack")
             user_heroes: List of user's owned heroes
             profile: Optional user profile
+            top_k: Also return the next best top_k - 1 lineups that use a
+                different set of heroes, under "alternatives"
+            exclude: Hero names to leave out (e.g. already in another march)
 
         Returns:
             Dict with lineup information
         """
         heroes_dict = self._heroes_list_to_dict(user_heroes)
-        lineup = self.lineup_builder.build_personalized_lineup(
+        if top_k <= 1:
+            lineup = self.lineup_builder.build_personalized_lineup(
+                event_type=game_mode,
+                user_heroes=heroes_dict,
+                max_generation=99,
+                exclude=exclude,
+            )
+            return self._lineup_to_dict(lineup)
+
+        lineups = self.lineup_builder.build_lineup_alternatives(
             event_type=game_mode,
             user_heroes=heroes_dict,
+            top_k=top_k,
             max_generation=99,
+            exclude=exclude,
         )
+        result = self._lineup_to_dict(lineups[0])
+        result["total_power"] = lineups[0].total_power
+        result["alternatives"] = [
+            {**self._lineup_to_dict(lineup), "rank": rank, "total_power": lineup.total_power}
+            for rank, lineup in enumerate(lineups[1:], start=2)
+        ]
+        return result
+
+    def allocate_marches(
+        self,
+        user_heroes: list,
+        marches: List[tuple],
+        exclude: Optional[List[str]] = None,
+    ) -> dict:
+        """
+        Split the user's heroes across simultaneous marches (no double-booking).
 
+        Args:
+            user_heroes: List of user's owned heroes
+            marches: (mode, weight) per march
+            exclude: Hero names to leave out
+
+        Returns:
+            Dict with one lineup per march and the weighted total score
+        """
+        heroes_dict = self._heroes_list_to_dict(user_heroes)
+        lineups = self.lineup_builder.allocate_marches(
+            marches, heroes_dict, max_generation=99, exclude=exclude,
+        )
+
+        result = []
+        for index, ((mode, weight), lineup) in enumerate(zip(marches, lineups), start=1):
+            result.append({
+                **self._lineup_to_dict(lineup),
+                "march": index,
+                "mode": mode,
+                "weight": weight,
+                "total_power": lineup.total_power,
+            })
+        return {
+            "marches": result,
+            "total_score": round(sum(m["weight"] * m["total_power"] for m in result), 2),
+        }
+
+    @staticmethod
+    def _lineup_to_dict(lineup) -> dict:
         return {
             "game_mode": lineup.game_mode,
             "heroes": lineup.heroes,
@@ -357,6 +429,7 @@ class RecommendationEngine:
         """Get lineups for all game modes."""
         from engine.analyzers.lineup_builder import LINEUP_TEMPLATES
         heroes_dict = self._heroes_list_to_dict(user_heroes)
+        scores = self.lineup_builder.build_score_matrix(heroes_dict, list(LINEUP_TEMPLATES))
 
         result = {}
         for mode in LINEUP_TEMPLATES:
@@ -364,15 +437,9 @@ class RecommendationEngine:
                 event_type=mode,
                 user_heroes=heroes_dict,
                 max_generation=99,
+                scores=scores,
             )
-            result[mode] = {
-                "game_mode": lineup.game_mode,
-                "heroes": lineup.heroes,
-                "troop_ratio": lineup.troop_ratio,
-                "notes": lineup.notes,
-                "confidence": lineup.confidence,
-                "recommended_to_get": lineup.recommended_to_get,
-            }
+            result[mode] = self._lineup_to_dict(lineup)
         return result
 
     def get_joiner_recommendation(self, user_heroes: list, attack: bool = True) -> dict:
@@ -437,12 +504,8 @@ class RecommendationEngine:
             return ai_result
 
         # AI not available - try rules as fallback
-        rules_fallback = self._handle_with_rules(
-            classified, profile, user_heroes,
-            self._heroes_list_to_dict(user_heroes), user_gear, question
-        )
-        if rules_fallback and rules_fallback.get("answer"):
-            rules_fallback["source"] = "rules"
+        rules_fallback = self._rules_fallback(classified, profile, user_heroes, user_gear, question)
+        if rules_fallback:
             return rules_fallback
 
         return {
@@ -548,6 +611,70 @@ class RecommendationEngine:
 
         return result
 
+    def ask_stream(
+        self,
+        profile,
+        user_heroes: list,
+        question: str,
+        user_gear: dict = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Answer a question like ask(), streaming AI answers as they generate.
+
+        Yields {"type": "delta", "text": ...} events and then one
+        {"type": "done", "result": ...} whose result has the same shape as
+        ask()'s. Questions routed to AI stream from the provider; anything
+        answered by rules arrives as a single delta. If every provider fails
+        before the first token, the rules answer (or the same error result
+        ask() gives) is sent instead; a stream that breaks partway ends with
+        an "error" result, so neither is counted as an AI answer.
+        """
+        classified = self.request_classifier.classify(question)
+        ai = self.ai_recommender
+        if classified.request_type != RequestType.AI or not ai or not ai.is_available():
+            result = self.ask(profile, user_heroes, question, user_gear=user_gear)
+            if result.get("answer"):
+                yield {"type": "delta", "text": result["answer"]}
+            yield {"type": "done", "result": result}
+            return
+
+        chunks = []
+        try:
+            for text in ai.stream_question(profile, user_heroes, self.reference, question):
+                chunks.append(text)
+                yield {"type": "delta", "text": text}
+        except Exception as e:
+            logger.warning("AI stream failed after %d chunks: %s", len(chunks), e)
+            if chunks:
+                result = {"answer": "".join(chunks).strip(), "source": "error", "recommendations": []}
+            else:
+                result = self._rules_fallback(classified, profile, user_heroes, user_gear, question)
+                if not result:
+                    result = self._ai_error_result(e)
+                yield {"type": "delta", "text": result["answer"]}
+            yield {"type": "done", "result": result}
+            return
+
+        yield {"type": "done", "result": {
+            "answer": "".join(chunks).strip(),
+            "source": "ai",
+            "provider": self._ai_provider_name(),
+            "model": self._ai_model_name(),
+            **ai.last_usage(),
+            "recommendations": []
+        }}
+
+    def _ai_provider_name(self) -> str:
+        """Provider that answered the last AI call on this thread."""
+        ai = self.ai_recommender
+        return ai.last_provider() or ai.active_provider or "openai"
+
+    def _ai_model_name(self) -> str:
+        provider = self._ai_provider_name()
+        if provider == "fake":
+            return "fake"
+        return "claude-sonnet-4-20250514" if provider == "anthropic" else "gpt-4o-mini"
+
     def _handle_with_ai(self, profile, user_heroes: list, question: str) -> Optional[Dict[str, Any]]:
         """Handle a request using AI."""
         if not self.ai_recommender or not self.ai_recommender.is_available():
@@ -557,33 +684,48 @@ class RecommendationEngine:
             answer = self.ai_recommender.ask_question(
                 profile,
                 user_heroes,
-                self.heroes_data,
+                self.reference,
                 question
             )
 
             return {
                 "answer": answer,
                 "source": "ai",
-                "provider": self.ai_recommender.active_provider or "openai",
-                "model": "claude-sonnet-4-20250514" if self.ai_recommender.active_provider == "anthropic" else "gpt-4o-mini",
+                "provider": self._ai_provider_name(),
+                "model": self._ai_model_name(),
+                **self.ai_recommender.last_usage(),
                 "recommendations": []
             }
         except Exception as e:
-            # Log the actual error but show user-friendly message
-            error_str = str(e).lower()
-            if 'api' in error_str or 'key' in error_str or 'auth' in error_str:
-                user_message = "AI service configuration issue. Please contact support."
-            elif 'timeout' in error_str or 'connection' in error_str:
-                user_message = "Could not reach AI service. Please try again."
-            elif 'rate' in error_str or 'limit' in error_str:
-                user_message = "AI request limit reached. Please try again later."
-            else:
-                user_message = "AI service is temporarily unavailable."
-            return {
-                "answer": user_message,
-                "source": "error",
-                "recommendations": []
-            }
+            return self._ai_error_result(e)
+
+    def _ai_error_result(self, error: Exception) -> Dict[str, Any]:
+        """User-friendly answer for a failed AI call."""
+        error_str = str(error).lower()
+        if 'api' in error_str or 'key' in error_str or 'auth' in error_str:
+            user_message = "AI service configuration issue. Please contact support."
+        elif 'timeout' in error_str or 'connection' in error_str:
+            user_message = "Could not reach AI service. Please try again."
+        elif 'rate' in error_str or 'limit' in error_str:
+            user_message = "AI request limit reached. Please try again later."
+        else:
+            user_message = "AI service is temporarily unavailable."
+        return {
+            "answer": user_message,
+            "source": "error",
+            "recommendations": []
+        }
+
+    def _rules_fallback(self, classified, profile, user_heroes: list, user_gear, question: str) -> Optional[Dict[str, Any]]:
+        """Rules answer for a question the AI could not answer, if any."""
+        rules_fallback = self._handle_with_rules(
+            classified, profile, user_heroes,
+            self._heroes_list_to_dict(user_heroes), user_gear, question
+        )
+        if rules_fallback and rules_fallback.get("answer"):
+            rules_fallback["source"] = "rules"
+            return rules_fallback
+        return None
 
     def _heroes_list_to_dict(self, user_heroes: list) -> dict:
         """Convert user_heroes list to dict format.
@@ -897,7 +1039,7 @@ class RecommendationEngine:
 
         results = []
         for priority_rank, name in enumerate(ranked[:max_heroes], start=1):
-            hero_data = self.hero_analyzer.hero_lookup.get(name, {})
+            hero_data = self.reference.get(name) or {}
             hero_gen = hero_data.get('generation', 1)
             tier = hero_data.get('tier_overall', 'C')
             hero_class = hero_data.get('hero_class', 'Unknown')
@@ -969,7 +1111,107 @@ class RecommendationEngine:
         return json.dumps([asdict(r) for r in recommendations], indent=2)
 
 
-# Convenience function for quick access
+# ---------------------------------------------------------------------------
+# Process-wide warm engine
+# ---------------------------------------------------------------------------
+
+# One engine per data directory, kept for the lifetime of the container.
+# Each entry: {"engine", "version", "build_ms", "built_at", "reuse_count"}
+_engine_cache: Dict[str, Dict[str, Any]] = {}
+_engine_lock = threading.Lock()
+
+
+def _resolve_data_dir(data_dir: Optional[Path]) -> Path:
+    if data_dir is None:
+        return Path(__file__).parent.parent / "data"
+    return Path(data_dir)
+
+
+def get_data_version(data_dir: Path = None) -> str:
+    """Compute a cheap version fingerprint for the reference data files.
+
+    Uses file size and mtime rather than content hashing so the check is a
+    handful of stat() calls per request. The reference bundle version is
+    folded in for containers that ship only the bundle.
+    """
+    data_dir = _resolve_data_dir(data_dir)
+    parts = []
+    for name in REFERENCE_DATA_FILES:
+        try:
+            st = (data_dir / name).stat()
+            parts.append(f"{name}:{st.st_size}:{st.st_mtime_ns}")
+        except OSError:
+            parts.append(f"{name}:missing")
+    from common.reference_data import get_bundle_version
+    parts.append(f"bundle:{get_bundle_version()}")
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
 def get_engine(data_dir: Path = None) -> RecommendationEngine:
-    """Get a recommendation engine instance."""
-    return RecommendationEngine(data_dir)
+    """Get the warm recommendation engine for this container.
+
+    The engine is built once and reused across invocations until the
+    reference data version changes.
+    """
+    data_dir = _resolve_data_dir(data_dir)
+    key = str(data_dir)
+    version = get_data_version(data_dir)
+
+    entry = _engine_cache.get(key)
+    if entry and entry["version"] == version:
+        entry["reuse_count"] += 1
+        return entry["engine"]
+
+    with _engine_lock:
+        entry = _engine_cache.get(key)
+        if entry and entry["version"] == version:
+            entry["reuse_count"] += 1
+            return entry["engine"]
+
+        if entry:
+            # Data changed underneath us; re-index hero reference data too
+            from common.reference_store import reset_reference_store
+            reset_reference_store()
+
+        start = time.perf_counter()
+        engine = RecommendationEngine(data_dir)
+        engine.data_version = version
+        build_ms = round((time.perf_counter() - start) * 1000, 2)
+
+        _engine_cache[key] = {
+            "engine": engine,
+            "version": version,
+            "build_ms": build_ms,
+            "built_at": time.time(),
+            "reuse_count": 0,
+        }
+        logger.info(
+            "Built recommendation engine version=%s build_ms=%s previous_version=%s",
+            version, build_ms, entry["version"] if entry else None,
+        )
+        return engine
+
+
+def get_engine_stats() -> List[Dict[str, Any]]:
+    """Return build/reuse statistics for every cached engine."""
+    return [
+        {
+            "data_dir": key,
+            "version": entry["version"],
+            "build_ms": entry["build_ms"],
+            "built_at": entry["built_at"],
+            "reuse_count": entry["reuse_count"],
+        }
+        for key, entry in _engine_cache.items()
+    ]
+
+
+def reset_engine() -> None:
+    """Drop all cached engines so the next get_engine() call rebuilds."""
+    with _engine_lock:
+        _engine_cache.clear()
+
+
+
+# Drop the warm engine whenever reference data changes in another container
+register_invalidation_hook(reset_engine)
@@ -1,20 +1,26 @@
 """Admin Lambda handler."""
 
+import copy
 import json
 import os
-from collections import Counter
+import time
 from datetime import datetime, timezone
 
 import boto3
 from aws_lambda_powertools import Logger
-from aws_lambda_powertools.event_handler import APIGatewayHttpResolver
+from aws_lambda_powertools.event_handler import APIGatewayHttpResolver, Response
 
-from common.auth import get_effective_user_id, require_admin, is_admin, get_user_id
+from common.user_context import get_user_context
 from common.error_capture import capture_error
 from common.exceptions import AppError, NotFoundError, ValidationError
 from common.config import Config
-from common import admin_repo, user_repo, ai_repo, profile_repo, hero_repo
-from common.db import get_table
+from common import admin_counters, admin_repo, user_repo, ai_repo, profile_repo, hero_repo
+from common.admin_aggregates import get_main_table_aggregate
+from common.export_jobs import CONTENT_TYPES, get_export_job, open_export, run_export
+from common.integrity import HERO_LIMITS, build_integrity_index, hero_range_issues
+from common.db import batch_delete, batch_get_items, get_table, iter_scan, parallel_count, parallel_scan
+from common.cache_invalidation import bump_reference_generation, check_reference_generation
+from common.reference_data import load_json, save_json
 
 cognito = boto3.client("cognito-idp", region_name=Config.REGION)
 
@@ -24,7 +30,7 @@ logger = Logger()
 
 def _require_admin():
     """Guard: require admin role on every admin route."""
-    require_admin(app.current_event.raw_event)
+    get_user_context(app.current_event.raw_event).require_admin()
 
 
 # --- Users ---
@@ -82,7 +88,7 @@ def purge_expired_users():
     _require_admin()
     expired = user_repo.get_expired_deleted_users(grace_days=30)
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     results = []
 
     for user in expired:
@@ -140,7 +146,7 @@ def create_user():
     )
     user["id"] = user.get("user_id")
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "create_user", "user", user_id, username)
 
     return {"user": user}, 201
@@ -176,7 +182,7 @@ def update_user(userId: str):
     updated = user_repo.update_user(userId, updates)
     updated["id"] = updated.get("user_id", userId)
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "update_user", "user", userId, user.get("username"), json.dumps(updates))
 
     return {"user": updated}
@@ -192,7 +198,7 @@ def delete_user(userId: str):
     if not user:
         raise NotFoundError("User not found")
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     email = user.get("email")
 
     if hard:
@@ -256,7 +262,7 @@ def restore_user(userId: str):
         except Exception:
             logger.warning("Failed to re-enable Cognito user: %s", email, exc_info=True)
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "restore_user", "user", userId, user.get("username"))
 
     return {"user": restored}
@@ -269,7 +275,7 @@ def impersonate_user(userId: str):
     if not user:
         raise NotFoundError("User not found")
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "impersonate", "user", userId, user.get("username"))
 
     profiles = profile_repo.get_profiles(userId)
@@ -681,7 +687,7 @@ def seed_test_accounts():
     """Create test accounts with profiles and heroes for testing."""
     _require_admin()
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     results = []
 
     for acct in _TEST_ACCOUNTS:
@@ -810,7 +816,7 @@ def update_flag(flagName: str):
 
     flag = admin_repo.update_feature_flag(flagName, updates)
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "update_flag", "flag", flagName, details=json.dumps(updates))
 
     return {"flag": flag}
@@ -844,7 +850,7 @@ def update_ai_settings():
 
     settings = ai_repo.update_ai_settings(updates)
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "update_ai_settings", details=json.dumps(updates))
 
     return {"settings": settings}
@@ -906,7 +912,7 @@ def create_announcement():
     if not title or not message:
         raise ValidationError("Title and message are required")
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     announcement = admin_repo.create_announcement(
         title=title,
         message=message,
@@ -967,7 +973,7 @@ def update_feedback(feedbackId: str):
     # feedbackId is the SK value
     result = admin_repo.update_feedback(feedbackId, updates)
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "update_feedback", "feedback", feedbackId, details=json.dumps(updates))
 
     return {"feedback": result}
@@ -978,7 +984,7 @@ def delete_feedback(feedbackId: str):
     _require_admin()
     table = get_table("admin")
     table.delete_item(Key={"PK": "FEEDBACK", "SK": f"FEEDBACK#{feedbackId}"})
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "delete_feedback", "feedback", feedbackId)
     return {"status": "deleted"}
 
@@ -988,7 +994,7 @@ def bulk_feedback_action():
     _require_admin()
     body = app.current_event.json_body or {}
     action = body.get("action")
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
 
     if action == "archive_completed":
         feedback = admin_repo.get_feedback(status_filter="completed")
@@ -1030,42 +1036,28 @@ def bulk_feedback_action():
 @app.get("/api/admin/stats")
 def get_admin_stats():
     _require_admin()
-    users = user_repo.list_users(limit=1000)
-    real_users = [u for u in users if not u.get("is_test_account")]
-    test_accounts = len(users) - len(real_users)
-    active_users = sum(1 for u in real_users if u.get("is_active"))
+    # Test accounts are left out, as in /api/admin/usage/stats;
+    # test_accounts says how many there are
+    counters = admin_counters.get_counters()
+    totals = counters["totals"]
+    test_usage = admin_counters.test_account_usage(counters["test_users"])
+    roles = {
+        key[len("users_role_"):]: n for key, n in totals.items()
+        if key.startswith("users_role_") and n
+    }
 
     ai_settings = ai_repo.get_ai_settings()
     feedback = admin_repo.get_feedback()
     announcements = admin_repo.get_announcements(active_only=True)
 
-    # Count profiles and heroes (exclude test accounts)
-    total_profiles = 0
-    total_heroes = 0
-    ai_requests_today = 0
-    for u in real_users:
-        ai_requests_today += u.get("ai_requests_today", 0)
-        try:
-            profiles = profile_repo.get_profiles(u["user_id"])
-            total_profiles += len(profiles)
-            for p in profiles:
-                profile_id = p.get("SK", "").replace("PROFILE#", "") or p.get("profile_id", "")
-                if profile_id:
-                    try:
-                        heroes = hero_repo.get_heroes(profile_id)
-                        total_heroes += len(heroes)
-                    except Exception:
-                        pass
-        except Exception:
-            pass
-
     return {
-        "total_users": len(real_users),
-        "active_users": active_users,
-        "test_accounts": test_accounts,
-        "total_profiles": total_profiles,
-        "total_heroes_tracked": total_heroes,
-        "ai_requests_today": ai_requests_today,
+        "total_users": totals["users_real"],
+        "active_users": totals["users_active_real"],
+        "test_accounts": totals["users_test"],
+        "users_by_role": roles,
+        "total_profiles": max(0, totals["profiles"] - test_usage["profiles"]),
+        "total_heroes_tracked": max(0, totals["heroes"] - test_usage["heroes"]),
+        "ai_requests_today": totals["ai_requests_today_real"],
         "pending_feedback": sum(1 for f in feedback if f.get("status") in ("new", "pending_fix", "pending_update")),
         "active_announcements": len(announcements),
         "ai_mode": ai_settings.get("mode", "off"),
@@ -1082,156 +1074,64 @@ def get_usage_stats():
 
     days = {"7d": 7, "30d": 30, "90d": 90}.get(date_range, 7)
 
-    all_users = user_repo.list_users(limit=1000)
-    users = [u for u in all_users if not u.get("is_test_account")]
-    total_users = len(users)
-    active_users = sum(1 for u in users if u.get("is_active"))
+    aggregate = get_main_table_aggregate()
+    users = aggregate.select(include_test=False)
+    summary = aggregate.summary(include_test=False)
+    total_users = summary["total_users"]
+    active_users = summary["active_users"]
     now = datetime.now(timezone.utc)
 
-    # Classify user activity
-    very_active = 0
-    active_weekly = 0
-    active_monthly = 0
-    inactive = 0
-    new_users = 0
-
-    for u in users:
-        last_login = u.get("last_login")
-        created_at = u.get("created_at")
-
-        # Count new users in date range
-        if created_at:
-            try:
-                created = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
-                if (now - created).days <= days:
-                    new_users += 1
-            except Exception:
-                pass
-
-        if not last_login:
-            inactive += 1
-            continue
-
-        try:
-            last = datetime.fromisoformat(last_login.replace("Z", "+00:00"))
-            days_since = (now - last).days
-        except Exception:
-            inactive += 1
-            continue
-
-        if days_since <= 1:
-            very_active += 1
-        elif days_since <= 7:
-            active_weekly += 1
-        elif days_since <= 30:
-            active_monthly += 1
-        else:
-            inactive += 1
+    # Count new users in date range
+    new_users = sum(1 for u in users if u.created and (now - u.created).days <= days)
 
     # Content stats - profiles, heroes, inventory
-    total_profiles = 0
-    total_heroes = 0
+    total_profiles = summary["total_profiles"]
+    total_heroes = summary["total_heroes"]
     total_inventory = 0
-    hero_name_counter = Counter()
-    hero_class_counter = Counter()
-    spending_counter = Counter()
-    alliance_role_counter = Counter()
-    state_counter = Counter()
-    users_with_state = 0
-    users_without_state = 0
+    hero_name_counter = summary["hero_popularity"]
+    state_counter = summary["states"]
 
     # User activity list
     user_activity_list = []
 
     for u in users:
-        uid = u.get("user_id")
-        user_heroes_count = 0
-        user_items_count = 0
-        user_has_state = False
-
-        try:
-            profiles = profile_repo.get_profiles(uid) if uid else []
-            total_profiles += len(profiles)
-
-            for p in profiles:
-                profile_id = p.get("SK", "").replace("PROFILE#", "") or p.get("profile_id", "")
-                state_num = p.get("state_number")
-                if state_num:
-                    state_counter[state_num] += 1
-                    user_has_state = True
-
-                spending = p.get("spending_profile")
-                if spending:
-                    spending_counter[spending] += 1
-
-                alliance_role = p.get("alliance_role")
-                if alliance_role:
-                    alliance_role_counter[alliance_role] += 1
-
-                if profile_id:
-                    try:
-                        heroes = hero_repo.get_heroes(profile_id)
-                        total_heroes += len(heroes)
-                        user_heroes_count += len(heroes)
-                        for h in heroes:
-                            hname = h.get("SK", "").replace("HERO#", "") or h.get("hero_name", "")
-                            if hname:
-                                hero_name_counter[hname] += 1
-                            hclass = h.get("hero_class")
-                            if hclass:
-                                hero_class_counter[hclass] += 1
-                    except Exception:
-                        pass
-        except Exception:
-            pass
-
-        if user_has_state:
-            users_with_state += 1
-        else:
-            users_without_state += 1
-
         # Activity score: rough heuristic based on login recency
         activity_score = 0
-        last_login = u.get("last_login")
-        if last_login:
-            try:
-                last = datetime.fromisoformat(last_login.replace("Z", "+00:00"))
-                days_since_login = (now - last).days
-                if days_since_login == 0:
-                    activity_score = 7
-                elif days_since_login <= 1:
-                    activity_score = 6
-                elif days_since_login <= 3:
-                    activity_score = 5
-                elif days_since_login <= 7:
-                    activity_score = 3
-                elif days_since_login <= 14:
-                    activity_score = 2
-                elif days_since_login <= 30:
-                    activity_score = 1
-            except Exception:
-                pass
+        days_since_login = u.days_since_login(now)
+        if days_since_login is not None:
+            if days_since_login == 0:
+                activity_score = 7
+            elif days_since_login <= 1:
+                activity_score = 6
+            elif days_since_login <= 3:
+                activity_score = 5
+            elif days_since_login <= 7:
+                activity_score = 3
+            elif days_since_login <= 14:
+                activity_score = 2
+            elif days_since_login <= 30:
+                activity_score = 1
 
         user_activity_list.append({
-            "username": u.get("username", u.get("email", "unknown")),
-            "email": u.get("email", ""),
-            "heroes": user_heroes_count,
-            "items": user_items_count,
+            "username": u.item.get("username", u.item.get("email", "unknown")),
+            "email": u.item.get("email", ""),
+            "heroes": u.hero_count,
+            "items": 0,
             "activity_score": activity_score,
-            "last_login": u.get("last_login"),
+            "last_login": u.item.get("last_login"),
         })
 
     # Build top_heroes (sorted by count, top 15)
     top_heroes = [{"name": name, "count": count} for name, count in hero_name_counter.most_common(15)]
 
     # Build hero_classes
-    hero_classes = dict(hero_class_counter)
+    hero_classes = dict(summary["hero_classes"])
 
     # Build spending_distribution
-    spending_distribution = dict(spending_counter)
+    spending_distribution = dict(summary["spending_distribution"])
 
     # Build alliance_roles
-    alliance_roles = dict(alliance_role_counter)
+    alliance_roles = dict(summary["alliance_roles"])
 
     # Build top_states (sorted by count)
     top_states = [{"state": state, "count": count} for state, count in state_counter.most_common()]
@@ -1244,38 +1144,13 @@ def get_usage_stats():
     # Build data_points from user created_at / last_login timestamps
     from datetime import timedelta
 
-    created_dates: dict[str, int] = {}  # date -> new users
-    login_dates: dict[str, int] = {}    # date -> active users
-
-    for u in users:
-        ca = u.get("created_at")
-        if ca:
-            try:
-                d = datetime.fromisoformat(ca.replace("Z", "+00:00")).strftime("%Y-%m-%d")
-                created_dates[d] = created_dates.get(d, 0) + 1
-            except Exception:
-                pass
-        ll = u.get("last_login")
-        if ll:
-            try:
-                d = datetime.fromisoformat(ll.replace("Z", "+00:00")).strftime("%Y-%m-%d")
-                login_dates[d] = login_dates.get(d, 0) + 1
-            except Exception:
-                pass
+    created_dates = summary["created_dates"]  # date -> new users
+    login_dates = summary["login_dates"]      # date -> active users
 
     data_points = []
-    cumulative = 0
     # Count users created before the range start
     start_dt = now - timedelta(days=days)
-    for u in users:
-        ca = u.get("created_at")
-        if ca:
-            try:
-                created = datetime.fromisoformat(ca.replace("Z", "+00:00"))
-                if created < start_dt:
-                    cumulative += 1
-            except Exception:
-                pass
+    cumulative = sum(1 for u in users if u.created and u.created < start_dt)
 
     for i in range(days):
         day = (start_dt + timedelta(days=i + 1))
@@ -1302,12 +1177,7 @@ def get_usage_stats():
             "new_users": new_users,
             "activity_rate": activity_rate,
         },
-        "activity_breakdown": {
-            "very_active": very_active,
-            "active_weekly": active_weekly,
-            "active_monthly": active_monthly,
-            "inactive": inactive,
-        },
+        "activity_breakdown": summary["activity_breakdown"],
         "content": {
             "profiles": total_profiles,
             "heroes": total_heroes,
@@ -1320,8 +1190,8 @@ def get_usage_stats():
         "top_states": top_states,
         "states_summary": {
             "unique_states": unique_states,
-            "users_with_state": users_with_state,
-            "users_without_state": users_without_state,
+            "users_with_state": summary["users_with_state"],
+            "users_without_state": summary["users_without_state"],
         },
         "daily_active_users": daily_active_users,
         "historical": historical,
@@ -1346,7 +1216,7 @@ def create_flag():
         is_enabled=body.get("is_enabled", False),
     )
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "create_flag", "flag", name)
     return {"flag": flag}, 201
 
@@ -1356,7 +1226,7 @@ def delete_flag(flagName: str):
     _require_admin()
     admin_repo.delete_feature_flag(flagName)
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "delete_flag", "flag", flagName)
     return {"status": "deleted"}
 
@@ -1372,7 +1242,7 @@ def bulk_flag_action():
 
     admin_repo.bulk_flag_action(action)
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "bulk_flag_action", details=action)
     return {"status": "ok", "action": action}
 
@@ -1426,7 +1296,7 @@ def resolve_error(errorId: str):
         ExpressionAttributeValues={":resolved": "resolved", ":true_val": True},
     )
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "resolve_error", "error", errorId)
     return {"status": "resolved", "resolved": True}
 
@@ -1466,7 +1336,7 @@ def update_error(errorId: str):
             ExpressionAttributeValues=values,
         )
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "update_error", "error", errorId, details=json.dumps(body))
     return {"status": "updated"}
 
@@ -1479,7 +1349,7 @@ def delete_error(errorId: str):
         raise NotFoundError(f"Error {errorId} not found")
     table = get_table("admin")
     table.delete_item(Key={"PK": "ERRORS", "SK": item["SK"]})
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "delete_error", "error", errorId)
     return {"status": "deleted"}
 
@@ -1560,7 +1430,7 @@ def bulk_error_action():
     _require_admin()
     body = app.current_event.json_body or {}
     action = body.get("action")
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
 
     if action == "delete_ignored":
         table = get_table("admin")
@@ -1587,14 +1457,13 @@ def list_ai_conversations():
     params = app.current_event.query_string_parameters or {}
     limit = int(params.get("limit", "50"))
 
-    # Scan all conversations across users via admin table or main table query
+    # Scan all conversations across users (newest first needs every item)
     table = get_table("main")
-    resp = table.scan(
+    conversations = list(parallel_scan(
+        table,
         FilterExpression="begins_with(SK, :prefix)",
         ExpressionAttributeValues={":prefix": "AICONV#"},
-        Limit=limit,
-    )
-    conversations = resp.get("Items", [])
+    ))
     conversations.sort(key=lambda c: c.get("created_at", ""), reverse=True)
     # Add routed_to alias for source field (frontend expects routed_to)
     for c in conversations[:limit]:
@@ -1612,12 +1481,11 @@ def list_conversations_alias():
     source_filter = params.get("source_filter")
 
     table = get_table("main")
-    resp = table.scan(
+    conversations = list(parallel_scan(
+        table,
         FilterExpression="begins_with(SK, :prefix)",
         ExpressionAttributeValues={":prefix": "AICONV#"},
-        Limit=limit * 3,  # Over-fetch for filtering
-    )
-    conversations = resp.get("Items", [])
+    ))
 
     # Apply filters
     if rating_filter:
@@ -1650,36 +1518,24 @@ def curate_conversation(convId: str):
 
     # Find and update the conversation
     table = get_table("main")
-    update_parts = []
-    attr_values = {}
-    attr_names = {}
-    for k, v in updates.items():
-        safe_key = f"#{k}"
-        val_key = f":{k}"
-        update_parts.append(f"{safe_key} = {val_key}")
-        attr_names[safe_key] = k
-        attr_values[val_key] = v
-
-    if update_parts:
+    if updates:
         # convId could be the full SK or just the ID part
         sk = convId if convId.startswith("AICONV#") else f"AICONV#{convId}"
 
         # We need to find which user owns this - scan for it
-        resp = table.scan(
+        matches = parallel_scan(
+            table,
+            projection="PK",
             FilterExpression="SK = :sk",
             ExpressionAttributeValues={":sk": sk},
-            Limit=1,
         )
-        items = resp.get("Items", [])
-        if items:
-            table.update_item(
-                Key={"PK": items[0]["PK"], "SK": sk},
-                UpdateExpression="SET " + ", ".join(update_parts),
-                ExpressionAttributeNames=attr_names,
-                ExpressionAttributeValues=attr_values,
-            )
+        owner = next(matches, None)
+        matches.close()
+        if owner:
+            # Through the repo so the curation counters stay in sync
+            ai_repo.rate_conversation(owner["PK"].replace("USER#", "", 1), sk, updates)
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "curate_conversation", "conversation", convId, details=json.dumps(updates))
     return {"status": "updated"}
 
@@ -1687,20 +1543,17 @@ def curate_conversation(convId: str):
 @app.get("/api/admin/conversations/stats")
 def get_conversation_stats():
     _require_admin()
-    table = get_table("main")
-    resp = table.scan(
-        FilterExpression="begins_with(SK, :prefix)",
-        ExpressionAttributeValues={":prefix": "AICONV#"},
-    )
-    conversations = resp.get("Items", [])
+    counters = admin_counters.get_counters()["totals"]
 
-    total = len(conversations)
-    ai_count = sum(1 for c in conversations if c.get("source") == "ai")
-    rules_count = sum(1 for c in conversations if c.get("source") == "rules")
-    rated = sum(1 for c in conversations if c.get("rating") is not None)
-    helpful = sum(1 for c in conversations if c.get("is_helpful") is True)
-    good_examples = sum(1 for c in conversations if c.get("is_good_example"))
-    bad_examples = sum(1 for c in conversations if c.get("is_bad_example"))
+    total = counters["conversations"]
+    ai_count = counters.get("source_ai", 0)
+    rules_count = counters.get("source_rules", 0)
+    rated = counters["conversations_rated"]
+    helpful = counters["conversations_helpful"]
+    good_examples = counters["good_examples"]
+    bad_examples = counters["bad_examples"]
+    cache_hits = counters["answer_cache_hits"]
+    cache_lookups = cache_hits + counters["answer_cache_misses"]
 
     return {
         "total": total,
@@ -1711,9 +1564,15 @@ def get_conversation_stats():
         "ai_percentage": round((ai_count / total * 100) if total else 0, 1),
         "rated": rated,
         "helpful": helpful,
-        "unhelpful": sum(1 for c in conversations if c.get("is_helpful") is False),
+        "unhelpful": counters["conversations_unhelpful"],
         "good_examples": good_examples,
         "bad_examples": bad_examples,
+        "answer_cache": {
+            "hits": cache_hits,
+            "lookups": cache_lookups,
+            "hit_rate": round((cache_hits / cache_lookups * 100) if cache_lookups else 0, 1),
+            "tokens_saved": counters["tokens_saved"],
+        },
     }
 
 
@@ -1723,37 +1582,42 @@ def export_conversations():
     params = app.current_event.query_string_parameters or {}
     fmt = params.get("format", "jsonl")
     filter_type = params.get("filter")
+    if fmt not in ("jsonl", "csv"):
+        raise ValidationError("Format must be jsonl or csv")
 
     table = get_table("main")
-    resp = table.scan(
+    conversations = parallel_scan(
+        table,
         FilterExpression="begins_with(SK, :prefix)",
         ExpressionAttributeValues={":prefix": "AICONV#"},
     )
-    conversations = resp.get("Items", [])
 
     if filter_type == "good":
-        conversations = [c for c in conversations if c.get("is_good_example")]
+        conversations = (c for c in conversations if c.get("is_good_example"))
     elif filter_type == "bad":
-        conversations = [c for c in conversations if c.get("is_bad_example")]
+        conversations = (c for c in conversations if c.get("is_bad_example"))
     elif filter_type == "rated":
-        conversations = [c for c in conversations if c.get("rating") is not None]
+        conversations = (c for c in conversations if c.get("rating") is not None)
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "export_conversations", details=f"format={fmt}, filter={filter_type}")
 
     if fmt == "csv":
-        if not conversations:
-            return {"csv": "", "count": 0}
         headers = ["question", "answer", "source", "provider", "model", "rating", "is_helpful", "created_at"]
-        lines = [",".join(headers)]
-        for c in conversations:
-            row = [str(c.get(h, "")).replace(",", ";").replace("\n", " ") for h in headers]
-            lines.append(",".join(row))
-        return {"csv": "\n".join(lines), "count": len(conversations)}
+        rows = conversations
+    else:
+        headers = None
+        rows = (
+            {"question": c.get("question", ""), "answer": c.get("answer", ""), "source": c.get("source", ""), "rating": c.get("rating")}
+            for c in conversations
+        )
 
-    # JSONL format
-    lines = [json.dumps({"question": c.get("question", ""), "answer": c.get("answer", ""), "source": c.get("source", ""), "rating": c.get("rating")}) for c in conversations]
-    return {"data": "\n".join(lines), "count": len(conversations), "format": fmt}
+    return run_export(
+        "conversations", fmt, rows,
+        filename=f"ai_training_data_{filter_type or 'all'}.{fmt}",
+        headers=headers,
+        created_by=admin_id,
+    )
 
 
 # Alias for frontend path /api/admin/ai/conversations
@@ -1774,139 +1638,150 @@ def ai_export_alias():
 
 # --- Data Integrity ---
 
+def _run_check(results: list, name: str, description: str, severity: str, check) -> None:
+    """Run one integrity check, timing it and reporting a failure as a warning."""
+    started = time.perf_counter()
+    try:
+        result = check()
+    except Exception as e:
+        result = {"status": "warn", "details": f"Check failed: {e}", "count": 0}
+    results.append({
+        "name": name,
+        "description": description,
+        "severity": severity,
+        **result,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
+
+
 @app.get("/api/admin/data-integrity/check")
 def check_data_integrity():
     _require_admin()
     results = []
-    table = get_table("main")
 
-    # 1. Orphaned Profiles - profiles whose user has no METADATA
+    # One scan indexes the keys of every entity type; the checks below are
+    # set differences over it
+    scan_started = time.perf_counter()
     try:
-        profile_resp = table.scan(
-            FilterExpression="begins_with(SK, :prof)",
-            ExpressionAttributeValues={":prof": "PROFILE#"},
-        )
-        orphaned_profiles = []
-        for item in profile_resp.get("Items", []):
-            user_pk = item["PK"]
-            meta = table.get_item(Key={"PK": user_pk, "SK": "METADATA"}).get("Item")
-            if not meta:
-                orphaned_profiles.append(f"{user_pk}/{item['SK']}")
-        count = len(orphaned_profiles)
-        results.append({
-            "name": "Orphaned Profiles",
-            "description": "Profiles without a matching user record",
+        index, scan_error = build_integrity_index(), None
+    except Exception as e:
+        index, scan_error = None, e
+    scan_ms = round((time.perf_counter() - scan_started) * 1000, 1)
+
+    def indexed():
+        if scan_error:
+            raise scan_error
+        return index
+
+    # 1. Orphaned Profiles - profiles whose user has no METADATA
+    def orphaned_profiles():
+        orphaned = [f"{pk}/{sk}" for pk, sk in indexed().orphaned_profiles()]
+        count = len(orphaned)
+        return {
             "status": "fail" if count > 0 else "pass",
             "details": f"{count} orphaned profile(s) found" if count else "All profiles have valid users",
             "count": count,
-            "affected_ids": orphaned_profiles[:20],
-            "severity": "high",
+            "affected_ids": orphaned[:20],
             "fix_action": "clean_orphaned_profiles",
-        })
-    except Exception as e:
-        results.append({"name": "Orphaned Profiles", "description": "Profiles without a matching user record",
-                        "status": "warn", "details": f"Check failed: {e}", "count": 0, "severity": "high"})
+        }
+
+    _run_check(results, "Orphaned Profiles", "Profiles without a matching user record", "high", orphaned_profiles)
 
     # 2. Users Without Profiles
-    try:
-        user_resp = table.scan(
-            FilterExpression="SK = :meta AND begins_with(PK, :u)",
-            ExpressionAttributeValues={":meta": "METADATA", ":u": "USER#"},
-        )
-        no_profile = []
-        for item in user_resp.get("Items", []):
-            user_pk = item["PK"]
-            prof = table.query(
-                KeyConditionExpression="PK = :pk AND begins_with(SK, :prof)",
-                ExpressionAttributeValues={":pk": user_pk, ":prof": "PROFILE#"},
-                Limit=1,
-            )
-            if not prof.get("Items"):
-                no_profile.append(item.get("email", user_pk))
+    def users_without_profiles():
+        no_profile = indexed().users_without_profiles()
         count = len(no_profile)
-        results.append({
-            "name": "Users Without Profiles",
-            "description": "Users who have no profile record",
+        return {
             "status": "warn" if count > 0 else "pass",
             "details": f"{count} user(s) without profiles" if count else "All users have profiles",
             "count": count,
             "affected_ids": no_profile[:20],
-            "severity": "medium",
-        })
-    except Exception as e:
-        results.append({"name": "Users Without Profiles", "description": "Users who have no profile record",
-                        "status": "warn", "details": f"Check failed: {e}", "count": 0, "severity": "medium"})
+        }
 
-    # 3. Invalid Hero References - heroes with names not in heroes.json
-    try:
-        valid_heroes = set()
-        heroes_data = hero_repo.get_all_heroes_reference()
-        for h in heroes_data:
-            valid_heroes.add(h.get("name", "").lower())
+    _run_check(results, "Users Without Profiles", "Users who have no profile record", "medium", users_without_profiles)
 
-        hero_resp = table.scan(
-            FilterExpression="begins_with(PK, :prof) AND begins_with(SK, :hero)",
-            ExpressionAttributeValues={":prof": "PROFILE#", ":hero": "HERO#"},
-        )
-        invalid_refs = []
-        for item in hero_resp.get("Items", []):
-            hero_name = item.get("hero_name", item.get("name", ""))
-            if hero_name and hero_name.lower() not in valid_heroes:
-                invalid_refs.append(f"{hero_name} ({item['PK']})")
+    # 3. Orphaned Heroes - heroes under a profile no user has
+    def orphaned_heroes():
+        orphaned = [f"{h.name} ({h.key[0]})" for h in indexed().orphaned_heroes()]
+        count = len(orphaned)
+        return {
+            "status": "fail" if count > 0 else "pass",
+            "details": f"{count} orphaned hero(es) found" if count else "All heroes belong to a profile",
+            "count": count,
+            "affected_ids": orphaned[:20],
+            "fix_action": "clean_orphaned_heroes",
+        }
+
+    _run_check(results, "Orphaned Heroes", "Heroes whose profile no longer exists", "medium", orphaned_heroes)
+
+    # 4. Invalid Hero References - heroes with names not in heroes.json
+    def invalid_hero_references():
+        valid_heroes = {h.get("name", "").lower() for h in hero_repo.get_all_heroes_reference()}
+        invalid_refs = [
+            f"{h.name} ({h.key[0]})" for h in indexed().heroes
+            if h.name and h.name.lower() not in valid_heroes
+        ]
         count = len(invalid_refs)
-        results.append({
-            "name": "Invalid Hero References",
-            "description": "User heroes referencing names not in heroes.json",
+        return {
             "status": "fail" if count > 0 else "pass",
             "details": f"{count} invalid hero reference(s)" if count else "All hero references are valid",
             "count": count,
             "affected_ids": invalid_refs[:20],
-            "severity": "high",
-        })
-    except Exception as e:
-        results.append({"name": "Invalid Hero References", "description": "User heroes referencing names not in heroes.json",
-                        "status": "warn", "details": f"Check failed: {e}", "count": 0, "severity": "high"})
+        }
 
-    # 4. Hero Values Out of Range
-    try:
-        hero_resp = table.scan(
-            FilterExpression="begins_with(PK, :prof) AND begins_with(SK, :hero)",
-            ExpressionAttributeValues={":prof": "PROFILE#", ":hero": "HERO#"},
-        )
-        out_of_range = []
-        for item in hero_resp.get("Items", []):
-            issues = []
-            if item.get("level", 0) > 80:
-                issues.append(f"level={item['level']}")
-            if item.get("stars", 0) > 5:
-                issues.append(f"stars={item['stars']}")
-            for sk in ["exploration_skill_1_level", "exploration_skill_2_level", "exploration_skill_3_level",
-                        "expedition_skill_1_level", "expedition_skill_2_level", "expedition_skill_3_level"]:
-                if item.get(sk, 0) > 5:
-                    issues.append(f"{sk}={item[sk]}")
-            for gq in ["gear_slot1_quality", "gear_slot2_quality", "gear_slot3_quality", "gear_slot4_quality"]:
-                if item.get(gq, 0) > 7:
-                    issues.append(f"{gq}={item[gq]}")
-            if issues:
-                hero_name = item.get("hero_name", item.get("name", "unknown"))
-                out_of_range.append(f"{hero_name}: {', '.join(issues)}")
+    _run_check(results, "Invalid Hero References", "User heroes referencing names not in heroes.json", "high",
+               invalid_hero_references)
+
+    # 5. Hero Values Out of Range
+    def hero_values_out_of_range():
+        out_of_range = [
+            f"{h.name or 'unknown'}: {', '.join(f'{k}={v}' for k, v in h.issues.items())}"
+            for h in indexed().heroes if h.issues
+        ]
         count = len(out_of_range)
-        results.append({
-            "name": "Hero Values Out of Range",
-            "description": "Heroes with stats exceeding valid maximums",
+        return {
             "status": "warn" if count > 0 else "pass",
             "details": f"{count} hero(es) with out-of-range values" if count else "All hero values within valid ranges",
             "count": count,
             "affected_ids": out_of_range[:20],
-            "severity": "medium",
             "fix_action": "fix_hero_ranges",
-        })
-    except Exception as e:
-        results.append({"name": "Hero Values Out of Range", "description": "Heroes with stats exceeding valid maximums",
-                        "status": "warn", "details": f"Check failed: {e}", "count": 0, "severity": "medium"})
+        }
 
-    # 5. Game Data Files on Lambda filesystem
-    try:
+    _run_check(results, "Hero Values Out of Range", "Heroes with stats exceeding valid maximums", "medium",
+               hero_values_out_of_range)
+
+    # 6. Orphaned Uniqueness Guards - email/username reservations of deleted users
+    def orphaned_guards():
+        orphaned = [f"{pk}/{sk}" for pk, sk in indexed().orphaned_guards()]
+        count = len(orphaned)
+        return {
+            "status": "warn" if count > 0 else "pass",
+            "details": f"{count} guard(s) without a user" if count else "All email/username guards have users",
+            "count": count,
+            "affected_ids": orphaned[:20],
+            "fix_action": "clean_orphaned_guards",
+        }
+
+    _run_check(results, "Orphaned Uniqueness Guards", "Email/username reservations held by missing users", "medium",
+               orphaned_guards)
+
+    # 7. Orphaned Conversations - AI history left behind by missing users
+    def orphaned_conversations():
+        orphaned = indexed().orphaned_conversations()
+        count = sum(orphaned.values())
+        return {
+            "status": "warn" if count > 0 else "pass",
+            "details": (f"{count} conversation(s) from {len(orphaned)} missing user(s)" if count
+                        else "All conversations belong to users"),
+            "count": count,
+            "affected_ids": [f"USER#{u} ({n})" for u, n in sorted(orphaned.items())][:20],
+        }
+
+    _run_check(results, "Orphaned Conversations", "AI conversations without a matching user record", "low",
+               orphaned_conversations)
+
+    # 8. Game Data Files on Lambda filesystem
+    def game_data_files():
         data_dir = Config.DATA_DIR
         json_count = 0
         missing_core = []
@@ -1926,20 +1801,25 @@ def check_data_integrity():
         else:
             status = "pass"
             details = f"{json_count} JSON data files present, all core files found"
-        results.append({
-            "name": "Game Data Files",
-            "description": "Core JSON data files on Lambda filesystem",
+        return {
             "status": status,
             "details": details,
             "count": json_count,
             "affected_ids": missing_core,
-            "severity": "low",
-        })
-    except Exception as e:
-        results.append({"name": "Game Data Files", "description": "Core JSON data files on Lambda filesystem",
-                        "status": "warn", "details": f"Check failed: {e}", "count": 0, "severity": "low"})
+        }
+
+    _run_check(results, "Game Data Files", "Core JSON data files on Lambda filesystem", "low", game_data_files)
 
-    return {"checks": results, "total": len(results), "passing": sum(1 for r in results if r["status"] == "pass")}
+    return {
+        "checks": results,
+        "total": len(results),
+        "passing": sum(1 for r in results if r["status"] == "pass"),
+        "scan": {
+            "items_scanned": index.items_scanned if index else 0,
+            "items_by_type": index.counts if index else {},
+            "duration_ms": scan_ms,
+        },
+    }
 
 
 # --- Game Data ---
@@ -1993,12 +1873,11 @@ def get_game_data_file():
     if not full_path.startswith(os.path.normpath(data_dir)):
         raise ValidationError("Invalid file path")
 
-    if not os.path.exists(full_path):
+    # Includes shared admin edits, which never reach the local file
+    content = load_json(rel_path)
+    if content is None:
         raise NotFoundError(f"File not found: {rel_path}")
 
-    with open(full_path, encoding="utf-8") as f:
-        content = json.load(f)
-
     return {"path": rel_path, "content": content}
 
 
@@ -2019,27 +1898,37 @@ def save_game_data_file():
     if not full_path.startswith(os.path.normpath(data_dir)):
         raise ValidationError("Invalid file path")
 
-    if not os.path.exists(full_path):
+    if load_json(rel_path) is None:
         raise NotFoundError(f"File not found: {rel_path}")
 
-    with open(full_path, "w", encoding="utf-8") as f:
-        json.dump(content, f, indent=2, ensure_ascii=False)
+    save_json(rel_path, content)
 
-    # Clear hero cache if heroes.json was modified
-    if "heroes.json" in rel_path:
-        hero_repo._heroes_cache = None
+    # Invalidate reference caches here and in every other warm container
+    bump_reference_generation(f"game-data:{rel_path}")
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "save_game_data", details=f"path={rel_path}")
 
     return {"status": "saved", "path": rel_path}
 
 
+@app.post("/api/admin/counters/reconcile")
+def reconcile_admin_counters():
+    _require_admin()
+    totals = admin_counters.reconcile_counters()
+
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
+    admin_repo.log_audit(admin_id, "admin", "reconcile_counters", details=json.dumps(totals))
+
+    return {"status": "reconciled", "totals": totals}
+
+
 @app.post("/api/admin/data-integrity/fix/<action>")
 def fix_integrity_issue(action: str):
     _require_admin()
 
-    valid_actions = ("rebuild_hero_cache", "clean_orphaned_profiles", "clean_orphaned_heroes", "fix_hero_ranges")
+    valid_actions = ("rebuild_hero_cache", "clean_orphaned_profiles", "clean_orphaned_heroes",
+                     "clean_orphaned_guards", "fix_hero_ranges")
     if action not in valid_actions:
         raise ValidationError(f"Invalid action. Must be one of: {', '.join(valid_actions)}")
 
@@ -2047,60 +1936,46 @@ def fix_integrity_issue(action: str):
     table = get_table("main")
 
     if action == "rebuild_hero_cache":
-        hero_repo._heroes_cache = None
+        bump_reference_generation("rebuild_hero_cache")
         fixed = 1
 
-    elif action == "clean_orphaned_profiles":
-        # Find profiles whose user doesn't exist
-        resp = table.scan(
-            FilterExpression="begins_with(SK, :prof)",
-            ExpressionAttributeValues={":prof": "PROFILE#"},
-        )
-        for item in resp.get("Items", []):
-            user_pk = item["PK"]  # USER#xxx
-            meta = table.get_item(Key={"PK": user_pk, "SK": "METADATA"}).get("Item")
-            if not meta:
-                table.delete_item(Key={"PK": item["PK"], "SK": item["SK"]})
-                fixed += 1
-
-    elif action == "clean_orphaned_heroes":
-        # Find heroes whose profile doesn't exist
-        resp = table.scan(
-            FilterExpression="begins_with(PK, :prof) AND begins_with(SK, :hero)",
-            ExpressionAttributeValues={":prof": "PROFILE#", ":hero": "HERO#"},
-        )
-        for item in resp.get("Items", []):
-            profile_pk = item["PK"]  # PROFILE#xxx
-            profile_id = profile_pk.replace("PROFILE#", "")
-            # Check if any user has this profile
-            user_resp = table.scan(
-                FilterExpression="begins_with(SK, :prefix) AND profile_id = :pid",
-                ExpressionAttributeValues={":prefix": "PROFILE#", ":pid": profile_id},
-                Limit=1,
-            )
-            if not user_resp.get("Items"):
-                table.delete_item(Key={"PK": item["PK"], "SK": item["SK"]})
-                fixed += 1
+    elif action in ("clean_orphaned_profiles", "clean_orphaned_heroes", "clean_orphaned_guards"):
+        # Same key-set index as the check; deletes go out in 25-item batches
+        index = build_integrity_index()
+        orphaned_profile_heroes = []
+        if action == "clean_orphaned_profiles":
+            keys = index.orphaned_profiles()
+            # Their heroes go in the same batches, or they become orphans themselves
+            orphaned_profile_heroes = [
+                h.key for h in index.heroes_under({sk[len("PROFILE#"):] for _, sk in keys})
+            ]
+            keys = keys + orphaned_profile_heroes
+        elif action == "clean_orphaned_heroes":
+            keys = [h.key for h in index.orphaned_heroes()]
+        else:
+            keys = index.orphaned_guards()
+        batch_delete(table, [{"PK": pk, "SK": sk} for pk, sk in keys])
+        fixed = len(keys)
+        # Counters follow only once the items are actually gone
+        if action == "clean_orphaned_profiles":
+            admin_counters.increment({
+                "profiles": -sum(
+                    1 for pk, sk in keys if pk.startswith("USER#") and sk[len("PROFILE#"):] in index.live_profiles
+                ),
+            })
+            admin_counters.record_heroes(removed=[sk[len("HERO#"):] for _, sk in orphaned_profile_heroes])
+        elif action == "clean_orphaned_heroes":
+            admin_counters.record_heroes(removed=[sk[len("HERO#"):] for _, sk in keys])
 
     elif action == "fix_hero_ranges":
         # Clamp out-of-range hero values
-        resp = table.scan(
+        hero_items = parallel_scan(
+            table,
             FilterExpression="begins_with(PK, :prof) AND begins_with(SK, :hero)",
             ExpressionAttributeValues={":prof": "PROFILE#", ":hero": "HERO#"},
         )
-        for item in resp.get("Items", []):
-            updates = {}
-            if item.get("level", 0) > 80:
-                updates["level"] = 80
-            if item.get("stars", 0) > 5:
-                updates["stars"] = 5
-            for skill_key in ["exploration_skill_1_level", "exploration_skill_2_level", "exploration_skill_3_level",
-                              "expedition_skill_1_level", "expedition_skill_2_level", "expedition_skill_3_level"]:
-                if item.get(skill_key, 0) > 5:
-                    updates[skill_key] = 5
-            for gq_key in ["gear_slot1_quality", "gear_slot2_quality", "gear_slot3_quality", "gear_slot4_quality"]:
-                if item.get(gq_key, 0) > 7:
-                    updates[gq_key] = 7
+        for item in hero_items:
+            updates = {f: HERO_LIMITS[f] for f in hero_range_issues(item)}
             if updates:
                 expr_parts = [f"#{k} = :{k}" for k in updates]
                 table.update_item(
@@ -2111,7 +1986,7 @@ def fix_integrity_issue(action: str):
                 )
                 fixed += 1
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", f"integrity_fix_{action}", details=f"fixed={fixed}")
 
     return {"message": f"Action '{action}' completed", "fixed": fixed}
@@ -2206,12 +2081,11 @@ def _count_entity(cfg: dict) -> int:
     elif cfg.get("sk_prefix"):
         filter_parts.append("begins_with(SK, :skp)")
         expr_vals[":skp"] = cfg["sk_prefix"]
-    resp = table.scan(
+    return parallel_count(
+        table,
         FilterExpression=" AND ".join(filter_parts),
         ExpressionAttributeValues=expr_vals,
-        Select="COUNT",
     )
-    return resp.get("Count", 0)
 
 
 @app.get("/api/admin/database/entities/<entityId>")
@@ -2266,12 +2140,12 @@ def _query_entity(table, cfg: dict, limit: int) -> list:
     elif cfg.get("sk_prefix"):
         filter_parts.append("begins_with(SK, :skp)")
         expr_vals[":skp"] = cfg["sk_prefix"]
-    resp = table.scan(
+    return list(iter_scan(
+        table,
+        limit=limit,
         FilterExpression=" AND ".join(filter_parts),
         ExpressionAttributeValues=expr_vals,
-        Limit=limit,
-    )
-    return resp.get("Items", [])
+    ))
 
 
 # Keep legacy endpoints for backwards compat during transition
@@ -2356,49 +2230,55 @@ def export_data(format: str):
 
     if prefix and prefix.endswith("#"):
         # SK-based prefix filter
-        resp = table.scan(
+        scan = parallel_scan(
+            table,
             FilterExpression="begins_with(SK, :prefix)",
             ExpressionAttributeValues={":prefix": prefix},
         )
     elif prefix:
         # PK-based prefix filter
-        resp = table.scan(
+        scan = parallel_scan(
+            table,
             FilterExpression="begins_with(PK, :prefix)",
             ExpressionAttributeValues={":prefix": prefix},
         )
     else:
-        resp = table.scan()
-
-    items = resp.get("Items", [])
-
-    if format_lower == "json":
-        return {"table": actual_name, "items": items, "count": len(items)}
+        scan = parallel_scan(table)
 
-    if format_lower == "jsonl":
-        # JSONL: one JSON object per line
-        lines = [json.dumps(item, default=str) for item in items]
-        admin_id = get_user_id(app.current_event.raw_event)
-        admin_repo.log_audit(admin_id, "admin", "export_data", "table", actual_name, details=f"format={format}")
-        return {"data": "\n".join(lines), "count": len(items), "format": "jsonl"}
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
+    admin_repo.log_audit(admin_id, "admin", "export_data", "table", actual_name, details=f"format={format}")
 
-    # CSV format
-    if not items:
-        return {"csv": "", "count": 0}
+    # CSV columns are the union of every item's keys
+    return run_export(
+        f"table:{table_name}", format_lower, scan,
+        filename=f"{table_name}_export.{format_lower}",
+        created_by=admin_id,
+    )
 
-    all_keys = set()
-    for item in items:
-        all_keys.update(item.keys())
-    headers = sorted(all_keys)
 
-    lines = [",".join(headers)]
-    for item in items:
-        row = [str(item.get(h, "")).replace(",", ";").replace("\n", " ") for h in headers]
-        lines.append(",".join(row))
+@app.get("/api/admin/export/jobs/<jobId>")
+def get_export(jobId: str):
+    """Export job status with a fresh download URL."""
+    _require_admin()
+    return get_export_job(jobId)
 
-    admin_id = get_user_id(app.current_event.raw_event)
-    admin_repo.log_audit(admin_id, "admin", "export_data", "table", actual_name, details=f"format={format}")
 
-    return {"csv": "\n".join(lines), "count": len(items)}
+@app.get("/api/admin/export/jobs/<jobId>/download")
+def download_export(jobId: str):
+    """The export file itself (local store) or a redirect to its S3 URL."""
+    _require_admin()
+    job, body = open_export(jobId)
+    if body is None:
+        return Response(status_code=302, content_type="text/plain", body="", headers={"Location": job["download_url"]})
+    return Response(
+        status_code=200,
+        content_type=CONTENT_TYPES[job["format"]],
+        body=body,
+        headers={
+            "Content-Encoding": "gzip",
+            "Content-Disposition": f'attachment; filename="{job["filename"]}"',
+        },
+    )
 
 
 # --- Admin Message Threads ---
@@ -2422,13 +2302,16 @@ def list_admin_threads():
     threads = resp.get("Items", [])
 
     # Enrich threads with username
+    users = {
+        u["PK"]: u for u in batch_get_items(
+            get_table("main"),
+            [{"PK": f"USER#{t['user_id']}", "SK": "METADATA"} for t in threads if t.get("user_id")],
+            projection="PK, username, email",
+        )
+    }
     for t in threads:
-        uid = t.get("user_id")
-        if uid:
-            u = user_repo.get_user(uid)
-            t["username"] = u.get("username") or u.get("email", "Unknown") if u else "Unknown"
-        else:
-            t["username"] = "Unknown"
+        u = users.get(f"USER#{t.get('user_id')}")
+        t["username"] = u.get("username") or u.get("email", "Unknown") if u else "Unknown"
         # Extract thread_id from SK
         sk = t.get("SK", "")
         t["thread_id"] = sk.replace("THREAD#", "") if sk.startswith("THREAD#") else sk
@@ -2465,7 +2348,7 @@ def create_admin_thread():
     now = datetime.now(timezone.utc).isoformat()
     thread_id = str(uuid.uuid4())
     message_id = str(uuid.uuid4())
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
 
     table = get_table("admin")
 
@@ -2597,7 +2480,7 @@ def admin_reply_to_thread(threadId: str):
     import uuid
     now = datetime.now(timezone.utc).isoformat()
     message_id = str(uuid.uuid4())
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
 
     # Create message
     msg_item = {
@@ -2692,7 +2575,7 @@ def update_admin_thread(threadId: str):
             kwargs["ExpressionAttributeNames"] = attr_names
         table.update_item(**kwargs)
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "update_thread", "thread", threadId, details=json.dumps(body))
 
     return {"status": "updated"}
@@ -2718,7 +2601,7 @@ def generate_report():
 
     rows = _build_report(report_type, start_date, end_date)
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "generate_report", details=f"type={report_type}")
 
     return {"rows": rows, "type": report_type, "count": len(rows)}
@@ -2743,19 +2626,15 @@ def download_report():
 
     rows = _build_report(report_type, start_date, end_date)
 
-    if not rows:
-        return {"csv": "", "count": 0}
-
-    headers = list(rows[0].keys()) if rows else []
-    lines = [",".join(headers)]
-    for row in rows:
-        line = [str(row.get(h, "")).replace(",", ";").replace("\n", " ").replace("\r", "") for h in headers]
-        lines.append(",".join(line))
-
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "download_report", details=f"type={report_type}, format={fmt}")
 
-    return {"csv": "\n".join(lines), "count": len(rows), "filename": f"{report_type}_report.csv"}
+    return run_export(
+        f"report:{report_type}", "csv", rows,
+        filename=f"{report_type}_report.csv",
+        headers=list(rows[0].keys()) if rows else [],
+        created_by=admin_id,
+    )
 
 
 def _build_report(report_type: str, start_date: str = None, end_date: str = None) -> list:
@@ -2775,18 +2654,11 @@ def _build_report(report_type: str, start_date: str = None, end_date: str = None
 
 def _report_user_summary() -> list:
     """User Summary report."""
-    users = user_repo.list_users(limit=1000)
     rows = []
 
-    for u in users:
-        uid = u.get("user_id")
-        profiles = []
-        try:
-            profiles = profile_repo.get_profiles(uid) if uid else []
-        except Exception:
-            pass
-
-        if not profiles:
+    for user in get_main_table_aggregate().select():
+        u = user.item
+        if not user.profiles:
             rows.append({
                 "Username": u.get("username", ""),
                 "Email": u.get("email", ""),
@@ -2799,14 +2671,8 @@ def _report_user_summary() -> list:
                 "Heroes Tracked": 0,
             })
         else:
-            for p in profiles:
-                profile_id = p.get("SK", "").replace("PROFILE#", "") or p.get("profile_id", "")
-                hero_count = 0
-                if profile_id:
-                    try:
-                        hero_count = len(hero_repo.get_heroes(profile_id))
-                    except Exception:
-                        pass
+            for profile in user.profiles:
+                p = profile.item
                 rows.append({
                     "Username": u.get("username", ""),
                     "Email": u.get("email", ""),
@@ -2816,7 +2682,7 @@ def _report_user_summary() -> list:
                     "Created": u.get("created_at", "")[:10],
                     "Last Login": (u.get("last_login") or "")[:10],
                     "Profile Name": p.get("name", ""),
-                    "Heroes Tracked": hero_count,
+                    "Heroes Tracked": profile.hero_count,
                 })
 
     return rows
@@ -2824,7 +2690,7 @@ def _report_user_summary() -> list:
 
 def _report_activity() -> list:
     """Activity Report."""
-    users = user_repo.list_users(limit=1000)
+    users = [user.item for user in get_main_table_aggregate().select()]
     now = datetime.now(timezone.utc)
     rows = []
 
@@ -2861,34 +2727,20 @@ def _report_activity() -> list:
 
 def _report_content_stats() -> list:
     """Content Statistics report."""
-    users = user_repo.list_users(limit=1000)
     rows = []
 
-    for u in users:
-        uid = u.get("user_id")
-        try:
-            profiles = profile_repo.get_profiles(uid) if uid else []
-        except Exception:
-            profiles = []
-
-        for p in profiles:
-            profile_id = p.get("SK", "").replace("PROFILE#", "") or p.get("profile_id", "")
-            hero_count = 0
-            if profile_id:
-                try:
-                    hero_count = len(hero_repo.get_heroes(profile_id))
-                except Exception:
-                    pass
-
+    for user in get_main_table_aggregate().select():
+        for profile in user.profiles:
+            p = profile.item
             rows.append({
                 "Profile Name": p.get("name", ""),
-                "Username": u.get("username", ""),
+                "Username": user.item.get("username", ""),
                 "State": str(p.get("state_number", "")),
                 "Server Age": p.get("server_age_days", ""),
                 "Furnace Level": p.get("furnace_level", ""),
                 "Spending Profile": p.get("spending_profile", ""),
                 "Alliance Role": p.get("alliance_role", ""),
-                "Heroes Tracked": hero_count,
+                "Heroes Tracked": profile.hero_count,
                 "Inventory Items": 0,
             })
 
@@ -2897,8 +2749,7 @@ def _report_content_stats() -> list:
 
 def _report_hero_usage() -> list:
     """Hero Usage report."""
-    users = user_repo.list_users(limit=1000)
-    hero_counter = Counter()
+    hero_counter = get_main_table_aggregate().summary(include_test=True)["hero_popularity"]
 
     hero_ref = {}
     try:
@@ -2908,25 +2759,6 @@ def _report_hero_usage() -> list:
     except Exception:
         pass
 
-    for u in users:
-        uid = u.get("user_id")
-        try:
-            profiles = profile_repo.get_profiles(uid) if uid else []
-        except Exception:
-            continue
-
-        for p in profiles:
-            profile_id = p.get("SK", "").replace("PROFILE#", "") or p.get("profile_id", "")
-            if profile_id:
-                try:
-                    heroes = hero_repo.get_heroes(profile_id)
-                    for h in heroes:
-                        hname = h.get("hero_name") or h.get("SK", "").replace("HERO#", "")
-                        if hname:
-                            hero_counter[hname] += 1
-                except Exception:
-                    pass
-
     rows = []
     for hero_name, count in hero_counter.most_common():
         ref = hero_ref.get(hero_name, {})
@@ -2979,6 +2811,59 @@ def admin_list_heroes():
     return {"heroes": heroes}
 
 
+@app.get("/api/admin/heroes/<heroName>/skill-scores")
+def admin_hero_skill_scores(heroName: str):
+    """Show how the lineup engine's skill score for a hero breaks down per mode.
+
+    Query params:
+        mode: Restrict to one mode (default: every mode with skill weights)
+        levels: Comma-separated skill levels for skills 1-3 (default: 5,5,5)
+    """
+    _require_admin()
+    params = app.current_event.query_string_parameters or {}
+
+    from engine.recommendation_engine import get_engine
+    table = get_engine().lineup_builder.skill_table
+    if heroName not in table:
+        raise NotFoundError(f"Hero '{heroName}' not found")
+
+    hero_stats = None
+    if params.get("levels"):
+        try:
+            levels = [int(v) for v in params["levels"].split(",")]
+        except ValueError:
+            raise ValidationError("levels must be comma-separated integers")
+        if len(levels) != 3 or not all(1 <= v <= 5 for v in levels):
+            raise ValidationError("levels must be three values between 1 and 5")
+        hero_stats = {}
+        for prefix in ("expedition_skill", "exploration_skill"):
+            hero_stats.update({f"{prefix}_{n}": v for n, v in enumerate(levels, 1)})
+
+    modes = list(table.coefficients[heroName])
+    if params.get("mode"):
+        if params["mode"] not in modes:
+            raise ValidationError(f"No skill weights for mode '{params['mode']}'")
+        modes = [params["mode"]]
+
+    return {
+        "hero": heroName,
+        "modes": {mode: table.breakdown(heroName, mode, hero_stats) for mode in modes},
+    }
+
+
+def _heroes_for_edit() -> dict:
+    """A private copy of heroes.json, including earlier shared edits."""
+    data = copy.deepcopy(load_json("heroes.json") or {})
+    data.setdefault("heroes", [])
+    return data
+
+
+def _save_heroes(data: dict, reason: str) -> None:
+    """Store edited heroes.json and have every container rebuild from it."""
+    save_json("heroes.json", data)
+    bump_reference_generation(reason)
+
+
 @app.post("/api/admin/heroes")
 def admin_create_hero():
     _require_admin()
@@ -2999,9 +2884,7 @@ def admin_create_hero():
         raise ValidationError(f"Hero '{name}' already exists")
 
     # Add to heroes.json
-    heroes_path = os.path.join(Config.DATA_DIR, "heroes.json")
-    with open(heroes_path, encoding="utf-8") as f:
-        data = json.load(f)
+    data = _heroes_for_edit()
 
     new_hero = {
         "name": name,
@@ -3012,13 +2895,10 @@ def admin_create_hero():
     }
     data["heroes"].append(new_hero)
 
-    with open(heroes_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    # Invalidate reference caches across containers
+    _save_heroes(data, f"create_hero:{name}")
 
-    # Clear the in-memory cache
-    hero_repo._heroes_cache = None
-
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "create_hero", "hero", name)
 
     return {"hero": new_hero}, 201
@@ -3029,9 +2909,7 @@ def admin_update_hero(heroName: str):
     _require_admin()
     body = app.current_event.json_body or {}
 
-    heroes_path = os.path.join(Config.DATA_DIR, "heroes.json")
-    with open(heroes_path, encoding="utf-8") as f:
-        data = json.load(f)
+    data = _heroes_for_edit()
 
     hero_idx = None
     for i, h in enumerate(data["heroes"]):
@@ -3047,12 +2925,9 @@ def admin_update_hero(heroName: str):
         if k in allowed:
             data["heroes"][hero_idx][k] = v
 
-    with open(heroes_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-    hero_repo._heroes_cache = None
+    _save_heroes(data, f"update_hero:{heroName}")
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "update_hero", "hero", heroName, details=json.dumps(body))
 
     return {"hero": data["heroes"][hero_idx]}
@@ -3062,9 +2937,7 @@ def admin_update_hero(heroName: str):
 def admin_delete_hero(heroName: str):
     _require_admin()
 
-    heroes_path = os.path.join(Config.DATA_DIR, "heroes.json")
-    with open(heroes_path, encoding="utf-8") as f:
-        data = json.load(f)
+    data = _heroes_for_edit()
 
     original_count = len(data["heroes"])
     data["heroes"] = [h for h in data["heroes"] if h["name"] != heroName]
@@ -3072,12 +2945,9 @@ def admin_delete_hero(heroName: str):
     if len(data["heroes"]) == original_count:
         raise NotFoundError(f"Hero '{heroName}' not found")
 
-    with open(heroes_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-    hero_repo._heroes_cache = None
+    _save_heroes(data, f"delete_hero:{heroName}")
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "delete_hero", "hero", heroName)
 
     return {"status": "deleted"}
@@ -3134,7 +3004,7 @@ def admin_create_item():
 
     table.put_item(Item={k: v for k, v in item.items() if v is not None})
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "create_item", "item", name)
 
     return {"item": item}, 201
@@ -3169,7 +3039,7 @@ def admin_update_item(itemName: str):
             ExpressionAttributeValues=attr_values,
         )
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "update_item", "item", itemName, details=json.dumps(body))
 
     updated = table.get_item(Key={"PK": "ITEM", "SK": itemName})
@@ -3187,13 +3057,14 @@ def admin_delete_item(itemName: str):
 
     table.delete_item(Key={"PK": "ITEM", "SK": itemName})
 
-    admin_id = get_user_id(app.current_event.raw_event)
+    admin_id = get_user_context(app.current_event.raw_event).caller_id
     admin_repo.log_audit(admin_id, "admin", "delete_item", "item", itemName)
 
     return {"status": "deleted"}
 
 
 def lambda_handler(event, context):
+    check_reference_generation()
     try:
         return app.resolve(event, context)
     except AppError as exc:
@@ -1,24 +1,33 @@
-"""AI Advisor Lambda handler."""
+"""AI Advisor Lambda handler.
+
+Questions are answered here in one response (/api/advisor/ask) and, with
+the answer streamed as it is generated, by handlers/advisor_stream.py
+(/api/advisor/ask/stream). Both go through start_ask() and finish_ask().
+"""
 
 import json
 import time
+from typing import Iterator
 
 from aws_lambda_powertools import Logger
 from aws_lambda_powertools.event_handler import APIGatewayHttpResolver
 
-from common.auth import get_effective_user_id
 from common.error_capture import capture_error
 from common.exceptions import AppError, ValidationError, RateLimitError
-from common import ai_repo, profile_repo, hero_repo, user_repo
+from common import ai_repo, user_repo
+from common.user_context import get_user_context
+from common.cache_invalidation import check_reference_generation
 
 app = APIGatewayHttpResolver()
 logger = Logger()
 
 
-@app.post("/api/advisor/ask")
-def ask_advisor():
-    user_id = get_effective_user_id(app.current_event.raw_event)
-    body = app.current_event.json_body or {}
+def start_ask(ctx, body: dict):
+    """Validate the request, load the asker and apply rate limits.
+
+    Returns:
+        (question, thread_id, remaining AI requests)
+    """
 
     question = body.get("question", "").strip()
     if not question:
@@ -26,45 +35,47 @@ def ask_advisor():
 
     thread_id = body.get("thread_id")
 
+    # Load user, profile and heroes together
+    ctx.load(heroes=True)
+
     # Check rate limits
-    user = user_repo.get_user(user_id)
     settings = ai_repo.get_ai_settings()
-    allowed, message, remaining = ai_repo.check_rate_limit(user or {}, settings)
+    allowed, message, remaining = ai_repo.check_rate_limit(ctx.user or {}, settings)
     if not allowed:
         raise RateLimitError(message)
 
-    # Load user context
-    profile = profile_repo.get_or_create_profile(user_id)
-    profile_id = profile["profile_id"]
-    heroes = hero_repo.get_heroes(profile_id)
+    return question, thread_id, remaining
 
-    # Try rules engine first, fall back to AI
-    from engine.recommendation_engine import get_engine
-    engine = get_engine()
-
-    start_ms = int(time.time() * 1000)
-    result = engine.ask(profile=profile, user_heroes=heroes, question=question)
-    elapsed_ms = int(time.time() * 1000) - start_ms
 
+def finish_ask(ctx, question, thread_id, remaining, result, cache_hit, elapsed_ms, first_token_ms=None):
+    """Log the conversation and update counters once the answer is complete."""
+    profile = ctx.profile
     source = result.get("source", "rules")
     answer = result.get("answer", "")
     logger.info("Advisor response", extra={
         "question": question[:100],
         "source": source,
+        "cache_hit": cache_hit,
         "elapsed_ms": elapsed_ms,
+        "first_token_ms": first_token_ms,
         "answer_preview": answer[:100] if answer else "",
-        "hero_count": len(heroes),
+        "hero_count": len(ctx.heroes),
         "profile_furnace": profile.get("furnace_level") if isinstance(profile, dict) else None,
     })
     provider = result.get("provider", "rules")
     model = result.get("model", "rule_engine")
     tokens_in = result.get("tokens_input", 0)
     tokens_out = result.get("tokens_output", 0)
+    tokens_saved = 0
+    if cache_hit:
+        # Nothing was spent on this answer; record what the original cost
+        tokens_saved = tokens_in + tokens_out
+        tokens_in = tokens_out = 0
 
     # Log conversation
     conversation = ai_repo.log_conversation(
-        user_id=user_id,
-        profile_id=profile_id,
+        user_id=ctx.user_id,
+        profile_id=ctx.profile_id,
         question=question,
         answer=answer,
         source=source,
@@ -74,24 +85,90 @@ def ask_advisor():
         tokens_output=tokens_out,
         response_time_ms=elapsed_ms,
         thread_id=thread_id,
+        answer_cache="hit" if cache_hit else "miss",
+        tokens_saved=tokens_saved,
     )
 
     # Increment AI request counter if AI was used
-    if source == "ai":
-        user_repo.increment_ai_requests(user_id)
+    ai_used = source == "ai" and not cache_hit
+    if ai_used:
+        user_repo.increment_ai_requests(ctx.user_id)
 
     return {
         "answer": answer,
         "source": source,
+        "cached": cache_hit,
         "conversation_id": conversation.get("SK"),
         "thread_id": thread_id,
-        "remaining_requests": remaining - (1 if source == "ai" else 0),
+        "remaining_requests": remaining - (1 if ai_used else 0),
     }
 
 
+@app.post("/api/advisor/ask")
+def ask_advisor():
+    ctx = get_user_context(app.current_event.raw_event)
+    question, thread_id, remaining = start_ask(ctx, app.current_event.json_body or {})
+
+    # Near-duplicate questions from the same bracket reuse a cached answer;
+    # otherwise try rules engine first, fall back to AI
+    from engine.answer_cache import get_cached_answer, store_answer
+    from engine.recommendation_engine import get_data_version, get_engine
+
+    start_ms = int(time.time() * 1000)
+    cache_key, result = get_cached_answer(question, ctx.profile, ctx.heroes, version=get_data_version())
+    cache_hit = result is not None
+    if not cache_hit:
+        engine = get_engine()
+        result = engine.ask(profile=ctx.profile, user_heroes=ctx.heroes, question=question)
+        store_answer(cache_key, result)
+    elapsed_ms = int(time.time() * 1000) - start_ms
+
+    return finish_ask(ctx, question, thread_id, remaining, result, cache_hit, elapsed_ms)
+
+
+def sse(event: str, data: dict) -> str:
+    """One server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def stream_answer(ctx, question, thread_id, remaining) -> Iterator[str]:
+    """Server-sent events for one question: "delta" text as it is generated,
+    then "done" with the same body /api/advisor/ask returns.
+
+    The conversation is logged (and counters updated) only after the
+    provider stream has closed, so a log entry always has the full answer.
+    """
+    from engine.answer_cache import get_cached_answer, store_answer
+    from engine.recommendation_engine import get_data_version, get_engine
+
+    start = time.perf_counter()
+    first_token_ms = None
+    cache_key, result = get_cached_answer(question, ctx.profile, ctx.heroes, version=get_data_version())
+    cache_hit = result is not None
+    if cache_hit:
+        events = iter([{"type": "delta", "text": result.get("answer", "")}, {"type": "done", "result": result}])
+    else:
+        events = get_engine().ask_stream(profile=ctx.profile, user_heroes=ctx.heroes, question=question)
+
+    for event in events:
+        if event["type"] == "delta":
+            if first_token_ms is None:
+                first_token_ms = int((time.perf_counter() - start) * 1000)
+            yield sse("delta", {"text": event["text"]})
+        else:
+            result = event["result"]
+    elapsed_ms = int((time.perf_counter() - start) * 1000)
+
+    if not cache_hit:
+        store_answer(cache_key, result)
+    yield sse("done", finish_ask(
+        ctx, question, thread_id, remaining, result, cache_hit, elapsed_ms, first_token_ms,
+    ))
+
+
 @app.get("/api/advisor/history")
 def get_history():
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     params = app.current_event.query_string_parameters or {}
     limit = int(params.get("limit", "10"))
 
@@ -101,14 +178,14 @@ def get_history():
 
 @app.delete("/api/advisor/history")
 def clear_history():
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     count = ai_repo.delete_conversation_history(user_id)
     return {"deleted": count}
 
 
 @app.post("/api/advisor/delete")
 def delete_conversation():
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     body = app.current_event.json_body or {}
 
     thread_id = body.get("thread_id")
@@ -125,7 +202,7 @@ def delete_conversation():
 
 @app.post("/api/advisor/rate")
 def rate_conversation():
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     body = app.current_event.json_body or {}
 
     conversation_sk = body.get("conversation_sk")
@@ -144,7 +221,7 @@ def rate_conversation():
 
 @app.get("/api/advisor/favorites")
 def get_favorites():
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     params = app.current_event.query_string_parameters or {}
     limit = int(params.get("limit", "20"))
 
@@ -155,7 +232,7 @@ def get_favorites():
 
 @app.post("/api/advisor/favorite")
 def toggle_favorite():
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     body = app.current_event.json_body or {}
     conv_sk = body.get("conversation_sk")
     if not conv_sk:
@@ -173,8 +250,7 @@ def toggle_favorite():
 
 @app.get("/api/advisor/status")
 def get_advisor_status():
-    user_id = get_effective_user_id(app.current_event.raw_event)
-    user = user_repo.get_user(user_id)
+    user = get_user_context(app.current_event.raw_event).user
     settings = ai_repo.get_ai_settings()
     allowed, message, remaining = ai_repo.check_rate_limit(user or {}, settings)
 
@@ -184,7 +260,7 @@ def get_advisor_status():
     user_daily_limit = (user or {}).get("ai_daily_limit")
     if user_daily_limit is None:
         user_daily_limit = settings.get("daily_limit_admin", 1000) if role == "admin" else settings.get("daily_limit_free", 20)
-    return {
+    status = {
         "ai_enabled": mode != "off",
         "mode": mode,
         "daily_limit": user_daily_limit,
@@ -192,11 +268,16 @@ def get_advisor_status():
         "requests_remaining": remaining,
         "primary_provider": settings.get("primary_provider", "openai"),
     }
+    if role == "admin":
+        # Latency histograms of this container's provider calls
+        from engine.ai_clients import get_latency_stats
+        status["provider_latency"] = get_latency_stats()
+    return status
 
 
 @app.get("/api/advisor/threads")
 def get_threads():
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     params = app.current_event.query_string_parameters or {}
     limit = int(params.get("limit", "10"))
 
@@ -222,7 +303,7 @@ def get_threads():
 
 @app.get("/api/advisor/threads/<threadId>")
 def get_thread_messages(threadId: str):
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
 
     # Get all conversations and filter by thread_id
     conversations = ai_repo.get_conversation_history(user_id, limit=100)
@@ -234,6 +315,7 @@ def get_thread_messages(threadId: str):
 
 
 def lambda_handler(event, context):
+    check_reference_generation()
     try:
         return app.resolve(event, context)
     except AppError as exc:
@@ -0,0 +1,160 @@
+"""Streamed AI Advisor answers over a Lambda Function URL.
+
+API Gateway HTTP APIs buffer a Lambda's whole response, and the Python
+managed runtime cannot stream a handler's return value, so
+/api/advisor/ask/stream is served by this small HTTP server instead. The
+Lambda Web Adapter layer starts it (run_stream.sh) and forwards Function
+URL requests to it with AWS_LWA_INVOKE_MODE=response_stream, so every
+server-sent event written here reaches the browser as soon as it is
+flushed. CloudFront routes the path to the Function URL, next to the rest
+of /api.
+
+A Function URL has no Cognito authorizer in front of it: the caller's
+access token is checked with Cognito GetUser (which rejects expired,
+revoked and forged tokens) and must have been issued to this app's client.
+The verified claims go where the handlers expect the authorizer's.
+
+Run locally (with AI_PROVIDER=fake for an offline provider):
+    cd backend && python -m handlers.advisor_stream
+"""
+
+import base64
+import json
+import logging
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from common.cache_invalidation import check_reference_generation
+from common.config import Config
+from common.error_capture import capture_error
+from common.exceptions import AppError, AuthenticationError, ValidationError
+from common.user_context import get_user_context
+from handlers.advisor import sse, start_ask, stream_answer
+
+logger = logging.getLogger(__name__)
+
+STREAM_PATH = "/api/advisor/ask/stream"
+MAX_BODY_BYTES = 64 * 1024
+
+_cognito = None
+
+
+def _cognito_client():
+    global _cognito
+    if _cognito is None:
+        import boto3
+        _cognito = boto3.client("cognito-idp", region_name=Config.REGION)
+    return _cognito
+
+
+def _token_payload(token: str) -> dict:
+    """Claims of a JWT, without checking its signature."""
+    try:
+        payload = token.split(".")[1]
+        return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (IndexError, ValueError):
+        raise AuthenticationError("Missing or invalid authentication token")
+
+
+def authenticate(headers: dict) -> dict:
+    """Claims (sub, email) of the Cognito access token in the Authorization header."""
+    auth = headers.get("authorization", "")
+    if not auth.lower().startswith("bearer "):
+        raise AuthenticationError("Missing or invalid authentication token")
+    token = auth[len("bearer "):].strip()
+    payload = _token_payload(token)
+    if payload.get("token_use") != "access" or (
+        Config.USER_POOL_CLIENT_ID and payload.get("client_id") != Config.USER_POOL_CLIENT_ID
+    ):
+        raise AuthenticationError("Missing or invalid authentication token")
+
+    from botocore.exceptions import ClientError
+    try:
+        resp = _cognito_client().get_user(AccessToken=token)
+    except ClientError:
+        raise AuthenticationError("Missing or invalid authentication token")
+    return {attr["Name"]: attr["Value"] for attr in resp.get("UserAttributes", [])}
+
+
+class AdvisorStreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+    def do_GET(self):
+        # The Web Adapter's readiness check
+        self._send_json(200, {"status": "ok"})
+
+    def do_POST(self):
+        if self.path.split("?")[0] != STREAM_PATH:
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        check_reference_generation()
+        headers = {k.lower(): v for k, v in self.headers.items()}
+        event = {"headers": headers, "requestContext": {}}
+        try:
+            length = int(headers.get("content-length") or 0)
+            if length > MAX_BODY_BYTES:
+                raise ValidationError("Request body too large")
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                raise ValidationError("Request body must be JSON")
+            if not isinstance(body, dict):
+                raise ValidationError("Request body must be a JSON object")
+            event["requestContext"] = {"authorizer": {"jwt": {"claims": authenticate(headers)}}}
+            ctx = get_user_context(event)
+            question, thread_id, remaining = start_ask(ctx, body)
+        except AppError as exc:
+            logger.warning("Application error: %s", exc.message)
+            self._send_json(exc.status_code, {"error": exc.message})
+            return
+        except Exception as exc:
+            logger.exception("Unhandled error in advisor stream")
+            capture_error("advisor_stream", event, exc, logger)
+            self._send_json(500, {"error": "Internal server error"})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for chunk in stream_answer(ctx, question, thread_id, remaining):
+                self._write_chunk(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            logger.info("Client closed the advisor stream")
+            return
+        except Exception as exc:
+            logger.exception("Advisor stream failed")
+            capture_error("advisor_stream", event, exc, logger)
+            self._write_chunk(sse("error", {"error": "Internal server error"}))
+        self._write_chunk("")
+
+    def _write_chunk(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, data: dict) -> None:
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    logging.basicConfig(level=os.environ.get("POWERTOOLS_LOG_LEVEL", "INFO"))
+    port = int(os.environ.get("PORT", "8080"))
+    server = ThreadingHTTPServer(("127.0.0.1", port), AdvisorStreamHandler)
+    logger.info("Advisor stream server listening on %d", port)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -17,10 +17,11 @@ from aws_lambda_powertools.event_handler.exceptions import (
     UnauthorizedError,
 )
 
-from common.auth import get_user_id, get_user_email, get_effective_user_id
+from common.auth import get_user_email, get_effective_user_id
 from common.config import Config
 from common.error_capture import capture_error
 from common.exceptions import AppError, ValidationError, ConflictError
+from common.user_context import get_user_context
 from common.rate_limit import check_rate_limit, record_failed_attempt, clear_attempts, TooManyRequestsError
 from common.user_repo import (
     get_user,
@@ -97,7 +98,7 @@ def _rekey_legacy_user(legacy_user: dict, new_sub: str) -> dict:
     DynamoDB records still use the old legacy UUID as PK. This function
     copies all records to the new Cognito sub PK and cleans up the old ones.
     """
-    from common.db import get_table
+    from common.db import get_table, iter_query
 
     table = get_table("main")
     old_id = legacy_user["user_id"]
@@ -115,10 +116,7 @@ def _rekey_legacy_user(legacy_user: dict, new_sub: str) -> dict:
     table.put_item(Item=new_user)
 
     # 2. Query all items under old USER# PK (profiles, logins, etc.)
-    old_items = table.query(
-        KeyConditionExpression="PK = :pk",
-        ExpressionAttributeValues={":pk": f"USER#{old_id}"},
-    ).get("Items", [])
+    old_items = list(iter_query(table, f"USER#{old_id}"))
 
     for item in old_items:
         sk = item["SK"]
@@ -462,10 +460,11 @@ def confirm_reset():
 def me():
     """Return current user's profile from JWT claims + DynamoDB."""
     event = app.current_event.raw_event
-    user_id = get_user_id(event)
+    ctx = get_user_context(event)
+    user_id = ctx.caller_id
     email = get_user_email(event)
 
-    user = get_user(user_id)
+    user = ctx.get_user(user_id)
     if not user:
         # First time this Cognito user hits /me -- create a record
         user = create_user(user_id=user_id, email=email, username=email)
@@ -5,10 +5,10 @@ import json
 from aws_lambda_powertools import Logger
 from aws_lambda_powertools.event_handler import APIGatewayHttpResolver
 
-from common.auth import get_effective_user_id
 from common.error_capture import capture_error
 from common.exceptions import AppError, ValidationError
-from common import chief_repo, profile_repo
+from common import chief_repo
+from common.user_context import get_user_context
 
 app = APIGatewayHttpResolver()
 logger = Logger()
@@ -16,16 +16,12 @@ logger = Logger()
 
 def _get_profile_id() -> str:
     """Get the active profile ID for the current user."""
-    user_id = get_effective_user_id(app.current_event.raw_event)
-    profile = profile_repo.get_or_create_profile(user_id)
-    return profile["profile_id"]
+    return get_user_context(app.current_event.raw_event).profile_id
 
 
 @app.get("/api/chief/gear")
 def get_gear():
-    profile_id = _get_profile_id()
-    gear = chief_repo.get_chief_gear(profile_id)
-    return {"gear": gear}
+    return {"gear": get_user_context(app.current_event.raw_event).chief_gear}
 
 
 @app.put("/api/chief/gear")
@@ -52,9 +48,7 @@ def update_gear():
 
 @app.get("/api/chief/charms")
 def get_charms():
-    profile_id = _get_profile_id()
-    charms = chief_repo.get_chief_charms(profile_id)
-    return {"charms": charms}
+    return {"charms": get_user_context(app.current_event.raw_event).chief_charms}
 
 
 @app.put("/api/chief/charms")
@@ -1,31 +1,34 @@
 """General routes Lambda handler (dashboard, events, inbox, feedback, lineups)."""
 
 import json
-import os
 
+from boto3.dynamodb.conditions import Attr
 from aws_lambda_powertools import Logger
 from aws_lambda_powertools.event_handler import APIGatewayHttpResolver
 
-from common.auth import get_effective_user_id
+from common.user_context import get_user_context
 from common.error_capture import capture_error
 from common.exceptions import AppError, ValidationError, NotFoundError
-from common.config import Config
-from common import profile_repo, hero_repo, admin_repo, user_repo, ai_repo
-from common.db import get_table
+from common import admin_counters, profile_repo, hero_repo, admin_repo, user_repo, ai_repo, result_cache
+from common.db import count_query, get_table, iter_query
+from common.reference_data import load_json
+from common.cache_invalidation import check_reference_generation
 
 app = APIGatewayHttpResolver()
 logger = Logger()
 
+LINEUP_REASONING_FILE = "guides/hero_lineup_reasoning.json"
+MAX_LINEUP_TOP_K = 10
+MAX_MARCHES = 8
+
 
 # --- Dashboard ---
 
 @app.get("/api/dashboard")
 def get_dashboard():
-    user_id = get_effective_user_id(app.current_event.raw_event)
-    profile = profile_repo.get_or_create_profile(user_id)
-    profile_id = profile["profile_id"]
-
-    heroes = hero_repo.get_heroes(profile_id)
+    ctx = get_user_context(app.current_event.raw_event).load(heroes=True)
+    user_id = ctx.user_id
+    profile, heroes = ctx.profile, ctx.heroes
     profiles = profile_repo.get_profiles(user_id)
 
     # Active announcements
@@ -52,17 +55,11 @@ def get_dashboard():
         furnace_display = "Lv.1"
 
     # Load total hero count from reference data
-    heroes_path = os.path.join(Config.DATA_DIR, "heroes.json")
-    total_heroes = 0
-    try:
-        with open(heroes_path, encoding="utf-8") as f:
-            heroes_data = json.load(f)
-        total_heroes = len(heroes_data.get("heroes", []))
-    except Exception:
-        pass
+    heroes_data = load_json("heroes.json", default={})
+    total_heroes = len(heroes_data.get("heroes", []))
 
     # Get user info
-    user = user_repo.get_user(user_id)
+    user = ctx.user
 
     return {
         "profile": profile,
@@ -84,13 +81,10 @@ def get_dashboard():
 
 @app.get("/api/events")
 def get_events():
-    events_path = os.path.join(Config.DATA_DIR, "events.json")
-    if not os.path.exists(events_path):
+    data = load_json("events.json")
+    if data is None:
         return {"events": []}
 
-    with open(events_path, encoding="utf-8") as f:
-        data = json.load(f)
-
     return {"events": data.get("events", data) if isinstance(data, dict) else data}
 
 
@@ -98,19 +92,15 @@ def get_events():
 def get_events_guide():
     """Return full events guide data for the frontend events page."""
     # Use the dedicated guide file which matches the frontend's expected format
-    guide_path = os.path.join(Config.DATA_DIR, "events_guide.json")
-    if os.path.exists(guide_path):
-        with open(guide_path, encoding="utf-8") as f:
-            return json.load(f)
+    guide = load_json("events_guide.json")
+    if guide is not None:
+        return guide
 
     # Fallback to events.json (old format, may not work with frontend)
-    events_path = os.path.join(Config.DATA_DIR, "events.json")
-    if not os.path.exists(events_path):
+    data = load_json("events.json")
+    if data is None:
         return {"events": {}, "cost_categories": {}, "priority_tiers": {}}
 
-    with open(events_path, encoding="utf-8") as f:
-        data = json.load(f)
-
     return data
 
 
@@ -118,18 +108,10 @@ def get_events_guide():
 
 @app.get("/api/inbox")
 def get_inbox():
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     table = get_table("main")
 
-    resp = table.query(
-        KeyConditionExpression="PK = :pk AND begins_with(SK, :prefix)",
-        ExpressionAttributeValues={
-            ":pk": f"USER#{user_id}",
-            ":prefix": "NOTIF#",
-        },
-        ScanIndexForward=False,
-    )
-    raw_notifications = resp.get("Items", [])
+    raw_notifications = iter_query(table, f"USER#{user_id}", sk_begins_with="NOTIF#", scan_forward=False)
 
     # Transform DynamoDB items into the shape the frontend expects
     notifications = []
@@ -160,7 +142,7 @@ def get_inbox():
 
 @app.post("/api/inbox/<notificationId>/dismiss")
 def dismiss_notification(notificationId: str):
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     table = get_table("main")
 
     table.update_item(
@@ -175,7 +157,7 @@ def dismiss_notification(notificationId: str):
 
 @app.post("/api/feedback")
 def submit_feedback():
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     body = app.current_event.json_body or {}
 
     category = body.get("category", "general")
@@ -201,18 +183,10 @@ def submit_feedback():
 
 @app.get("/api/inbox/notifications")
 def get_notifications():
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     table = get_table("main")
 
-    resp = table.query(
-        KeyConditionExpression="PK = :pk AND begins_with(SK, :prefix)",
-        ExpressionAttributeValues={
-            ":pk": f"USER#{user_id}",
-            ":prefix": "NOTIF#",
-        },
-        ScanIndexForward=False,
-    )
-    raw_notifications = resp.get("Items", [])
+    raw_notifications = iter_query(table, f"USER#{user_id}", sk_begins_with="NOTIF#", scan_forward=False)
 
     # Transform DynamoDB items into the shape the frontend expects
     notifications = []
@@ -248,7 +222,7 @@ def get_notifications():
 
 @app.post("/api/inbox/notifications/<notificationId>/read")
 def mark_notification_read(notificationId: str):
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     table = get_table("main")
 
     table.update_item(
@@ -261,33 +235,24 @@ def mark_notification_read(notificationId: str):
 
 @app.get("/api/inbox/unread-count")
 def get_unread_count():
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     table = get_table("main")
 
-    resp = table.query(
-        KeyConditionExpression="PK = :pk AND begins_with(SK, :prefix)",
-        ExpressionAttributeValues={
-            ":pk": f"USER#{user_id}",
-            ":prefix": "NOTIF#",
-        },
-    )
-    notifications = resp.get("Items", [])
+    notifications = iter_query(table, f"USER#{user_id}", sk_begins_with="NOTIF#")
     unread = sum(1 for n in notifications if not n.get("dismissed") and not n.get("is_read"))
 
     # For admins, include unresolved error count
     error_count = 0
     try:
-        from common.auth import is_admin
-        if is_admin(app.current_event.raw_event):
+        if get_user_context(app.current_event.raw_event).is_admin:
             admin_table = get_table("admin")
-            error_resp = admin_table.query(
+            error_count = count_query(
+                admin_table,
                 KeyConditionExpression="PK = :pk",
                 FilterExpression="attribute_not_exists(#s) OR #s = :new",
                 ExpressionAttributeNames={"#s": "status"},
                 ExpressionAttributeValues={":pk": "ERRORS", ":new": "new"},
-                Select="COUNT",
             )
-            error_count = error_resp.get("Count", 0)
     except Exception:
         pass  # Don't break unread count if error query fails
 
@@ -297,22 +262,14 @@ def get_unread_count():
 @app.get("/api/inbox/threads")
 def get_inbox_threads():
     """Get message threads for the current user."""
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     admin_table = get_table("admin")
 
-    # Query all threads - filter by user_id
-    resp = admin_table.query(
-        KeyConditionExpression="PK = :pk AND begins_with(SK, :prefix)",
-        ExpressionAttributeValues={
-            ":pk": "THREADS",
-            ":prefix": "THREAD#",
-        },
-        ScanIndexForward=False,
+    # Query all threads, keeping only this user's
+    user_threads = iter_query(
+        admin_table, "THREADS", sk_begins_with="THREAD#", scan_forward=False,
+        filter_expression=Attr("user_id").eq(user_id),
     )
-    all_threads = resp.get("Items", [])
-
-    # Filter to only this user's threads
-    user_threads = [t for t in all_threads if t.get("user_id") == user_id]
 
     # Transform for frontend
     threads = []
@@ -336,7 +293,7 @@ def get_inbox_threads():
 @app.get("/api/inbox/threads/<threadId>/messages")
 def get_thread_messages(threadId: str):
     """Get messages in a thread for the current user."""
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     admin_table = get_table("admin")
 
     # Verify the thread belongs to this user
@@ -346,15 +303,7 @@ def get_thread_messages(threadId: str):
         return {"messages": []}
 
     # Get messages
-    msg_resp = admin_table.query(
-        KeyConditionExpression="PK = :pk AND begins_with(SK, :prefix)",
-        ExpressionAttributeValues={
-            ":pk": f"THREAD#{threadId}",
-            ":prefix": "MSG#",
-        },
-        ScanIndexForward=True,
-    )
-    messages = msg_resp.get("Items", [])
+    messages = list(iter_query(admin_table, f"THREAD#{threadId}", sk_begins_with="MSG#"))
 
     # Mark thread as read by user
     if not thread.get("is_read_by_user"):
@@ -379,7 +328,7 @@ def get_thread_messages(threadId: str):
 @app.post("/api/inbox/threads/<threadId>/reply")
 def reply_to_thread(threadId: str):
     """User replies to a thread."""
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     body = app.current_event.json_body or {}
     content = body.get("content", "").strip()
 
@@ -454,10 +403,9 @@ def _get_lineup_templates_from_code():
 @app.get("/api/lineups/templates")
 def get_lineup_templates():
     """Return lineup template metadata (no auth required)."""
-    lineup_path = os.path.join(Config.DATA_DIR, "guides", "hero_lineup_reasoning.json")
-    if os.path.exists(lineup_path):
-        with open(lineup_path, encoding="utf-8") as f:
-            return json.load(f)
+    data = load_json(LINEUP_REASONING_FILE)
+    if data is not None:
+        return data
     # Fallback: use LINEUP_TEMPLATES from code
     return _get_lineup_templates_from_code()
 
@@ -465,11 +413,8 @@ def get_lineup_templates():
 @app.get("/api/lineups/template/<gameMode>")
 def get_lineup_template(gameMode: str):
     """Return specific lineup template details (no auth required)."""
-    lineup_path = os.path.join(Config.DATA_DIR, "guides", "hero_lineup_reasoning.json")
-    if os.path.exists(lineup_path):
-        with open(lineup_path, encoding="utf-8") as f:
-            data = json.load(f)
-
+    data = load_json(LINEUP_REASONING_FILE)
+    if data is not None:
         # Templates live under lineup_scenarios; try exact match then prefix match
         scenarios = data.get("lineup_scenarios", {}) if isinstance(data, dict) else {}
         template = scenarios.get(gameMode)
@@ -510,10 +455,8 @@ def get_general_lineup(gameMode: str):
     except Exception as e:
         logger.warning(f"General lineup failed, returning template: {e}")
         # Fall back to template data
-        lineup_path = os.path.join(Config.DATA_DIR, "guides", "hero_lineup_reasoning.json")
-        if os.path.exists(lineup_path):
-            with open(lineup_path, encoding="utf-8") as f:
-                data = json.load(f)
+        data = load_json(LINEUP_REASONING_FILE)
+        if data is not None:
             scenarios = data.get("lineup_scenarios", {}) if isinstance(data, dict) else {}
             template = scenarios.get(gameMode, {})
             if not template:
@@ -527,35 +470,93 @@ def get_general_lineup(gameMode: str):
 
 @app.get("/api/lineups/build/<gameMode>")
 def build_lineup_for_mode(gameMode: str):
-    """Build personalized lineup for a specific game mode (auth required)."""
-    user_id = get_effective_user_id(app.current_event.raw_event)
-    profile = profile_repo.get_or_create_profile(user_id)
-    profile_id = profile["profile_id"]
-    heroes = hero_repo.get_heroes(profile_id)
+    """Build personalized lineup for a specific game mode (auth required).
+
+    Query params:
+        top_k: Also return the next best lineups using other heroes (1-MAX_LINEUP_TOP_K)
+        exclude: Comma-separated hero names already committed to other marches
+    """
+    params = app.current_event.query_string_parameters or {}
+    try:
+        top_k = int(params.get("top_k", "1"))
+    except ValueError:
+        raise ValidationError("top_k must be an integer")
+    if not 1 <= top_k <= MAX_LINEUP_TOP_K:
+        raise ValidationError(f"top_k must be between 1 and {MAX_LINEUP_TOP_K}")
+    exclude = [name.strip() for name in params.get("exclude", "").split(",") if name.strip()]
+
+    ctx = get_user_context(app.current_event.raw_event).load(heroes=True)
+    profile, heroes = ctx.profile, ctx.heroes
 
     try:
         from engine.recommendation_engine import get_engine
         engine = get_engine()
-        result = engine.get_lineup(gameMode, user_heroes=heroes, profile=profile)
+        result = engine.get_lineup(
+            gameMode, user_heroes=heroes, profile=profile, top_k=top_k, exclude=exclude,
+        )
         return result
     except Exception as e:
         logger.warning(f"Personalized lineup failed: {e}")
         return {"game_mode": gameMode, "heroes": [], "troop_ratio": {"infantry": 50, "lancer": 20, "marksman": 30}, "notes": "Unable to generate lineup. Add heroes to your tracker.", "confidence": "none", "recommended_to_get": []}
 
 
+@app.post("/api/lineups/allocate")
+def allocate_marches():
+    """Allocate heroes across simultaneous marches without double-booking (auth required).
+
+    Body:
+        marches: List of mode names or {"mode": ..., "weight": ...} objects;
+            modes may repeat (e.g. three "rally_joiner_attack")
+        exclude: Optional list of hero names to leave out
+    """
+    from engine.analyzers.lineup_builder import LINEUP_TEMPLATES
+
+    body = app.current_event.json_body or {}
+
+    raw_marches = body.get("marches")
+    if not isinstance(raw_marches, list) or not raw_marches:
+        raise ValidationError("marches must be a non-empty list")
+    if len(raw_marches) > MAX_MARCHES:
+        raise ValidationError(f"At most {MAX_MARCHES} marches can be allocated at once")
+
+    marches = []
+    for entry in raw_marches:
+        if isinstance(entry, str):
+            mode, weight = entry, 1.0
+        elif isinstance(entry, dict):
+            mode, weight = entry.get("mode"), entry.get("weight", 1.0)
+        else:
+            raise ValidationError("Each march must be a mode name or a {mode, weight} object")
+        if not isinstance(mode, str) or mode not in LINEUP_TEMPLATES:
+            raise ValidationError(f"Unknown game mode: {mode}")
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight <= 0:
+            raise ValidationError(f"Weight for {mode} must be a positive number")
+        marches.append((mode, float(weight)))
+
+    exclude = body.get("exclude") or []
+    if not isinstance(exclude, list) or not all(isinstance(name, str) for name in exclude):
+        raise ValidationError("exclude must be a list of hero names")
+
+    heroes = get_user_context(app.current_event.raw_event).load(heroes=True).heroes
+
+    from engine.recommendation_engine import get_engine
+    return get_engine().allocate_marches(heroes, marches, exclude=exclude)
+
+
 @app.get("/api/lineups/build-all")
 def build_all_lineups():
     """Build lineups for all game modes (auth required)."""
-    user_id = get_effective_user_id(app.current_event.raw_event)
-    profile = profile_repo.get_or_create_profile(user_id)
-    profile_id = profile["profile_id"]
-    heroes = hero_repo.get_heroes(profile_id)
+    ctx = get_user_context(app.current_event.raw_event).load(heroes=True)
+    profile, heroes = ctx.profile, ctx.heroes
 
     try:
         from engine.recommendation_engine import get_engine
         engine = get_engine()
-        result = engine.get_all_lineups(user_heroes=heroes, profile=profile)
-        return {"lineups": result}
+        return result_cache.get_or_compute(
+            "lineups.build_all", {"heroes": heroes},
+            lambda: {"lineups": engine.get_all_lineups(user_heroes=heroes, profile=profile)},
+            version=engine.data_version,
+        )
     except Exception as e:
         logger.warning(f"Build all lineups failed: {e}")
         return {"lineups": {}}
@@ -564,10 +565,7 @@ def build_all_lineups():
 @app.get("/api/lineups/joiner/<attackType>")
 def get_joiner_recommendation(attackType: str):
     """Get rally joiner hero recommendation (auth required)."""
-    user_id = get_effective_user_id(app.current_event.raw_event)
-    profile = profile_repo.get_or_create_profile(user_id)
-    profile_id = profile["profile_id"]
-    heroes = hero_repo.get_heroes(profile_id)
+    heroes = get_user_context(app.current_event.raw_event).load(heroes=True).heroes
 
     is_attack = attackType.lower() in ("attack", "offense")
 
@@ -583,18 +581,11 @@ def get_joiner_recommendation(attackType: str):
 
 @app.get("/api/lineups")
 def get_lineups():
-    user_id = get_effective_user_id(app.current_event.raw_event)
-    profile = profile_repo.get_or_create_profile(user_id)
-    profile_id = profile["profile_id"]
-    heroes = hero_repo.get_heroes(profile_id)
+    heroes = get_user_context(app.current_event.raw_event).load(heroes=True).heroes
     hero_ref = hero_repo.get_all_heroes_reference()
 
     # Load lineup templates from data
-    lineup_path = os.path.join(Config.DATA_DIR, "guides", "hero_lineup_reasoning.json")
-    lineups = {}
-    if os.path.exists(lineup_path):
-        with open(lineup_path, encoding="utf-8") as f:
-            lineups = json.load(f)
+    lineups = load_json(LINEUP_REASONING_FILE, default={})
 
     return {
         "lineups": lineups,
@@ -605,19 +596,13 @@ def get_lineups():
 
 @app.get("/api/lineups/<eventType>")
 def get_lineup_for_event(eventType: str):
-    user_id = get_effective_user_id(app.current_event.raw_event)
-    profile = profile_repo.get_or_create_profile(user_id)
-    profile_id = profile["profile_id"]
-    heroes = hero_repo.get_heroes(profile_id)
+    heroes = get_user_context(app.current_event.raw_event).load(heroes=True).heroes
 
     # Load lineup data
-    lineup_path = os.path.join(Config.DATA_DIR, "guides", "hero_lineup_reasoning.json")
-    if not os.path.exists(lineup_path):
+    lineups = load_json(LINEUP_REASONING_FILE)
+    if lineups is None:
         raise NotFoundError("Lineup data not found")
 
-    with open(lineup_path, encoding="utf-8") as f:
-        lineups = json.load(f)
-
     # Find the matching event type lineup (data is under lineup_scenarios)
     scenarios = lineups.get("lineup_scenarios", {}) if isinstance(lineups, dict) else {}
     event_lineup = scenarios.get(eventType)
@@ -642,7 +627,8 @@ def get_lineup_for_event(eventType: str):
 def cleanup_handler(event, context):
     """Daily cleanup Lambda triggered by EventBridge schedule.
 
-    Resets AI request counters, cleans up expired data, and saves metrics.
+    Resets AI request counters, backfills active-profile pointers, cleans
+    up expired data, and saves metrics.
     """
     logger.info("Running daily cleanup")
 
@@ -654,28 +640,32 @@ def cleanup_handler(event, context):
             user_repo.reset_ai_request_counter(user["user_id"])
             reset_count += 1
 
-    # Save daily metrics
-    total_users = len(users)
-    test_accounts = sum(1 for u in users if u.get("is_test_account"))
-    active_users = sum(1 for u in users if u.get("is_active"))
+    # Users created before the active-profile pointer existed get one here
+    pointers = profile_repo.backfill_active_pointers(users)
+
+    # Correct any drift in the incrementally maintained admin counters
+    counters = admin_counters.reconcile_counters()
 
     ai_settings = ai_repo.get_ai_settings()
     feedback = admin_repo.get_feedback()
 
     admin_repo.save_daily_metrics({
-        "total_users": total_users,
-        "test_accounts": test_accounts,
-        "active_users": active_users,
+        "total_users": counters["users"],
+        "test_accounts": counters["users_test"],
+        "active_users": counters["users_active"],
+        "total_profiles": counters["profiles"],
+        "total_heroes": counters["heroes"],
         "ai_mode": ai_settings.get("mode", "off"),
         "total_ai_requests": ai_settings.get("total_requests", 0),
         "pending_feedback": sum(1 for f in feedback if f.get("status") in ("new", "pending_fix", "pending_update")),
     })
 
-    logger.info(f"Cleanup complete: reset {reset_count} AI counters, saved metrics")
-    return {"status": "ok", "reset_count": reset_count}
+    logger.info(f"Cleanup complete: reset {reset_count} AI counters, set {pointers} profile pointers, saved metrics")
+    return {"status": "ok", "reset_count": reset_count, "pointers_set": pointers}
 
 
 def lambda_handler(event, context):
+    check_reference_generation()
     try:
         return app.resolve(event, context)
     except AppError as exc:
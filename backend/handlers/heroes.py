@@ -11,7 +11,7 @@ import os
 from aws_lambda_powertools import Logger
 from aws_lambda_powertools.event_handler import APIGatewayHttpResolver
 
-from common.auth import get_effective_user_id
+from common.cache_invalidation import check_reference_generation
 from common.config import Config
 from common.error_capture import capture_error
 from common.exceptions import AppError, NotFoundError, ValidationError
@@ -21,11 +21,10 @@ from common.hero_repo import (
     get_all_heroes_reference,
     get_hero,
     get_hero_reference,
-    get_heroes,
     update_hero,
     put_hero,
 )
-from common.profile_repo import get_or_create_profile
+from common.user_context import get_user_context
 
 app = APIGatewayHttpResolver()
 logger = Logger()
@@ -63,10 +62,7 @@ def _get_profile_id_from_current_event() -> str:
     Uses the raw event from the current Powertools resolver context
     so that the auth module can read JWT claims from requestContext.
     """
-    raw_event = app.current_event.raw_event
-    user_id = get_effective_user_id(raw_event)
-    profile = get_or_create_profile(user_id)
-    return profile["profile_id"]
+    return get_user_context(app.current_event.raw_event).profile_id
 
 
 def _merge_reference(user_hero: dict) -> dict:
@@ -182,7 +178,7 @@ def get_owned_heroes():
     Query params:
         include_images (bool, default true) - embed base64 portrait data.
     """
-    profile_id = _get_profile_id_from_current_event()
+    ctx = get_user_context(app.current_event.raw_event)
 
     include_images = _bool_param(
         app.current_event.query_string_parameters.get("include_images")
@@ -191,7 +187,7 @@ def get_owned_heroes():
         default=True,
     )
 
-    user_heroes = get_heroes(profile_id)
+    user_heroes = ctx.heroes
 
     results = []
     for uh in user_heroes:
@@ -264,6 +260,7 @@ def delete_single_hero(hero_name: str):
 @logger.inject_lambda_context
 def lambda_handler(event: dict, context):
     """AWS Lambda entrypoint."""
+    check_reference_generation()
     try:
         return app.resolve(event, context)
     except AppError as exc:
@@ -5,10 +5,10 @@ import json
 from aws_lambda_powertools import Logger
 from aws_lambda_powertools.event_handler import APIGatewayHttpResolver
 
-from common.auth import get_effective_user_id
 from common.error_capture import capture_error
 from common.exceptions import AppError, NotFoundError, ValidationError
 from common import profile_repo, hero_repo
+from common.user_context import get_user_context
 
 app = APIGatewayHttpResolver()
 logger = Logger()
@@ -16,7 +16,7 @@ logger = Logger()
 
 @app.get("/api/profiles")
 def get_profiles():
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     profiles = profile_repo.get_profiles(user_id)
     # Enrich each profile with hero count
     for p in profiles:
@@ -28,7 +28,7 @@ def get_profiles():
 
 @app.post("/api/profiles")
 def create_profile():
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     body = app.current_event.json_body or {}
 
     name = body.get("name", "Chief")
@@ -49,14 +49,12 @@ def create_profile():
 
 @app.get("/api/profiles/current")
 def get_current_profile():
-    user_id = get_effective_user_id(app.current_event.raw_event)
-    profile = profile_repo.get_or_create_profile(user_id)
-    return {"profile": profile}
+    return {"profile": get_user_context(app.current_event.raw_event).profile}
 
 
 @app.get("/api/profiles/deleted")
 def get_deleted_profiles():
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     profiles = profile_repo.get_profiles(user_id, include_deleted=True)
     deleted_profiles = [p for p in profiles if p.get("deleted_at") is not None]
     return {"profiles": deleted_profiles}
@@ -67,7 +65,7 @@ def get_deleted_profiles():
 
 @app.get("/api/profiles/<profileId>")
 def get_profile(profileId: str):
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     profile = profile_repo.get_profile(user_id, profileId)
     if not profile:
         raise NotFoundError("Profile not found")
@@ -76,7 +74,7 @@ def get_profile(profileId: str):
 
 @app.put("/api/profiles/<profileId>")
 def update_profile(profileId: str):
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     body = app.current_event.json_body or {}
 
     profile = profile_repo.get_profile(user_id, profileId)
@@ -102,7 +100,7 @@ def update_profile(profileId: str):
 
 @app.delete("/api/profiles/<profileId>")
 def delete_profile(profileId: str):
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     hard = app.current_event.query_string_parameters.get("hard", "false").lower() == "true" if app.current_event.query_string_parameters else False
 
     profile = profile_repo.get_profile(user_id, profileId)
@@ -115,7 +113,7 @@ def delete_profile(profileId: str):
 
 @app.post("/api/profiles/<profileId>/duplicate")
 def duplicate_profile(profileId: str):
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     body = app.current_event.json_body or {}
     name = body.get("name")
 
@@ -125,14 +123,14 @@ def duplicate_profile(profileId: str):
 
 @app.post("/api/profiles/<profileId>/restore")
 def restore_profile(profileId: str):
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     profile_repo.restore_profile(user_id, profileId)
     return {"status": "restored", "profile_id": profileId}
 
 
 @app.post("/api/profiles/<profileId>/switch")
 def switch_profile(profileId: str):
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
 
     profile = profile_repo.get_profile(user_id, profileId)
     if not profile:
@@ -144,7 +142,7 @@ def switch_profile(profileId: str):
 
 @app.get("/api/profiles/<profileId>/preview")
 def preview_profile(profileId: str):
-    user_id = get_effective_user_id(app.current_event.raw_event)
+    user_id = get_user_context(app.current_event.raw_event).user_id
     profile = profile_repo.get_profile(user_id, profileId)
     if not profile:
         raise NotFoundError("Profile not found")
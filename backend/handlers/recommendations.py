@@ -7,10 +7,11 @@ from decimal import Decimal
 from aws_lambda_powertools import Logger
 from aws_lambda_powertools.event_handler import APIGatewayHttpResolver
 
-from common.auth import get_effective_user_id
 from common.error_capture import capture_error
-from common.exceptions import AppError, NotFoundError
-from common import profile_repo, hero_repo
+from common.exceptions import AppError, NotFoundError, ValidationError
+from common import result_cache
+from common.user_context import get_user_context
+from common.cache_invalidation import check_reference_generation
 
 app = APIGatewayHttpResolver()
 logger = Logger()
@@ -77,13 +78,10 @@ def _wrap_heroes(hero_dicts: list) -> list:
     return wrapped
 
 
-def _load_user_context():
-    """Load profile and heroes for the current user."""
-    user_id = get_effective_user_id(app.current_event.raw_event)
-    profile = profile_repo.get_or_create_profile(user_id)
-    profile_id = profile["profile_id"]
-    heroes = hero_repo.get_heroes(profile_id)
-    return profile, heroes
+def _load_user_context(chief: bool = False):
+    """Load profile and heroes (and optionally chief gear/charms) for the current user."""
+    ctx = get_user_context(app.current_event.raw_event).load(heroes=True, chief=chief)
+    return ctx.profile, ctx.heroes
 
 
 def _serialize_recommendations(recommendations):
@@ -101,43 +99,51 @@ def _serialize_recommendations(recommendations):
     return results
 
 
-@app.get("/api/recommendations")
-def get_recommendations():
-    profile, heroes = _load_user_context()
-
-    from engine.recommendation_engine import get_engine
-    engine = get_engine()
-
-    profile_obj = _wrap_profile(profile)
-    hero_objs = _wrap_heroes(heroes)
+# --- Sections ---
+# Each section takes the already-loaded context so the individual routes and
+# the bundle route share one implementation.
 
-    recommendations = engine.get_recommendations(profile=profile_obj, user_heroes=hero_objs)
-    return {"recommendations": _serialize_recommendations(recommendations)}
+def _load_chief_items():
+    """Load chief gear and charms for the active profile (empty lists if unavailable)."""
+    user_gear = []
+    user_charms = []
+    try:
+        ctx = get_user_context(app.current_event.raw_event)
+        gear = ctx.chief_gear
+        if gear:
+            user_gear = [_convert_decimals(gear)]
+        charms = ctx.chief_charms
+        if charms:
+            user_charms = [_convert_decimals(charms)]
+    except Exception as e:
+        logger.warning(f"Could not load gear/charms for stat insights: {e}")
+    return user_gear, user_charms
 
 
-@app.get("/api/recommendations/investments")
-def get_investments():
-    profile, heroes = _load_user_context()
+def _recommendations_section(engine, profile, heroes, profile_obj, hero_objs):
+    def compute():
+        recommendations = engine.get_recommendations(profile=profile_obj, user_heroes=hero_objs)
+        return {"recommendations": _serialize_recommendations(recommendations)}
 
-    from engine.recommendation_engine import get_engine
-    engine = get_engine()
+    return result_cache.get_or_compute(
+        "recommendations", {"profile": profile, "heroes": heroes}, compute,
+        version=engine.data_version,
+    )
 
-    profile_obj = _wrap_profile(profile)
-    hero_objs = _wrap_heroes(heroes)
 
-    investments = engine.get_hero_investments(profile=profile_obj, user_heroes=hero_objs)
-    return {"investments": investments}
+def _investments_section(engine, profile, heroes, profile_obj, hero_objs):
+    def compute():
+        investments = engine.get_hero_investments(profile=profile_obj, user_heroes=hero_objs)
+        return {"investments": investments}
 
+    return result_cache.get_or_compute(
+        "recommendations.investments", {"profile": profile, "heroes": heroes}, compute,
+        version=engine.data_version,
+    )
 
-@app.get("/api/recommendations/phase")
-def get_phase_info():
-    profile, heroes = _load_user_context()
-
-    from engine.recommendation_engine import get_engine
-    engine = get_engine()
 
+def _phase_section(engine, profile, profile_obj):
     try:
-        profile_obj = _wrap_profile(profile)
         phase_info = engine.get_phase_info(profile=profile_obj)
         return {"phase": phase_info}
     except Exception as e:
@@ -153,58 +159,144 @@ def get_phase_info():
         return {"phase": {"name": phase, "furnace_level": furnace}}
 
 
-@app.get("/api/recommendations/stat-insights")
-def get_stat_insights():
+def _stat_insights_section(engine, profile, profile_obj, user_gear, user_charms):
+    try:
+        return result_cache.get_or_compute(
+            "recommendations.stat_insights",
+            {"profile": profile, "gear": user_gear, "charms": user_charms},
+            lambda: {"stat_insights": engine.get_stat_insights(
+                profile=profile_obj,
+                user_gear=user_gear,
+                user_charms=user_charms,
+            )},
+            version=engine.data_version,
+        )
+    except Exception as e:
+        logger.warning(f"Stat insights failed: {e}")
+        return {"stat_insights": {"gaps": [], "recommendations": [], "untracked_sources": []}}
+
+
+def _gear_priority_section(engine, profile):
+    try:
+        gear_priority = engine.get_gear_priority(spending_profile=profile.get("spending_profile", "f2p"))
+        return {"gear_priority": gear_priority}
+    except Exception as e:
+        logger.warning(f"Gear priority failed: {e}")
+        return {"gear_priority": []}
+
+
+# --- Routes ---
+
+@app.get("/api/recommendations")
+def get_recommendations():
     profile, heroes = _load_user_context()
 
     from engine.recommendation_engine import get_engine
     engine = get_engine()
 
-    profile_obj = _wrap_profile(profile)
+    return _recommendations_section(
+        engine, profile, heroes, _wrap_profile(profile), _wrap_heroes(heroes),
+    )
 
-    # Load chief gear and charms if available
-    user_gear = []
-    user_charms = []
-    try:
-        from common import chief_repo
-        profile_id = profile["profile_id"]
-        gear = chief_repo.get_chief_gear(profile_id)
-        if gear:
-            user_gear = [_convert_decimals(gear)]
-        charms = chief_repo.get_chief_charms(profile_id)
-        if charms:
-            user_charms = [_convert_decimals(charms)]
-    except Exception as e:
-        logger.warning(f"Could not load gear/charms for stat insights: {e}")
 
-    try:
-        insights = engine.get_stat_insights(
-            profile=profile_obj,
-            user_gear=user_gear,
-            user_charms=user_charms,
-        )
-        return {"stat_insights": insights}
-    except Exception as e:
-        logger.warning(f"Stat insights failed: {e}")
-        return {"stat_insights": {"gaps": [], "recommendations": [], "untracked_sources": []}}
+@app.get("/api/recommendations/investments")
+def get_investments():
+    profile, heroes = _load_user_context()
+
+    from engine.recommendation_engine import get_engine
+    engine = get_engine()
+
+    return _investments_section(
+        engine, profile, heroes, _wrap_profile(profile), _wrap_heroes(heroes),
+    )
+
+
+@app.get("/api/recommendations/phase")
+def get_phase_info():
+    profile = get_user_context(app.current_event.raw_event).profile
+
+    from engine.recommendation_engine import get_engine
+    engine = get_engine()
+
+    return _phase_section(engine, profile, _wrap_profile(profile))
+
+
+@app.get("/api/recommendations/stat-insights")
+def get_stat_insights():
+    profile, heroes = _load_user_context(chief=True)
+
+    from engine.recommendation_engine import get_engine
+    engine = get_engine()
+
+    user_gear, user_charms = _load_chief_items()
+    return _stat_insights_section(engine, profile, _wrap_profile(profile), user_gear, user_charms)
 
 
 @app.get("/api/recommendations/gear-priority")
 def get_gear_priority():
-    profile, heroes = _load_user_context()
+    profile = get_user_context(app.current_event.raw_event).profile
 
     from engine.recommendation_engine import get_engine
     engine = get_engine()
 
-    try:
-        gear_priority = engine.get_gear_priority(spending_profile=profile.get("spending_profile", "f2p"))
-        return {"gear_priority": gear_priority}
-    except Exception as e:
-        logger.warning(f"Gear priority failed: {e}")
-        return {"gear_priority": []}
+    return _gear_priority_section(engine, profile)
+
+
+BUNDLE_SECTIONS = ("recommendations", "investments", "phase", "stat_insights", "gear_priority")
+
+
+@app.get("/api/recommendations/bundle")
+def get_recommendations_bundle():
+    """Everything the recommendations page needs in one call.
+
+    Loads the user context (and chief gear/charms only if stat_insights is
+    requested) once and runs every requested section against it.
+
+    Query params:
+        sections: Comma-separated subset of BUNDLE_SECTIONS (default: all)
+    """
+    params = app.current_event.query_string_parameters or {}
+    requested = [s.strip() for s in params.get("sections", "").split(",") if s.strip()]
+    unknown = [s for s in requested if s not in BUNDLE_SECTIONS]
+    if unknown:
+        raise ValidationError(
+            f"Unknown sections: {', '.join(unknown)}. Valid: {', '.join(BUNDLE_SECTIONS)}"
+        )
+    sections = [s for s in BUNDLE_SECTIONS if s in requested] if requested else list(BUNDLE_SECTIONS)
+
+    profile, heroes = _load_user_context(chief="stat_insights" in sections)
+
+    from engine.recommendation_engine import get_engine
+    engine = get_engine()
+
+    profile_obj = _wrap_profile(profile)
+    hero_objs = _wrap_heroes(heroes) if {"recommendations", "investments"} & set(sections) else None
+
+    builders = {
+        "recommendations": lambda: _recommendations_section(engine, profile, heroes, profile_obj, hero_objs),
+        "investments": lambda: _investments_section(engine, profile, heroes, profile_obj, hero_objs),
+        "phase": lambda: _phase_section(engine, profile, profile_obj),
+        "stat_insights": lambda: _stat_insights_section(
+            engine, profile, profile_obj, *_load_chief_items()
+        ),
+        "gear_priority": lambda: _gear_priority_section(engine, profile),
+    }
+
+    result = {}
+    errors = {}
+    for section in sections:
+        try:
+            result.update(builders[section]())
+        except Exception:
+            logger.exception(f"Recommendations bundle section {section} failed")
+            errors[section] = "Unable to compute this section"
+    if errors:
+        result["errors"] = errors
+    return result
 
 
 def lambda_handler(event, context):
+    check_reference_generation()
     try:
         return app.resolve(event, context)
     except AppError as exc:
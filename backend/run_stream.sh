@@ -0,0 +1,6 @@
+#!/bin/sh
+# Entry point of AdvisorStreamFunction: the Lambda Web Adapter layer
+# (AWS_LAMBDA_EXEC_WRAPPER=/opt/bootstrap) runs this script and proxies
+# Function URL requests to the server on $PORT.
+export PYTHONPATH="${LAMBDA_TASK_ROOT:-.}:/opt/python:${PYTHONPATH}"
+exec python3 -m handlers.advisor_stream
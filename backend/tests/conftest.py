@@ -0,0 +1,6 @@
+"""Make the Lambda source root (backend/) importable as it is in Lambda."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,94 @@
+"""Export compression and encoding, without an object store."""
+
+import gzip
+import json
+
+import pytest
+
+pytest.importorskip("boto3")
+
+from common.export_jobs import GzipPartWriter, _encode  # noqa: E402
+
+
+class RecordingUpload:
+    """Collects uploaded parts in memory."""
+
+    def __init__(self):
+        self.parts = []
+        self.completed = False
+
+    def upload_part(self, data: bytes) -> None:
+        self.parts.append(data)
+
+    def complete(self) -> None:
+        self.completed = True
+
+
+def _write_all(chunks, part_size):
+    upload = RecordingUpload()
+    writer = GzipPartWriter(upload, part_size)
+    for chunk in chunks:
+        writer.write(chunk)
+    writer.close()
+    return upload, writer
+
+
+def test_gzip_parts_concatenate_to_the_original_text():
+    # Random-looking rows so the compressed output spans several parts
+    rows = [json.dumps({"id": i, "value": format(i * 2654435761 % 2 ** 32, "x")}) + "\n" for i in range(5000)]
+
+    upload, writer = _write_all(rows, part_size=1024)
+
+    assert upload.completed
+    assert len(upload.parts) > 1
+    assert writer.parts == len(upload.parts)
+    assert all(len(part) >= 1024 for part in upload.parts[:-1])
+    body = b"".join(upload.parts)
+    assert writer.compressed_bytes == len(body)
+    assert gzip.decompress(body).decode("utf-8") == "".join(rows)
+    assert writer.raw_bytes == len("".join(rows).encode("utf-8"))
+
+
+def test_gzip_single_short_part():
+    upload, writer = _write_all(["héllo", " world"], part_size=1024 * 1024)
+
+    assert len(upload.parts) == 1
+    assert gzip.decompress(upload.parts[0]).decode("utf-8") == "héllo world"
+
+
+def test_empty_export_is_valid_gzip():
+    upload, _ = _write_all([], part_size=1024)
+
+    assert gzip.decompress(b"".join(upload.parts)) == b""
+
+
+def test_csv_headers_are_the_union_of_keys():
+    items = [{"b": 1, "a": "x"}, {"c": "line\nbreak", "a": "y,z"}, {"d": None}]
+    counter = [0]
+
+    text = "".join(_encode("csv", iter(items), None, counter))
+
+    lines = text.split("\n")
+    assert lines[0] == "a,b,c,d"
+    assert lines[1:] == ["x,1,,", "y;z,,line break,", ",,,"]
+    assert counter[0] == 3
+
+
+def test_csv_with_given_headers_keeps_their_order():
+    counter = [0]
+
+    text = "".join(_encode("csv", [{"a": 1, "b": 2, "extra": 3}], ["b", "a"], counter))
+
+    assert text == "b,a\n2,1"
+
+
+def test_json_and_jsonl_encodings_round_trip():
+    items = [{"n": 1}, {"n": 2, "s": "two"}]
+
+    json_counter, jsonl_counter = [0], [0]
+    as_json = "".join(_encode("json", iter(items), None, json_counter))
+    as_jsonl = "".join(_encode("jsonl", iter(items), None, jsonl_counter))
+
+    assert json.loads(as_json) == items
+    assert [json.loads(line) for line in as_jsonl.splitlines()] == items
+    assert json_counter[0] == jsonl_counter[0] == 2
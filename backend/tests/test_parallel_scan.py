@@ -0,0 +1,95 @@
+"""parallel_scan against an in-memory table split into segments."""
+
+import threading
+from collections import Counter
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("boto3")
+
+from common import db  # noqa: E402
+
+
+class SegmentedTable:
+    """Fake Scan API: items dealt into segments, paged via LastEvaluatedKey."""
+
+    def __init__(self, count, page_size=3, fail_segment=None, fail_after_pages=1):
+        self.name = "fake-table"
+        self.items = [{"PK": f"ITEM#{i}", "SK": "METADATA", "n": Decimal(i)} for i in range(count)]
+        self.page_size = page_size
+        self.fail_segment = fail_segment
+        self.fail_after_pages = fail_after_pages
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def scan(self, TableName, Segment, TotalSegments, ExclusiveStartKey=None, **kwargs):
+        assert TableName == self.name
+        with self._lock:
+            self.calls[Segment] += 1
+            pages_served = self.calls[Segment] - 1
+        if Segment == self.fail_segment and pages_served >= self.fail_after_pages:
+            raise RuntimeError(f"segment {Segment} failed")
+        segment = self.items[Segment::TotalSegments]
+        start = 0
+        if ExclusiveStartKey:
+            start = next(i for i, item in enumerate(segment) if item["PK"] == ExclusiveStartKey["PK"]) + 1
+        page = segment[start:start + self.page_size]
+        response = {"Items": [dict(item) for item in page], "Count": len(page)}
+        if start + self.page_size < len(segment):
+            response["LastEvaluatedKey"] = {"PK": page[-1]["PK"], "SK": page[-1]["SK"]}
+        return response
+
+
+@pytest.fixture
+def fake_table(monkeypatch):
+    def install(table):
+        resource = SimpleNamespace(meta=SimpleNamespace(client=table))
+        monkeypatch.setattr(db, "_get_resource", lambda: resource)
+        return table
+    return install
+
+
+def test_every_item_yielded_exactly_once(fake_table):
+    table = fake_table(SegmentedTable(50, page_size=3))
+
+    seen = Counter(item["PK"] for item in db.parallel_scan(table, segments=4))
+
+    assert seen == Counter(item["PK"] for item in table.items)
+    assert set(seen.values()) == {1}
+    # Every segment was paged to the end: ceil(len(segment) / page_size) calls
+    assert all(table.calls[s] == -(-len(table.items[s::4]) // 3) for s in range(4))
+
+
+def test_more_segments_than_items(fake_table):
+    table = fake_table(SegmentedTable(3, page_size=2))
+
+    seen = [item["PK"] for item in db.parallel_scan(table, segments=8)]
+
+    assert sorted(seen) == sorted(item["PK"] for item in table.items)
+
+
+def test_convert_turns_decimals_into_numbers(fake_table):
+    table = fake_table(SegmentedTable(10))
+
+    values = sorted(item["n"] for item in db.parallel_scan(table, segments=2, convert=True))
+
+    assert values == list(range(10))
+    assert all(type(v) is int for v in values)
+
+
+def test_failing_segment_raises_without_duplicates(fake_table):
+    table = fake_table(SegmentedTable(60, page_size=2, fail_segment=1, fail_after_pages=2))
+
+    seen = Counter()
+    with pytest.raises(RuntimeError, match="segment 1 failed"):
+        for item in db.parallel_scan(table, segments=4):
+            seen[item["PK"]] += 1
+
+    all_keys = {item["PK"] for item in table.items}
+    assert set(seen) <= all_keys
+    assert set(seen.values()) <= {1}
+    # Nothing past the failed page of segment 1 was yielded
+    segment_1 = [item["PK"] for item in table.items[1::4]]
+    assert set(seen) & set(segment_1) <= set(segment_1[:4])
@@ -0,0 +1,91 @@
+"""Reference bundle round trip and shared admin edits, without AWS."""
+
+import json
+
+import pytest
+
+pytest.importorskip("boto3")
+
+from common import db, reference_data  # noqa: E402
+from common.config import Config  # noqa: E402
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    data = tmp_path / "data"
+    (data / "guides").mkdir(parents=True)
+    (data / "raw").mkdir()
+    (data / "heroes.json").write_text(json.dumps({"heroes": [{"name": "Jeronimo", "generation": 1}]}))
+    (data / "guides" / "tips.json").write_text(json.dumps({"tips": ["a", 1.5, None, True]}))
+    (data / "raw" / "scrape.json").write_text("{}")
+
+    bundle = tmp_path / "reference_bundle.bin"
+    monkeypatch.setattr(Config, "DATA_DIR", str(data))
+    monkeypatch.setattr(Config, "REFERENCE_BUNDLE", str(bundle))
+    monkeypatch.setattr(Config, "REFERENCE_SHARED_EDITS", False)
+    reference_data.reset_bundle()
+    yield data
+    reference_data.reset_bundle()
+
+
+def test_bundle_serves_files_without_the_sources(data_dir):
+    summary = reference_data.build_bundle(str(data_dir), Config.REFERENCE_BUNDLE)
+    assert summary["files"] == 2  # raw/ is excluded
+    assert reference_data.verify_bundle(Config.REFERENCE_BUNDLE) == []
+
+    (data_dir / "heroes.json").unlink()
+    (data_dir / "guides" / "tips.json").unlink()
+
+    assert reference_data.load_json("heroes.json") == {"heroes": [{"name": "Jeronimo", "generation": 1}]}
+    assert reference_data.load_json("guides/tips.json") == {"tips": ["a", 1.5, None, True]}
+    assert reference_data.get_bundle_version() == summary["version"]
+
+
+def test_verify_catches_a_damaged_section(data_dir):
+    reference_data.build_bundle(str(data_dir), Config.REFERENCE_BUNDLE)
+    with open(Config.REFERENCE_BUNDLE, "r+b") as f:
+        f.seek(-3, 2)
+        f.write(b"\xff\xff\xff")
+
+    assert len(reference_data.verify_bundle(Config.REFERENCE_BUNDLE)) == 1
+
+
+def test_stale_section_falls_back_to_json(data_dir):
+    reference_data.build_bundle(str(data_dir), Config.REFERENCE_BUNDLE)
+    (data_dir / "heroes.json").write_text(json.dumps({"heroes": [{"name": "Natalia", "generation": 1}, {"name": "Molly"}]}))
+
+    assert [h["name"] for h in reference_data.load_json("heroes.json")["heroes"]] == ["Natalia", "Molly"]
+
+
+class EditTable:
+    """Fake ReferenceTable holding DATA_FILE items."""
+
+    def __init__(self):
+        self.items = {}
+
+    def put_item(self, Item):
+        self.items[(Item["PK"], Item["SK"])] = Item
+
+    def get_item(self, Key):
+        item = self.items.get((Key["PK"], Key["SK"]))
+        return {"Item": item} if item else {}
+
+
+def test_shared_edit_wins_over_the_bundle_after_invalidation(data_dir, monkeypatch):
+    reference_data.build_bundle(str(data_dir), Config.REFERENCE_BUNDLE)
+    (data_dir / "heroes.json").unlink()
+    table = EditTable()
+    monkeypatch.setattr(Config, "REFERENCE_SHARED_EDITS", True)
+    monkeypatch.setattr(db, "get_table", lambda name: table)
+    monkeypatch.setattr(
+        db, "iter_query",
+        lambda t, pk, projection=None: iter([{"SK": sk} for p, sk in table.items if p == pk]),
+    )
+    assert reference_data.load_json("heroes.json")["heroes"][0]["name"] == "Jeronimo"
+
+    reference_data.save_json("heroes.json", {"heroes": [{"name": "Zinman"}]})
+    # Another container: nothing cached, reads the edit instead of its bundle
+    reference_data.reset_bundle()
+
+    assert reference_data.load_json("heroes.json") == {"heroes": [{"name": "Zinman"}]}
+    assert not (data_dir / "heroes.json").exists()
@@ -3,7 +3,7 @@
 import { useEffect, useState } from 'react';
 import PageLayout from '@/components/PageLayout';
 import { useAuth } from '@/lib/auth';
-import { adminApi, API_BASE } from '@/lib/api';
+import { adminApi, API_BASE, downloadExport } from '@/lib/api';
 
 interface AISettings {
   mode: 'off' | 'on' | 'unlimited';
@@ -934,15 +934,9 @@ function ExportTab({
         }
       );
       if (res.ok) {
-        const blob = await res.blob();
-        const url = window.URL.createObjectURL(blob);
-        const a = document.createElement('a');
-        a.href = url;
-        a.download = `ai_training_data_${exportFilter}.${exportFormat}`;
-        document.body.appendChild(a);
-        a.click();
-        a.remove();
-        window.URL.revokeObjectURL(url);
+        // The export is written to storage; follow its download URL
+        const job = await res.json();
+        await downloadExport(job, token, `ai_training_data_${exportFilter}.${exportFormat}`);
       }
     } catch (error) {
       console.error('Export failed:', error);
@@ -3,7 +3,7 @@
 import { useState } from 'react';
 import PageLayout from '@/components/PageLayout';
 import { useAuth } from '@/lib/auth';
-import { adminApi, API_BASE } from '@/lib/api';
+import { adminApi, API_BASE, downloadExport } from '@/lib/api';
 
 interface ExportOption {
   id: string;
@@ -148,40 +148,20 @@ export default function AdminExportPage() {
     if (!token || !reportRows || reportRows.length === 0) return;
     try {
       const result = await adminApi.downloadReportCsv(token, selectedReport, startDate, endDate);
-      if (result.csv) {
-        const blob = new Blob([result.csv], { type: 'text/csv;charset=utf-8;' });
-        const url = window.URL.createObjectURL(blob);
-        const a = document.createElement('a');
-        a.href = url;
-        a.download = result.filename || `${selectedReport}_report.csv`;
-        document.body.appendChild(a);
-        a.click();
-        a.remove();
-        window.URL.revokeObjectURL(url);
-      }
+      await downloadExport(result, token, `${selectedReport}_report.csv`);
     } catch (error) {
       console.error('CSV download failed:', error);
     }
   };
 
   const handleDownloadExcel = async () => {
-    // Excel download: use the same CSV data but with .xlsx extension hint
+    // Excel download: use the same CSV export but with .xlsx extension hint
     // Since Lambda doesn't have openpyxl, we download CSV and let the user open in Excel
     if (!token || !reportRows || reportRows.length === 0) return;
     try {
       const result = await adminApi.downloadReportCsv(token, selectedReport, startDate, endDate);
-      if (result.csv) {
-        const blob = new Blob([result.csv], { type: 'text/csv;charset=utf-8;' });
-        const url = window.URL.createObjectURL(blob);
-        const a = document.createElement('a');
-        a.href = url;
-        // Use .csv extension - Excel opens CSV natively
-        a.download = result.filename || `${selectedReport}_report.csv`;
-        document.body.appendChild(a);
-        a.click();
-        a.remove();
-        window.URL.revokeObjectURL(url);
-      }
+      // Use .csv extension - Excel opens CSV natively
+      await downloadExport(result, token, `${selectedReport}_report.csv`);
     } catch (error) {
       console.error('Excel download failed:', error);
     }
@@ -202,15 +182,9 @@ export default function AdminExportPage() {
       );
 
       if (res.ok) {
-        const blob = await res.blob();
-        const url = window.URL.createObjectURL(blob);
-        const a = document.createElement('a');
-        a.href = url;
-        a.download = `${selectedExport}_export.${selectedFormat.toLowerCase()}`;
-        document.body.appendChild(a);
-        a.click();
-        a.remove();
-        window.URL.revokeObjectURL(url);
+        // The export is written to storage; follow its download URL
+        const job = await res.json();
+        await downloadExport(job, token, `${selectedExport}_export.${selectedFormat.toLowerCase()}`);
         setExportResult({ success: true, message: 'Export downloaded successfully!' });
       } else {
         throw new Error('Export failed');
@@ -1548,7 +1548,7 @@ function ConversationsTab({ token }: { token: string }) {
     <div className="space-y-6">
       {/* Stats */}
       {stats && (
-        <div className="grid grid-cols-2 md:grid-cols-4 gap-4">
+        <div className="grid grid-cols-2 md:grid-cols-5 gap-4">
           <div className="card text-center">
             <div className="text-2xl font-bold text-frost">{stats.total}</div>
             <div className="text-xs text-frost-muted">Total</div>
@@ -1565,6 +1565,14 @@ function ConversationsTab({ token }: { token: string }) {
             <div className="text-2xl font-bold text-warning">{stats.helpful}</div>
             <div className="text-xs text-frost-muted">Helpful</div>
           </div>
+          {stats.answer_cache && (
+            <div className="card text-center">
+              <div className="text-2xl font-bold text-ice">{stats.answer_cache.hit_rate}%</div>
+              <div className="text-xs text-frost-muted">
+                Cache Hits ({stats.answer_cache.tokens_saved.toLocaleString()} tokens saved)
+              </div>
+            </div>
+          )}
         </div>
       )}
 
@@ -14,6 +14,7 @@ interface AdminStats {
   total_users: number;
   active_users: number;
   test_accounts: number;
+  users_by_role?: Record<string, number>;
   total_profiles: number;
   total_heroes_tracked: number;
   ai_requests_today: number;
@@ -290,11 +290,23 @@ export default function AIAdvisorPage() {
     setInput('');
     setIsLoading(true);
 
+    const assistantId = (Date.now() + 1).toString();
+    let streamed = '';
     try {
-      const data = await advisorApi.ask(token!, userMessage.content, threadId);
+      // Show the answer as it is generated, then replace it with the final one
+      const data = await advisorApi.askStream(token!, userMessage.content, threadId, (text) => {
+        const started = streamed === '';
+        streamed += text;
+        const content = streamed;
+        setMessages((prev) =>
+          started
+            ? [...prev, { id: assistantId, role: 'assistant', content, timestamp: new Date() }]
+            : prev.map((m) => (m.id === assistantId ? { ...m, content } : m))
+        );
+      });
 
       const assistantMessage: Message = {
-        id: (Date.now() + 1).toString(),
+        id: assistantId,
         role: 'assistant',
         content: data.answer || 'Sorry, I could not process your request.',
         source: data.source as 'rules' | 'ai',
@@ -308,7 +320,9 @@ export default function AIAdvisorPage() {
         setCurrentThreadId(data.thread_id);
       }
 
-      setMessages((prev) => [...prev, assistantMessage]);
+      setMessages((prev) =>
+        streamed ? prev.map((m) => (m.id === assistantId ? assistantMessage : m)) : [...prev, assistantMessage]
+      );
       fetchChatHistory();
 
       // Refresh AI status to update remaining requests
@@ -317,7 +331,7 @@ export default function AIAdvisorPage() {
       console.error('Failed to get response:', error);
       const errorMsg = error instanceof Error ? error.message : 'Something went wrong';
       setMessages((prev) => [
-        ...prev,
+        ...prev.filter((m) => m.id !== assistantId),
         {
           id: (Date.now() + 1).toString(),
           role: 'assistant',
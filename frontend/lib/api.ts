@@ -122,6 +122,34 @@ export async function api<T>(endpoint: string, options: ApiOptions = {}): Promis
   return response.json();
 }
 
+/**
+ * Save a finished export. S3 exports are presigned links the browser can
+ * follow directly; local exports are served by the admin API and need the
+ * Authorization header, so they are fetched and saved from a blob.
+ */
+export async function downloadExport(job: ExportJob, token?: string | null, fallbackName = 'export') {
+  if (!job.download_url) return;
+  let href = job.download_url;
+  let objectUrl: string | null = null;
+  if (href.startsWith('/api/')) {
+    const authToken = token || getStoredToken();
+    const res = await fetch(`${API_BASE}${href}`, {
+      headers: authToken ? { Authorization: `Bearer ${authToken}` } : {},
+      cache: 'no-store',
+    });
+    if (!res.ok) throw new Error('Export download failed');
+    objectUrl = URL.createObjectURL(await res.blob());
+    href = objectUrl;
+  }
+  const a = document.createElement('a');
+  a.href = href;
+  a.download = job.filename || fallbackName;
+  document.body.appendChild(a);
+  a.click();
+  a.remove();
+  if (objectUrl) URL.revokeObjectURL(objectUrl);
+}
+
 async function tryRefreshToken(): Promise<string | null> {
   try {
     const refreshToken = localStorage.getItem('refresh_token');
@@ -281,6 +309,68 @@ export const advisorApi = {
       token,
     }),
 
+  /**
+   * Ask with the answer streamed as it is generated. onDelta receives each
+   * piece of text; the promise resolves with the same body ask() returns.
+   * Falls back to ask() where the streaming route is not deployed (local
+   * API) or no Cognito access token is stored.
+   */
+  askStream: async (
+    token: string,
+    question: string,
+    threadId: string | undefined,
+    onDelta: (text: string) => void,
+  ): Promise<AdvisorResponse> => {
+    const accessToken = typeof window !== 'undefined' ? localStorage.getItem('access_token') : null;
+    if (!accessToken) return advisorApi.ask(token, question, threadId);
+
+    const headers: Record<string, string> = {
+      'Content-Type': 'application/json',
+      Authorization: `Bearer ${accessToken}`,
+    };
+    const impersonateUserId = localStorage.getItem('impersonate_user_id');
+    if (impersonateUserId) headers['X-Impersonate-User'] = impersonateUserId;
+
+    const res = await fetch(`${API_BASE}/api/advisor/ask/stream`, {
+      method: 'POST',
+      headers,
+      body: JSON.stringify({ question, thread_id: threadId }),
+      cache: 'no-store',
+    });
+    if (res.status === 401 || res.status === 403 || res.status === 404 || !res.body) {
+      return advisorApi.ask(token, question, threadId);
+    }
+    if (!res.ok) {
+      const error = await res.json().catch(() => ({ error: 'Request failed' }));
+      throw new Error(error.message || error.error || 'Request failed');
+    }
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+        const raw = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        let event = 'message';
+        let data = '';
+        for (const line of raw.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        }
+        const payload = data ? JSON.parse(data) : {};
+        if (event === 'delta') onDelta(payload.text || '');
+        else if (event === 'done') return payload as AdvisorResponse;
+        else if (event === 'error') throw new Error(payload.error || 'Something went wrong');
+      }
+    }
+    throw new Error('The answer stream ended early');
+  },
+
   getHistory: (token: string, limit = 10) =>
     api<{ conversations: Conversation[] }>(`/api/advisor/history?limit=${limit}`, { token }),
 
@@ -449,7 +539,10 @@ export const adminApi = {
 
   // Export
   exportData: (token: string, format: 'json' | 'csv', table = 'main') =>
-    api<any>(`/api/admin/export/${format}?table=${table}`, { token }),
+    api<ExportJob>(`/api/admin/export/${format}?table=${table}`, { token }),
+
+  getExportJob: (token: string, jobId: string) =>
+    api<ExportJob>(`/api/admin/export/jobs/${jobId}`, { token }),
 
   // Impersonation
   impersonateUser: (token: string, userId: string) =>
@@ -504,7 +597,7 @@ export const adminApi = {
   exportConversations: (token: string, format = 'jsonl', filter?: string) => {
     const params = new URLSearchParams({ format });
     if (filter) params.append('filter', filter);
-    return api<any>(`/api/admin/conversations/export?${params}`, { token });
+    return api<ExportJob>(`/api/admin/conversations/export?${params}`, { token });
   },
 
   // Admin Message Threads
@@ -537,7 +630,7 @@ export const adminApi = {
 
   downloadReportCsv: (token: string, type: string, startDate: string, endDate: string) => {
     const params = new URLSearchParams({ type, start_date: startDate, end_date: endDate, format: 'csv' });
-    return api<{ csv: string; count: number; filename: string }>(`/api/admin/export/report/download?${params}`, { token });
+    return api<ExportJob>(`/api/admin/export/report/download?${params}`, { token });
   },
 
   // Data Integrity
@@ -1058,6 +1151,25 @@ export interface ConversationStats {
   unhelpful?: number;
   good_examples: number;
   bad_examples: number;
+  answer_cache?: {
+    hits: number;
+    lookups: number;
+    hit_rate: number;
+    tokens_saved: number;
+  };
+}
+
+export interface ExportJob {
+  job_id: string;
+  status: string;
+  kind: string;
+  format: string;
+  count: number;
+  bytes: number;
+  compressed_bytes: number;
+  filename: string;
+  download_url: string | null;
+  created_at: string;
 }
 
 export interface DataFile {
@@ -0,0 +1,102 @@
+"""
+Benchmark streamed vs. buffered advisor answers with the fake AI provider.
+
+Runs the same AI-routed questions through RecommendationEngine.ask (the
+whole answer at once) and RecommendationEngine.ask_stream (deltas as the
+provider produces them), and reports time to first token and total time.
+The fake provider (AI_PROVIDER=fake) needs no API keys or network; its
+first-token latency and per-token delay are set on the command line.
+
+Usage:
+    python scripts/benchmark_advisor_stream.py
+    python scripts/benchmark_advisor_stream.py --first-token-ms 800 --token-delay-ms 40 --runs 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+os.environ.setdefault("DATA_DIR", str(PROJECT_ROOT / "data"))
+
+QUESTIONS = [
+    "What if I skip Gen 3 heroes?",
+    "Is it worth investing in Jessie's expedition skill?",
+    "Should I buy the hero gear pack or save gems?",
+]
+
+PROFILE = {"furnace_level": 25, "spending_profile": "f2p", "server_age_days": 120}
+HEROES = [
+    {"hero_name": "Jeronimo", "level": 50, "stars": 3},
+    {"hero_name": "Natalia", "level": 45, "stars": 2},
+    {"hero_name": "Molly", "level": 40, "stars": 2},
+]
+
+
+def _buffered(engine, question: str) -> tuple:
+    start = time.perf_counter()
+    result = engine.ask(profile=PROFILE, user_heroes=HEROES, question=question)
+    elapsed = time.perf_counter() - start
+    # Nothing reaches the client before the whole answer does
+    return elapsed, elapsed, result
+
+
+def _streamed(engine, question: str) -> tuple:
+    start = time.perf_counter()
+    first = None
+    result = None
+    for event in engine.ask_stream(profile=PROFILE, user_heroes=HEROES, question=question):
+        if event["type"] == "delta" and first is None:
+            first = time.perf_counter() - start
+        elif event["type"] == "done":
+            result = event["result"]
+    return first, time.perf_counter() - start, result
+
+
+def _report(label: str, samples: list) -> None:
+    first = [s[0] * 1000 for s in samples]
+    total = [s[1] * 1000 for s in samples]
+    print(
+        f"  {label:<10} first token median {statistics.median(first):7.0f} ms   "
+        f"total median {statistics.median(total):7.0f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streamed advisor answers")
+    parser.add_argument("--first-token-ms", type=int, default=400)
+    parser.add_argument("--token-delay-ms", type=int, default=25)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ["AI_PROVIDER"] = "fake"
+    os.environ["AI_FAKE_FIRST_TOKEN_MS"] = str(args.first_token_ms)
+    os.environ["AI_FAKE_TOKEN_DELAY_MS"] = str(args.token_delay_ms)
+    from engine.recommendation_engine import get_engine
+
+    engine = get_engine()
+    print(
+        f"fake provider: {args.first_token_ms} ms to first token, {args.token_delay_ms} ms/token, "
+        f"{len(QUESTIONS)} questions x {args.runs} runs"
+    )
+
+    buffered, streamed = [], []
+    for _ in range(args.runs):
+        for question in QUESTIONS:
+            buffered.append(_buffered(engine, question))
+            streamed.append(_streamed(engine, question))
+
+    for (_, _, a), (_, _, b) in zip(buffered, streamed):
+        if (a["answer"], a["source"], a.get("tokens_output")) != (b["answer"], b["source"], b.get("tokens_output")):
+            sys.exit(f"Streamed answer differs from buffered answer:\n  {a}\n  {b}")
+
+    _report("buffered", buffered)
+    _report("streamed", streamed)
+
+
+if __name__ == "__main__":
+    main()
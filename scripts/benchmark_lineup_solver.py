@@ -0,0 +1,95 @@
+"""
+Benchmark the exact lineup assignment solver at full roster size.
+
+Every hero in heroes.json is treated as owned with randomized stats, which
+is the worst case for the solver (largest candidate lists per slot). Times
+the solver alone and the full personalized lineup build for a 3-slot
+template and the 5-slot arena template, plus top-K enumeration.
+
+Usage:
+    python scripts/benchmark_lineup_solver.py
+    python scripts/benchmark_lineup_solver.py --runs 2000 --seed 7
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+os.environ.setdefault("DATA_DIR", str(PROJECT_ROOT / "data"))
+
+from engine.analyzers.lineup_builder import LINEUP_TEMPLATES, LineupBuilder  # noqa: E402
+from engine.analyzers.lineup_solver import solve_assignment, solve_top_k  # noqa: E402
+
+TEMPLATES = ["bear_trap", "arena"]
+
+
+def _random_roster(builder: LineupBuilder, rng: random.Random) -> dict:
+    roster = {}
+    for hero in builder.reference.heroes:
+        stats = {
+            "level": rng.randint(1, 80),
+            "stars": rng.randint(0, 5),
+            "ascension": rng.randint(0, 5),
+        }
+        for n in range(1, 4):
+            stats[f"expedition_skill_{n}"] = rng.randint(1, 5)
+            stats[f"exploration_skill_{n}"] = rng.randint(1, 5)
+        for slot in range(1, 5):
+            stats[f"gear_slot{slot}_quality"] = rng.randint(0, 6)
+            stats[f"gear_slot{slot}_level"] = rng.randint(0, 100)
+        roster[hero["name"]] = stats
+    return roster
+
+
+def _time_us(fn, runs: int) -> list:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    return samples
+
+
+def _report(label: str, samples: list) -> None:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"  {label:<16} median {statistics.median(samples):8.1f} us   p95 {p95:8.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the lineup assignment solver")
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    builder = LineupBuilder()
+    roster = _random_roster(builder, rng)
+    print(f"Roster: {len(roster)} owned heroes, {args.runs} runs per measurement")
+
+    for mode in TEMPLATES:
+        scores = builder.build_score_matrix(roster, [mode])
+        slots = LINEUP_TEMPLATES[mode]["slots"]
+        slot_candidates = [
+            builder._slot_candidates(slot, scores, scores.columns[mode], 99) for slot in slots
+        ]
+        sizes = "x".join(str(len(c)) for c in slot_candidates)
+        print(f"{mode} ({len(slots)} slots, candidates {sizes})")
+        _report("solver", _time_us(lambda: solve_assignment(slot_candidates), args.runs))
+        _report(f"top-{args.top_k}", _time_us(lambda: solve_top_k(slot_candidates, args.top_k), args.runs))
+        _report("score matrix", _time_us(lambda: builder.build_score_matrix(roster, [mode]), args.runs))
+        _report(
+            "full lineup",
+            _time_us(lambda: builder.build_personalized_lineup(mode, roster, scores=scores), args.runs),
+        )
+
+
+if __name__ == "__main__":
+    main()
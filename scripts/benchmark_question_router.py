@@ -0,0 +1,185 @@
+"""
+Benchmark advisor question routing: per-pattern re.search vs. QuestionRouter.
+
+The legacy path is the routing the advisor used to do per question:
+RequestClassifier.classify (re.search over AI_PATTERNS / RULE_PATTERNS)
+and the lineup mode lookup. The router path is the same two lookups
+through the shared QUESTION_ROUTER. Both must agree on every question in
+the corpus before timings are reported.
+
+Entity extraction is timed separately: the old per-name substring tests
+against the word-bounded EntityIndex scan. Their results differ by design
+(the index no longer finds "greg" inside "gregory"), so they are not
+compared.
+
+The corpus is a conversation export from the admin AI page (JSONL with a
+"question" field, optionally .gz) or a plain text file with one question
+per line. Without --corpus a small built-in sample is used.
+
+Usage:
+    python scripts/benchmark_question_router.py
+    python scripts/benchmark_question_router.py --corpus ai_training_data_all.jsonl.gz --runs 20
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+os.environ.setdefault("DATA_DIR", str(PROJECT_ROOT / "data"))
+
+from engine.analyzers.request_classifier import (  # noqa: E402
+    AI_PATTERNS,
+    EXPLICIT_AI_PHRASES,
+    LINEUP_MODE_PATTERNS,
+    QUESTION_ROUTER,
+    RULE_PATTERNS,
+    RequestClassifier,
+)
+from common.reference_store import get_reference_store  # noqa: E402
+from engine.analyzers.entity_index import (  # noqa: E402
+    GAME_MODE_NAMES,
+    HERO_GEAR_PIECES,
+    get_entity_index,
+)
+
+SAMPLE_QUESTIONS = [
+    "What is the best bear trap lineup?",
+    "bear trap heroes?",
+    "Who should I use for crazy joe",
+    "should i upgrade jeronimo or natalia first",
+    "What should I upgrade next?",
+    "Is Molly good for garrison defense?",
+    "Which joiner heroes should I send when joining an attack rally?",
+    "what gear should i focus on for my chief",
+    "Is it worth investing in Jessie's expedition skill?",
+    "Compare Flint vs Philly for rallies",
+    "Tell me about alliance tech priorities",
+    "How do I improve my furnace faster in mid game?",
+    "whats the best team for svs field battles",
+    "what if I skip Gen 3 heroes",
+    "best heroes for exploration and frozen stages",
+    "Should I buy the hero gear pack or save gems?",
+    "I'm R4 in my alliance, what should I focus on for rally lead?",
+    "ring or amulet first for my lancer heroes",
+    "why is Sergey recommended for defense joiner",
+    "hello",
+]
+
+
+def load_corpus(path: str) -> list:
+    opener = gzip.open if path.endswith(".gz") else open
+    questions = []
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                question = json.loads(line).get("question")
+                if question:
+                    questions.append(question)
+            else:
+                questions.append(line)
+    return questions
+
+
+def legacy_route(question: str) -> tuple:
+    """The per-pattern routing the advisor did before the shared router."""
+    q = question.lower().strip()
+    if any(phrase in q for phrase in EXPLICIT_AI_PHRASES):
+        classified = ("explicit_ai", 1.0)
+    else:
+        classified = None
+        for pattern, category, confidence in AI_PATTERNS:
+            if re.search(pattern, q):
+                classified = (category, confidence)
+                break
+        if classified is None:
+            best = None
+            for pattern, category, handler, confidence in RULE_PATTERNS:
+                if re.search(pattern, q) and (best is None or confidence > best[1]):
+                    best = (category, confidence)
+            classified = best or ("general", 0.5)
+
+    q = question.lower()
+    mode = next((m for pattern, m in LINEUP_MODE_PATTERNS if re.search(pattern, q)), None)
+    return classified, mode
+
+
+def router_route(classifier: RequestClassifier, question: str) -> tuple:
+    classified = classifier.classify(question)
+    mode = QUESTION_ROUTER.first(question, "mode")
+    return (
+        (classified.category, classified.confidence),
+        mode.route.category if mode else None,
+    )
+
+
+def legacy_entities(hero_names: list, question: str) -> tuple:
+    """The substring entity extraction the advisor did before the entity index."""
+    q = question.lower()
+    return (
+        [h.title() for h in hero_names if h in q],
+        [m for text, m in GAME_MODE_NAMES if text in q],
+        [p.title() for p in HERO_GEAR_PIECES if p in q],
+    )
+
+
+def _time_us(fn, questions: list, runs: int) -> list:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for q in questions:
+            fn(q)
+        samples.append((time.perf_counter() - start) * 1_000_000 / len(questions))
+    return samples
+
+
+def _report(label: str, samples: list) -> None:
+    samples = sorted(samples)
+    p95 = samples[max(int(len(samples) * 0.95) - 1, 0)]
+    print(f"  {label:<22} median {statistics.median(samples):8.1f} us/question   p95 {p95:8.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark advisor question routing")
+    parser.add_argument("--corpus", help="Conversation export (.jsonl[.gz]) or text file, one question per line")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    questions = load_corpus(args.corpus) if args.corpus else SAMPLE_QUESTIONS
+    classifier = RequestClassifier()
+
+    mismatches = [q for q in questions if legacy_route(q) != router_route(classifier, q)]
+    for q in mismatches[:10]:
+        print(f"MISMATCH: {q!r}\n  legacy {legacy_route(q)}\n  router {router_route(classifier, q)}")
+    if mismatches:
+        sys.exit(f"{len(mismatches)} of {len(questions)} questions routed differently")
+    print(f"{len(questions)} questions, identical routing, {args.runs} runs per measurement")
+
+    _report("legacy re.search", _time_us(legacy_route, questions, args.runs))
+
+    def uncached(q):
+        QUESTION_ROUTER.clear_cache()
+        return router_route(classifier, q)
+
+    _report("router (cold cache)", _time_us(uncached, questions, args.runs))
+    _report("router", _time_us(lambda q: router_route(classifier, q), questions, args.runs))
+
+    index = get_entity_index()
+    hero_names = [h["name"].lower() for h in get_reference_store().heroes]
+    print("entity extraction")
+    _report("legacy substring", _time_us(lambda q: legacy_entities(hero_names, q), questions, args.runs))
+    _report("entity index", _time_us(index.find, questions, args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark cold-start reference-data loading: plain JSON vs. the bundle.
+
+Each run starts a fresh interpreter (a stand-in for a cold Lambda container)
+and loads the files the handlers and engine read at startup. The JSON run
+points REFERENCE_BUNDLE at a missing file so every lookup parses from disk.
+Both the total (import plus loads) and the loads alone are reported; the
+import is the same for either source.
+
+Usage:
+    python scripts/build_reference_bundle.py
+    python scripts/benchmark_reference_load.py --runs 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BACKEND_DIR = PROJECT_ROOT / "backend"
+DATA_DIR = PROJECT_ROOT / "data"
+BUNDLE_PATH = BACKEND_DIR / "common" / "reference_bundle.bin"
+
+# Files read on a cold start across hero_repo, lineup_builder,
+# RecommendationEngine, PowerOptimizer and handlers/general.py
+COLD_START_FILES = [
+    "heroes.json",
+    "chief_gear.json",
+    "chief_equipment_data.json",
+    "hero_power_data.json",
+    "troop_data.json",
+    "upgrades/war_academy.steps.json",
+    "upgrades/buildings.edges.json",
+    "upgrades/buildings.fc.edges.json",
+    "events.json",
+    "events_guide.json",
+    "guides/hero_lineup_reasoning.json",
+]
+
+CHILD_CODE = """
+import json, sys, time
+start = time.perf_counter()
+from common.reference_data import load_json
+imported = time.perf_counter()
+for rel_path in json.loads(sys.argv[1]):
+    load_json(rel_path)
+end = time.perf_counter()
+print((end - start) * 1000, (end - imported) * 1000)
+"""
+
+
+def _run_once(bundle_path: str) -> tuple:
+    env = {
+        **os.environ,
+        "DATA_DIR": str(DATA_DIR),
+        "REFERENCE_BUNDLE": bundle_path,
+        "PYTHONDONTWRITEBYTECODE": "1",
+    }
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD_CODE, json.dumps(COLD_START_FILES)],
+        cwd=str(BACKEND_DIR),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_ms, load_ms = out.stdout.strip().splitlines()[-1].split()
+    return float(total_ms), float(load_ms)
+
+
+def _report(label: str, samples: list) -> float:
+    median = statistics.median(samples)
+    print(f"{label:<8} median {median:7.2f} ms   min {min(samples):7.2f} ms   max {max(samples):7.2f} ms")
+    return median
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reference-data cold start")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--bundle", default=str(BUNDLE_PATH))
+    args = parser.parse_args()
+
+    if not Path(args.bundle).exists():
+        print(f"Bundle not found at {args.bundle}; run scripts/build_reference_bundle.py first")
+        sys.exit(1)
+
+    json_samples = [_run_once(str(BUNDLE_PATH) + ".missing") for _ in range(args.runs)]
+    bundle_samples = [_run_once(args.bundle) for _ in range(args.runs)]
+
+    print(f"Cold-start load of {len(COLD_START_FILES)} reference files ({args.runs} runs each)")
+    for label, column in (("total", 0), ("loads", 1)):
+        print(f"-- {label}")
+        json_median = _report("json", [s[column] for s in json_samples])
+        bundle_median = _report("bundle", [s[column] for s in bundle_samples])
+        if bundle_median > 0:
+            print(f"Speedup: {json_median / bundle_median:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
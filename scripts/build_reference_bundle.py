@@ -0,0 +1,54 @@
+"""
+Build the precompiled reference-data bundle.
+
+Compiles every JSON file under data/ into one versioned, checksummed snapshot
+that ships inside the common Lambda layer, then verifies every section's
+checksum (the runtime loader does not). Run before `sam build` whenever
+anything under data/ changes; the loader falls back to plain JSON for any
+file that is newer than the snapshot.
+
+Usage:
+    python scripts/build_reference_bundle.py
+    python scripts/build_reference_bundle.py --data-dir data --out backend/common/reference_bundle.bin
+    python scripts/build_reference_bundle.py --verify-only
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+
+from common.reference_data import build_bundle, verify_bundle  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the reference-data bundle")
+    parser.add_argument("--data-dir", default=str(PROJECT_ROOT / "data"))
+    parser.add_argument(
+        "--out", default=str(PROJECT_ROOT / "backend" / "common" / "reference_bundle.bin")
+    )
+    parser.add_argument(
+        "--verify-only", action="store_true", help="Check an existing bundle without rebuilding it"
+    )
+    args = parser.parse_args()
+
+    if not args.verify_only:
+        summary = build_bundle(args.data_dir, args.out)
+        print(f"Bundle version: {summary['version']}")
+        print(f"Files:          {summary['files']}")
+        print(f"Source JSON:    {summary['source_bytes'] / 1024:.1f} KB")
+        print(f"Bundle size:    {summary['bundle_bytes'] / 1024:.1f} KB")
+        print(f"Written to:     {summary['path']}")
+
+    problems = verify_bundle(args.out)
+    for problem in problems:
+        print(f"Bundle check failed: {problem}")
+    if problems:
+        sys.exit(1)
+    print("Checksums:      ok")
+
+
+if __name__ == "__main__":
+    main()
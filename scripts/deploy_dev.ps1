@@ -12,7 +12,14 @@ $pythonDir = "C:\Users\adam\AppData\Local\Programs\Python\Python313"
 $env:PATH = "$pythonDir;$pythonDir\Scripts;$env:PATH"
 
 if (-not $FrontendOnly) {
-    Write-Host "=== Building Backend (SAM) ===" -ForegroundColor Cyan
+    Write-Host "=== Building Reference Data Bundle ===" -ForegroundColor Cyan
+    & python "$rootDir\scripts\build_reference_bundle.py"
+    if ($LASTEXITCODE -ne 0) {
+        Write-Host "Reference bundle build failed!" -ForegroundColor Red
+        exit 1
+    }
+
+    Write-Host "`n=== Building Backend (SAM) ===" -ForegroundColor Cyan
     Set-Location "$rootDir\infra"
     & $samCli build
     if ($LASTEXITCODE -ne 0) {